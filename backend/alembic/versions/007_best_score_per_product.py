@@ -0,0 +1,53 @@
+"""Add is_real_asin column and best-score-per-product index
+
+Revision ID: 007_best_score_per_product
+Revises: 006_harvested_asins
+Create Date: 2025-12-08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import Boolean
+
+# revision identifiers, used by Alembic.
+revision = '007_best_score_per_product'
+down_revision = '006_harvested_asins'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Ajouter is_real_asin (indexé) et l'index du meilleur score par produit."""
+    op.add_column(
+        'product_candidates',
+        sa.Column(
+            'is_real_asin',
+            Boolean,
+            nullable=False,
+            server_default=sa.true(),
+            comment="False si le produit provient des données mockées (source == 'mock')",
+        ),
+    )
+    # Backfill depuis le JSON brut (une seule fois, ensuite maintenu par DiscoverJob)
+    op.execute(
+        "UPDATE product_candidates SET is_real_asin = false "
+        "WHERE raw_keepa_data ->> 'source' = 'mock'"
+    )
+    op.create_index('ix_product_candidates_is_real_asin', 'product_candidates', ['is_real_asin'])
+
+    op.create_index(
+        'idx_product_scores_best_per_product',
+        'product_scores',
+        [
+            'product_candidate_id',
+            sa.text('global_score DESC NULLS LAST'),
+            sa.text('margin_percent DESC NULLS LAST'),
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Supprimer is_real_asin et l'index du meilleur score par produit."""
+    op.drop_index('idx_product_scores_best_per_product', table_name='product_scores')
+    op.drop_index('ix_product_candidates_is_real_asin', table_name='product_candidates')
+    op.drop_column('product_candidates', 'is_real_asin')
@@ -0,0 +1,101 @@
+"""Create winners projection table
+
+Revision ID: 008_winners_projection
+Revises: 007_best_score_per_product
+Create Date: 2025-12-09
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, Numeric, Boolean, DateTime
+
+# revision identifiers, used by Alembic.
+revision = '008_winners_projection'
+down_revision = '007_best_score_per_product'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table winners (meilleur score par produit) et la remplir."""
+    op.create_table(
+        'winners',
+        sa.Column('product_candidate_id', UUID(as_uuid=True), primary_key=True),
+        sa.Column('product_score_id', UUID(as_uuid=True), nullable=False),
+        sa.Column('sourcing_option_id', UUID(as_uuid=True), nullable=False),
+        sa.Column('supplier_name', String(255), nullable=True),
+        sa.Column('purchase_price', Numeric(10, 2), nullable=True),
+        sa.Column('selling_price_target', Numeric(10, 2), nullable=False),
+        sa.Column('amazon_fees_estimate', Numeric(10, 2), nullable=True),
+        sa.Column('margin_absolute', Numeric(10, 2), nullable=True),
+        sa.Column('margin_percent', Numeric(5, 2), nullable=True),
+        sa.Column('gross_profit', Numeric(10, 2), nullable=True),
+        sa.Column('gross_margin_percent', Numeric(5, 2), nullable=True),
+        sa.Column('net_profit_estimated', Numeric(10, 2), nullable=True),
+        sa.Column('estimated_sales_per_day', Numeric(10, 2), nullable=True),
+        sa.Column('approx_profit_per_day', Numeric(12, 2), nullable=True),
+        sa.Column('global_score', Numeric(10, 2), nullable=True),
+        sa.Column('decision', String(20), nullable=False),
+        sa.Column('is_real_asin', Boolean, nullable=False, server_default=sa.true()),
+        sa.Column('refreshed_at', DateTime, nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['product_candidate_id'], ['product_candidates.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_score_id'], ['product_scores.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['sourcing_option_id'], ['sourcing_options.id'], ondelete='CASCADE'),
+    )
+    # Index alignés sur les filtres et le tri du dashboard
+    op.create_index('ix_winners_margin_percent', 'winners', ['margin_percent'])
+    op.create_index('ix_winners_estimated_sales_per_day', 'winners', ['estimated_sales_per_day'])
+    op.create_index(
+        'idx_winners_score',
+        'winners',
+        [
+            sa.text('global_score DESC NULLS LAST'),
+            sa.text('margin_percent DESC NULLS LAST'),
+            'product_candidate_id',
+        ],
+    )
+    op.create_index(
+        'idx_winners_decision_score',
+        'winners',
+        [
+            'decision',
+            sa.text('global_score DESC NULLS LAST'),
+            sa.text('margin_percent DESC NULLS LAST'),
+            'product_candidate_id',
+        ],
+    )
+
+    # Remplissage initial depuis les scores existants
+    op.execute(
+        """
+        INSERT INTO winners (
+            product_candidate_id, product_score_id, sourcing_option_id, supplier_name,
+            purchase_price, selling_price_target, amazon_fees_estimate, margin_absolute,
+            margin_percent, gross_profit, gross_margin_percent, net_profit_estimated,
+            estimated_sales_per_day, approx_profit_per_day, global_score, decision,
+            is_real_asin, refreshed_at
+        )
+        SELECT DISTINCT ON (ps.product_candidate_id)
+            ps.product_candidate_id, ps.id, ps.sourcing_option_id, so.supplier_name,
+            so.unit_cost, ps.selling_price_target, ps.amazon_fees_estimate, ps.margin_absolute,
+            ps.margin_percent, ps.gross_profit, ps.gross_margin_percent, ps.net_profit_estimated,
+            ps.estimated_sales_per_day,
+            COALESCE(ps.net_profit_estimated * ps.estimated_sales_per_day, 0),
+            ps.global_score, ps.decision, pc.is_real_asin, now()
+        FROM product_scores ps
+        JOIN product_candidates pc ON pc.id = ps.product_candidate_id
+        JOIN sourcing_options so ON so.id = ps.sourcing_option_id
+        ORDER BY ps.product_candidate_id, ps.global_score DESC NULLS LAST,
+                 ps.margin_percent DESC NULLS LAST
+        """
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table winners."""
+    op.drop_index('idx_winners_decision_score', table_name='winners')
+    op.drop_index('idx_winners_score', table_name='winners')
+    op.drop_index('ix_winners_estimated_sales_per_day', table_name='winners')
+    op.drop_index('ix_winners_margin_percent', table_name='winners')
+    op.drop_table('winners')
@@ -0,0 +1,76 @@
+"""Keyset pagination indexes for winners and product_scores
+
+Revision ID: 009_keyset_pagination_indexes
+Revises: 008_winners_projection
+Create Date: 2025-12-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_keyset_pagination_indexes'
+down_revision = '008_winners_projection'
+branch_labels = None
+depends_on = None
+
+# Doit rester identique à app.core.pagination.NULLS_LAST_SENTINEL
+NULLS_LAST_SENTINEL = "-999999999"
+
+# (nom, table, colonnes) ; les colonnes de tri sont remplacées par COALESCE(col, sentinelle)
+KEYSET_INDEXES = [
+    ('idx_winners_score', 'winners', [None, 'global_score', 'margin_percent', 'product_candidate_id']),
+    ('idx_winners_decision_score', 'winners', ['decision', 'global_score', 'margin_percent', 'product_candidate_id']),
+    ('idx_winners_margin', 'winners', [None, 'margin_percent', 'global_score', 'product_candidate_id']),
+    ('idx_winners_decision_margin', 'winners', ['decision', 'margin_percent', 'global_score', 'product_candidate_id']),
+    ('idx_winners_profit_per_day', 'winners', [None, 'approx_profit_per_day', 'global_score', 'product_candidate_id']),
+    ('idx_winners_decision_profit_per_day', 'winners', ['decision', 'approx_profit_per_day', 'global_score', 'product_candidate_id']),
+    ('idx_product_scores_decision_score', 'product_scores', ['decision', 'global_score', 'margin_percent', 'id']),
+    ('idx_product_scores_decision_margin', 'product_scores', ['decision', 'margin_percent', 'global_score', 'id']),
+]
+
+
+def _keyset_columns(columns):
+    """Construit la liste de colonnes d'un index keyset (préfixe, 2 clés COALESCE, id)."""
+    prefix, first, second, id_column = columns
+    keys = [
+        sa.text(f"COALESCE({first}, {NULLS_LAST_SENTINEL})"),
+        sa.text(f"COALESCE({second}, {NULLS_LAST_SENTINEL})"),
+        id_column,
+    ]
+    return ([prefix] if prefix else []) + keys
+
+
+def upgrade() -> None:
+    """Remplacer les index de tri des winners par des index keyset et indexer les scores."""
+    op.drop_index('idx_winners_decision_score', table_name='winners')
+    op.drop_index('idx_winners_score', table_name='winners')
+
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, _keyset_columns(columns))
+
+
+def downgrade() -> None:
+    """Revenir aux index de tri DESC NULLS LAST de la migration 008."""
+    for name, table, _ in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
+
+    op.create_index(
+        'idx_winners_score',
+        'winners',
+        [
+            sa.text('global_score DESC NULLS LAST'),
+            sa.text('margin_percent DESC NULLS LAST'),
+            'product_candidate_id',
+        ],
+    )
+    op.create_index(
+        'idx_winners_decision_score',
+        'winners',
+        [
+            'decision',
+            sa.text('global_score DESC NULLS LAST'),
+            sa.text('margin_percent DESC NULLS LAST'),
+            'product_candidate_id',
+        ],
+    )
@@ -0,0 +1,38 @@
+"""Create listing content cache table
+
+Revision ID: 010_listing_content_cache
+Revises: 009_keyset_pagination_indexes
+Create Date: 2025-12-11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_listing_content_cache'
+down_revision = '009_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table listing_content_cache."""
+    op.create_table(
+        'listing_content_cache',
+        sa.Column('content_hash', sa.String(64), primary_key=True),
+        sa.Column('generator_version', sa.String(100), nullable=False),
+        sa.Column('content', sa.JSON, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('last_used_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        'ix_listing_content_cache_generator_version',
+        'listing_content_cache',
+        ['generator_version'],
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table listing_content_cache."""
+    op.drop_index('ix_listing_content_cache_generator_version', table_name='listing_content_cache')
+    op.drop_table('listing_content_cache')
@@ -0,0 +1,36 @@
+"""Add last_seen_at to harvested_asins
+
+Revision ID: 011_harvested_asins_last_seen
+Revises: 010_listing_content_cache
+Create Date: 2025-12-11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_harvested_asins_last_seen'
+down_revision = '010_listing_content_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Ajouter last_seen_at (dernière récolte ayant remonté l'ASIN)."""
+    op.add_column(
+        'harvested_asins',
+        sa.Column(
+            'last_seen_at',
+            sa.DateTime,
+            nullable=False,
+            server_default=sa.func.now(),
+            comment="Dernière récolte ayant remonté cet ASIN",
+        ),
+    )
+    # Meilleure approximation pour l'existant
+    op.execute("UPDATE harvested_asins SET last_seen_at = updated_at")
+
+
+def downgrade() -> None:
+    """Supprimer last_seen_at."""
+    op.drop_column('harvested_asins', 'last_seen_at')
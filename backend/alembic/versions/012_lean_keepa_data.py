@@ -0,0 +1,71 @@
+"""Lean Keepa data: typed columns and compressed history store
+
+Revision ID: 012_lean_keepa_data
+Revises: 011_harvested_asins_last_seen
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_lean_keepa_data'
+down_revision = '011_harvested_asins_last_seen'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Ajouter les colonnes Keepa typées et la table keepa_history_series."""
+    op.add_column(
+        'product_candidates',
+        sa.Column('keepa_domain', sa.Integer, nullable=True,
+                  comment="Domaine Keepa du produit (clé de keepa_history_series)"),
+    )
+    op.add_column(
+        'product_candidates',
+        sa.Column('brand', sa.String(255), nullable=True, comment="Marque du produit (Keepa)"),
+    )
+    op.add_column(
+        'product_candidates',
+        sa.Column('sales_rank_drops_90', sa.Integer, nullable=True,
+                  comment="Nombre de baisses du BSR sur 90 jours (≈ ventes)"),
+    )
+
+    # Meilleure approximation pour l'existant (raw_keepa_data est allégé au prochain discover)
+    op.execute(
+        """
+        UPDATE product_candidates
+        SET keepa_domain = (raw_keepa_data->>'domain')::integer
+        WHERE raw_keepa_data->>'domain' ~ '^[0-9]+$'
+        """
+    )
+
+    op.create_table(
+        'keepa_history_series',
+        sa.Column('asin', sa.String(10), primary_key=True,
+                  comment="Amazon Standard Identification Number"),
+        sa.Column('domain', sa.Integer, primary_key=True,
+                  comment="Domaine Keepa (1=FR dans cette application)"),
+        sa.Column('series', sa.SmallInteger, primary_key=True,
+                  comment="Index de la série dans le tableau csv Keepa (0=Amazon, 1=neuf, 3=BSR)"),
+        sa.Column('points_count', sa.Integer, nullable=False,
+                  comment="Nombre de points (temps, valeur) de la série"),
+        sa.Column('first_time', sa.Integer, nullable=True,
+                  comment="Premier point (minutes Keepa)"),
+        sa.Column('last_time', sa.Integer, nullable=True,
+                  comment="Dernier point (minutes Keepa)"),
+        sa.Column('last_value', sa.Integer, nullable=True,
+                  comment="Dernière valeur (centimes ou rang, -1 = indisponible)"),
+        sa.Column('data', sa.LargeBinary, nullable=False,
+                  comment="Points delta-encodés (varint zigzag) compressés zlib"),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table keepa_history_series et les colonnes Keepa typées."""
+    op.drop_table('keepa_history_series')
+    op.drop_column('product_candidates', 'sales_rank_drops_90')
+    op.drop_column('product_candidates', 'brand')
+    op.drop_column('product_candidates', 'keepa_domain')
@@ -0,0 +1,34 @@
+"""Add content_hash to product_candidates
+
+Revision ID: 013_product_content_hash
+Revises: 012_lean_keepa_data
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_product_content_hash'
+down_revision = '012_lean_keepa_data'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Ajouter content_hash (empreinte des champs normalisés au dernier upsert)."""
+    op.add_column(
+        'product_candidates',
+        sa.Column(
+            'content_hash',
+            sa.String(64),
+            nullable=True,
+            comment="SHA-256 des champs Keepa normalisés au dernier upsert",
+        ),
+    )
+    # Pas de backfill : chaque produit est réécrit une fois, au prochain discover
+
+
+def downgrade() -> None:
+    """Supprimer content_hash."""
+    op.drop_column('product_candidates', 'content_hash')
@@ -0,0 +1,40 @@
+"""Create asin_refresh_schedule table
+
+Revision ID: 014_asin_refresh_schedule
+Revises: 013_product_content_hash
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014_asin_refresh_schedule'
+down_revision = '013_product_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table asin_refresh_schedule (échéances de rafraîchissement Keepa)."""
+    op.create_table(
+        'asin_refresh_schedule',
+        sa.Column('asin', sa.String(10), primary_key=True),
+        sa.Column('marketplace', sa.String(50), primary_key=True),
+        sa.Column('next_due_at', sa.DateTime, nullable=False),
+        sa.Column('last_refreshed_at', sa.DateTime, nullable=True),
+        sa.Column('refresh_interval_hours', sa.Numeric(8, 2), nullable=False),
+        sa.Column('last_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('price_volatility', sa.Numeric(6, 4), nullable=False, server_default='0'),
+    )
+    op.create_index(
+        'idx_asin_refresh_schedule_due',
+        'asin_refresh_schedule',
+        ['marketplace', 'next_due_at'],
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table asin_refresh_schedule."""
+    op.drop_index('idx_asin_refresh_schedule_due', table_name='asin_refresh_schedule')
+    op.drop_table('asin_refresh_schedule')
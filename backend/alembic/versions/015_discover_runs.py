@@ -0,0 +1,46 @@
+"""Create discover_runs table (resumable discover checkpoints)
+
+Revision ID: 015_discover_runs
+Revises: 014_asin_refresh_schedule
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '015_discover_runs'
+down_revision = '014_asin_refresh_schedule'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table discover_runs (points de reprise des runs de découverte)."""
+    op.create_table(
+        'discover_runs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('market_code', sa.String(50), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('asins', sa.JSON, nullable=False),
+        sa.Column('batch_size', sa.Integer, nullable=False),
+        sa.Column('cursor', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('completed_batches', sa.JSON, nullable=False),
+        sa.Column('stats', sa.JSON, nullable=False),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('started_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index(
+        'idx_discover_runs_market_status',
+        'discover_runs',
+        ['market_code', 'status', 'started_at'],
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table discover_runs."""
+    op.drop_index('idx_discover_runs_market_status', table_name='discover_runs')
+    op.drop_table('discover_runs')
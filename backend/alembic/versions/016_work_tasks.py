@@ -0,0 +1,47 @@
+"""Create work_tasks table (distributed pipeline work queue)
+
+Revision ID: 016_work_tasks
+Revises: 015_discover_runs
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '016_work_tasks'
+down_revision = '015_discover_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table work_tasks (file de travail des étapes du pipeline)."""
+    op.create_table(
+        'work_tasks',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('task_type', sa.String(50), nullable=False),
+        sa.Column('market_code', sa.String(50), nullable=True),
+        sa.Column('payload', sa.JSON, nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer, nullable=False),
+        sa.Column('available_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('locked_until', sa.DateTime, nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('result', sa.JSON, nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index('idx_work_tasks_claim', 'work_tasks', ['status', 'available_at'])
+    op.create_index('idx_work_tasks_type_status', 'work_tasks', ['task_type', 'status'])
+
+
+def downgrade() -> None:
+    """Supprimer la table work_tasks."""
+    op.drop_index('idx_work_tasks_type_status', table_name='work_tasks')
+    op.drop_index('idx_work_tasks_claim', table_name='work_tasks')
+    op.drop_table('work_tasks')
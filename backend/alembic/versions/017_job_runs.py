@@ -0,0 +1,45 @@
+"""Create job_runs table (single-flight job executions)
+
+Revision ID: 017_job_runs
+Revises: 016_work_tasks
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '017_job_runs'
+down_revision = '016_work_tasks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table job_runs (exécutions des jobs, une seule en cours par job et marché)."""
+    op.create_table(
+        'job_runs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('job_type', sa.String(50), nullable=False),
+        sa.Column('market_code', sa.String(50), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('owner', sa.String(100), nullable=True),
+        sa.Column('stats', sa.JSON, nullable=True),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('started_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index(
+        'idx_job_runs_type_market_status',
+        'job_runs',
+        ['job_type', 'market_code', 'status'],
+    )
+    op.create_index('idx_job_runs_started_at', 'job_runs', ['started_at'])
+
+
+def downgrade() -> None:
+    """Supprimer la table job_runs."""
+    op.drop_index('idx_job_runs_started_at', table_name='job_runs')
+    op.drop_index('idx_job_runs_type_market_status', table_name='job_runs')
+    op.drop_table('job_runs')
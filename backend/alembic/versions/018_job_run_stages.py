@@ -0,0 +1,53 @@
+"""Create job_run_stages table (per-stage job run ledger)
+
+Revision ID: 018_job_run_stages
+Revises: 017_job_runs
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '018_job_run_stages'
+down_revision = '017_job_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Créer la table job_run_stages (durées, temps SQL, appels HTTP et caches par étape)."""
+    op.create_table(
+        'job_run_stages',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            'job_run_id',
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('job_runs.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('stage', sa.String(50), nullable=False),
+        sa.Column('started_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('wall_ms', sa.Float, nullable=False, server_default='0'),
+        sa.Column('db_ms', sa.Float, nullable=False, server_default='0'),
+        sa.Column('db_queries', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('rows_read', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('rows_written', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('http_calls', sa.JSON, nullable=True),
+        sa.Column('keepa_tokens', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('cache', sa.JSON, nullable=True),
+    )
+    op.create_index('idx_job_run_stages_job_run_id', 'job_run_stages', ['job_run_id'])
+    op.create_index(
+        'idx_job_run_stages_stage_started_at',
+        'job_run_stages',
+        ['stage', 'started_at'],
+    )
+
+
+def downgrade() -> None:
+    """Supprimer la table job_run_stages."""
+    op.drop_index('idx_job_run_stages_stage_started_at', table_name='job_run_stages')
+    op.drop_index('idx_job_run_stages_job_run_id', table_name='job_run_stages')
+    op.drop_table('job_run_stages')
@@ -0,0 +1,25 @@
+"""Add params to job_runs (parameters of the single-flight execution)
+
+Revision ID: 019_job_run_params
+Revises: 018_job_run_stages
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '019_job_run_params'
+down_revision = '018_job_run_stages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Ajouter la colonne params (paramètres du déclenchement, ex. force)."""
+    op.add_column('job_runs', sa.Column('params', sa.JSON, nullable=True))
+
+
+def downgrade() -> None:
+    """Supprimer la colonne params."""
+    op.drop_column('job_runs', 'params')
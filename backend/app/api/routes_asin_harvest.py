@@ -8,7 +8,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.jobs.asin_harvest_job import AsinHarvestJob
@@ -26,6 +26,21 @@ class AsinHarvestStats(BaseModel):
     duplicates: int = Field(description="Nombre d'ASINs déjà existants (doublons ignorés)")
 
 
+class AsinHarvestParallelStats(AsinHarvestStats):
+    """Statistiques de la récolte Apify parallèle (multi-runs)."""
+
+    runs_started: int = Field(description="Nombre de runs Apify lancés")
+    runs_succeeded: int = Field(description="Nombre de runs Apify terminés avec succès")
+
+
+class AsinHarvestParallelResponse(BaseModel):
+    """Réponse de l'endpoint de récolte Apify parallèle."""
+
+    success: bool = Field(description="Indique si le job s'est terminé avec succès")
+    message: str = Field(description="Message descriptif du résultat")
+    stats: AsinHarvestParallelStats = Field(description="Statistiques détaillées de l'exécution")
+
+
 class AsinHarvestResponse(BaseModel):
     """Réponse de l'endpoint de récolte d'ASINs."""
 
@@ -125,3 +140,92 @@ async def run_asin_harvest_job(
             detail=f"Erreur lors de l'exécution du job de récolte d'ASINs: {str(e)}",
         )
 
+
+
+@router.post(
+    "/jobs/asin_harvest/run_parallel",
+    response_model=AsinHarvestParallelResponse,
+    summary="Lancer la récolte d'ASINs Apify en parallèle (multi-catégories)",
+    description="""
+    Lance plusieurs runs Apify en parallèle (une liste par catégorie et par source)
+    et stocke les ASINs récoltés dans la table harvested_asins.
+
+    **Fonctionnalités :**
+    - Un run par (source, catégorie), au plus APIFY_MAX_CONCURRENT_RUNS simultanés
+    - Suivi des runs par long-polling, sans bloquer le serveur
+    - Datasets lus page par page (APIFY_DATASET_PAGE_SIZE items) et upsertés au fil de l'eau
+    - Un run en échec n'interrompt pas les autres
+
+    **Paramètres :**
+    - `market` (optionnel) : Code du marché (ex: "amazon_fr", "amazon_de")
+    - `categories` (optionnel, répétable) : Slugs de catégories Amazon
+      (ex: "kitchen", "sports"). Par défaut : classement général
+    - `sources` (optionnel, répétable) : "apify_bestsellers" et/ou "apify_movers"
+      - Par défaut : les deux
+    - `limit_per_run` (optionnel) : Nombre maximum de produits par run
+      - Par défaut : 100
+
+    **Retourne :**
+    - Statistiques détaillées (runs lancés/réussis, récoltés, nouveaux, doublons)
+    """,
+)
+async def run_asin_harvest_parallel_job(
+    market: Optional[str] = Query(
+        default="amazon_fr",
+        description="Code du marché (ex: amazon_fr, amazon_de)",
+    ),
+    categories: Optional[List[str]] = Query(
+        default=None,
+        description="Slugs de catégories Amazon (répétable)",
+    ),
+    sources: List[str] = Query(
+        default=["apify_bestsellers", "apify_movers"],
+        description="Listes à récolter (apify_bestsellers, apify_movers)",
+    ),
+    limit_per_run: int = Query(
+        default=100,
+        ge=1,
+        le=10000,
+        description="Nombre maximum de produits par run (1-10000)",
+    ),
+    db: Session = Depends(get_db),
+) -> AsinHarvestParallelResponse:
+    """
+    Lance la récolte d'ASINs Apify en parallèle sur plusieurs catégories et listes.
+    """
+    logger.info(
+        f"Démarrage de la récolte Apify parallèle via l'endpoint API: market={market}, "
+        f"categories={categories}, sources={sources}, limit_per_run={limit_per_run}"
+    )
+    try:
+        job = AsinHarvestJob(db)
+        stats = await job.run_apify_parallel(
+            market=market,
+            categories=categories,
+            sources=sources,
+            limit_per_run=limit_per_run,
+        )
+
+        return AsinHarvestParallelResponse(
+            success=True,
+            message=(
+                f"Récolte Apify parallèle terminée: {stats['runs_succeeded']}/"
+                f"{stats['runs_started']} runs réussis, {stats['inserted_new']} nouveaux ASINs"
+            ),
+            stats=AsinHarvestParallelStats(
+                harvested_total=stats.get("harvested_total", 0),
+                inserted_new=stats.get("inserted_new", 0),
+                duplicates=stats.get("duplicates_ignored", 0),
+                runs_started=stats.get("runs_started", 0),
+                runs_succeeded=stats.get("runs_succeeded", 0),
+            ),
+        )
+    except Exception as e:
+        logger.error(
+            f"Erreur lors de la récolte Apify parallèle: {str(e)}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la récolte Apify parallèle: {str(e)}",
+        )
@@ -8,20 +8,34 @@ from typing import List, Optional
 from uuid import UUID
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
 from pydantic import BaseModel, Field
 
 from app.core.database import get_db
+from app.core.pagination import (
+    InvalidCursorError,
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_sort_expression,
+)
 from app.models.product_candidate import ProductCandidate
-from app.models.product_score import ProductScore
-from app.models.sourcing_option import SourcingOption
+from app.models.winner import Winner
+from app.services.winners_projection import WinnersProjectionService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
 
+# Tris disponibles : clé -> (colonne principale, colonne secondaire), départage par product_candidate_id
+# (chaque tri a ses index keyset idx_winners_*, voir app.models.winner)
+WINNERS_SORTS = {
+    "global_score": (Winner.global_score, Winner.margin_percent),
+    "margin_percent": (Winner.margin_percent, Winner.global_score),
+    "approx_profit_per_day": (Winner.approx_profit_per_day, Winner.global_score),
+}
+
 
 class WinnerProductOut(BaseModel):
     """Réponse pour un produit winner."""
@@ -56,6 +70,10 @@ class WinnersResponse(BaseModel):
     filters: dict = Field(description="Filtres appliqués")
     items: List[WinnerProductOut] = Field(description="Liste des produits winners")
     total_count: int = Field(description="Nombre total d'items retournés")
+    next_cursor: str | None = Field(
+        default=None,
+        description="Curseur de la page suivante (None si dernière page)",
+    )
 
 
 @router.get(
@@ -66,13 +84,19 @@ class WinnersResponse(BaseModel):
     Récupère la liste des produits winners (candidats avec scores) avec des filtres.
     
     Pour chaque produit, retourne le meilleur score (global_score max) si plusieurs scores existent.
+    Lit la projection `winners` (meilleur score par produit), rafraîchie à chaque scoring.
     
     **Filtres disponibles :**
     - decision : A_launch, B_review, C_drop
     - min_margin_percent : marge minimum en pourcentage
     - min_global_score : score global minimum
     - min_sales_per_day : ventes par jour minimum
-    - limit : nombre maximum de résultats (défaut: 50)
+    - limit : nombre maximum de résultats par page (défaut: 50)
+
+    **Tri et pagination (keyset) :**
+    - sort : global_score (défaut), margin_percent, approx_profit_per_day
+    - order : desc (défaut) ou asc ; les valeurs NULL sont traitées comme les plus faibles
+    - cursor : valeur `next_cursor` de la page précédente pour obtenir la suivante
     """,
 )
 async def get_winners(
@@ -80,146 +104,105 @@ async def get_winners(
     min_margin_percent: Optional[float] = Query(None, description="Marge minimum en %"),
     min_global_score: Optional[float] = Query(None, description="Score global minimum"),
     min_sales_per_day: Optional[float] = Query(None, description="Ventes par jour minimum"),
-    limit: int = Query(50, ge=1, le=500, description="Nombre maximum de résultats"),
+    limit: int = Query(50, ge=1, le=500, description="Nombre maximum de résultats par page"),
+    sort: str = Query(
+        "global_score",
+        description="Clé de tri (global_score, margin_percent, approx_profit_per_day)",
+        pattern="^(global_score|margin_percent|approx_profit_per_day)$",
+    ),
+    order: str = Query("desc", description="Ordre de tri (desc, asc)", pattern="^(desc|asc)$"),
+    cursor: Optional[str] = Query(None, description="Curseur de pagination (next_cursor de la page précédente)"),
     db: Session = Depends(get_db),
 ) -> WinnersResponse:
     """
     Récupère les produits winners avec filtres.
     
     Pour chaque produit, retourne le score avec le meilleur global_score
-    si plusieurs scores existent pour ce produit.
+    si plusieurs scores existent pour ce produit. Pagination keyset via `cursor`.
     """
     logger.info(
         f"Récupération des winners avec filtres: decision={decision}, "
         f"min_margin_percent={min_margin_percent}, min_global_score={min_global_score}, "
-        f"min_sales_per_day={min_sales_per_day}, limit={limit}"
+        f"min_sales_per_day={min_sales_per_day}, limit={limit}, sort={sort}, order={order}"
     )
 
+    sort_columns = WINNERS_SORTS[sort]
+    cursor_sort = f"{sort}:{order}"
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, cursor_sort, len(sort_columns))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        # Requête principale avec JOINs simples
-        # On récupère tous les scores, puis on garde le meilleur par produit en Python
+        # Lecture de la projection winners (une ligne par produit, maintenue par ScoringJob)
         query = (
             db.query(
-                ProductCandidate.id.label("product_id"),
                 ProductCandidate.asin,
                 ProductCandidate.title,
                 ProductCandidate.category,
-                ProductCandidate.raw_keepa_data,
-                SourcingOption.supplier_name,
-                SourcingOption.unit_cost.label("purchase_price"),
-                ProductScore.selling_price_target,
-                ProductScore.amazon_fees_estimate,
-                ProductScore.margin_absolute,
-                ProductScore.margin_percent,
-                ProductScore.gross_profit,
-                ProductScore.gross_margin_percent,
-                ProductScore.net_profit_estimated,
-                ProductScore.estimated_sales_per_day,
-                # Calculer approx_profit_per_day = net_profit_estimated * estimated_sales_per_day
-                func.coalesce(
-                    ProductScore.net_profit_estimated * ProductScore.estimated_sales_per_day,
-                    Decimal("0")
-                ).label("approx_profit_per_day"),
-                ProductScore.global_score,
-                ProductScore.decision,
-            )
-            .join(ProductScore, ProductScore.product_candidate_id == ProductCandidate.id)
-            .join(
-                SourcingOption,
-                SourcingOption.id == ProductScore.sourcing_option_id,
+                Winner,
             )
+            .join(ProductCandidate, ProductCandidate.id == Winner.product_candidate_id)
         )
 
-        # Appliquer les filtres
+        # Appliquer les filtres (sur le meilleur score de chaque produit)
         if decision and decision.lower() not in ("tous", "all", ""):
-            query = query.filter(ProductScore.decision == decision)
+            query = query.filter(Winner.decision == decision)
 
         if min_margin_percent is not None:
-            query = query.filter(
-                ProductScore.margin_percent.isnot(None),
-                ProductScore.margin_percent >= min_margin_percent
-            )
+            query = query.filter(Winner.margin_percent >= min_margin_percent)
 
         if min_global_score is not None:
-            query = query.filter(
-                ProductScore.global_score.isnot(None),
-                ProductScore.global_score >= min_global_score
-            )
+            query = query.filter(Winner.global_score >= min_global_score)
 
         if min_sales_per_day is not None:
-            query = query.filter(
-                ProductScore.estimated_sales_per_day.isnot(None),
-                ProductScore.estimated_sales_per_day >= min_sales_per_day
-            )
+            query = query.filter(Winner.estimated_sales_per_day >= min_sales_per_day)
 
-        # Trier par global_score décroissant, puis par margin_percent décroissant
-        # Cela permet de récupérer les meilleurs scores en premier
-        query = query.order_by(
-            desc(ProductScore.global_score),
-            desc(ProductScore.margin_percent),
+        # Tri keyset (idx_winners_*) ; une ligne de plus pour savoir s'il reste une page
+        query = apply_keyset(
+            query,
+            [keyset_sort_expression(column) for column in sort_columns],
+            Winner.product_candidate_id,
+            descending=(order == "desc"),
+            after=after,
         )
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-        # Exécuter la requête (sans limite pour l'instant, on limite après le groupement)
-        results = query.all()
-
-        # Grouper par product_id pour ne garder que le meilleur score par produit
-        # Comme les résultats sont triés par global_score décroissant, le premier pour chaque produit est le meilleur
-        products_map = {}
-        for row in results:
-            product_id = row.product_id
-            if product_id not in products_map:
-                products_map[product_id] = row
-            # Sinon, on ignore (on garde déjà le meilleur qui est venu en premier)
-
-        # Convertir en modèles Pydantic
-        items = []
-        for row in products_map.values():
-            # Déterminer si l'ASIN est réel (pas un produit mocké)
-            # Un produit est mocké si raw_keepa_data contient "source": "mock"
-            is_real_asin = True
-            if row.raw_keepa_data and isinstance(row.raw_keepa_data, dict):
-                if row.raw_keepa_data.get("source") == "mock":
-                    is_real_asin = False
-            
-            # Calculer approx_profit_per_day si les valeurs sont disponibles
-            approx_profit_per_day = None
-            if hasattr(row, "approx_profit_per_day"):
-                approx_profit_per_day = row.approx_profit_per_day
-            elif hasattr(row, "net_profit_estimated") and hasattr(row, "estimated_sales_per_day"):
-                if row.net_profit_estimated and row.estimated_sales_per_day:
-                    approx_profit_per_day = row.net_profit_estimated * row.estimated_sales_per_day
-            
-            items.append(
-                WinnerProductOut(
-                    product_id=row.product_id,
-                    asin=row.asin,
-                    title=row.title,
-                    category=row.category,
-                    supplier_name=row.supplier_name,
-                    purchase_price=row.purchase_price,
-                    selling_price_target=row.selling_price_target,
-                    amazon_fees_estimate=row.amazon_fees_estimate,
-                    margin_absolute=row.margin_absolute,
-                    margin_percent=row.margin_percent,
-                    gross_profit=getattr(row, "gross_profit", None) if hasattr(row, "gross_profit") else None,
-                    gross_margin_percent=getattr(row, "gross_margin_percent", None) if hasattr(row, "gross_margin_percent") else None,
-                    net_profit_estimated=getattr(row, "net_profit_estimated", None) if hasattr(row, "net_profit_estimated") else None,
-                    estimated_sales_per_day=row.estimated_sales_per_day,
-                    approx_profit_per_day=approx_profit_per_day,
-                    global_score=row.global_score,
-                    decision=row.decision,
-                    is_real_asin=is_real_asin,
-                )
+        items = [
+            WinnerProductOut(
+                product_id=winner.product_candidate_id,
+                asin=asin,
+                title=title,
+                category=category,
+                supplier_name=winner.supplier_name,
+                purchase_price=winner.purchase_price,
+                selling_price_target=winner.selling_price_target,
+                amazon_fees_estimate=winner.amazon_fees_estimate,
+                margin_absolute=winner.margin_absolute,
+                margin_percent=winner.margin_percent,
+                gross_profit=winner.gross_profit,
+                gross_margin_percent=winner.gross_margin_percent,
+                net_profit_estimated=winner.net_profit_estimated,
+                estimated_sales_per_day=winner.estimated_sales_per_day,
+                approx_profit_per_day=winner.approx_profit_per_day,
+                global_score=winner.global_score,
+                decision=winner.decision,
+                is_real_asin=winner.is_real_asin,
+            )
+            for asin, title, category, winner in rows
+        ]
+
+        next_cursor = None
+        if has_more:
+            last = rows[-1][3]
+            next_cursor = encode_cursor(
+                cursor_sort,
+                [getattr(last, column.key) for column in sort_columns] + [last.product_candidate_id],
             )
-        
-        # Re-trier les items par global_score décroissant (après le groupement)
-        items.sort(
-            key=lambda x: (x.global_score or Decimal("0"), x.margin_percent or Decimal("0")),
-            reverse=True
-        )
-        
-        # Appliquer la limite après le groupement
-        items = items[:limit]
 
         filters_applied = {
             "decision": decision,
@@ -227,6 +210,8 @@ async def get_winners(
             "min_global_score": min_global_score,
             "min_sales_per_day": min_sales_per_day,
             "limit": limit,
+            "sort": sort,
+            "order": order,
         }
 
         logger.info(f"Retour de {len(items)} winners après filtres")
@@ -236,6 +221,7 @@ async def get_winners(
             filters=filters_applied,
             items=items,
             total_count=len(items),
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
@@ -247,3 +233,33 @@ async def get_winners(
             total_count=0,
         )
 
+
+
+class WinnersRebuildResponse(BaseModel):
+    """Réponse de la reconstruction de la projection winners."""
+
+    success: bool = Field(description="Indique si la reconstruction a réussi")
+    rows: int = Field(description="Nombre de lignes winners écrites")
+
+
+@router.post(
+    "/winners/rebuild",
+    response_model=WinnersRebuildResponse,
+    summary="Reconstruire la projection winners",
+    description="""
+    Reconstruit entièrement la table `winners` depuis les scores existants.
+
+    Normalement inutile : ScoringJob rafraîchit la projection de manière incrémentale.
+    À utiliser après une migration ou une modification manuelle des scores.
+    """,
+)
+async def rebuild_winners(db: Session = Depends(get_db)) -> WinnersRebuildResponse:
+    """Reconstruit la projection winners."""
+    try:
+        rows = WinnersProjectionService(db).rebuild()
+        return WinnersRebuildResponse(success=True, rows=rows)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la reconstruction des winners: {str(e)}",
+        )
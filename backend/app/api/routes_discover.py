@@ -4,14 +4,28 @@ Routes API pour le Module A : Discoverer.
 Endpoints pour lancer la découverte de produits.
 """
 import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 from app.core.database import get_db
 from app.jobs.discover_job import DiscoverJob
+from app.services.job_lock import JobParamsConflictError, JobStillRunningError, run_or_attach
+from app.services.keepa_history import (
+    KEEPA_SERIES,
+    SERIES_AMAZON,
+    SERIES_NEW,
+    SERIES_SALES_RANK,
+    KeepaHistoryStore,
+    count_rank_drops,
+    to_keepa_minutes,
+    value_at,
+    window_average,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +37,9 @@ class DiscoverStats(BaseModel):
 
     created: int = Field(description="Nombre de produits créés")
     updated: int = Field(description="Nombre de produits mis à jour")
+    unchanged: int = Field(default=0, description="Nombre de produits inchangés (aucune écriture)")
+    scheduled: int = Field(default=0, description="Nombre d'ASINs échus sélectionnés par le planificateur")
+    not_due: int = Field(default=0, description="Nombre d'ASINs non échus ou hors budget (non rafraîchis)")
     total_processed: int = Field(description="Total de produits traités")
     markets_processed: int = Field(description="Nombre de marchés traités")
     errors: int = Field(description="Nombre d'erreurs rencontrées")
@@ -34,6 +51,56 @@ class DiscoverResponse(BaseModel):
     success: bool = Field(description="Indique si le job s'est terminé avec succès")
     message: str = Field(description="Message descriptif du résultat")
     stats: DiscoverStats = Field(description="Statistiques détaillées de l'exécution")
+    run_id: Optional[str] = Field(
+        default=None, description="Identifiant du run (point de reprise dans discover_runs)"
+    )
+    run_status: Optional[str] = Field(
+        default=None, description="Statut du run: running, completed, failed"
+    )
+    job_run_id: Optional[str] = Field(
+        default=None, description="Identifiant de l'exécution du job (job_runs)"
+    )
+    attached: bool = Field(
+        default=False,
+        description="True si ce déclenchement s'est rattaché à une exécution déjà en cours",
+    )
+
+
+class DiscoverFinderStats(BaseModel):
+    """Statistiques de la découverte par Product Finder."""
+
+    created: int = Field(description="Nombre de produits créés")
+    updated: int = Field(description="Nombre de produits mis à jour")
+    unchanged: int = Field(description="Nombre de produits inchangés (aucune écriture)")
+    total_processed: int = Field(description="Total de produits traités")
+    categories_processed: int = Field(description="Nombre de catégories parcourues sans erreur")
+    duplicates_skipped: int = Field(description="ASINs déjà découverts dans une autre catégorie")
+    tokens_spent: int = Field(description="Tokens Keepa consommés par le balayage")
+    errors: int = Field(description="Nombre d'erreurs rencontrées")
+
+
+class DiscoverFinderResponse(BaseModel):
+    """Réponse de l'endpoint de découverte par Product Finder."""
+
+    success: bool = Field(description="Indique si le job s'est terminé avec succès")
+    message: str = Field(description="Message descriptif du résultat")
+    stats: DiscoverFinderStats = Field(description="Statistiques détaillées de l'exécution")
+
+
+class KeepaHistorySummary(BaseModel):
+    """Indicateurs calculés sur l'historique Keepa stocké d'un produit."""
+
+    asin: str = Field(description="ASIN du produit")
+    domain: int = Field(description="Domaine Keepa")
+    at: datetime = Field(description="Instant de référence (UTC)")
+    window_days: int = Field(description="Taille de la fenêtre des moyennes (jours)")
+    amazon_price: Optional[Decimal] = Field(description="Prix Amazon à l'instant de référence (EUR)")
+    new_price: Optional[Decimal] = Field(description="Prix neuf le plus bas à l'instant de référence (EUR)")
+    avg_amazon_price: Optional[Decimal] = Field(description="Prix Amazon moyen sur la fenêtre (EUR)")
+    avg_new_price: Optional[Decimal] = Field(description="Prix neuf moyen sur la fenêtre (EUR)")
+    sales_rank: Optional[int] = Field(description="BSR à l'instant de référence")
+    rank_drops_90: Optional[int] = Field(description="Baisses du BSR sur les 90 jours précédents")
+    points: Dict[str, int] = Field(description="Nombre de points stockés par série")
 
 
 @router.post(
@@ -52,6 +119,28 @@ class DiscoverResponse(BaseModel):
     **Paramètres :**
     - `market` (optionnel) : Code du marché à traiter (ex: "amazon_fr", "amazon_de", "amazon_es")
       - Par défaut : "amazon_fr"
+    - `token_budget` (optionnel) : Budget de tokens Keepa du run (défaut: KEEPA_REFRESH_TOKEN_BUDGET)
+    - `resume` (optionnel) : Reprend le dernier run interrompu du marché
+
+    **Points de reprise :**
+    - La liste des ASINs du run est figée au démarrage, puis traitée par lots
+      (DISCOVER_CHECKPOINT_BATCH_SIZE) ; après chaque lot commité, le curseur et les
+      statistiques cumulées sont enregistrés dans `discover_runs`
+    - Avec `resume=True`, un run interrompu (crash, échec Keepa, déploiement) reprend au
+      lot suivant le dernier lot commité, sans refaire les lots déjà traités
+    - Sans `resume`, un nouveau run démarre et les runs non terminés sont abandonnés
+
+    **Exécution unique :**
+    - Un seul job de découverte à la fois par marché (verrou consultatif Postgres) ;
+      un déclenchement pendant une exécution en cours s'y rattache et renvoie son
+      résultat (`attached=true`), 409 si elle ne se termine pas à temps
+
+    **Planification des rafraîchissements :**
+    - Seuls les ASINs échus sont rafraîchis : échéance courte pour les A_launch et les
+      prix volatils, longue pour les C_drop
+    - Les plus intéressants (décision, profit/jour, retard) passent en premier, dans la
+      limite du budget de tokens
+    - `force=True` rafraîchit tous les ASINs sans tenir compte des échéances
 
     **Fréquence recommandée :**
     - En production : 1 fois par jour (ex: 03:00) via n8n cron
@@ -60,9 +149,10 @@ class DiscoverResponse(BaseModel):
     **Statut des produits :**
     - Nouveaux produits : `status = "new"`
     - Produits existants : mise à jour des métriques sans changer le statut s'il a déjà été traité
+    - Produits inchangés (même empreinte des champs normalisés) : aucune écriture en base
 
     **Retourne :**
-    - Statistiques détaillées (créés, mis à jour, traités, marchés, erreurs)
+    - Statistiques détaillées (créés, mis à jour, inchangés, traités, marchés, erreurs)
     - Message de succès ou d'erreur
     """,
 )
@@ -75,6 +165,15 @@ async def run_discover_job(
         default=False,
         description="Si True, force la mise à jour de TOUS les produits (même ceux déjà traités)",
     ),
+    token_budget: Optional[int] = Query(
+        default=None,
+        ge=0,
+        description="Budget de tokens Keepa du run (défaut: KEEPA_REFRESH_TOKEN_BUDGET)",
+    ),
+    resume: bool = Query(
+        default=False,
+        description="Si True, reprend le dernier run interrompu au lot suivant le dernier lot commité",
+    ),
     db: Session = Depends(get_db),
 ) -> DiscoverResponse:
     """
@@ -83,30 +182,58 @@ async def run_discover_job(
     Récupère les produits depuis Keepa en utilisant la liste d'ASINs configurée
     pour le marché et les stocke en base de données (création ou mise à jour).
     """
-    logger.info(f"Démarrage du job de découverte via l'endpoint API pour le marché: {market} (force={force})")
+    logger.info(f"Démarrage du job de découverte via l'endpoint API pour le marché: {market} (force={force}, resume={resume})")
     try:
         job = DiscoverJob(db, market_code=market)
-        stats = job.run(force=force)
+        flight = await run_or_attach(
+            "discover",
+            market,
+            lambda: job.run(force=force, token_budget=token_budget, resume=resume),
+            params={"force": force, "token_budget": token_budget, "resume": resume},
+        )
+        stats = flight["stats"]
+        discover_run = job.discover_run
 
         response = DiscoverResponse(
             success=True,
-            message=f"Job de découverte terminé avec succès pour le marché {market}",
+            message=(
+                f"Job de découverte terminé avec succès pour le marché {market}"
+                + (" (exécution déjà en cours rejointe)" if flight["attached"] else "")
+            ),
             stats=DiscoverStats(
                 created=stats.get("created", 0),
                 updated=stats.get("updated", 0),
+                unchanged=stats.get("unchanged", 0),
+                scheduled=stats.get("scheduled", 0),
+                not_due=stats.get("not_due", 0),
                 total_processed=stats.get("total_processed", 0),
                 markets_processed=stats.get("markets_processed", 0),
                 errors=stats.get("errors", 0),
             ),
+            run_id=str(discover_run.id) if discover_run else None,
+            run_status=discover_run.status if discover_run else None,
+            job_run_id=flight["job_run_id"],
+            attached=flight["attached"],
         )
 
         logger.info(
             f"Job terminé: {response.stats.created} créés, "
             f"{response.stats.updated} mis à jour, "
+            f"{response.stats.unchanged} inchangés, "
             f"{response.stats.total_processed} traités"
         )
 
         return response
+    except JobParamsConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de découverte déjà en cours avec d'autres paramètres (exécution {e.job_run_id}: {e.running_params})",
+        )
+    except JobStillRunningError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de découverte déjà en cours (exécution {e.job_run_id}), toujours pas terminé",
+        )
     except Exception as e:
         logger.error(
             f"Erreur lors de l'exécution du job de découverte: {str(e)}", exc_info=True
@@ -116,3 +243,160 @@ async def run_discover_job(
             detail=f"Erreur lors de l'exécution du job de découverte: {str(e)}",
         )
 
+
+@router.post(
+    "/jobs/discover/run_finder",
+    response_model=DiscoverFinderResponse,
+    summary="Découvrir des produits par catégorie (Keepa Product Finder)",
+    description="""
+    Découvre des produits par catégorie via le Product Finder Keepa (endpoint /query).
+
+    **Fonctionnalités :**
+    - Les seuils de category_config.yml (BSR max, prix min/max, avis et note minimum)
+      sont appliqués côté serveur : seuls les produits qui les respectent sont payés
+    - Résultats triés par BSR croissant et parcourus page par page
+    - Chaque page d'ASINs est enrichie (/product par lots de 100) et stockée aussitôt
+    - Les catégories sont parcourues en parallèle sous un budget de tokens commun ;
+      un ASIN présent dans plusieurs catégories n'est enrichi qu'une fois
+
+    **Paramètres :**
+    - `market` : Code du marché (catégories dont `marketplace` correspond). Défaut: amazon_fr
+    - `limit_per_category` : Nombre maximum d'ASINs par catégorie. Défaut: 200
+    - `category_id` (optionnel) : Restreindre à une catégorie (ID Keepa)
+    - `token_budget` (optionnel) : Budget de tokens Keepa (défaut: KEEPA_DISCOVERY_TOKEN_BUDGET)
+    - `max_workers` (optionnel) : Catégories en parallèle (défaut: KEEPA_CATEGORY_CONCURRENCY)
+
+    **Retourne :**
+    - Statistiques (créés, mis à jour, inchangés, traités, catégories, doublons,
+      tokens, erreurs)
+    """,
+)
+async def run_discover_finder_job(
+    market: str = Query(default="amazon_fr", description="Code du marché à traiter"),
+    limit_per_category: int = Query(
+        default=200, ge=1, le=10000, description="Nombre maximum d'ASINs par catégorie"
+    ),
+    category_id: Optional[int] = Query(default=None, description="ID Keepa de la catégorie"),
+    token_budget: Optional[int] = Query(
+        default=None, ge=0, description="Budget de tokens Keepa (défaut: KEEPA_DISCOVERY_TOKEN_BUDGET)"
+    ),
+    max_workers: Optional[int] = Query(
+        default=None, ge=1, le=16, description="Catégories en parallèle"
+    ),
+    db: Session = Depends(get_db),
+) -> DiscoverFinderResponse:
+    """
+    Lance la découverte par Product Finder pour les catégories actives d'un marché.
+    """
+    logger.info(
+        f"Démarrage de la découverte Product Finder via l'endpoint API pour le marché: {market}"
+    )
+    try:
+        job = DiscoverJob(db, market_code=market)
+        stats = job.run_finder(
+            limit_per_category=limit_per_category,
+            category_id=category_id,
+            token_budget=token_budget,
+            max_workers=max_workers,
+        )
+
+        return DiscoverFinderResponse(
+            success=True,
+            message=f"Découverte Product Finder terminée pour le marché {market}",
+            stats=DiscoverFinderStats(**stats),
+        )
+    except Exception as e:
+        logger.error(
+            f"Erreur lors de la découverte Product Finder: {str(e)}", exc_info=True
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la découverte Product Finder: {str(e)}",
+        )
+
+
+def _cents_to_eur(cents) -> Optional[Decimal]:
+    """Centimes Keepa -> EUR (2 décimales), None conservé."""
+    if cents is None:
+        return None
+    return (Decimal(str(cents)) / Decimal("100")).quantize(Decimal("0.01"))
+
+
+@router.get(
+    "/products/{asin}/keepa_history",
+    response_model=KeepaHistorySummary,
+    summary="Indicateurs de l'historique Keepa d'un produit",
+    description="""
+    Calcule des indicateurs de tendance depuis l'historique Keepa compressé
+    (table keepa_history_series), sans rappeler Keepa.
+
+    **Paramètres :**
+    - `domain` : Domaine Keepa (1 = Amazon FR). Défaut: 1
+    - `at` (optionnel) : Instant de référence (UTC). Défaut: maintenant
+    - `window_days` : Fenêtre des prix moyens, en jours avant `at`. Défaut: 30
+
+    **Retourne :**
+    - Prix Amazon et prix neuf à l'instant `at`
+    - Prix moyens (pondérés par la durée) sur la fenêtre
+    - BSR à l'instant `at` et nombre de baisses du BSR sur 90 jours
+
+    **Erreurs :**
+    - 404 si aucun historique n'est stocké pour cet ASIN
+    """,
+)
+async def get_keepa_history_summary(
+    asin: str = Path(..., min_length=10, max_length=10, description="ASIN du produit"),
+    domain: int = Query(default=1, description="Domaine Keepa (1 = Amazon FR)"),
+    at: Optional[datetime] = Query(default=None, description="Instant de référence (UTC)"),
+    window_days: int = Query(default=30, ge=1, le=365, description="Fenêtre des moyennes (jours)"),
+    db: Session = Depends(get_db),
+) -> KeepaHistorySummary:
+    """
+    Calcule les indicateurs de l'historique Keepa d'un produit.
+
+    Chaque série est chargée et décodée une seule fois.
+    """
+    asin = asin.upper()
+    if at is None:
+        at = datetime.utcnow()
+    elif at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        store = KeepaHistoryStore(db)
+        series = {index: store.load(asin, domain, index) for index in KEEPA_SERIES}
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'historique Keepa de {asin}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la lecture de l'historique Keepa: {str(e)}",
+        )
+
+    if not any(series.values()):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Aucun historique Keepa stocké pour l'ASIN {asin} (domaine {domain})",
+        )
+
+    at_minutes = to_keepa_minutes(at)
+    window_start = to_keepa_minutes(at - timedelta(days=window_days))
+    amazon = series[SERIES_AMAZON] or []
+    new = series[SERIES_NEW] or []
+    ranks = series[SERIES_SALES_RANK]
+
+    return KeepaHistorySummary(
+        asin=asin,
+        domain=domain,
+        at=at,
+        window_days=window_days,
+        amazon_price=_cents_to_eur(value_at(amazon, at_minutes)),
+        new_price=_cents_to_eur(value_at(new, at_minutes)),
+        avg_amazon_price=_cents_to_eur(window_average(amazon, window_start, at_minutes)),
+        avg_new_price=_cents_to_eur(window_average(new, window_start, at_minutes)),
+        sales_rank=value_at(ranks, at_minutes) if ranks else None,
+        rank_drops_90=(
+            count_rank_drops(ranks, to_keepa_minutes(at - timedelta(days=90)), at_minutes)
+            if ranks is not None
+            else None
+        ),
+        points={name: len(series[index] or []) for index, name in KEEPA_SERIES.items()},
+    )
@@ -1,29 +1,75 @@
 """
 Routes API pour l'export de données.
 
-Endpoints pour exporter les listings en CSV.
+Endpoints pour exporter les listings (CSV, flat-file Amazon, gzip) et les
+données d'analyse (Parquet).
 """
 import csv
 import io
 import logging
-from typing import List, Optional
+import tempfile
+import zlib
+from typing import Iterable, Iterator, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, Uuid, and_, select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
-from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db
 from app.models.listing_template import ListingTemplate
 from app.models.product_candidate import ProductCandidate
+from app.models.product_score import ProductScore
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["export"])
 
+# Nombre de lignes lues par aller-retour sur le curseur serveur (et écrites par chunk HTTP)
+EXPORT_BATCH_SIZE = 1000
+
+# En-têtes du CSV listings (ordre des colonnes de _listing_csv_row)
+LISTINGS_CSV_HEADER = [
+    "asin",
+    "reference_asin",
+    "title",
+    "bullets",
+    "description",
+    "price_target",
+    "brandable",
+    "brand_name",
+    "status",
+    "marketplace",
+]
+
+# En-têtes du flat-file Amazon (noms d'attributs des templates d'inventaire catégorie)
+FLATFILE_HEADER = [
+    "item_sku",
+    "external_product_id",
+    "external_product_id_type",
+    "item_name",
+    "brand_name",
+    "manufacturer",
+    "product_description",
+    "bullet_point1",
+    "bullet_point2",
+    "bullet_point3",
+    "bullet_point4",
+    "bullet_point5",
+    "generic_keywords",
+    "standard_price",
+    "update_delete",
+]
+
+# Nombre de lignes par row group Parquet
+PARQUET_ROW_GROUP_SIZE = 50000
+
+# Taille des chunks HTTP lors de l'envoi d'un fichier temporaire
+FILE_CHUNK_SIZE = 1024 * 1024
+
 
 class ExportRequest(BaseModel):
     """Requête pour l'export CSV de listings."""
@@ -32,6 +78,258 @@ class ExportRequest(BaseModel):
     export_all_drafts: bool = False
 
 
+def _listings_export_select(request: ExportRequest):
+    """
+    Construit le SELECT des listings à exporter, joint aux produits candidats.
+
+    Une seule requête (LEFT JOIN) remplace la lecture du candidat ligne par ligne ;
+    seules les colonnes exportées sont sélectionnées.
+
+    Args:
+        request: Requête d'export (listing_ids ou export_all_drafts).
+
+    Returns:
+        Select SQLAlchemy.
+
+    Raises:
+        HTTPException: 400 si la requête ne précise aucun listing.
+    """
+    stmt = select(
+        ListingTemplate.id,
+        ListingTemplate.reference_asin,
+        ListingTemplate.title,
+        ListingTemplate.bullets,
+        ListingTemplate.description,
+        ListingTemplate.search_terms,
+        ListingTemplate.brandable,
+        ListingTemplate.brand_name,
+        ListingTemplate.status,
+        ListingTemplate.marketplace,
+        ProductCandidate.asin,
+        ProductCandidate.avg_price,
+    ).outerjoin(ProductCandidate, ProductCandidate.id == ListingTemplate.product_candidate_id)
+
+    if request.export_all_drafts:
+        # Exporter tous les drafts
+        return stmt.where(ListingTemplate.status == "draft")
+    if request.listing_ids:
+        # Exporter les listings spécifiés
+        return stmt.where(ListingTemplate.id.in_(request.listing_ids))
+
+    raise HTTPException(
+        status_code=400,
+        detail="Vous devez fournir soit 'listing_ids' soit 'export_all_drafts=true'",
+    )
+
+
+def _listing_csv_row(row) -> list:
+    """
+    Convertit une ligne du SELECT d'export en ligne CSV (voir LISTINGS_CSV_HEADER).
+
+    Args:
+        row: Ligne retournée par _listings_export_select().
+
+    Returns:
+        Liste des valeurs de la ligne CSV.
+    """
+    # ASIN
+    asin = row.asin or "N/A"
+
+    # Bullets (concaténés avec " | ")
+    bullets_str = ""
+    if row.bullets and isinstance(row.bullets, list):
+        bullets_str = " | ".join(str(b) for b in row.bullets)
+
+    # Price target
+    price_target = str(float(row.avg_price)) if row.avg_price else ""
+
+    return [
+        asin,
+        row.reference_asin or asin,
+        row.title,
+        bullets_str,
+        row.description or "",
+        price_target,
+        "Oui" if row.brandable else "Non",
+        row.brand_name or "",
+        row.status,
+        row.marketplace,
+    ]
+
+
+def _flatfile_value(value) -> str:
+    """Nettoie une valeur pour le flat-file (pas de tabulation ni de saut de ligne)."""
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def _listing_flatfile_row(row) -> list:
+    """
+    Convertit une ligne du SELECT d'export en ligne du flat-file Amazon (voir FLATFILE_HEADER).
+
+    Args:
+        row: Ligne retournée par _listings_export_select().
+
+    Returns:
+        Liste des valeurs de la ligne (déjà nettoyées).
+    """
+    asin = row.reference_asin or row.asin or ""
+    bullets = list(row.bullets) if row.bullets and isinstance(row.bullets, list) else []
+    bullets = (bullets + [""] * 5)[:5]
+
+    values = [
+        f"WM-{asin or 'NOASIN'}-{str(row.id)[:8]}",
+        asin,
+        "ASIN" if asin else "",
+        row.title,
+        row.brand_name,
+        row.brand_name,
+        row.description,
+        *bullets,
+        row.search_terms,
+        f"{row.avg_price:.2f}" if row.avg_price else "",
+        "Update",
+    ]
+    return [_flatfile_value(v) for v in values]
+
+
+def _iter_export_rows(stmt) -> Iterator:
+    """
+    Itère les lignes d'un SELECT d'export via un curseur côté serveur.
+
+    Utilise sa propre session : la session de la requête est fermée avant la fin
+    du streaming de la réponse.
+
+    Args:
+        stmt: Select SQLAlchemy à lire.
+
+    Yields:
+        Lignes du résultat, lues par lots de EXPORT_BATCH_SIZE.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        yield from result
+    finally:
+        db.close()
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    """Vide le buffer texte et retourne son contenu encodé en UTF-8."""
+    content = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    return content
+
+
+def _iter_listings_flatfile(stmt) -> Iterator[bytes]:
+    """
+    Génère le flat-file Amazon (tabulations, UTF-8) par chunks de EXPORT_BATCH_SIZE lignes.
+
+    Args:
+        stmt: Select retourné par _listings_export_select().
+
+    Yields:
+        Chunks de bytes UTF-8 du fichier.
+    """
+    yield ("\t".join(FLATFILE_HEADER) + "\n").encode("utf-8")
+
+    lines = []
+    exported = 0
+    for row in _iter_export_rows(stmt):
+        lines.append("\t".join(_listing_flatfile_row(row)) + "\n")
+        exported += 1
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "".join(lines).encode("utf-8")
+            lines = []
+    if lines:
+        yield "".join(lines).encode("utf-8")
+
+    logger.info(f"Export flat-file terminé: {exported} listing(s) exporté(s)")
+
+
+def _gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compresse un flux de chunks au format gzip, au fil de l'eau.
+
+    Args:
+        chunks: Chunks de bytes non compressés.
+
+    Yields:
+        Chunks compressés (fichier .gz valide une fois concaténés).
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 => en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _listings_export_response(
+    chunks: Iterator[bytes], filename: str, media_type: str, compression: Optional[str]
+) -> StreamingResponse:
+    """
+    Construit la réponse streamée d'un export de listings, compressée ou non.
+
+    Args:
+        chunks: Générateur du contenu du fichier.
+        filename: Nom du fichier non compressé.
+        media_type: Type MIME du fichier non compressé.
+        compression: None ou "gzip".
+
+    Returns:
+        StreamingResponse téléchargeable.
+    """
+    if compression == "gzip":
+        chunks = _gzip_stream(chunks)
+        filename = f"{filename}.gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _iter_listings_csv(stmt) -> Iterator[bytes]:
+    """
+    Génère le CSV des listings par chunks (BOM UTF-8 + en-têtes, puis un chunk par lot).
+
+    Args:
+        stmt: Select retourné par _listings_export_select().
+
+    Yields:
+        Chunks de bytes UTF-8 du fichier CSV.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+
+    # Encoder en UTF-8 avec BOM pour Excel
+    writer.writerow(LISTINGS_CSV_HEADER)
+    yield "\ufeff".encode("utf-8") + _drain(buffer)
+
+    exported = 0
+    try:
+        for row in _iter_export_rows(stmt):
+            writer.writerow(_listing_csv_row(row))
+            exported += 1
+            if exported % EXPORT_BATCH_SIZE == 0:
+                yield _drain(buffer)
+        if buffer.tell():
+            yield _drain(buffer)
+    except Exception as e:
+        # Les en-têtes HTTP sont déjà partis : on ne peut que logger et couper le flux
+        logger.error(f"Erreur pendant le streaming de l'export CSV: {str(e)}", exc_info=True)
+        raise
+
+    logger.info(f"Export CSV terminé: {exported} listing(s) exporté(s)")
+
+
 @router.post(
     "/listings/export_csv",
     summary="Exporter des listings en CSV",
@@ -49,155 +347,334 @@ class ExportRequest(BaseModel):
     - Colonnes séparées par des virgules
     - Bullets concaténés avec " | "
     - Encodage UTF-8 avec BOM pour Excel
+    - Réponse streamée : les lignes sont envoyées au fil de la lecture (mémoire constante)
+    - `?compression=gzip` : fichier `listings_export.csv.gz` compressé à la volée
     """,
-    response_class=Response,
+    response_class=StreamingResponse,
 )
 async def export_listings_csv(
     request: ExportRequest = Body(
         ...,
         example={"listing_ids": None, "export_all_drafts": True},
     ),
+    compression: Optional[str] = Query(None, description="Compression (gzip)", pattern="^gzip$"),
     db: Session = Depends(get_db),
-) -> Response:
+) -> StreamingResponse:
     """
-    Exporte des templates de listing en format CSV.
+    Exporte des templates de listing en format CSV (réponse streamée).
 
     Args:
         request: Requête avec liste d'IDs ou option export_all_drafts.
+        compression: None ou "gzip".
         db: Session de base de données.
 
     Returns:
-        Fichier CSV téléchargeable.
+        Fichier CSV téléchargeable, envoyé au fil de la lecture en base.
     """
     logger.info("Démarrage de l'export CSV des listings")
 
     try:
-        # Déterminer quels listings exporter
-        if request.export_all_drafts:
-            # Exporter tous les drafts
-            listings = (
-                db.query(ListingTemplate)
-                .filter(ListingTemplate.status == "draft")
-                .all()
-            )
-            logger.info(f"Export de tous les drafts: {len(listings)} listings")
-        elif request.listing_ids:
-            # Exporter les listings spécifiés
-            listings = (
-                db.query(ListingTemplate)
-                .filter(ListingTemplate.id.in_(request.listing_ids))
-                .all()
-            )
-            logger.info(f"Export de {len(listings)} listing(s) spécifié(s)")
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Vous devez fournir soit 'listing_ids' soit 'export_all_drafts=true'",
-            )
+        stmt = _listings_export_select(request)
 
-        if not listings:
+        # Vérifier qu'il y a au moins un listing avant d'envoyer les en-têtes HTTP
+        if db.execute(stmt.limit(1)).first() is None:
             raise HTTPException(status_code=404, detail="Aucun listing trouvé à exporter")
 
-        # Créer le CSV en mémoire
-        output = io.StringIO()
-        writer = csv.writer(output, delimiter=",", quoting=csv.QUOTE_MINIMAL)
-
-        # En-têtes
-        writer.writerow(
-            [
-                "asin",
-                "reference_asin",
-                "title",
-                "bullets",
-                "description",
-                "price_target",
-                "brandable",
-                "brand_name",
-                "status",
-                "marketplace",
-            ]
+        return _listings_export_response(
+            _iter_listings_csv(stmt),
+            "listings_export.csv",
+            "text/csv; charset=utf-8",
+            compression,
         )
 
-        # Récupérer les produits associés pour obtenir avg_price
-        for listing in listings:
-            candidate = (
-                db.query(ProductCandidate)
-                .filter(ProductCandidate.id == listing.product_candidate_id)
-                .first()
-            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de l'export CSV: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'export CSV: {str(e)}",
+        )
 
-            # ASIN
-            asin = candidate.asin if candidate else "N/A"
-
-            # Reference ASIN
-            reference_asin = listing.reference_asin or asin
-
-            # Title
-            title = listing.title
-
-            # Bullets (concaténés avec " | ")
-            bullets_str = ""
-            if listing.bullets and isinstance(listing.bullets, list):
-                bullets_str = " | ".join(str(b) for b in listing.bullets)
-
-            # Description
-            description = listing.description or ""
-
-            # Price target
-            price_target = ""
-            if candidate and candidate.avg_price:
-                price_target = str(float(candidate.avg_price))
-
-            # Brandable
-            brandable = "Oui" if listing.brandable else "Non"
-
-            # Brand name
-            brand_name = listing.brand_name or ""
-
-            # Status
-            status = listing.status
-
-            # Marketplace
-            marketplace = listing.marketplace
-
-            writer.writerow(
-                [
-                    asin,
-                    reference_asin,
-                    title,
-                    bullets_str,
-                    description,
-                    price_target,
-                    brandable,
-                    brand_name,
-                    status,
-                    marketplace,
-                ]
-            )
 
-        # Préparer la réponse CSV
-        csv_content = output.getvalue()
-        output.close()
+@router.post(
+    "/listings/export_flatfile",
+    summary="Exporter des listings au format flat-file Amazon",
+    description="""
+    Exporte des templates de listing au format flat-file Amazon (texte tabulé).
+
+    **Options :** identiques à `/listings/export_csv` (`listing_ids` ou `export_all_drafts`).
+
+    **Format :**
+    - Une ligne d'en-tête avec les noms d'attributs du template d'inventaire
+      (item_sku, external_product_id, item_name, bullet_point1..5, standard_price, ...)
+      à coller sous les en-têtes du template catégorie Seller Central
+    - Colonnes séparées par des tabulations, UTF-8 sans BOM
+    - `item_sku` généré : WM-{ASIN}-{8 premiers caractères de l'ID du listing}
+    - `?compression=gzip` : fichier `listings_flatfile.txt.gz` compressé à la volée
+    """,
+    response_class=StreamingResponse,
+)
+async def export_listings_flatfile(
+    request: ExportRequest = Body(
+        ...,
+        example={"listing_ids": None, "export_all_drafts": True},
+    ),
+    compression: Optional[str] = Query(None, description="Compression (gzip)", pattern="^gzip$"),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Exporte des templates de listing au format flat-file Amazon (réponse streamée).
+
+    Args:
+        request: Requête avec liste d'IDs ou option export_all_drafts.
+        compression: None ou "gzip".
+        db: Session de base de données.
+
+    Returns:
+        Fichier texte tabulé téléchargeable.
+    """
+    logger.info("Démarrage de l'export flat-file des listings")
 
-        # Encoder en UTF-8 avec BOM pour Excel
-        csv_bytes = "\ufeff".encode("utf-8") + csv_content.encode("utf-8")
+    try:
+        stmt = _listings_export_select(request)
 
-        logger.info(f"Export CSV terminé: {len(listings)} listing(s) exporté(s)")
+        if db.execute(stmt.limit(1)).first() is None:
+            raise HTTPException(status_code=404, detail="Aucun listing trouvé à exporter")
 
-        return Response(
-            content=csv_bytes,
-            media_type="text/csv; charset=utf-8",
-            headers={
-                "Content-Disposition": 'attachment; filename="listings_export.csv"',
-            },
+        return _listings_export_response(
+            _iter_listings_flatfile(stmt),
+            "listings_flatfile.txt",
+            "text/tab-separated-values; charset=utf-8",
+            compression,
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erreur lors de l'export CSV: {str(e)}", exc_info=True)
+        logger.error(f"Erreur lors de l'export flat-file: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f"Erreur lors de l'export CSV: {str(e)}",
+            detail=f"Erreur lors de l'export flat-file: {str(e)}",
+        )
+
+
+def _analytics_export_select(only_real_asins: bool):
+    """
+    Construit le SELECT dénormalisé candidats + scores + listings pour l'analyse.
+
+    Une ligne par (produit, score) ; les produits sans score ont les colonnes de
+    score vides ; le listing est celui du même couple (produit, option de sourcing).
+
+    Args:
+        only_real_asins: Exclure les produits mockés (is_real_asin = false).
+
+    Returns:
+        Select SQLAlchemy (colonnes nommées comme dans le fichier Parquet).
+    """
+    stmt = (
+        select(
+            ProductCandidate.id.label("product_id"),
+            ProductCandidate.asin,
+            ProductCandidate.title,
+            ProductCandidate.category,
+            ProductCandidate.source_marketplace,
+            ProductCandidate.avg_price,
+            ProductCandidate.bsr,
+            ProductCandidate.estimated_sales_per_day.label("candidate_sales_per_day"),
+            ProductCandidate.reviews_count,
+            ProductCandidate.rating,
+            ProductCandidate.is_real_asin,
+            ProductCandidate.status.label("candidate_status"),
+            ProductCandidate.created_at.label("candidate_created_at"),
+            ProductScore.id.label("score_id"),
+            ProductScore.sourcing_option_id,
+            ProductScore.selling_price_target,
+            ProductScore.amazon_fees_estimate,
+            ProductScore.logistics_cost_estimate,
+            ProductScore.margin_absolute,
+            ProductScore.margin_percent,
+            ProductScore.gross_profit,
+            ProductScore.gross_margin_percent,
+            ProductScore.net_profit_estimated,
+            ProductScore.estimated_sales_per_day.label("score_sales_per_day"),
+            ProductScore.risk_factor,
+            ProductScore.global_score,
+            ProductScore.decision,
+            ProductScore.created_at.label("scored_at"),
+            ListingTemplate.id.label("listing_id"),
+            ListingTemplate.title.label("listing_title"),
+            ListingTemplate.brandable,
+            ListingTemplate.brand_name,
+            ListingTemplate.strategy,
+            ListingTemplate.status.label("listing_status"),
+            ListingTemplate.marketplace,
+        )
+        .outerjoin(ProductScore, ProductScore.product_candidate_id == ProductCandidate.id)
+        .outerjoin(
+            ListingTemplate,
+            and_(
+                ListingTemplate.product_candidate_id == ProductCandidate.id,
+                ListingTemplate.sourcing_option_id == ProductScore.sourcing_option_id,
+            ),
+        )
+    )
+    if only_real_asins:
+        stmt = stmt.where(ProductCandidate.is_real_asin.is_(True))
+    return stmt
+
+
+def _arrow_schema(stmt):
+    """
+    Déduit le schéma Arrow des colonnes d'un SELECT (types SQLAlchemy -> Arrow).
+
+    Numeric -> decimal128 (exact), UUID -> string, le reste selon le type SQL.
+
+    Args:
+        stmt: Select SQLAlchemy.
+
+    Returns:
+        pyarrow.Schema.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for column in stmt.selected_columns:
+        sql_type = column.type
+        if isinstance(sql_type, Numeric):
+            arrow_type = pa.decimal128(sql_type.precision or 38, sql_type.scale or 0)
+        elif isinstance(sql_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(sql_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(sql_type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _write_analytics_parquet(stmt, sink) -> int:
+    """
+    Écrit le résultat d'un SELECT dans un fichier Parquet (zstd), par row groups.
+
+    La mémoire reste bornée par PARQUET_ROW_GROUP_SIZE lignes.
+
+    Args:
+        stmt: Select retourné par _analytics_export_select().
+        sink: Fichier binaire ouvert en écriture.
+
+    Returns:
+        Nombre de lignes écrites.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(stmt)
+    uuid_columns = {
+        i for i, column in enumerate(stmt.selected_columns) if isinstance(column.type, Uuid)
+    }
+
+    def to_batch(rows) -> "pa.RecordBatch":
+        columns = list(zip(*rows))
+        arrays = [
+            pa.array(
+                [None if v is None else str(v) for v in values] if i in uuid_columns else values,
+                type=schema.field(i).type,
+            )
+            for i, values in enumerate(columns)
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    written = 0
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        rows = []
+        for row in _iter_export_rows(stmt):
+            rows.append(tuple(row))
+            if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_batch(to_batch(rows))
+                written += len(rows)
+                rows = []
+        if rows:
+            writer.write_batch(to_batch(rows))
+            written += len(rows)
+    return written
+
+
+def _iter_file(file_obj) -> Iterator[bytes]:
+    """Lit un fichier temporaire par chunks puis le ferme (supprimé à la fermeture)."""
+    try:
+        file_obj.seek(0)
+        while chunk := file_obj.read(FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+@router.get(
+    "/export/analytics.parquet",
+    summary="Exporter candidats + scores + listings en Parquet",
+    description="""
+    Exporte une table dénormalisée candidats + scores + listings au format Parquet
+    (colonnes typées, compression zstd) pour l'analyse hors ligne (pandas, DuckDB, ...).
+
+    **Contenu :**
+    - Une ligne par couple (produit, score) ; produits sans score inclus (colonnes de score vides)
+    - Listing associé au même couple (produit, option de sourcing) s'il existe
+    - Montants en décimal exact, IDs en texte
+
+    **Query parameters :**
+    - `only_real_asins` : exclure les produits mockés (défaut: false)
+
+    Nécessite l'extra `analytics` (pyarrow) : `poetry install -E analytics`.
+    """,
+    response_class=StreamingResponse,
+)
+async def export_analytics_parquet(
+    only_real_asins: bool = Query(False, description="Exclure les produits mockés"),
+) -> StreamingResponse:
+    """
+    Exporte candidats + scores + listings au format Parquet.
+
+    Le fichier est écrit par row groups dans un fichier temporaire (hors boucle
+    d'événements), puis envoyé en streaming.
+
+    Args:
+        only_real_asins: Exclure les produits mockés.
+
+    Returns:
+        Fichier Parquet téléchargeable.
+
+    Raises:
+        HTTPException: 501 si pyarrow n'est pas installé.
+    """
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Export Parquet indisponible: installer l'extra 'analytics' (pyarrow)",
+        )
+
+    logger.info(f"Démarrage de l'export Parquet (only_real_asins={only_real_asins})")
+
+    sink = tempfile.TemporaryFile()
+    try:
+        stmt = _analytics_export_select(only_real_asins)
+        rows = await run_in_threadpool(_write_analytics_parquet, stmt, sink)
+    except Exception as e:
+        sink.close()
+        logger.error(f"Erreur lors de l'export Parquet: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'export Parquet: {str(e)}",
         )
 
+    logger.info(f"Export Parquet terminé: {rows} ligne(s)")
+
+    return StreamingResponse(
+        _iter_file(sink),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": 'attachment; filename="winner_machine_analytics.parquet"'},
+    )
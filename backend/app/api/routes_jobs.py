@@ -0,0 +1,281 @@
+"""
+Routes API pour le suivi des exécutions de jobs (job_runs).
+
+Un déclenchement rattaché à une exécution déjà en cours reçoit son
+identifiant : ces endpoints permettent d'en suivre l'avancement, et de
+consulter les mesures par étape (job_run_stages) pour suivre les régressions
+et la capacité dans le temps.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy import Float, case, cast, func, literal_column
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+
+from app.core.database import get_db
+from app.models.job_run import JobRun
+from app.models.job_run_stage import JobRunStage
+from app.services.run_ledger import summarize_stages
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["jobs"])
+
+
+class JobRunStageResponse(BaseModel):
+    """Mesures d'une étape d'une exécution."""
+
+    stage: str = Field(description="Étape (type du job, ou job enchaîné par le pipeline)")
+    started_at: datetime = Field(description="Début de l'étape (UTC)")
+    wall_ms: float = Field(description="Durée de l'étape (ms)")
+    db_ms: float = Field(description="Temps cumulé des requêtes SQL (ms)")
+    db_queries: int = Field(description="Nombre de requêtes SQL")
+    rows_read: int = Field(description="Lignes retournées par les SELECT")
+    rows_written: int = Field(description="Lignes insérées, modifiées ou supprimées")
+    http_calls: Optional[Dict[str, Dict[str, float]]] = Field(
+        default=None, description="Appels HTTP par service: {keepa: {calls, errors, ms}, ...}"
+    )
+    keepa_tokens: int = Field(description="Tokens Keepa consommés")
+    cache: Optional[Dict[str, Dict[str, int]]] = Field(
+        default=None, description="Hits/misses par cache"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class JobRunResponse(BaseModel):
+    """Exécution d'un job."""
+
+    id: UUID = Field(description="Identifiant de l'exécution")
+    job_type: str = Field(description="Type de job")
+    market_code: str = Field(description="Code du marché ('all' pour les jobs sans marché)")
+    status: str = Field(description="Statut: running, completed, failed, abandoned")
+    owner: Optional[str] = Field(default=None, description="Processus qui exécute le job (hôte:pid)")
+    stats: Optional[Dict[str, Any]] = Field(default=None, description="Statistiques retournées par le job")
+    error: Optional[str] = Field(default=None, description="Erreur (job en échec)")
+    started_at: datetime = Field(description="Début de l'exécution (UTC)")
+    finished_at: Optional[datetime] = Field(default=None, description="Fin de l'exécution (UTC)")
+    stages: List[JobRunStageResponse] = Field(
+        default_factory=list, description="Mesures par étape (exécution terminée)"
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class JobStageSummary(BaseModel):
+    """Mesures agrégées d'une étape sur une journée."""
+
+    day: date = Field(description="Jour (UTC)")
+    job_type: str = Field(description="Type de job")
+    stage: str = Field(description="Étape")
+    runs: int = Field(description="Nombre d'exécutions")
+    wall_ms_avg: float = Field(description="Durée moyenne (ms)")
+    wall_ms_max: float = Field(description="Durée maximale (ms)")
+    db_ms_avg: float = Field(description="Temps SQL moyen (ms)")
+    rows_read: int = Field(description="Lignes lues")
+    rows_written: int = Field(description="Lignes écrites")
+    keepa_tokens: int = Field(description="Tokens Keepa consommés")
+    http_calls: Dict[str, Dict[str, float]] = Field(
+        description="Appels HTTP par service: {keepa: {calls, errors, avg_ms}, ...}"
+    )
+    cache_hit_rate: Dict[str, float] = Field(description="Taux de hit par cache (0-1)")
+
+
+def _stage_summary_rows(
+    db: Session, filters: tuple, *columns, json_entries=None
+) -> List[Dict[str, Any]]:
+    """
+    Mesures d'étapes agrégées en SQL par (jour, type de job, étape).
+
+    Args:
+        db: Session de base de données.
+        filters: (fenêtre en jours, type de job ou None, étape ou None).
+        columns: Agrégats à calculer.
+        json_entries: Entrées json_each d'une colonne JSON, ajoutées au groupement par clé.
+
+    Returns:
+        Une ligne par groupe, jour converti en date.
+    """
+    days, job_type, stage = filters
+    day = func.date_trunc(literal_column("'day'"), JobRunStage.started_at)
+    keys = [day.label("day"), JobRun.job_type, JobRunStage.stage]
+    group_by = [day, JobRun.job_type, JobRunStage.stage]
+    if json_entries is not None:
+        group_by.append(json_entries.c.key)
+
+    query = (
+        db.query(*keys, *columns)
+        .select_from(JobRunStage)
+        .join(JobRun, JobRun.id == JobRunStage.job_run_id)
+        .filter(JobRunStage.started_at >= datetime.utcnow() - timedelta(days=days))
+    )
+    if job_type:
+        query = query.filter(JobRun.job_type == job_type)
+    if stage:
+        query = query.filter(JobRunStage.stage == stage)
+    rows = [row._asdict() for row in query.group_by(*group_by).all()]
+    for row in rows:
+        row["day"] = row["day"].date()
+    return rows
+
+
+def _stage_json_summary_rows(
+    db: Session, filters: tuple, json_column, key_label: str, fields: tuple
+) -> List[Dict[str, Any]]:
+    """
+    Compteurs d'une colonne JSON {clé: {compteur: valeur}} sommés en SQL par clé (json_each).
+
+    Args:
+        db: Session de base de données.
+        filters: (fenêtre en jours, type de job ou None, étape ou None).
+        json_column: Colonne JSON (http_calls, cache).
+        key_label: Nom de la clé dans les lignes retournées (upstream, name).
+        fields: Compteurs à sommer.
+
+    Returns:
+        Une ligne par (jour, type de job, étape, clé).
+    """
+    # json_each échoue sur un null JSON : objet vide à la place
+    objects = case(
+        (func.json_typeof(json_column) == "object", json_column),
+        else_=literal_column("'{}'::json"),
+    )
+    entries = func.json_each(objects).table_valued("key", "value", joins_implicitly=True)
+    columns = [entries.c.key.label(key_label)] + [
+        func.sum(cast(entries.c.value.op("->>")(field), Float)).label(field) for field in fields
+    ]
+    return _stage_summary_rows(db, filters, *columns, json_entries=entries)
+
+
+def _stages_by_run(db: Session, job_run_ids: List[UUID]) -> Dict[UUID, List[JobRunStage]]:
+    """Mesures par étape des exécutions, groupées par exécution."""
+    stages: Dict[UUID, List[JobRunStage]] = {job_run_id: [] for job_run_id in job_run_ids}
+    if not job_run_ids:
+        return stages
+    rows = (
+        db.query(JobRunStage)
+        .filter(JobRunStage.job_run_id.in_(job_run_ids))
+        .order_by(JobRunStage.started_at)
+        .all()
+    )
+    for row in rows:
+        stages[row.job_run_id].append(row)
+    return stages
+
+
+def _job_run_response(job_run: JobRun, stages: List[JobRunStage]) -> JobRunResponse:
+    """Réponse d'une exécution avec ses étapes."""
+    response = JobRunResponse.model_validate(job_run)
+    response.stages = [JobRunStageResponse.model_validate(stage) for stage in stages]
+    return response
+
+
+@router.get(
+    "/jobs/runs",
+    response_model=List[JobRunResponse],
+    summary="Lister les exécutions de jobs",
+    description="""
+    Liste les exécutions de jobs, les plus récentes d'abord, avec leurs mesures
+    par étape (durée, temps SQL, lignes lues/écrites, appels HTTP par service,
+    tokens Keepa, caches).
+    """,
+)
+async def list_job_runs(
+    job_type: Optional[str] = Query(default=None, description="Type de job (ex: discover, scoring)"),
+    market_code: Optional[str] = Query(default=None, description="Code du marché"),
+    status: Optional[str] = Query(default=None, description="Statut (running, completed, failed, abandoned)"),
+    since: Optional[datetime] = Query(default=None, description="Exécutions démarrées après cette date (UTC)"),
+    limit: int = Query(default=50, ge=1, le=500, description="Nombre maximum d'exécutions (1-500)"),
+    db: Session = Depends(get_db),
+) -> List[JobRunResponse]:
+    """Liste les exécutions de jobs avec leurs mesures par étape."""
+    try:
+        query = db.query(JobRun)
+        if job_type:
+            query = query.filter(JobRun.job_type == job_type)
+        if market_code:
+            query = query.filter(JobRun.market_code == market_code)
+        if status:
+            query = query.filter(JobRun.status == status)
+        if since:
+            query = query.filter(JobRun.started_at >= since)
+        job_runs = query.order_by(JobRun.started_at.desc()).limit(limit).all()
+
+        stages = _stages_by_run(db, [job_run.id for job_run in job_runs])
+        return [_job_run_response(job_run, stages[job_run.id]) for job_run in job_runs]
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des exécutions: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la lecture des exécutions: {str(e)}")
+
+
+@router.get(
+    "/jobs/stages/summary",
+    response_model=List[JobStageSummary],
+    summary="Tendances des étapes de jobs",
+    description="""
+    Agrège les mesures des étapes par jour, type de job et étape sur les
+    derniers jours : durées moyenne et max, temps SQL, lignes, appels HTTP par
+    service, tokens Keepa et taux de hit des caches. Sert à repérer les
+    régressions et à suivre la capacité semaine après semaine.
+    """,
+)
+async def summarize_job_stages(
+    days: int = Query(default=28, ge=1, le=365, description="Fenêtre en jours (1-365)"),
+    job_type: Optional[str] = Query(default=None, description="Type de job"),
+    stage: Optional[str] = Query(default=None, description="Étape"),
+    db: Session = Depends(get_db),
+) -> List[JobStageSummary]:
+    """Agrège les mesures des étapes par jour (en SQL, sans charger les lignes)."""
+    try:
+        filters = (days, job_type, stage)
+        totals = _stage_summary_rows(
+            db,
+            filters,
+            func.count(JobRunStage.id).label("runs"),
+            func.sum(JobRunStage.wall_ms).label("wall_ms_total"),
+            func.max(JobRunStage.wall_ms).label("wall_ms_max"),
+            func.sum(JobRunStage.db_ms).label("db_ms_total"),
+            func.sum(JobRunStage.rows_read).label("rows_read"),
+            func.sum(JobRunStage.rows_written).label("rows_written"),
+            func.sum(JobRunStage.keepa_tokens).label("keepa_tokens"),
+        )
+
+        http_calls = _stage_json_summary_rows(
+            db, filters, JobRunStage.http_calls, "upstream", ("calls", "errors", "ms")
+        )
+        caches = _stage_json_summary_rows(db, filters, JobRunStage.cache, "name", ("hits", "misses"))
+
+        return [
+            JobStageSummary(**entry) for entry in summarize_stages(totals, http_calls, caches)
+        ]
+    except Exception as e:
+        logger.error(f"Erreur lors de l'agrégation des étapes: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'agrégation des étapes: {str(e)}")
+
+
+@router.get(
+    "/jobs/runs/{job_run_id}",
+    response_model=JobRunResponse,
+    summary="Récupérer une exécution de job",
+    description="""
+    Récupère une exécution de job (statut, statistiques, erreur, mesures par étape).
+
+    **Erreurs :**
+    - 404 si l'exécution n'existe pas
+    """,
+)
+async def get_job_run(
+    job_run_id: UUID = Path(description="Identifiant de l'exécution"),
+    db: Session = Depends(get_db),
+) -> JobRunResponse:
+    """Récupère une exécution de job par son identifiant."""
+    job_run = db.query(JobRun).filter(JobRun.id == job_run_id).first()
+    if job_run is None:
+        raise HTTPException(status_code=404, detail=f"Exécution {job_run_id} introuvable")
+    return _job_run_response(job_run, _stages_by_run(db, [job_run.id])[job_run.id])
@@ -15,6 +15,7 @@ from pydantic import BaseModel, Field
 
 from app.core.database import get_db
 from app.jobs.listing_job import ListingJob
+from app.services.job_lock import JobStillRunningError, run_or_attach
 from app.models.product_candidate import ProductCandidate
 from app.models.listing_template import ListingTemplate
 
@@ -32,6 +33,14 @@ class ListingStats(BaseModel):
     products_without_sourcing_or_listing: int = Field(
         description="Nombre de produits sans option de sourcing ou sans listing généré"
     )
+    generation_failures: int = Field(
+        default=0,
+        description="Nombre de produits dont la génération a échoué ou dépassé son timeout",
+    )
+    listings_from_cache: int = Field(
+        default=0,
+        description="Nombre de listings dont le contenu a été repris du cache",
+    )
 
 
 class ListingJobResponse(BaseModel):
@@ -40,6 +49,13 @@ class ListingJobResponse(BaseModel):
     success: bool = Field(description="Indique si le job s'est terminé avec succès")
     message: str = Field(description="Message descriptif du résultat")
     stats: ListingStats = Field(description="Statistiques détaillées de l'exécution")
+    job_run_id: Optional[str] = Field(
+        default=None, description="Identifiant de l'exécution du job (job_runs)"
+    )
+    attached: bool = Field(
+        default=False,
+        description="True si ce déclenchement s'est rattaché à une exécution déjà en cours",
+    )
 
 
 class ListingTemplateOut(BaseModel):
@@ -75,6 +91,11 @@ class ListingTemplateOut(BaseModel):
     - À lancer après chaque job de scoring (Module C)
     - Ou sur demande manuelle
 
+    **Exécution unique :**
+    - Un seul job à la fois (verrou consultatif Postgres) ; un déclenchement pendant
+      une exécution en cours s'y rattache et renvoie son résultat (`attached=true`),
+      409 si elle ne se termine pas à temps
+
     **Retourne :**
     - Statistiques détaillées (produits traités, listings créés, produits sans sourcing)
     - Message de succès ou d'erreur
@@ -90,18 +111,25 @@ async def generate_listings_for_selected(db: Session = Depends(get_db)) -> Listi
     logger.info("Démarrage du job de génération de listings via l'endpoint API")
     try:
         job = ListingJob(db)
-        stats = job.run()
+        flight = await run_or_attach("listing", None, job.run)
+        stats = flight["stats"]
 
         response = ListingJobResponse(
             success=True,
-            message="Job de génération de listings terminé avec succès",
+            message="Job de génération de listings terminé avec succès" + (
+                " (exécution déjà en cours rejointe)" if flight["attached"] else ""
+            ),
             stats=ListingStats(
                 products_processed=stats.get("products_processed", 0),
                 listings_created=stats.get("listings_created", 0),
                 products_without_sourcing_or_listing=stats.get(
                     "products_without_sourcing_or_listing", 0
                 ),
+                generation_failures=stats.get("generation_failures", 0),
+                listings_from_cache=stats.get("listings_from_cache", 0),
             ),
+            job_run_id=flight["job_run_id"],
+            attached=flight["attached"],
         )
 
         logger.info(
@@ -110,6 +138,11 @@ async def generate_listings_for_selected(db: Session = Depends(get_db)) -> Listi
         )
 
         return response
+    except JobStillRunningError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de génération de listings déjà en cours (exécution {e.job_run_id}), toujours pas terminé",
+        )
     except Exception as e:
         logger.error(
             f"Erreur lors de l'exécution du job de génération de listings: {str(e)}",
@@ -0,0 +1,124 @@
+"""
+Routes API pour la file de travail distribuée.
+
+Endpoints pour découper une étape du pipeline en tâches et suivre la file.
+Les tâches sont exécutées par les workers (python -m app.jobs.queue_worker).
+"""
+import logging
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+
+from app.core.database import get_db
+from app.jobs.queue_worker import STAGE_TASK_TYPES, enqueue_stage
+from app.services.job_lock import JobStillRunningError
+from app.services.work_queue import WorkQueue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["queue"])
+
+
+class EnqueueResponse(BaseModel):
+    """Réponse de la mise en file d'une étape."""
+
+    success: bool = Field(description="Indique si les tâches ont été mises en file")
+    message: str = Field(description="Message descriptif du résultat")
+    stage: str = Field(description="Étape du pipeline")
+    task_type: str = Field(description="Type des tâches créées")
+    tasks_enqueued: int = Field(description="Nombre de tâches créées")
+
+
+class QueueStatsResponse(BaseModel):
+    """État de la file de travail."""
+
+    tasks: Dict[str, Dict[str, int]] = Field(
+        description="Nombre de tâches par type puis par statut (pending, running, done, failed)"
+    )
+
+
+@router.post(
+    "/jobs/queue/{stage}",
+    response_model=EnqueueResponse,
+    summary="Mettre une étape du pipeline en file",
+    description="""
+    Découpe une étape du pipeline en tâches dans la file de travail Postgres (work_tasks).
+
+    **Étapes :**
+    - `discover` : ASINs échus du marché et pas déjà en file, par lots de
+      DISCOVER_CHECKPOINT_BATCH_SIZE (409 si une mise en file du marché est en cours)
+    - `sourcing` : produits sans options, par lots de WORK_QUEUE_CHUNK_SIZE
+    - `scoring` : produits ayant des couples sans score, par lots de WORK_QUEUE_CHUNK_SIZE
+
+    **Exécution :**
+    - Les tâches sont réclamées par les workers (`python -m app.jobs.queue_worker`) avec
+      `SELECT ... FOR UPDATE SKIP LOCKED` : autant de workers que voulu, sur tous les nœuds
+    - Une tâche non terminée dans WORK_QUEUE_VISIBILITY_TIMEOUT_SECONDS est reprise par un
+      autre worker ; un échec est retenté (délai exponentiel) jusqu'à WORK_QUEUE_MAX_ATTEMPTS
+
+    **Retourne :**
+    - Nombre de tâches créées
+    """,
+)
+async def enqueue_pipeline_stage(
+    stage: str = Path(description="Étape du pipeline (discover, sourcing, scoring)"),
+    market: Optional[str] = Query(
+        default="amazon_fr",
+        description="Code du marché (étape discover uniquement)",
+    ),
+    force: bool = Query(
+        default=False,
+        description="Si True, traite TOUS les produits / ASINs (comme le paramètre force des jobs)",
+    ),
+    chunk_size: Optional[int] = Query(
+        default=None, ge=1, le=10000, description="Taille des lots (défaut selon l'étape)"
+    ),
+    db: Session = Depends(get_db),
+) -> EnqueueResponse:
+    """Découpe une étape du pipeline en tâches de la file de travail."""
+    if stage not in STAGE_TASK_TYPES:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Étape '{stage}' non reconnue. Étapes disponibles: {', '.join(STAGE_TASK_TYPES)}",
+        )
+
+    logger.info(f"Mise en file de l'étape {stage} (market={market}, force={force})")
+    try:
+        tasks = enqueue_stage(db, stage, market_code=market, force=force, chunk_size=chunk_size)
+        return EnqueueResponse(
+            success=True,
+            message=f"{len(tasks)} tâche(s) mise(s) en file pour l'étape {stage}",
+            stage=stage,
+            task_type=STAGE_TASK_TYPES[stage],
+            tasks_enqueued=len(tasks),
+        )
+    except JobStillRunningError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Mise en file de l'étape {stage} déjà en cours pour le marché {market}",
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise en file de l'étape {stage}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la mise en file: {str(e)}",
+        )
+
+
+@router.get(
+    "/jobs/queue",
+    response_model=QueueStatsResponse,
+    summary="État de la file de travail",
+)
+async def get_queue_stats(db: Session = Depends(get_db)) -> QueueStatsResponse:
+    """Nombre de tâches par type et par statut."""
+    try:
+        return QueueStatsResponse(tasks=WorkQueue(db).stats())
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de la file: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la lecture de la file: {str(e)}",
+        )
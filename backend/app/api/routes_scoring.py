@@ -8,13 +8,21 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
 from app.core.database import get_db
+from app.core.pagination import (
+    InvalidCursorError,
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_sort_expression,
+)
 from app.jobs.scoring_job import ScoringJob
+from app.services.job_lock import JobParamsConflictError, JobStillRunningError, run_or_attach
 from app.models.product_candidate import ProductCandidate
 from app.models.product_score import ProductScore
 
@@ -22,6 +30,13 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["scoring"])
 
+# Tris disponibles pour /products/scores/top : clé -> (colonne principale, colonne secondaire)
+# (index keyset idx_product_scores_decision_*, voir app.models.product_score)
+TOP_SCORES_SORTS = {
+    "global_score": (ProductScore.global_score, ProductScore.margin_percent),
+    "margin_percent": (ProductScore.margin_percent, ProductScore.global_score),
+}
+
 
 # Modèles Pydantic pour les réponses
 class ScoringStats(BaseModel):
@@ -31,6 +46,16 @@ class ScoringStats(BaseModel):
     products_marked_selected: int = Field(description="Nombre de produits marqués 'selected'")
     products_marked_scored: int = Field(description="Nombre de produits marqués 'scored'")
     products_marked_rejected: int = Field(description="Nombre de produits marqués 'rejected'")
+    winners_refreshed: int = Field(default=0, description="Nombre de lignes winners rafraîchies")
+    page_cache_hits: int = Field(
+        default=0, description="Pages produit servies depuis le cache du scraper (sans requête)"
+    )
+    page_cache_revalidated: int = Field(
+        default=0, description="Pages produit du cache revalidées par requête conditionnelle (304)"
+    )
+    page_cache_misses: int = Field(
+        default=0, description="Pages produit téléchargées (absentes ou périmées dans le cache)"
+    )
 
 
 class ScoringJobResponse(BaseModel):
@@ -39,6 +64,13 @@ class ScoringJobResponse(BaseModel):
     success: bool = Field(description="Indique si le job s'est terminé avec succès")
     message: str = Field(description="Message descriptif du résultat")
     stats: ScoringStats = Field(description="Statistiques détaillées de l'exécution")
+    job_run_id: Optional[str] = Field(
+        default=None, description="Identifiant de l'exécution du job (job_runs)"
+    )
+    attached: bool = Field(
+        default=False,
+        description="True si ce déclenchement s'est rattaché à une exécution déjà en cours",
+    )
 
 
 class ProductScoreResponse(BaseModel):
@@ -78,6 +110,11 @@ class ProductScoreResponse(BaseModel):
     - À lancer après chaque job de sourcing (Module B)
     - Ou sur demande manuelle
 
+    **Exécution unique :**
+    - Un seul job à la fois (verrou consultatif Postgres) ; un déclenchement pendant
+      une exécution en cours s'y rattache et renvoie son résultat (`attached=true`),
+      409 si elle ne se termine pas à temps
+
     **Retourne :**
     - Statistiques détaillées (couples scorés, produits marqués selected/scored/rejected)
     - Message de succès ou d'erreur
@@ -100,17 +137,28 @@ async def run_scoring_job(
     logger.info(f"Démarrage du job de scoring via l'endpoint API (force={force})")
     try:
         job = ScoringJob(db)
-        stats = job.run(force=force)
+        flight = await run_or_attach(
+            "scoring", None, lambda: job.run(force=force), params={"force": force}
+        )
+        stats = flight["stats"]
 
         response = ScoringJobResponse(
             success=True,
-            message="Job de scoring terminé avec succès",
+            message="Job de scoring terminé avec succès" + (
+                " (exécution déjà en cours rejointe)" if flight["attached"] else ""
+            ),
             stats=ScoringStats(
                 pairs_scored=stats.get("pairs_scored", 0),
                 products_marked_selected=stats.get("products_marked_selected", 0),
                 products_marked_scored=stats.get("products_marked_scored", 0),
                 products_marked_rejected=stats.get("products_marked_rejected", 0),
+                winners_refreshed=stats.get("winners_refreshed", 0),
+                page_cache_hits=stats.get("page_cache_hits", 0),
+                page_cache_revalidated=stats.get("page_cache_revalidated", 0),
+                page_cache_misses=stats.get("page_cache_misses", 0),
             ),
+            job_run_id=flight["job_run_id"],
+            attached=flight["attached"],
         )
 
         logger.info(
@@ -119,6 +167,16 @@ async def run_scoring_job(
         )
 
         return response
+    except JobParamsConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de scoring déjà en cours avec d'autres paramètres (exécution {e.job_run_id}: {e.running_params})",
+        )
+    except JobStillRunningError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de scoring déjà en cours (exécution {e.job_run_id}), toujours pas terminé",
+        )
     except Exception as e:
         logger.error(
             f"Erreur lors de l'exécution du job de scoring: {str(e)}", exc_info=True
@@ -190,41 +248,71 @@ async def get_product_scores(
 
     **Query parameters :**
     - `decision` : Décision à filtrer (A_launch, B_review, C_drop). Défaut: A_launch
-    - `limit` : Nombre maximum de résultats. Défaut: 20
+    - `limit` : Nombre maximum de résultats par page. Défaut: 20
+    - `sort` : Clé de tri (global_score, margin_percent). Défaut: global_score
+    - `cursor` : Curseur de la page suivante (en-tête `X-Next-Cursor` de la réponse précédente)
 
     **Retourne :**
-    - Liste des meilleurs scores triés par global_score DESC
+    - Liste des meilleurs scores triés par la clé choisie DESC (NULL en dernier)
+    - En-tête `X-Next-Cursor` s'il reste des résultats (pagination keyset)
     - Liste vide si aucun score ne correspond aux critères
     """,
 )
 async def get_top_scores(
+    response: Response,
     decision: str = Query(
         default="A_launch",
         description="Décision à filtrer (A_launch, B_review, C_drop)",
         pattern="^(A_launch|B_review|C_drop)$",
     ),
-    limit: int = Query(default=20, ge=1, le=100, description="Nombre maximum de résultats"),
+    limit: int = Query(default=20, ge=1, le=100, description="Nombre maximum de résultats par page"),
+    sort: str = Query(
+        default="global_score",
+        description="Clé de tri (global_score, margin_percent)",
+        pattern="^(global_score|margin_percent)$",
+    ),
+    cursor: Optional[str] = Query(default=None, description="Curseur de pagination (X-Next-Cursor)"),
     db: Session = Depends(get_db),
 ) -> List[ProductScoreResponse]:
     """
     Récupère les meilleurs scores filtrés par décision.
 
     Args:
+        response: Réponse HTTP (pour l'en-tête X-Next-Cursor).
         decision: Décision à filtrer (A_launch, B_review, C_drop).
-        limit: Nombre maximum de résultats.
+        limit: Nombre maximum de résultats par page.
+        sort: Clé de tri (global_score, margin_percent).
+        cursor: Curseur de pagination renvoyé par la page précédente.
         db: Session de base de données.
 
     Returns:
-        Liste des meilleurs scores triés par global_score DESC.
+        Liste des meilleurs scores triés par la clé choisie DESC.
+
+    Raises:
+        HTTPException: Si le curseur est invalide.
     """
-    # Récupérer les scores filtrés et triés
-    scores = (
-        db.query(ProductScore)
-        .filter(ProductScore.decision == decision)
-        .order_by(ProductScore.global_score.desc().nulls_last())
-        .limit(limit)
-        .all()
+    sort_columns = TOP_SCORES_SORTS[sort]
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort, len(sort_columns))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Récupérer les scores filtrés et triés (une ligne de plus pour détecter la page suivante)
+    query = apply_keyset(
+        db.query(ProductScore).filter(ProductScore.decision == decision),
+        [keyset_sort_expression(column) for column in sort_columns],
+        ProductScore.id,
+        after=after,
     )
+    scores = query.limit(limit + 1).all()
+    if len(scores) > limit:
+        scores = scores[:limit]
+        last = scores[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort, [getattr(last, column.key) for column in sort_columns] + [last.id]
+        )
 
     logger.debug(f"Récupération de {len(scores)} score(s) avec decision={decision}")
 
@@ -4,7 +4,7 @@ Routes API pour le Module B : Sourcing.
 Endpoints pour lancer le sourcing et récupérer les options de sourcing.
 """
 import logging
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
@@ -13,6 +13,7 @@ from pydantic import BaseModel, Field
 
 from app.core.database import get_db
 from app.jobs.sourcing_job import SourcingJob
+from app.services.job_lock import JobParamsConflictError, JobStillRunningError, run_or_attach
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
 
@@ -36,6 +37,13 @@ class SourcingJobResponse(BaseModel):
     success: bool = Field(description="Indique si le job s'est terminé avec succès")
     message: str = Field(description="Message descriptif du résultat")
     stats: SourcingStats = Field(description="Statistiques détaillées de l'exécution")
+    job_run_id: Optional[str] = Field(
+        default=None, description="Identifiant de l'exécution du job (job_runs)"
+    )
+    attached: bool = Field(
+        default=False,
+        description="True si ce déclenchement s'est rattaché à une exécution déjà en cours",
+    )
 
 
 class SourcingOptionResponse(BaseModel):
@@ -72,6 +80,11 @@ class SourcingOptionResponse(BaseModel):
     - À lancer après chaque job de découverte (Module A)
     - Ou sur demande manuelle
 
+    **Exécution unique :**
+    - Un seul job à la fois (verrou consultatif Postgres) ; un déclenchement pendant
+      une exécution en cours s'y rattache et renvoie son résultat (`attached=true`),
+      409 si elle ne se termine pas à temps
+
     **Retourne :**
     - Statistiques détaillées (produits traités, options créées, produits sans options)
     - Message de succès ou d'erreur
@@ -94,16 +107,23 @@ async def run_sourcing_job(
     logger.info(f"Démarrage du job de sourcing via l'endpoint API (force={force})")
     try:
         job = SourcingJob(db)
-        stats = job.run(force=force)
+        flight = await run_or_attach(
+            "sourcing", None, lambda: job.run(force=force), params={"force": force}
+        )
+        stats = flight["stats"]
 
         response = SourcingJobResponse(
             success=True,
-            message="Job de sourcing terminé avec succès",
+            message="Job de sourcing terminé avec succès" + (
+                " (exécution déjà en cours rejointe)" if flight["attached"] else ""
+            ),
             stats=SourcingStats(
                 processed_products=stats.get("processed_products", 0),
                 options_created=stats.get("options_created", 0),
                 products_without_options=stats.get("products_without_options", 0),
             ),
+            job_run_id=flight["job_run_id"],
+            attached=flight["attached"],
         )
 
         logger.info(
@@ -112,6 +132,16 @@ async def run_sourcing_job(
         )
 
         return response
+    except JobParamsConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de sourcing déjà en cours avec d'autres paramètres (exécution {e.job_run_id}: {e.running_params})",
+        )
+    except JobStillRunningError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job de sourcing déjà en cours (exécution {e.job_run_id}), toujours pas terminé",
+        )
     except Exception as e:
         logger.error(
             f"Erreur lors de l'exécution du job de sourcing: {str(e)}", exc_info=True
@@ -4,6 +4,7 @@ Routes API pour l'interface UI de contrôle (Dashboard).
 Permet de lancer les jobs via une interface web simple.
 """
 import logging
+from functools import partial
 from typing import Dict, Any
 
 from fastapi import APIRouter, Request, Depends, Body
@@ -20,6 +21,8 @@ from app.jobs.sourcing_job import SourcingJob
 from app.jobs.scoring_job import ScoringJob
 from app.jobs.listing_job import ListingJob
 from app.jobs.asin_harvest_job import AsinHarvestJob
+from app.services.job_lock import JobParamsConflictError, JobStillRunningError, run_or_attach
+from app.services.run_ledger import stage
 from app.services.market_config import get_market_config_service
 
 logger = logging.getLogger(__name__)
@@ -85,6 +88,10 @@ async def run_job(
             - "pipeline_abcde" → Pipeline complet A→B→C→D/E
         db: Session de base de données.
 
+    Chaque job (et le pipeline complet) ne tourne qu'une fois à la fois par
+    marché : un déclenchement pendant une exécution en cours (cron n8n, autre
+    clic) s'y rattache et renvoie son résultat (attached=True).
+
     Returns:
         Résultat JSON du job exécuté.
     """
@@ -98,48 +105,18 @@ async def run_job(
 
     try:
         if job_name == "pipeline_abcde":
-            # Enchaîner les 4 jobs dans l'ordre
-            results = []
-            jobs_order = ["discover", "sourcing", "scoring", "listing"]
-            
-            for step_name in jobs_order:
-                logger.info(f"Exécution du job: {step_name}")
-                try:
-                    # Pour le job discover, passer le paramètre market
-                    market_code = request.market if request and step_name == "discover" else None
-                    # Pour discover, sourcing et scoring, passer force si demandé
-                    force = request.force if request and step_name in ["discover", "sourcing", "scoring"] else False
-                    result = await _run_single_job(step_name, db, market_code=market_code, force=force)
-                    results.append({
-                        "step": step_name,
-                        "result": result,
-                        "status_code": 200 if result.get("success") else 500,
-                    })
-                    
-                    # Si un job échoue, arrêter la chaîne
-                    if not result.get("success", False):
-                        logger.error(f"Job {step_name} a échoué, arrêt de la chaîne")
-                        break
-                except Exception as step_error:
-                    logger.error(f"Erreur lors de l'exécution du job {step_name}: {str(step_error)}", exc_info=True)
-                    results.append({
-                        "step": step_name,
-                        "result": {
-                            "success": False,
-                            "error": str(step_error),
-                        },
-                        "status_code": 500,
-                    })
-                    break
-            
-            # Déterminer le succès global
-            all_success = all(r.get("result", {}).get("success", False) for r in results)
-            
-            return {
-                "success": all_success,
-                "message": "Pipeline complet exécuté" if all_success else "Pipeline interrompu",
-                "steps": results,
-            }
+            market = (request.market if request else None) or "amazon_fr"
+
+            async def pipeline() -> Dict[str, Any]:
+                return await _run_pipeline(db, request)
+
+            force = bool(request.force) if request else False
+            flight = await run_or_attach(
+                "pipeline_abcde", market, pipeline, params={"force": force}
+            )
+            result = dict(flight["stats"])
+            result.update(job_run_id=flight["job_run_id"], attached=flight["attached"])
+            return result
         else:
             # Job simple
             logger.info(f"Exécution du job: {job_name}")
@@ -148,6 +125,22 @@ async def run_job(
             result = await _run_single_job(job_name, db, market_code=market_code, force=force)
             return result
 
+    except JobParamsConflictError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "job_name": job_name,
+            "job_run_id": e.job_run_id,
+            "attached": False,
+        }
+    except JobStillRunningError as e:
+        return {
+            "success": False,
+            "error": f"Job déjà en cours, toujours pas terminé: {str(e)}",
+            "job_name": job_name,
+            "job_run_id": e.job_run_id,
+            "attached": True,
+        }
     except Exception as e:
         logger.error(f"Erreur lors de l'exécution du job {job_name}: {str(e)}", exc_info=True)
         return {
@@ -157,6 +150,63 @@ async def run_job(
         }
 
 
+async def _run_pipeline(db: Session, request: Optional[RunJobRequest]) -> Dict[str, Any]:
+    """
+    Enchaîne les jobs du pipeline complet A→B→C→D/E (arrêt au premier échec).
+
+    Args:
+        db: Session de base de données.
+        request: Paramètres (marché pour discover, force).
+
+    Returns:
+        Résultat du pipeline avec le détail de chaque étape.
+    """
+    # Enchaîner les 4 jobs dans l'ordre
+    results = []
+    jobs_order = ["discover", "sourcing", "scoring", "listing"]
+    
+    for step_name in jobs_order:
+        logger.info(f"Exécution du job: {step_name}")
+        try:
+            # Pour le job discover, passer le paramètre market
+            market_code = request.market if request and step_name == "discover" else None
+            # Pour discover, sourcing et scoring, passer force si demandé
+            force = request.force if request and step_name in ["discover", "sourcing", "scoring"] else False
+            # Durée de l'étape dans job_run_stages du pipeline (détail dans l'exécution du job)
+            with stage(step_name):
+                result = await _run_single_job(step_name, db, market_code=market_code, force=force)
+            results.append({
+                "step": step_name,
+                "result": result,
+                "status_code": 200 if result.get("success") else 500,
+            })
+            
+            # Si un job échoue, arrêter la chaîne
+            if not result.get("success", False):
+                logger.error(f"Job {step_name} a échoué, arrêt de la chaîne")
+                break
+        except Exception as step_error:
+            logger.error(f"Erreur lors de l'exécution du job {step_name}: {str(step_error)}", exc_info=True)
+            results.append({
+                "step": step_name,
+                "result": {
+                    "success": False,
+                    "error": str(step_error),
+                },
+                "status_code": 500,
+            })
+            break
+    
+    # Déterminer le succès global
+    all_success = all(r.get("result", {}).get("success", False) for r in results)
+    
+    return {
+        "success": all_success,
+        "message": "Pipeline complet exécuté" if all_success else "Pipeline interrompu",
+        "steps": results,
+    }
+
+
 async def _run_single_job(
     job_name: str,
     db: Session,
@@ -170,52 +220,66 @@ async def _run_single_job(
         job_name: Nom du job à exécuter.
         db: Session de base de données.
         market_code: Code du marché (pour le job discover uniquement).
+        force: Si True, force le recalcul pour tous les produits.
     
     Returns:
-        Résultat du job sous forme de dictionnaire.
+        Résultat du job sous forme de dictionnaire (avec job_run_id et attached).
     """
     try:
         if job_name == "discover":
-            job = DiscoverJob(db, market_code=market_code or "amazon_fr")
-            stats = job.run(force=force)
-            return {
-                "success": True,
-                "job_name": job_name,
-                "message": "Job de découverte terminé avec succès",
-                "stats": stats,
-            }
+            market_code = market_code or "amazon_fr"
+            job = DiscoverJob(db, market_code=market_code)
+            run = partial(job.run, force=force)
+            # Mêmes paramètres que POST /discover/run sans token_budget ni resume
+            params = {"force": force, "token_budget": None, "resume": False}
+            message = "Job de découverte terminé avec succès"
         elif job_name == "sourcing":
             job = SourcingJob(db)
-            stats = job.run(force=force)
-            return {
-                "success": True,
-                "job_name": job_name,
-                "message": "Job de sourcing terminé avec succès",
-                "stats": stats,
-            }
+            run = partial(job.run, force=force)
+            params = {"force": force}
+            message = "Job de sourcing terminé avec succès"
         elif job_name == "scoring":
             job = ScoringJob(db)
-            stats = job.run(force=force)
-            return {
-                "success": True,
-                "job_name": job_name,
-                "message": "Job de scoring terminé avec succès",
-                "stats": stats,
-            }
+            run = partial(job.run, force=force)
+            params = {"force": force}
+            message = "Job de scoring terminé avec succès"
         elif job_name == "listing":
             job = ListingJob(db)
-            stats = job.run()
-            return {
-                "success": True,
-                "job_name": job_name,
-                "message": "Job de génération de listings terminé avec succès",
-                "stats": stats,
-            }
+            run = job.run
+            params = {}
+            message = "Job de génération de listings terminé avec succès"
         else:
             return {
                 "success": False,
                 "error": f"Job '{job_name}' non reconnu",
             }
+
+        # Une seule exécution à la fois : sinon rattachement à celle en cours
+        flight = await run_or_attach(job_name, market_code, run, params=params)
+        return {
+            "success": True,
+            "job_name": job_name,
+            "message": message,
+            "stats": flight["stats"],
+            "job_run_id": flight["job_run_id"],
+            "attached": flight["attached"],
+        }
+    except JobParamsConflictError as e:
+        return {
+            "success": False,
+            "job_name": job_name,
+            "error": str(e),
+            "job_run_id": e.job_run_id,
+            "attached": False,
+        }
+    except JobStillRunningError as e:
+        return {
+            "success": False,
+            "job_name": job_name,
+            "error": f"Job déjà en cours, toujours pas terminé: {str(e)}",
+            "job_run_id": e.job_run_id,
+            "attached": True,
+        }
     except Exception as e:
         logger.error(f"Erreur lors de l'exécution du job {job_name}: {str(e)}", exc_info=True)
         return {
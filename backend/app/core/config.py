@@ -60,6 +60,57 @@ class Settings(BaseSettings):
     AMAZON_SP_API_CLIENT_SECRET: Optional[str] = None
     KEYBUZZ_API_KEY: Optional[str] = None
     APIFY_API_KEY: Optional[str] = None
+
+    # Keepa : raw_keepa_data allégé, historiques csv compressés dans keepa_history_series
+    KEEPA_LEAN_RAW_DATA: bool = True
+
+    # Discover : planification des rafraîchissements par ASIN (échéances + budget de tokens)
+    DISCOVER_SCHEDULER_ENABLED: bool = True
+    KEEPA_REFRESH_TOKEN_BUDGET: int = 1000  # Tokens Keepa par run de discover
+    KEEPA_TOKENS_PER_PRODUCT: int = 1  # Coût Keepa d'un produit (/product avec stats)
+    DISCOVER_CHECKPOINT_BATCH_SIZE: int = 100  # ASINs par lot entre deux points de reprise
+    KEEPA_FINDER_PAGE_SIZE: int = 100  # ASINs par page du Product Finder (/query, minimum 50)
+    KEEPA_FINDER_TOKENS_PER_QUERY: int = 10  # Forfait Keepa par page du Product Finder
+    KEEPA_DISCOVERY_TOKEN_BUDGET: int = 5000  # Tokens par balayage des catégories
+    KEEPA_CATEGORY_CONCURRENCY: int = 4  # Catégories découvertes en parallèle
+
+    # File de travail Postgres des étapes du pipeline (workers multi-nœuds)
+    WORK_QUEUE_VISIBILITY_TIMEOUT_SECONDS: int = 900  # Délai avant reprise d'une tâche non terminée
+    WORK_QUEUE_MAX_ATTEMPTS: int = 3  # Tentatives avant échec définitif d'une tâche
+    WORK_QUEUE_RETRY_BACKOFF_SECONDS: int = 60  # Délai de base avant nouvelle tentative (doublé à chaque échec)
+    WORK_QUEUE_POLL_INTERVAL_SECONDS: float = 2.0  # Attente d'un worker quand la file est vide
+    WORK_QUEUE_HEARTBEAT_INTERVAL_SECONDS: float = 60.0  # Prolongation du délai de visibilité d'une tâche en cours
+    WORK_QUEUE_CHUNK_SIZE: int = 50  # Produits par tâche de sourcing / scoring
+
+    # Exécution unique par job et marché (verrou consultatif Postgres)
+    JOB_ATTACH_WAIT_SECONDS: float = 1800.0  # Attente max d'un déclenchement rattaché au job en cours
+    JOB_ATTACH_POLL_SECONDS: float = 2.0  # Intervalle de vérification du job en cours
+
+    # Événements du pipeline (LISTEN/NOTIFY) et enchaînement incrémental des étapes
+    PIPELINE_EVENTS_ENABLED: bool = True  # Publication des IDs écrits par les jobs
+    PIPELINE_LISTENER_BATCH_SECONDS: float = 10.0  # Regroupement des IDs avant de lancer une étape
+    PIPELINE_LISTENER_MAX_BATCH: int = 500  # Lancement immédiat au-delà de ce nombre d'IDs
+    PIPELINE_LISTENER_MAX_ATTEMPTS: int = 3  # Échecs avant abandon d'un ID (repris par les runs complets)
+
+    # Métriques Prometheus (/metrics)
+    METRICS_ENABLED: bool = True  # Endpoint /metrics et mesure des requêtes HTTP
+
+    # Orchestration asynchrone des runs Apify (récolte multi-catégories)
+    APIFY_MAX_CONCURRENT_RUNS: int = 4
+    APIFY_RUN_TIMEOUT_SECONDS: float = 900.0
+    APIFY_DATASET_PAGE_SIZE: int = 1000
+
+    # Scraper Amazon maison : pool de connexions, débit par hôte, relances
+    SCRAPER_MAX_CONCURRENCY: int = 4
+    SCRAPER_RATE_PER_HOST: float = 2.0  # Requêtes/seconde par hôte (0 = pas de limite)
+    SCRAPER_BURST: int = 4
+    SCRAPER_MAX_RETRIES: int = 3  # Relances sur 503/429/captcha/timeout
+    SCRAPER_BACKOFF_BASE_SECONDS: float = 1.0
+    SCRAPER_HTTP2: bool = True  # Utilisé si le paquet h2 est installé
+    SCRAPER_CACHE_ENABLED: bool = True  # Cache disque des pages scrapées
+    SCRAPER_CACHE_DIR: str = "/tmp/winner_machine/page_cache"
+    SCRAPER_CACHE_TTL_SECONDS: float = 6 * 3600  # Au-delà : revalidation ETag/Last-Modified
+    SCRAPER_CACHE_MAX_MB: int = 512
     
     # Amazon Selling Partner API (SP-API) Configuration
     SPAPI_LWA_CLIENT_ID: Optional[str] = None
@@ -73,6 +124,14 @@ class Settings(BaseSettings):
     # Listing & Branding
     DEFAULT_BRAND_NAME: str = "YOUR_BRAND"
 
+    # Génération de listings : backend d'exécution (inline, thread, process, http)
+    LISTING_GENERATOR_BACKEND: str = "inline"
+    LISTING_GENERATOR_MAX_WORKERS: int = 4
+    LISTING_GENERATOR_TIMEOUT_SECONDS: float = 10.0
+    LISTING_GENERATOR_URL: Optional[str] = None  # Serveur local de génération (backend http)
+    LISTING_GENERATOR_VERSION: Optional[str] = None  # Surcharge la version (clé du cache de contenu)
+    LISTING_CONTENT_CACHE_ENABLED: bool = True
+
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8080"]
 
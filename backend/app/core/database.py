@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
 
 from app.core.config import get_settings
+from app.core.metrics import instrument_pool
 
 settings = get_settings()
 
@@ -16,6 +17,9 @@ engine = create_engine(
     echo=settings.DEBUG,  # Afficher les requêtes SQL en mode debug
 )
 
+# Connexions ouvertes / empruntées (métriques Prometheus)
+instrument_pool(engine)
+
 # Créer la session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,435 @@
+"""
+Métriques Prometheus exposées sur /metrics (format texte 0.0.4).
+
+Compteurs, jauges et histogrammes minimalistes, sans dépendance : un
+observe() coûte une recherche dichotomique et un verrou non contendu, assez
+peu pour rester actif dans les boucles chaudes (ScoringJob, SourcingMatcher).
+Dans une boucle, résoudre les labels une fois (metric.labels(...)) puis
+appeler observe()/inc() sur l'enfant obtenu.
+
+Les métriques sont propres au processus : l'API expose les siennes ; le
+listener du pipeline et les workers de la file ont leurs propres compteurs.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Type de contenu du format texte Prometheus
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seaux par défaut (secondes) : de la milliseconde à la minute
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Seaux des durées de jobs et d'étapes (secondes) : de la seconde à plusieurs heures
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0)
+
+# Seaux des boucles chaudes (secondes) : de 50 µs à 1 s
+HOT_LOOP_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 1.0)
+
+
+def _escape(value: str) -> str:
+    """Échappe une valeur de label."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Formate une valeur numérique."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Formate des labels ({a="x",b="y"}, vide sans label)."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Value:
+    """Valeur d'un compteur ou d'une jauge pour un jeu de labels."""
+
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Incrémente la valeur."""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Décrémente la valeur (jauges)."""
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        """Fixe la valeur (jauges)."""
+        with self._lock:
+            self._value = value
+
+    def get(self) -> float:
+        """Valeur courante."""
+        return self._value
+
+
+class _HistogramValue:
+    """Seaux d'un histogramme pour un jeu de labels."""
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * len(bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Enregistre une observation (le premier seau dont la borne est >= value)."""
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        """Chronomètre un bloc : with histogram.time(): ..."""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Copie des seaux (non cumulés) et de la somme."""
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    """Chronomètre qui observe la durée d'un bloc dans un histogramme."""
+
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: _HistogramValue):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class _Metric(ABC):
+    """Base des métriques : une valeur par jeu de labels."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+        if not self.labelnames:
+            # Série exposée (à 0) dès le démarrage
+            self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """Valeur d'un nouveau jeu de labels."""
+
+    def labels(self, *values) -> object:
+        """
+        Valeur pour un jeu de labels (créée au premier usage).
+
+        Args:
+            *values: Valeurs des labels, dans l'ordre de labelnames.
+
+        Returns:
+            Enfant sur lequel appeler inc()/set()/observe().
+        """
+        # Chemin rapide : labels déjà en chaînes et enfant existant
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: labels attendus {self.labelnames}, reçus {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        """Valeur d'une métrique sans label."""
+        return self.labels()
+
+    def _children_snapshot(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        """Lignes du format texte Prometheus."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, child in self._children_snapshot():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    """Compteur croissant (nom en *_total)."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Incrémente le compteur sans label."""
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Jauge (valeur qui monte et descend)."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Incrémente la jauge sans label."""
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Décrémente la jauge sans label."""
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        """Fixe la jauge sans label."""
+        self._default().set(value)
+
+
+class Histogram(_Metric):
+    """Histogramme à seaux fixes (durées en secondes)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self._bounds = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self._bounds)
+
+    def observe(self, value: float) -> None:
+        """Enregistre une observation sans label."""
+        self._default().observe(value)
+
+    def time(self) -> _Timer:
+        """Chronomètre un bloc sans label."""
+        return self._default().time()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        bucket_labelnames = self.labelnames + ("le",)
+        for values, child in self._children_snapshot():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self._bounds, counts):
+                cumulative += count
+                labels = _format_labels(bucket_labelnames, values + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques du processus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        """Enregistre une métrique (nom unique)."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# Requêtes HTTP de l'API
+HTTP_REQUEST_DURATION = Histogram(
+    "winner_http_request_duration_seconds",
+    "Durée des requêtes HTTP de l'API par route",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "winner_http_requests_in_flight",
+    "Requêtes HTTP en cours de traitement",
+)
+
+# Jobs du pipeline
+JOBS_IN_FLIGHT = Gauge(
+    "winner_jobs_in_flight",
+    "Jobs en cours d'exécution dans ce processus",
+    ["job_type"],
+)
+JOB_RUNS = Counter(
+    "winner_job_runs_total",
+    "Exécutions de jobs terminées par statut",
+    ["job_type", "status"],
+)
+JOB_STAGE_DURATION = Histogram(
+    "winner_job_stage_duration_seconds",
+    "Durée des étapes des jobs",
+    ["stage"],
+    buckets=JOB_BUCKETS,
+)
+
+# Services externes (Keepa, SP-API, Apify, scraper)
+UPSTREAM_HTTP_DURATION = Histogram(
+    "winner_upstream_http_request_duration_seconds",
+    "Durée des appels HTTP vers les services externes",
+    ["upstream"],
+)
+UPSTREAM_HTTP_ERRORS = Counter(
+    "winner_upstream_http_errors_total",
+    "Appels HTTP en échec (erreur réseau ou statut >= 400) par service externe",
+    ["upstream"],
+)
+KEEPA_TOKENS = Counter(
+    "winner_keepa_tokens_consumed_total",
+    "Tokens Keepa consommés",
+)
+
+# Caches (ratio de hit : hit / (hit + miss))
+CACHE_REQUESTS = Counter(
+    "winner_cache_requests_total",
+    "Lectures des caches par résultat (hit, miss)",
+    ["cache", "result"],
+)
+
+# Pool de connexions SQLAlchemy
+DB_CONNECTIONS_IN_USE = Gauge(
+    "winner_db_pool_connections_in_use",
+    "Connexions à la base empruntées au pool",
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "winner_db_pool_connections_opened_total",
+    "Connexions à la base ouvertes",
+)
+
+# Boucles chaudes
+SCORING_PAIR_DURATION = Histogram(
+    "winner_scoring_pair_duration_seconds",
+    "Durée du calcul du score d'un couple produit + option (ScoringJob)",
+    buckets=HOT_LOOP_BUCKETS,
+)
+SCORING_PAIRS = Counter(
+    "winner_scoring_pairs_total",
+    "Couples scorés par résultat (décision ou error)",
+    ["result"],
+)
+SOURCING_MATCH_DURATION = Histogram(
+    "winner_sourcing_match_duration_seconds",
+    "Durée de la recherche d'options de sourcing d'un produit (SourcingMatcher)",
+    buckets=HOT_LOOP_BUCKETS,
+)
+SOURCING_CATALOG_ROWS = Counter(
+    "winner_sourcing_catalog_rows_scanned_total",
+    "Lignes de catalogues fournisseurs parcourues par le matching",
+)
+
+
+def instrument_pool(bind: Engine) -> None:
+    """Suit les connexions ouvertes et empruntées au pool d'un engine."""
+    if event.contains(bind, "checkout", _on_checkout):
+        return
+    event.listen(bind, "connect", _on_connect)
+    event.listen(bind, "checkout", _on_checkout)
+    event.listen(bind, "checkin", _on_checkin)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPENED.inc()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_CONNECTIONS_IN_USE.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_CONNECTIONS_IN_USE.dec()
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI : durée des requêtes par route (gabarit de chemin, pas
+    l'URL brute, pour borner le nombre de séries) et requêtes en cours.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Route résolue par le routeur (scope partagé), sinon requête hors API
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, status["code"]).observe(
+                time.perf_counter() - started
+            )
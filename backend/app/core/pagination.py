@@ -0,0 +1,128 @@
+"""
+Pagination par curseur (keyset) pour les listes triées de l'API.
+
+Le tri se fait sur des expressions COALESCE(colonne, sentinelle) : les NULL
+se retrouvent en fin de liste en tri décroissant et la comparaison de tuples
+(a, b, id) < (:a, :b, :id) reste valide. Les index de la table portent sur ces
+mêmes expressions (voir keyset_index_expression), ce qui garde le coût de la
+page N identique à celui de la page 1.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+# Valeur de remplacement des NULL dans les clés de tri (inférieure à tout score/marge)
+NULLS_LAST_SENTINEL = "-999999999"
+
+
+class InvalidCursorError(ValueError):
+    """Curseur de pagination illisible ou incompatible avec le tri demandé."""
+
+
+def keyset_index_expression(column_name: str) -> str:
+    """
+    Expression SQL d'index correspondant à keyset_sort_expression().
+
+    Args:
+        column_name: Nom de la colonne triée.
+
+    Returns:
+        Texte SQL "COALESCE(colonne, sentinelle)" à utiliser dans Index()/create_index.
+    """
+    return f"COALESCE({column_name}, {NULLS_LAST_SENTINEL})"
+
+
+def keyset_sort_expression(column) -> ColumnElement:
+    """
+    Expression de tri non-NULL pour une colonne numérique nullable.
+
+    Args:
+        column: Colonne SQLAlchemy (ex: Winner.global_score).
+
+    Returns:
+        COALESCE(colonne, sentinelle), identique à l'expression indexée.
+    """
+    return func.coalesce(column, literal_column(NULLS_LAST_SENTINEL))
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """
+    Encode un curseur opaque (base64url) à partir de la dernière ligne d'une page.
+
+    Args:
+        sort: Clé de tri utilisée (vérifiée au décodage).
+        values: Valeurs des clés de tri de la dernière ligne (id en dernier).
+
+    Returns:
+        Curseur à renvoyer tel quel dans la requête suivante.
+    """
+    payload = json.dumps({"s": sort, "v": [None if v is None else str(v) for v in values]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, key_count: int) -> Tuple[List[Decimal], UUID]:
+    """
+    Décode un curseur produit par encode_cursor().
+
+    Args:
+        cursor: Curseur reçu du client.
+        sort: Clé de tri de la requête courante.
+        key_count: Nombre de clés numériques attendues (hors id).
+
+    Returns:
+        Tuple (valeurs numériques des clés, id de la dernière ligne).
+
+    Raises:
+        InvalidCursorError: Si le curseur est invalide ou a été émis pour un autre tri.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("s") != sort:
+            raise InvalidCursorError("Curseur émis pour un autre tri")
+        values = payload["v"]
+        if len(values) != key_count + 1:
+            raise InvalidCursorError("Curseur incompatible avec le tri demandé")
+        keys = [Decimal(NULLS_LAST_SENTINEL if v is None else v) for v in values[:key_count]]
+        last_id = UUID(values[key_count])
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError, InvalidOperation, binascii.Error) as e:
+        raise InvalidCursorError(f"Curseur invalide: {str(e)}") from e
+    return keys, last_id
+
+
+def apply_keyset(
+    query,
+    sort_expressions: Sequence[ColumnElement],
+    id_column,
+    descending: bool = True,
+    after: Optional[Tuple[List[Decimal], UUID]] = None,
+):
+    """
+    Applique le tri et la condition "après le curseur" à une requête.
+
+    Args:
+        query: Query SQLAlchemy à paginer.
+        sort_expressions: Expressions de tri (keyset_sort_expression), hors id.
+        id_column: Colonne identifiant unique (départage les égalités).
+        descending: Tri décroissant (True) ou croissant (False).
+        after: Résultat de decode_cursor() ou None pour la première page.
+
+    Returns:
+        Query triée et filtrée (sans limit).
+    """
+    keys = [*sort_expressions, id_column]
+    if after is not None:
+        values, last_id = after
+        row = tuple_(*keys)
+        bound = tuple_(*values, last_id)
+        query = query.filter(row < bound if descending else row > bound)
+
+    return query.order_by(*[k.desc() if descending else k.asc() for k in keys])
@@ -5,19 +5,35 @@ Récupère des ASINs depuis Apify (Best Sellers, Movers & Shakers, etc.)
 et les stocke dans la table harvested_asins.
 """
 import logging
-from typing import Dict, Optional
+from contextlib import aclosing
+from typing import Dict, List, Optional, Sequence, Tuple
 from uuid import uuid4
 from datetime import datetime
 
+from sqlalchemy import case, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
 from app.models.harvested_asin import HarvestedAsin
-from app.services.apify_client import ApifyClient
+from app.services.apify_client import ApifyClient, extract_asins
+from app.services.apify_orchestrator import AsyncApifyOrchestrator, build_list_run_specs
 from app.services.scraper_client import ScraperClient
 
 logger = logging.getLogger(__name__)
 
+# Nombre d'ASINs par INSERT ... ON CONFLICT
+HARVEST_UPSERT_CHUNK_SIZE = 1000
+
+# Code marché -> domaine Amazon utilisé par les actors Apify
+MARKET_DOMAINS = {
+    "amazon_fr": "FR",
+    "amazon_de": "DE",
+    "amazon_es": "ES",
+    "amazon_it": "IT",
+    "amazon_uk": "UK",
+    "amazon_com": "US",
+}
+
 
 class AsinHarvestJob:
     """Job pour récolter des ASINs depuis Apify et les stocker en base."""
@@ -76,60 +92,11 @@ class AsinHarvestJob:
             stats["harvested_total"] = len(asins)
             logger.info(f"Récupération de {len(asins)} ASINs depuis {source}")
 
-            # Insérer les ASINs en base (ignorer les doublons)
-            for asin in asins:
-                try:
-                    # Vérifier si l'ASIN existe déjà
-                    existing = (
-                        self.db.query(HarvestedAsin)
-                        .filter(HarvestedAsin.asin == asin)
-                        .first()
-                    )
-
-                    if existing:
-                        # Mettre à jour le timestamp si nécessaire
-                        if existing.marketplace != market or existing.source != source:
-                            existing.marketplace = market
-                            existing.source = source
-                            existing.updated_at = datetime.utcnow()
-                            self.db.commit()
-                        stats["duplicates_ignored"] += 1
-                        continue
-
-                    # Créer un nouveau HarvestedAsin
-                    new_harvested = HarvestedAsin(
-                        id=uuid4(),
-                        asin=asin,
-                        marketplace=market,
-                        source=source,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow(),
-                    )
-
-                    self.db.add(new_harvested)
-                    self.db.commit()
-                    stats["inserted_new"] += 1
-
-                except IntegrityError as e:
-                    # Si jamais une UniqueViolation se produit (race condition)
-                    if "harvested_asins_asin_key" in str(e.orig) or "asin" in str(e.orig).lower():
-                        self.db.rollback()
-                        logger.debug(f"ASIN {asin} créé entre-temps, doublon ignoré")
-                        stats["duplicates_ignored"] += 1
-                    else:
-                        logger.error(
-                            f"Erreur d'intégrité lors de l'insertion de l'ASIN {asin}: {str(e)}",
-                            exc_info=True,
-                        )
-                        self.db.rollback()
-                except Exception as e:
-                    logger.error(
-                        f"Erreur lors de l'insertion de l'ASIN {asin}: {str(e)}",
-                        exc_info=True,
-                    )
-                    self.db.rollback()
-                    # Continue avec le prochain ASIN
-                    continue
+            # Upsert ensembliste par lots (nouveaux vs doublons comptés par la base)
+            inserted, duplicates = self._upsert_asins(asins, market=market, source=source)
+            self.db.commit()
+            stats["inserted_new"] = inserted
+            stats["duplicates_ignored"] = duplicates
 
             logger.info("=== Job de récolte d'ASINs terminé ===")
             logger.info(
@@ -148,6 +115,155 @@ class AsinHarvestJob:
 
         return stats
 
+    async def run_apify_parallel(
+        self,
+        market: str = "amazon_fr",
+        categories: Optional[Sequence[str]] = None,
+        sources: Sequence[str] = ("apify_bestsellers", "apify_movers"),
+        limit_per_run: int = 100,
+        orchestrator: Optional[AsyncApifyOrchestrator] = None,
+    ) -> Dict[str, int]:
+        """
+        Récolte des ASINs via plusieurs runs Apify lancés en parallèle.
+
+        Un run par (source, catégorie) ; chaque page de dataset est upsertée dès
+        sa réception, pendant que les autres runs tournent encore. Le temps total
+        suit donc le run le plus lent plutôt que la somme des runs.
+
+        Args:
+            market: Code du marché (ex: "amazon_fr").
+            categories: Slugs de catégories Amazon (None = classement général).
+            sources: Listes à récolter (apify_bestsellers, apify_movers).
+            limit_per_run: Nombre maximum de produits par run.
+            orchestrator: Orchestrateur à utiliser (par défaut, depuis les settings).
+
+        Returns:
+            Dictionnaire avec les statistiques de run() plus :
+            - runs_started: nombre de runs lancés
+            - runs_succeeded: nombre de runs terminés avec succès
+        """
+        domain = MARKET_DOMAINS.get(market, "FR")
+        specs = build_list_run_specs(domain, list(categories or []), sources, limit_per_run)
+        orchestrator = orchestrator or AsyncApifyOrchestrator()
+
+        logger.info(
+            f"=== Démarrage de la récolte Apify parallèle: market={market}, "
+            f"{len(specs)} runs (max {orchestrator.max_concurrent_runs} simultanés) ==="
+        )
+
+        stats = {
+            "runs_started": 0,
+            "runs_succeeded": 0,
+            "harvested_total": 0,
+            "inserted_new": 0,
+            "duplicates_ignored": 0,
+        }
+
+        try:
+            # Fermeture immédiate du flux sur erreur : runs en cours arrêtés
+            async with aclosing(orchestrator.stream_items(specs)) as stream:
+                async for spec, items in stream:
+                    asins = extract_asins(items)
+                    if not asins:
+                        continue
+                    stats["harvested_total"] += len(asins)
+                    inserted, duplicates = self._upsert_asins(
+                        asins, market=market, source=spec["source"]
+                    )
+                    stats["inserted_new"] += inserted
+                    stats["duplicates_ignored"] += duplicates
+
+            self.db.commit()
+        except Exception as e:
+            logger.error(
+                f"Erreur lors de la récolte Apify parallèle: {str(e)}",
+                exc_info=True,
+            )
+            self.db.rollback()
+            raise
+
+        stats["runs_started"] = sum(1 for r in orchestrator.run_results if r["run_id"])
+        stats["runs_succeeded"] = sum(
+            1 for r in orchestrator.run_results if r["status"] == "SUCCEEDED"
+        )
+
+        logger.info("=== Récolte Apify parallèle terminée ===")
+        logger.info(
+            f"Statistiques: {stats['runs_succeeded']}/{len(specs)} runs réussis, "
+            f"{stats['harvested_total']} récoltés, {stats['inserted_new']} nouveaux, "
+            f"{stats['duplicates_ignored']} doublons ignorés"
+        )
+        return stats
+
+    def _upsert_asins(self, asins: List[str], market: str, source: str) -> Tuple[int, int]:
+        """
+        Insère ou rafraîchit les ASINs récoltés par lots (INSERT ... ON CONFLICT (asin)).
+
+        Un ASIN déjà connu voit son last_seen_at rafraîchi, et son marketplace/source
+        (avec updated_at) seulement s'ils changent. RETURNING (xmax = 0) indique
+        pour chaque ligne si elle vient d'être insérée ou si elle existait déjà.
+        Pas de commit ici.
+
+        Args:
+            asins: ASINs récoltés (doublons et valeurs invalides tolérés).
+            market: Code du marché.
+            source: Source de récolte.
+
+        Returns:
+            Tuple (nouveaux ASINs insérés, ASINs déjà existants ou répétés dans la récolte).
+        """
+        # Dédoublonner en conservant l'ordre (une même clé ne peut pas être
+        # modifiée deux fois par un même INSERT ... ON CONFLICT)
+        unique_asins = [a for a in dict.fromkeys(asins) if a and len(a) <= 10]
+        skipped = len(asins) - len(unique_asins)
+
+        table = HarvestedAsin.__table__
+        inserted = 0
+        existing = 0
+        now = datetime.utcnow()
+
+        for i in range(0, len(unique_asins), HARVEST_UPSERT_CHUNK_SIZE):
+            chunk = unique_asins[i:i + HARVEST_UPSERT_CHUNK_SIZE]
+            stmt = pg_insert(table).values(
+                [
+                    {
+                        "id": uuid4(),
+                        "asin": asin,
+                        "marketplace": market,
+                        "source": source,
+                        "created_at": now,
+                        "updated_at": now,
+                        "last_seen_at": now,
+                    }
+                    for asin in chunk
+                ]
+            )
+            changed = or_(
+                table.c.marketplace != stmt.excluded.marketplace,
+                table.c.source != stmt.excluded.source,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.asin],
+                set_={
+                    "marketplace": stmt.excluded.marketplace,
+                    "source": stmt.excluded.source,
+                    "last_seen_at": stmt.excluded.last_seen_at,
+                    "updated_at": case(
+                        (changed, stmt.excluded.updated_at), else_=table.c.updated_at
+                    ),
+                },
+            ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+            flags = self.db.execute(stmt).scalars().all()
+            chunk_inserted = sum(1 for flag in flags if flag)
+            inserted += chunk_inserted
+            existing += len(flags) - chunk_inserted
+
+        if skipped:
+            logger.debug(f"{skipped} ASIN(s) répétés ou invalides dans la récolte")
+
+        return inserted, existing + skipped
+
     def _fetch_asins(
         self, source: str, market: str, limit: int
     ) -> list[str]:
@@ -171,15 +287,7 @@ class AsinHarvestJob:
             return []
         
         # Sources Apify (mise en pause mais code conservé)
-        domain_map = {
-            "amazon_fr": "FR",
-            "amazon_de": "DE",
-            "amazon_es": "ES",
-            "amazon_it": "IT",
-            "amazon_uk": "UK",
-            "amazon_com": "US",
-        }
-        domain = domain_map.get(market, "FR")
+        domain = MARKET_DOMAINS.get(market, "FR")
 
         if source == "apify_bestsellers":
             logger.info(f"Utilisation d'Apify pour Best Sellers {market} (payant - peut échouer)")
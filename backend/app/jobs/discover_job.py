@@ -3,6 +3,7 @@ Job de découverte de produits - Module A.
 
 Récupère des produits depuis Keepa et les stocke en base.
 """
+import hashlib
 import logging
 import json
 from typing import Dict, Set, Optional
@@ -14,12 +15,26 @@ from sqlalchemy.exc import IntegrityError
 
 from app.models.product_candidate import ProductCandidate
 from app.models.harvested_asin import HarvestedAsin
+from app.models.discover_run import DiscoverRun
+from app.services.category_config import get_category_config_service
+from app.services.category_fanout import CategoryFanout
 from app.services.keepa_client import KeepaClient
+from app.services.keepa_history import KeepaHistoryStore
+from app.services.refresh_scheduler import RefreshScheduler
+from app.core.config import get_settings
 from app.services.market_config import get_market_config_service, MarketConfig
+from app.services.pipeline_events import CHANNEL_PRODUCTS_UPSERTED, publish
+from app.services.winners_projection import WinnersProjectionService
 
 # Logger pour ce module
 logger = logging.getLogger(__name__)
 
+# Champs de raw_data exclus de l'empreinte (changent à chaque rafraîchissement Keepa)
+VOLATILE_RAW_FIELDS = ("lastUpdate",)
+
+# Statuts préservés lors d'une mise à jour sans force
+PROCESSED_STATUSES = ("scored", "selected", "launched")
+
 
 class DiscoverJob:
     """Job pour découvrir des produits candidats."""
@@ -36,30 +51,59 @@ class DiscoverJob:
         self.db = db
         self.keepa_client = KeepaClient()
         self.market_service = get_market_config_service()
+        self.winners_projection = WinnersProjectionService(db)
+        self.history_store = KeepaHistoryStore(db)
+        self.refresh_scheduler = RefreshScheduler(db)
         self.market_code = market_code or "amazon_fr"  # Par défaut: Amazon FR
         # Set pour tracker les ASINs déjà traités dans cette exécution
         self._processed_asins: Set[str] = set()
+        # IDs des produits créés ou modifiés, publiés sur products_upserted
+        self._upserted_ids: list = []
         # Flag pour forcer la mise à jour même si le produit a déjà été traité
         self._force_update: bool = False
-
-    def run(self, force: bool = False) -> Dict[str, int]:
+        # Budget de tokens Keepa du run (None = pas de planification)
+        self._token_budget: Optional[int] = None
+        # Point de reprise du run en cours (table discover_runs)
+        self._resume: bool = False
+        self.discover_run: Optional[DiscoverRun] = None
+
+    def run(
+        self, force: bool = False, token_budget: Optional[int] = None, resume: bool = False
+    ) -> Dict[str, int]:
         """
         Lance le job de découverte pour le marché spécifié.
 
         Args:
             force: Si True, force la mise à jour de TOUS les produits (même ceux déjà traités).
                    Si False, préserve le status des produits déjà traités (comportement par défaut).
+            token_budget: Budget de tokens Keepa du run. Si None, KEEPA_REFRESH_TOKEN_BUDGET.
+                          Ignoré (tous les ASINs sont rafraîchis) si force=True ou si
+                          DISCOVER_SCHEDULER_ENABLED est désactivé.
+            resume: Si True, reprend le dernier run interrompu du marché au lot suivant
+                    le dernier lot commité (nouveau run s'il n'y en a pas).
 
         Returns:
             Dictionnaire avec les statistiques :
             - created: nombre de produits créés
             - updated: nombre de produits mis à jour
+            - unchanged: nombre de produits identiques (aucune écriture)
+            - scheduled: nombre d'ASINs échus sélectionnés par le planificateur
+            - not_due: nombre d'ASINs non échus ou hors budget, non rafraîchis
             - total_processed: total traité
             - markets_processed: nombre de marchés traités
             - errors: nombre d'erreurs rencontrées
         """
         logger.info(f"=== Démarrage du job de découverte de produits pour le marché: {self.market_code} (force={force}) ===")
         self._force_update = force
+        self._resume = resume
+        self.discover_run = None
+        settings = get_settings()
+        if settings.DISCOVER_SCHEDULER_ENABLED and not force:
+            self._token_budget = (
+                token_budget if token_budget is not None else settings.KEEPA_REFRESH_TOKEN_BUDGET
+            )
+        else:
+            self._token_budget = None
 
         # Récupérer la configuration du marché
         market_config = self.market_service.get_market_by_code(self.market_code)
@@ -68,6 +112,9 @@ class DiscoverJob:
             return {
                 "created": 0,
                 "updated": 0,
+                "unchanged": 0,
+                "scheduled": 0,
+                "not_due": 0,
                 "total_processed": 0,
                 "markets_processed": 0,
                 "errors": 1,
@@ -78,6 +125,9 @@ class DiscoverJob:
             return {
                 "created": 0,
                 "updated": 0,
+                "unchanged": 0,
+                "scheduled": 0,
+                "not_due": 0,
                 "total_processed": 0,
                 "markets_processed": 0,
                 "errors": 0,
@@ -88,6 +138,9 @@ class DiscoverJob:
         stats = {
             "created": 0,
             "updated": 0,
+            "unchanged": 0,
+            "scheduled": 0,
+            "not_due": 0,
             "total_processed": 0,
             "markets_processed": 0,
             "errors": 0,
@@ -100,6 +153,9 @@ class DiscoverJob:
             market_stats = self._process_market(market_config)
             stats["created"] += market_stats["created"]
             stats["updated"] += market_stats["updated"]
+            stats["unchanged"] += market_stats["unchanged"]
+            stats["scheduled"] += market_stats["scheduled"]
+            stats["not_due"] += market_stats["not_due"]
             stats["total_processed"] += market_stats["total_processed"]
             stats["errors"] += market_stats.get("errors", 0)
             stats["markets_processed"] = 1
@@ -108,6 +164,7 @@ class DiscoverJob:
                 f"Marché {market_config.label}: "
                 f"{market_stats['created']} créés, "
                 f"{market_stats['updated']} mis à jour, "
+                f"{market_stats['unchanged']} inchangés, "
                 f"{market_stats['total_processed']} traités"
             )
         except Exception as e:
@@ -120,11 +177,13 @@ class DiscoverJob:
                 self.db.rollback()
             except Exception:
                 pass
+            self._fail_discover_run(e)
 
         logger.info("=== Job de découverte terminé ===")
         logger.info(
             f"Statistiques globales: {stats['created']} créés, "
             f"{stats['updated']} mis à jour, "
+            f"{stats['unchanged']} inchangés, "
             f"{stats['total_processed']} traités, "
             f"{stats['markets_processed']} marché(s), "
             f"{stats['errors']} erreur(s)"
@@ -132,6 +191,145 @@ class DiscoverJob:
 
         return stats
 
+    def select_asins(self, force: bool = False, token_budget: Optional[int] = None) -> list:
+        """
+        ASINs à rafraîchir pour le marché, sans les traiter (découpage en tâches).
+
+        Mêmes règles que run() : sources combinées puis planificateur dans la
+        limite du budget de tokens (sauf force=True ou planificateur désactivé).
+
+        Args:
+            force: Si True, tous les ASINs connus.
+            token_budget: Budget de tokens Keepa. Si None, KEEPA_REFRESH_TOKEN_BUDGET.
+
+        Returns:
+            Liste ordonnée des ASINs (vide si le marché est inconnu ou désactivé).
+        """
+        settings = get_settings()
+        if settings.DISCOVER_SCHEDULER_ENABLED and not force:
+            self._token_budget = (
+                token_budget if token_budget is not None else settings.KEEPA_REFRESH_TOKEN_BUDGET
+            )
+        else:
+            self._token_budget = None
+
+        market_config = self.market_service.get_market_by_code(self.market_code)
+        if not market_config or not market_config.active:
+            logger.warning(f"Marché '{self.market_code}' inconnu ou désactivé, aucun ASIN sélectionné")
+            return []
+        stats = {"scheduled": 0, "not_due": 0}
+        return self._select_asins(market_config, stats)
+
+    def run_batch(self, asins: list, force: bool = False) -> Dict[str, int]:
+        """
+        Traite un lot d'ASINs déjà sélectionné (tâche discover de la file de travail).
+
+        Args:
+            asins: ASINs du lot.
+            force: Si True, force la mise à jour des produits déjà traités.
+
+        Returns:
+            Statistiques du lot (created, updated, unchanged, total_processed, errors).
+
+        Raises:
+            ValueError: Si le marché est inconnu ou désactivé.
+            RuntimeError: Si l'appel Keepa échoue (la tâche sera retentée).
+        """
+        market_config = self.market_service.get_market_by_code(self.market_code)
+        if not market_config or not market_config.active:
+            raise ValueError(f"Marché '{self.market_code}' inconnu ou désactivé")
+
+        self._force_update = force
+        self._processed_asins.clear()
+        settings = get_settings()
+        # Les lots sont issus du planificateur : les ASINs rafraîchis sont replanifiés
+        self._token_budget = (
+            settings.KEEPA_REFRESH_TOKEN_BUDGET
+            if settings.DISCOVER_SCHEDULER_ENABLED and not force
+            else None
+        )
+        stats = {"created": 0, "updated": 0, "unchanged": 0, "total_processed": 0, "errors": 0}
+        if not self._process_batch(market_config, list(asins), stats):
+            raise RuntimeError(f"Échec Keepa sur un lot de {len(asins)} ASINs ({self.market_code})")
+        return stats
+
+    def run_finder(
+        self,
+        limit_per_category: int = 200,
+        category_id: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Découverte par catégorie via le Product Finder Keepa (filtres côté serveur).
+
+        Les catégories actives du marché (category_config.yml) sont parcourues en
+        parallèle (CategoryFanout) sous un budget de tokens commun ; les ASINs
+        présents dans plusieurs catégories ne sont enrichis et stockés qu'une
+        fois. Les pages sont stockées au fil de l'eau, dans ce thread (session DB).
+
+        Args:
+            limit_per_category: Nombre maximum d'ASINs découverts par catégorie.
+            category_id: Restreindre à une catégorie (ID Keepa). None = toutes.
+            token_budget: Budget de tokens Keepa (défaut: KEEPA_DISCOVERY_TOKEN_BUDGET).
+            max_workers: Catégories en parallèle (défaut: KEEPA_CATEGORY_CONCURRENCY).
+
+        Returns:
+            Dictionnaire avec les statistiques :
+            - created, updated, unchanged: produits créés, mis à jour, inchangés
+            - total_processed: total traité
+            - categories_processed: nombre de catégories parcourues sans erreur
+            - duplicates_skipped: ASINs déjà réclamés par une autre catégorie
+            - tokens_spent: tokens Keepa réservés pendant le balayage
+            - errors: nombre d'erreurs rencontrées
+        """
+        logger.info(
+            f"=== Démarrage de la découverte Product Finder pour le marché: {self.market_code} ==="
+        )
+        stats = {
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "total_processed": 0,
+            "categories_processed": 0,
+            "duplicates_skipped": 0,
+            "tokens_spent": 0,
+            "errors": 0,
+        }
+        self._processed_asins.clear()
+
+        categories = [
+            category
+            for category in get_category_config_service().get_active_categories()
+            if category.marketplace == self.market_code
+            and (category_id is None or category.id == category_id)
+        ]
+        if not categories:
+            logger.warning(f"Aucune catégorie active pour le marché {self.market_code}")
+            return stats
+
+        fanout = CategoryFanout(
+            keepa_client=self.keepa_client, max_workers=max_workers, token_budget=token_budget
+        )
+        for category, products in fanout.iter_products(categories, limit_per_category):
+            self._store_products(products, category.name, category.domain, stats)
+
+        stats["categories_processed"] = sum(
+            1 for result in fanout.category_results if result["status"] == "ok"
+        )
+        stats["errors"] += len(fanout.category_results) - stats["categories_processed"]
+        stats["duplicates_skipped"] = fanout.seen_asins.duplicates
+        stats["tokens_spent"] = fanout.budget.spent
+
+        logger.info(
+            f"=== Découverte Product Finder terminée: {stats['created']} créés, "
+            f"{stats['updated']} mis à jour, {stats['unchanged']} inchangés, "
+            f"{stats['categories_processed']} catégorie(s), "
+            f"{stats['duplicates_skipped']} doublon(s), {stats['tokens_spent']} tokens, "
+            f"{stats['errors']} erreur(s) ==="
+        )
+        return stats
+
     def _process_market(self, market_config: MarketConfig) -> Dict[str, int]:
         """
         Traite un marché : récupère les produits depuis la liste d'ASINs et les stocke.
@@ -142,8 +340,64 @@ class DiscoverJob:
         Returns:
             Statistiques pour ce marché.
         """
-        stats = {"created": 0, "updated": 0, "total_processed": 0, "errors": 0}
+        stats = {
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "scheduled": 0,
+            "not_due": 0,
+            "total_processed": 0,
+            "errors": 0,
+        }
+
+        discover_run = self._find_resumable_run() if self._resume else None
+        if discover_run is not None:
+            all_asins = list(discover_run.asins)
+            stats.update({key: discover_run.stats.get(key, 0) for key in stats})
+            # Les ASINs avant le curseur ont été commités par le run interrompu
+            self._processed_asins.update(all_asins[:discover_run.cursor])
+            logger.info(
+                f"Reprise du run {discover_run.id} pour {market_config.label}: "
+                f"{discover_run.cursor}/{len(all_asins)} ASINs déjà traités"
+            )
+        else:
+            all_asins = self._select_asins(market_config, stats)
+            if not all_asins:
+                return stats
+            discover_run = self._start_discover_run(all_asins, stats)
+        self.discover_run = discover_run
+
+        logger.info(
+            f"Traitement de {len(all_asins)} ASINs pour le marché {market_config.label} "
+            f"(sources combinées: markets_asins.yml + harvested_asins, "
+            f"lots de {discover_run.batch_size})"
+        )
+
+        batch_size = discover_run.batch_size
+        for start in range(discover_run.cursor, len(all_asins), batch_size):
+            batch = all_asins[start:start + batch_size]
+            if not self._process_batch(market_config, batch, stats):
+                # Lot non commité : le run reste reprenable à partir de ce lot
+                self._fail_discover_run(RuntimeError(f"Échec Keepa sur le lot {start // batch_size}"))
+                return stats
+            self._checkpoint(discover_run, start // batch_size, start + len(batch), stats)
+
+        discover_run.status = "completed"
+        discover_run.finished_at = datetime.utcnow()
+        self.db.commit()
+        return stats
+
+    def _select_asins(self, market_config: MarketConfig, stats: Dict[str, int]) -> list:
+        """
+        ASINs à rafraîchir pour un nouveau run (sources combinées, puis planificateur).
+
+        Args:
+            market_config: Configuration du marché.
+            stats: Statistiques à renseigner (scheduled, not_due).
 
+        Returns:
+            Liste ordonnée des ASINs (vide s'il n'y a rien à faire).
+        """
         # Récupérer les ASINs depuis plusieurs sources (union)
         all_asins = self._get_all_asins_for_market(market_config)
 
@@ -151,18 +405,44 @@ class DiscoverJob:
             logger.warning(
                 f"Aucun ASIN disponible pour le marché {market_config.label}. Le marché sera ignoré."
             )
-            return stats
+            return []
+
+        # Planification : seulement les ASINs échus les plus intéressants, dans le budget
+        if self._token_budget is not None:
+            known_count = len(all_asins)
+            all_asins = self.refresh_scheduler.select_due(
+                self.market_code,
+                all_asins,
+                token_budget=self._token_budget,
+                tokens_per_asin=get_settings().KEEPA_TOKENS_PER_PRODUCT,
+            )
+            stats["scheduled"] = len(all_asins)
+            stats["not_due"] = known_count - len(all_asins)
+            if not all_asins:
+                logger.info(f"Aucun ASIN échu pour le marché {market_config.label}")
+        else:
+            all_asins = sorted(all_asins)
 
-        logger.info(
-            f"Traitement de {len(all_asins)} ASINs pour le marché {market_config.label} "
-            f"(sources combinées: markets_asins.yml + harvested_asins)"
-        )
+        return all_asins
+
+    def _process_batch(
+        self, market_config: MarketConfig, batch: list, stats: Dict[str, int]
+    ) -> bool:
+        """
+        Récupère un lot d'ASINs depuis Keepa, stocke les produits et les replanifie.
+
+        Args:
+            market_config: Configuration du marché.
+            batch: ASINs du lot.
+            stats: Statistiques à incrémenter.
 
+        Returns:
+            False si l'appel Keepa a échoué (lot à reprendre), True sinon.
+        """
         try:
-            # Récupérer les produits depuis Keepa en utilisant la liste d'ASINs combinée
             products = self.keepa_client.get_products_by_asins(
                 domain=market_config.domain,
-                asin_list=all_asins
+                asin_list=batch
             )
         except Exception as e:
             logger.error(
@@ -170,16 +450,112 @@ class DiscoverJob:
                 exc_info=True,
             )
             stats["errors"] += 1
-            return stats
+            return False
 
         if not products:
             logger.warning(
-                f"Aucun produit retourné par Keepa pour le marché {market_config.label}"
+                f"Aucun produit retourné par Keepa pour un lot de {len(batch)} ASINs "
+                f"({market_config.label})"
             )
-            return stats
+            return True
 
         logger.info(f"Récupération de {len(products)} produits enrichis pour {market_config.label}")
 
+        self._store_products(products, market_config.label, market_config.domain, stats)
+
+        if self._token_budget is not None:
+            self._record_refreshes(batch, products)
+        return True
+
+    def _find_resumable_run(self) -> Optional[DiscoverRun]:
+        """Dernier run non terminé (en cours ou en échec) du marché, s'il existe."""
+        return (
+            self.db.query(DiscoverRun)
+            .filter(
+                DiscoverRun.market_code == self.market_code,
+                DiscoverRun.status.in_(["running", "failed"]),
+            )
+            .order_by(DiscoverRun.started_at.desc())
+            .first()
+        )
+
+    def _start_discover_run(self, asins: list, stats: Dict[str, int]) -> DiscoverRun:
+        """
+        Enregistre un nouveau run (liste d'ASINs figée) et abandonne les runs non terminés.
+
+        Args:
+            asins: Liste ordonnée des ASINs du run.
+            stats: Statistiques initiales (planificateur).
+
+        Returns:
+            Run créé et commité.
+        """
+        self.db.query(DiscoverRun).filter(
+            DiscoverRun.market_code == self.market_code,
+            DiscoverRun.status.in_(["running", "failed"]),
+        ).update({"status": "abandoned"}, synchronize_session=False)
+
+        discover_run = DiscoverRun(
+            id=uuid4(),
+            market_code=self.market_code,
+            status="running",
+            asins=list(asins),
+            batch_size=max(get_settings().DISCOVER_CHECKPOINT_BATCH_SIZE, 1),
+            cursor=0,
+            completed_batches=[],
+            stats=dict(stats),
+        )
+        self.db.add(discover_run)
+        self.db.commit()
+        return discover_run
+
+    def _checkpoint(
+        self, discover_run: DiscoverRun, batch_index: int, cursor: int, stats: Dict[str, int]
+    ) -> None:
+        """
+        Enregistre le point de reprise après un lot (curseur, lot terminé, statistiques).
+
+        Args:
+            discover_run: Run en cours.
+            batch_index: Numéro du lot terminé.
+            cursor: Position du prochain ASIN à traiter.
+            stats: Statistiques cumulées.
+        """
+        discover_run.cursor = cursor
+        # Nouvelles listes/dicts : détection des modifications des colonnes JSON
+        discover_run.completed_batches = list(discover_run.completed_batches) + [batch_index]
+        discover_run.stats = dict(stats)
+        discover_run.status = "running"
+        discover_run.error = None
+        self.db.commit()
+
+    def _fail_discover_run(self, error: Exception) -> None:
+        """Marque le run en cours comme en échec (reprenable avec resume=True)."""
+        if self.discover_run is None:
+            return
+        try:
+            self.discover_run.status = "failed"
+            self.discover_run.error = str(error)[:2000]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+
+    def _store_products(
+        self, products: list, category_name: str, domain: int, stats: Dict[str, int]
+    ) -> None:
+        """
+        Upsert une liste de produits Keepa et met à jour les statistiques.
+
+        Les ASINs déjà traités dans cette exécution sont ignorés ; une erreur
+        sur un produit n'interrompt pas le traitement des suivants.
+
+        Args:
+            products: Produits Keepa normalisés.
+            category_name: Catégorie enregistrée sur les produits.
+            domain: Domaine Keepa.
+            stats: Statistiques à incrémenter (created, updated, unchanged, errors...).
+        """
+        self._upserted_ids = []
         for keepa_product in products:
             try:
                 asin = keepa_product.asin
@@ -190,18 +566,14 @@ class DiscoverJob:
                     continue
 
                 # Upsert explicite : vérifier puis insérer ou mettre à jour
-                is_new = self._upsert_product(
+                outcome = self._upsert_product(
                     keepa_product,
-                    market_config.label,
+                    category_name,
                     self.market_code,
-                    domain=market_config.domain,
+                    domain=domain,
                     force=self._force_update,
                 )
-                
-                if is_new:
-                    stats["created"] += 1
-                else:
-                    stats["updated"] += 1
+                stats[outcome] += 1
 
                 # Marquer cet ASIN comme traité
                 self._processed_asins.add(asin)
@@ -251,7 +623,36 @@ class DiscoverJob:
                 # Continue avec le produit suivant
                 continue
 
-        return stats
+        # Produits écrits : le listener enchaîne le sourcing sur ces seuls produits
+        publish(self.db, CHANNEL_PRODUCTS_UPSERTED, self._upserted_ids)
+
+    def _record_refreshes(self, requested_asins: list, products: list) -> None:
+        """
+        Replanifie les ASINs rafraîchis depuis Keepa (prochaine échéance, volatilité).
+
+        Les produits mockés (fallback quand Keepa échoue) ne comptent pas comme
+        rafraîchis : leurs ASINs restent échus pour le prochain run.
+
+        Args:
+            requested_asins: ASINs demandés à Keepa.
+            products: Produits renvoyés.
+        """
+        real_products = [
+            p for p in products
+            if isinstance(p.raw_data, dict) and p.raw_data.get("source") == "keepa_api"
+        ]
+        if not real_products:
+            return
+
+        # ASINs demandés sans réponse Keepa : replanifiés aussi, sans prix
+        prices = {asin: None for asin in requested_asins}
+        prices.update({p.asin: p.avg_price for p in real_products})
+        try:
+            self.refresh_scheduler.record_refreshes(self.market_code, prices)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Erreur lors de la replanification des ASINs: {str(e)}", exc_info=True)
 
     def _get_all_asins_for_market(self, market_config: MarketConfig) -> list[str]:
         """
@@ -303,12 +704,15 @@ class DiscoverJob:
         marketplace_code: str,
         domain: Optional[int] = None,
         force: bool = False,
-    ) -> bool:
+    ) -> str:
         """
         Upsert un produit en utilisant l'ORM SQLAlchemy.
         
         Cette méthode utilise l'ORM pour gérer automatiquement les types et éviter
         les problèmes de conversion. Plus simple et plus robuste que le SQL brut.
+
+        Un produit existant dont l'empreinte (content_hash) est identique et dont
+        le statut ne change pas n'est pas réécrit : pas d'UPDATE, pas de WAL.
         
         Args:
             keepa_product: Produit Keepa à traiter.
@@ -317,7 +721,7 @@ class DiscoverJob:
             force: Si True, force la mise à jour même si le produit a déjà été traité.
         
         Returns:
-            True si le produit a été créé, False s'il a été mis à jour.
+            "created", "updated" ou "unchanged".
         
         Note:
             Si force=False, le status est préservé si le produit a déjà été traité (scored, selected, launched),
@@ -338,6 +742,27 @@ class DiscoverJob:
         if isinstance(raw_data_dict, dict):
             if "domain" not in raw_data_dict and domain is not None:
                 raw_data_dict["domain"] = domain
+
+        # Produit mocké si raw_data contient "source": "mock" (colonne indexée pour le dashboard)
+        is_real_asin = not (isinstance(raw_data_dict, dict) and raw_data_dict.get("source") == "mock")
+
+        history = getattr(keepa_product, "history", None)
+        content_hash = self._content_hash(
+            keepa_product, category_name, marketplace_code, domain, raw_data_dict, history
+        )
+
+        if (
+            existing
+            and not force
+            and existing.content_hash == content_hash
+            and existing.status in PROCESSED_STATUSES + ("new",)
+        ):
+            logger.debug(f"Produit {keepa_product.asin} inchangé, aucune écriture")
+            return "unchanged"
+
+        # Historiques csv Keepa : table compressée à part, commitée avec le produit
+        if history and domain is not None:
+            self.history_store.save(keepa_product.asin, domain, history)
         
         if existing:
             # Mise à jour du produit existant
@@ -349,18 +774,27 @@ class DiscoverJob:
             existing.reviews_count = keepa_product.reviews_count
             existing.rating = float(keepa_product.rating) if keepa_product.rating else None
             existing.raw_keepa_data = raw_data_dict
+            existing.keepa_domain = domain
+            existing.brand = getattr(keepa_product, "brand", None)
+            existing.sales_rank_drops_90 = getattr(keepa_product, "sales_rank_drops_90", None)
+            existing.content_hash = content_hash
+            if existing.is_real_asin != is_real_asin:
+                # Répercuter le flag réel/mock sur la projection winners
+                self.winners_projection.sync_real_asin_flag(existing.id, is_real_asin)
+            existing.is_real_asin = is_real_asin
             existing.source_marketplace = marketplace_code
             # Si force=True, réinitialiser le status à "new" pour re-traiter le produit
             # Sinon, préserver le status si déjà traité
             if force:
                 existing.status = "new"
-            elif existing.status not in ["scored", "selected", "launched"]:
+            elif existing.status not in PROCESSED_STATUSES:
                 existing.status = "new"
             existing.updated_at = datetime.utcnow()
             
             try:
                 self.db.commit()
-                return False  # Mis à jour
+                self._upserted_ids.append(existing.id)
+                return "updated"
             except Exception as e:
                 self.db.rollback()
                 logger.error(f"Erreur lors de la mise à jour du produit {keepa_product.asin}: {str(e)}", exc_info=True)
@@ -379,6 +813,11 @@ class DiscoverJob:
                 reviews_count=keepa_product.reviews_count,
                 rating=float(keepa_product.rating) if keepa_product.rating else None,
                 raw_keepa_data=raw_data_dict,
+                keepa_domain=domain,
+                brand=getattr(keepa_product, "brand", None),
+                sales_rank_drops_90=getattr(keepa_product, "sales_rank_drops_90", None),
+                content_hash=content_hash,
+                is_real_asin=is_real_asin,
                 status="new",
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow(),
@@ -387,14 +826,15 @@ class DiscoverJob:
             try:
                 self.db.add(new_product)
                 self.db.commit()
-                return True  # Créé
+                self._upserted_ids.append(new_product.id)
+                return "created"
             except IntegrityError as e:
                 # Si jamais une UniqueViolation se produit (cas de race condition)
                 if "product_candidates_asin_key" in str(e.orig) or "asin" in str(e.orig).lower():
                     self.db.rollback()
                     logger.warning(f"Produit {keepa_product.asin} créé entre-temps, tentative de mise à jour")
                     # Réessayer avec une mise à jour
-                    return self._upsert_product(keepa_product, category_name, marketplace_code)
+                    return self._upsert_product(keepa_product, category_name, marketplace_code, domain=domain, force=force)
                 else:
                     self.db.rollback()
                     logger.error(f"Erreur d'intégrité lors de la création du produit {keepa_product.asin}: {str(e)}", exc_info=True)
@@ -404,3 +844,44 @@ class DiscoverJob:
                 logger.error(f"Erreur lors de la création du produit {keepa_product.asin}: {str(e)}", exc_info=True)
                 raise
 
+    @staticmethod
+    def _content_hash(
+        keepa_product,
+        category_name: str,
+        marketplace_code: str,
+        domain: Optional[int],
+        raw_data_dict: dict,
+        history: Optional[dict],
+    ) -> str:
+        """
+        Empreinte SHA-256 des champs normalisés écrits par _upsert_product.
+
+        Args:
+            keepa_product: Produit Keepa normalisé.
+            category_name: Nom de la catégorie.
+            marketplace_code: Code du marché.
+            domain: Domaine Keepa.
+            raw_data_dict: Données brutes préparées pour raw_keepa_data.
+            history: Séries csv Keepa du produit.
+
+        Returns:
+            Empreinte hexadécimale (64 caractères).
+        """
+        raw = raw_data_dict if isinstance(raw_data_dict, dict) else {}
+        payload = {
+            "title": keepa_product.title,
+            "category": category_name,
+            "marketplace": marketplace_code,
+            "domain": domain,
+            "avg_price": keepa_product.avg_price,
+            "bsr": keepa_product.bsr,
+            "estimated_sales_per_day": keepa_product.estimated_sales_per_day,
+            "reviews_count": keepa_product.reviews_count,
+            "rating": keepa_product.rating,
+            "brand": getattr(keepa_product, "brand", None),
+            "sales_rank_drops_90": getattr(keepa_product, "sales_rank_drops_90", None),
+            "raw": {k: v for k, v in raw.items() if k not in VOLATILE_RAW_FIELDS},
+            "history": history or {},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -5,10 +5,10 @@ Génère des templates de listings pour tous les produits candidats
 avec status="selected" qui n'ont pas encore de listing.
 """
 import logging
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import exists
 
 from app.models.product_candidate import ProductCandidate
 from app.models.listing_template import ListingTemplate
@@ -16,6 +16,9 @@ from app.services.listing_service import ListingService
 
 logger = logging.getLogger(__name__)
 
+# Nombre de produits traités par lot (préchargement des options + INSERT multi-lignes)
+LISTING_BATCH_SIZE = 500
+
 
 class ListingJob:
     """Job pour générer des listings pour les produits sélectionnés."""
@@ -30,23 +33,31 @@ class ListingJob:
         self.db = db
         self.listing_service = ListingService(db)
 
-    def run(self) -> Dict[str, int]:
+    def run(self, product_ids: Optional[Iterable] = None) -> Dict[str, int]:
         """
         Lance le job de génération de listings.
 
         Traite tous les ProductCandidate avec status="selected"
         qui n'ont pas encore de ListingTemplate.
 
+        Args:
+            product_ids: Restreindre aux produits donnés (produits venant d'être
+                         scorés, voir app.jobs.pipeline_listener). None = tous.
+
         Returns:
             Dictionnaire avec les statistiques :
             - products_processed: nombre de produits traités
             - listings_created: nombre de listings créés
             - products_without_sourcing_or_listing: produits sans option de sourcing ou sans listing généré
+            - generation_failures: produits dont la génération a échoué ou dépassé son timeout
+            - listings_from_cache: listings dont le contenu a été repris du cache
         """
         logger.info("=== Démarrage du job de génération de listings ===")
 
         # Récupérer les produits candidats éligibles
-        candidates = self._get_eligible_candidates()
+        candidates = self._get_eligible_candidates(
+            list(product_ids) if product_ids is not None else None
+        )
 
         if not candidates:
             logger.warning("Aucun produit candidat éligible pour la génération de listings.")
@@ -54,6 +65,8 @@ class ListingJob:
                 "products_processed": 0,
                 "listings_created": 0,
                 "products_without_sourcing_or_listing": 0,
+                "generation_failures": 0,
+                "listings_from_cache": 0,
             }
 
         logger.info(f"Nombre de produits candidats à traiter: {len(candidates)}")
@@ -62,56 +75,80 @@ class ListingJob:
             "products_processed": 0,
             "listings_created": 0,
             "products_without_sourcing_or_listing": 0,
+            "generation_failures": 0,
+            "listings_from_cache": 0,
         }
 
-        for candidate in candidates:
-            try:
-                logger.debug(f"Traitement du produit: {candidate.asin} (ID: {candidate.id})")
-
-                # Générer le listing
-                listing_template = self.listing_service.generate_listing_for_candidate(candidate)
-
-                if not listing_template:
-                    logger.debug(
-                        f"Aucun listing généré pour {candidate.asin} "
-                        "(aucune option de sourcing disponible)"
-                    )
-                    stats["products_without_sourcing_or_listing"] += 1
-                else:
-                    # Persister le listing en base
-                    self.db.add(listing_template)
-                    stats["listings_created"] += 1
-                    logger.debug(
-                        f"Listing créé pour {candidate.asin} "
-                        f"(brandable={listing_template.brandable})"
-                    )
-
-                stats["products_processed"] += 1
-
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors du traitement du produit {candidate.asin}: {str(e)}",
-                    exc_info=True,
-                )
-                stats["products_processed"] += 1
-                continue
-
         try:
+            for i in range(0, len(candidates), LISTING_BATCH_SIZE):
+                self._process_batch(candidates[i:i + LISTING_BATCH_SIZE], stats)
+
             self.db.commit()
             logger.info("=== Job de génération de listings terminé avec succès ===")
             logger.info(
                 f"Statistiques: {stats['products_processed']} produits traités, "
                 f"{stats['listings_created']} listings créés, "
-                f"{stats['products_without_sourcing_or_listing']} produits sans sourcing/listing"
+                f"{stats['products_without_sourcing_or_listing']} produits sans sourcing/listing, "
+                f"{stats['generation_failures']} échec(s) de génération, "
+                f"{stats['listings_from_cache']} repris du cache"
             )
         except Exception as e:
-            logger.error(f"Erreur lors du commit en base de données: {str(e)}", exc_info=True)
+            logger.error(f"Erreur lors de l'écriture en base de données: {str(e)}", exc_info=True)
             self.db.rollback()
             raise
 
         return stats
 
-    def _get_eligible_candidates(self):
+    def _process_batch(self, candidates, stats: Dict[str, int]) -> None:
+        """
+        Génère et insère les listings d'un lot de produits.
+
+        Les meilleures options de sourcing du lot sont préchargées en une requête,
+        la génération est confiée à ListingService (cache de contenu puis backend),
+        puis les listings générés sont insérés en un seul INSERT multi-lignes.
+
+        Args:
+            candidates: Produits candidats du lot.
+            stats: Statistiques du job (mises à jour en place).
+        """
+        best_options = self.listing_service.find_best_sourcing_options(
+            [candidate.id for candidate in candidates]
+        )
+
+        pairs = []
+        for candidate in candidates:
+            logger.debug(f"Traitement du produit: {candidate.asin} (ID: {candidate.id})")
+            stats["products_processed"] += 1
+
+            option = best_options.get(candidate.id)
+            if not option:
+                logger.debug(
+                    f"Aucun listing généré pour {candidate.asin} "
+                    "(aucune option de sourcing disponible)"
+                )
+                stats["products_without_sourcing_or_listing"] += 1
+            else:
+                pairs.append((candidate, option))
+
+        # Générer les listings du lot (backend configuré : inline, pool, serveur local)
+        generated, cache_hits = self.listing_service.generate_listings(pairs)
+        stats["listings_from_cache"] += cache_hits
+
+        listings = []
+        for (candidate, _), listing_template in zip(pairs, generated):
+            if listing_template is None:
+                stats["generation_failures"] += 1
+                continue
+            listings.append(listing_template)
+            logger.debug(
+                f"Listing créé pour {candidate.asin} "
+                f"(brandable={listing_template.brandable})"
+            )
+
+        # Persister les listings du lot en base
+        stats["listings_created"] += self.listing_service.bulk_insert_listings(listings)
+
+    def _get_eligible_candidates(self, product_ids: Optional[list] = None):
         """
         Récupère les produits candidats éligibles pour la génération de listings.
 
@@ -119,30 +156,19 @@ class ListingJob:
         - status="selected"
         - Aucun ListingTemplate existant
 
+        Args:
+            product_ids: Restreindre aux produits donnés (None = tous).
+
         Returns:
             Liste des ProductCandidate éligibles.
         """
-        # Récupérer tous les IDs des produits qui ont déjà un listing
-        products_with_listings = (
-            self.db.query(ListingTemplate.product_candidate_id)
-            .distinct()
-            .all()
+        # Produits "selected" sans listing (NOT EXISTS évalué côté base)
+        has_listing = exists().where(
+            ListingTemplate.product_candidate_id == ProductCandidate.id
         )
-        product_ids_with_listings = {row[0] for row in products_with_listings}
-
-        # Récupérer les produits avec status="selected"
-        all_selected = (
-            self.db.query(ProductCandidate)
-            .filter(ProductCandidate.status == "selected")
-            .all()
+        query = self.db.query(ProductCandidate).filter(
+            ProductCandidate.status == "selected", ~has_listing
         )
-
-        # Filtrer ceux qui n'ont pas encore de listing
-        eligible_candidates = [
-            candidate
-            for candidate in all_selected
-            if candidate.id not in product_ids_with_listings
-        ]
-
-        return eligible_candidates
-
+        if product_ids is not None:
+            query = query.filter(ProductCandidate.id.in_(product_ids))
+        return query.order_by(ProductCandidate.id).all()
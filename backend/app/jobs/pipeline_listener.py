@@ -0,0 +1,235 @@
+"""
+Listener des événements du pipeline (LISTEN/NOTIFY).
+
+Enchaîne les étapes en quasi temps réel, uniquement sur les produits notifiés :
+
+    products_upserted → sourcing des produits sans options
+    options_created   → scoring des couples sans score
+    scores_written    → listings des produits sélectionnés
+
+Les IDs reçus sont regroupés pendant PIPELINE_LISTENER_BATCH_SECONDS avant de
+lancer l'étape. Chaque lot passe par le verrou single-flight des lots
+incrémentaux de l'étape ("scoring:incremental", app.services.job_lock), distinct
+de celui des runs complets : un run complet déclenché pendant un lot attend sa
+fin puis s'exécute, et si un run complet tourne déjà, les IDs sont gardés pour
+le lot suivant. Un ID dont l'étape échoue PIPELINE_LISTENER_MAX_ATTEMPTS fois
+est abandonné (les runs complets du cron le reprennent). Les jobs lancés ici
+publient à leur tour leurs événements, ce qui enchaîne l'étape suivante.
+
+    python -m app.jobs.pipeline_listener
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.jobs.listing_job import ListingJob
+from app.jobs.scoring_job import ScoringJob
+from app.jobs.sourcing_job import SourcingJob
+from app.services.job_lock import SingleFlight, incremental_job_type
+from app.services.pipeline_events import (
+    CHANNEL_OPTIONS_CREATED,
+    CHANNEL_PRODUCTS_UPSERTED,
+    CHANNEL_SCORES_WRITTEN,
+    PipelineEventListener,
+)
+
+logger = logging.getLogger(__name__)
+
+# Étape déclenchée par chaque canal
+STAGE_FOR_CHANNEL = {
+    CHANNEL_PRODUCTS_UPSERTED: "sourcing",
+    CHANNEL_OPTIONS_CREATED: "scoring",
+    CHANNEL_SCORES_WRITTEN: "listing",
+}
+
+# Ordre de lancement des étapes lors d'un vidage
+STAGE_ORDER = ("sourcing", "scoring", "listing")
+
+# Attente avant de se reconnecter après une perte de la connexion d'écoute
+RECONNECT_DELAY_SECONDS = 5.0
+
+
+def _run_stage(db: Session, stage: str, product_ids: List[UUID]) -> Dict[str, int]:
+    """Lance le job d'une étape sur une liste de produits."""
+    if stage == "sourcing":
+        return SourcingJob(db).run(product_ids=product_ids)
+    if stage == "scoring":
+        return ScoringJob(db).run(product_ids=product_ids)
+    return ListingJob(db).run(product_ids=product_ids)
+
+
+class PipelineListener:
+    """Regroupe les IDs notifiés et lance les étapes incrémentales."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        events: Optional[PipelineEventListener] = None,
+        batch_seconds: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        """
+        Initialise le listener.
+
+        Args:
+            session_factory: Fabrique de sessions SQLAlchemy (une session par étape).
+            events: Écoute LISTEN (défaut: tous les canaux du pipeline).
+            batch_seconds: Regroupement des IDs (défaut: PIPELINE_LISTENER_BATCH_SECONDS).
+            max_batch: Lancement immédiat au-delà de ce nombre d'IDs (défaut: PIPELINE_LISTENER_MAX_BATCH).
+            max_attempts: Échecs avant abandon d'un ID (défaut: PIPELINE_LISTENER_MAX_ATTEMPTS).
+        """
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.events = events or PipelineEventListener()
+        self.batch_seconds = (
+            batch_seconds if batch_seconds is not None else settings.PIPELINE_LISTENER_BATCH_SECONDS
+        )
+        self.max_batch = max_batch or settings.PIPELINE_LISTENER_MAX_BATCH
+        self.max_attempts = max_attempts or settings.PIPELINE_LISTENER_MAX_ATTEMPTS
+        # IDs en attente par étape, et date du plus ancien ID en attente
+        self.pending: Dict[str, Set[str]] = {stage: set() for stage in STAGE_ORDER}
+        self._pending_since: Optional[float] = None
+        # Échecs consécutifs par étape et par ID (lot empoisonné)
+        self.failures: Dict[str, Dict[str, int]] = {stage: {} for stage in STAGE_ORDER}
+
+    def add(self, channel: str, ids: List[str]) -> None:
+        """
+        Ajoute des IDs notifiés à l'étape déclenchée par le canal.
+
+        Args:
+            channel: Canal de la notification.
+            ids: IDs des produits.
+        """
+        stage = STAGE_FOR_CHANNEL.get(channel)
+        if stage is None:
+            return
+        valid_ids = set()
+        for product_id in ids:
+            try:
+                valid_ids.add(str(UUID(product_id)))
+            except ValueError:
+                logger.warning(f"ID de produit invalide ignoré sur {channel}: {product_id}")
+        if not valid_ids:
+            return
+        self.pending[stage].update(valid_ids)
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def pending_count(self) -> int:
+        """Nombre total d'IDs en attente."""
+        return sum(len(ids) for ids in self.pending.values())
+
+    def is_due(self, now: Optional[float] = None) -> bool:
+        """True si les IDs en attente doivent être traités (délai écoulé ou lot plein)."""
+        if self._pending_since is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return (
+            now - self._pending_since >= self.batch_seconds
+            or self.pending_count() >= self.max_batch
+        )
+
+    def flush(self) -> Dict[str, Dict[str, int]]:
+        """
+        Lance les étapes ayant des IDs en attente, dans l'ordre du pipeline.
+
+        Une étape dont le verrou est pris (run complet ou autre lot) garde ses
+        IDs pour le lot suivant. Une étape en échec aussi, sauf pour les IDs
+        ayant atteint max_attempts échecs, abandonnés.
+
+        Returns:
+            Statistiques par étape lancée.
+        """
+        results = {}
+        for stage in STAGE_ORDER:
+            ids = self.pending[stage]
+            if not ids:
+                continue
+            self.pending[stage] = set()
+            product_ids = [UUID(product_id) for product_id in sorted(ids)]
+            logger.info(f"Étape {stage} incrémentale sur {len(product_ids)} produit(s)")
+
+            db = self.session_factory()
+            try:
+                flight = SingleFlight(incremental_job_type(stage)).run(
+                    lambda: _run_stage(db, stage, product_ids), attach=False
+                )
+            except Exception as e:
+                logger.error(f"Erreur lors de l'étape {stage} incrémentale: {str(e)}", exc_info=True)
+                self._retry_failed(stage, ids)
+                continue
+            finally:
+                db.close()
+
+            if flight is None:
+                # Run complet ou autre lot en cours : réessayer au prochain lot
+                self.pending[stage].update(ids)
+                continue
+            for product_id in ids:
+                self.failures[stage].pop(product_id, None)
+            results[stage] = flight["stats"]
+
+        self._pending_since = time.monotonic() if self.pending_count() else None
+        return results
+
+    def _retry_failed(self, stage: str, ids: Set[str]) -> None:
+        """Remet en attente les IDs d'un lot en échec, sauf ceux à court de tentatives."""
+        failures = self.failures[stage]
+        dropped = []
+        for product_id in ids:
+            failures[product_id] = failures.get(product_id, 0) + 1
+            if failures[product_id] >= self.max_attempts:
+                del failures[product_id]
+                dropped.append(product_id)
+            else:
+                self.pending[stage].add(product_id)
+        if dropped:
+            logger.error(
+                f"Étape {stage} incrémentale: {len(dropped)} produit(s) abandonné(s) après "
+                f"{self.max_attempts} échecs (repris par le prochain run complet): "
+                f"{', '.join(sorted(dropped)[:20])}"
+            )
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        """
+        Écoute les canaux et lance les étapes jusqu'à l'arrêt demandé.
+
+        Args:
+            stop: Événement d'arrêt (None = jusqu'à interruption du processus).
+        """
+        logger.info("Listener du pipeline démarré")
+        while not (stop and stop.is_set()):
+            try:
+                for channel, ids in self.events.poll(timeout=min(self.batch_seconds, 1.0)):
+                    self.add(channel, ids)
+            except Exception as e:
+                # Connexion perdue : les notifications pendant la coupure sont perdues,
+                # les runs complets (cron) les rattrapent
+                logger.error(f"Connexion d'écoute perdue: {str(e)}", exc_info=True)
+                self.events.close()
+                time.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+            if self.is_due():
+                self.flush()
+        self.events.close()
+        logger.info("Listener du pipeline arrêté")
+
+
+def main() -> None:
+    """Point d'entrée en ligne de commande."""
+    logging.basicConfig(
+        level=get_settings().LOG_LEVEL,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    PipelineListener().run_forever()
+
+
+if __name__ == "__main__":
+    main()
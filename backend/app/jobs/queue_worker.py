@@ -0,0 +1,315 @@
+"""
+Worker de la file de travail distribuée (work_tasks).
+
+Découpe les étapes du pipeline en tâches (enqueue_stage) et les exécute dans
+un ou plusieurs processus workers, sur n'importe quel nœud ayant accès à la
+base :
+
+    python -m app.jobs.queue_worker                  # toutes les tâches
+    python -m app.jobs.queue_worker --types scoring_chunk --once
+
+Les tâches sont idempotentes (upsert discover, produits sans options pour le
+sourcing, couples sans score pour le scoring) : une tâche reprise après
+expiration de son délai de visibilité ne duplique rien.
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.jobs.discover_job import DiscoverJob
+from app.jobs.scoring_job import ScoringJob
+from app.jobs.sourcing_job import SourcingJob
+from app.models.work_task import WorkTask
+from app.services.job_lock import JobStillRunningError, SingleFlight
+from app.services.work_queue import (
+    TASK_DISCOVER_BATCH,
+    TASK_SCORING_CHUNK,
+    TASK_SOURCING_CHUNK,
+    TASK_TYPES,
+    WorkQueue,
+)
+
+logger = logging.getLogger(__name__)
+
+# Étapes du pipeline pouvant être mises en file, et type de tâche associé
+STAGE_TASK_TYPES = {
+    "discover": TASK_DISCOVER_BATCH,
+    "sourcing": TASK_SOURCING_CHUNK,
+    "scoring": TASK_SCORING_CHUNK,
+}
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    """Découpe une liste en morceaux de taille size (au moins 1)."""
+    size = max(size, 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def enqueue_stage(
+    db: Session,
+    stage: str,
+    market_code: Optional[str] = None,
+    force: bool = False,
+    chunk_size: Optional[int] = None,
+) -> List[WorkTask]:
+    """
+    Découpe une étape du pipeline en tâches et les met en file.
+
+    - discover : ASINs sélectionnés par le planificateur et pas encore en file
+      (next_due_at n'avance qu'une fois le lot rafraîchi), par lots de
+      DISCOVER_CHECKPOINT_BATCH_SIZE ; une seule mise en file à la fois par marché
+    - sourcing / scoring : produits éligibles, par lots de WORK_QUEUE_CHUNK_SIZE
+
+    Args:
+        db: Session SQLAlchemy.
+        stage: Étape ("discover", "sourcing", "scoring").
+        market_code: Code du marché (discover uniquement, défaut: amazon_fr).
+        force: Transmis aux jobs (rafraîchir / recalculer tout).
+        chunk_size: Taille des lots (défaut selon l'étape).
+
+    Returns:
+        Tâches créées.
+
+    Raises:
+        ValueError: Si l'étape est inconnue.
+        JobStillRunningError: Si une mise en file discover du marché est déjà en cours.
+    """
+    if stage not in STAGE_TASK_TYPES:
+        raise ValueError(
+            f"Étape '{stage}' non reconnue. Étapes disponibles: {', '.join(STAGE_TASK_TYPES)}"
+        )
+
+    settings = get_settings()
+    queue = WorkQueue(db)
+
+    if stage == "discover":
+        market_code = market_code or "amazon_fr"
+        tasks: List[WorkTask] = []
+
+        def enqueue_discover() -> Dict[str, int]:
+            asins = DiscoverJob(db, market_code=market_code).select_asins(force=force)
+            queued = queue.queued_asins(market_code)
+            due = [asin for asin in asins if asin not in queued]
+            payloads = [
+                {"asins": batch, "force": force}
+                for batch in _chunks(due, chunk_size or settings.DISCOVER_CHECKPOINT_BATCH_SIZE)
+            ]
+            tasks.extend(queue.enqueue(TASK_DISCOVER_BATCH, payloads, market_code=market_code))
+            return {"tasks_enqueued": len(tasks), "asins_already_queued": len(asins) - len(due)}
+
+        flight = SingleFlight("discover_enqueue", market_code).run(enqueue_discover, attach=False)
+        if flight is None:
+            raise JobStillRunningError("discover_enqueue", market_code, None)
+        return tasks
+
+    job = SourcingJob(db) if stage == "sourcing" else ScoringJob(db)
+    product_ids = [str(product_id) for product_id in job.eligible_product_ids(force=force)]
+    payloads = [
+        {"product_ids": batch, "force": force}
+        for batch in _chunks(product_ids, chunk_size or settings.WORK_QUEUE_CHUNK_SIZE)
+    ]
+    return queue.enqueue(STAGE_TASK_TYPES[stage], payloads)
+
+
+def execute_task(db: Session, task: WorkTask) -> Dict[str, int]:
+    """
+    Exécute une tâche avec le job de l'étape correspondante.
+
+    Args:
+        db: Session SQLAlchemy.
+        task: Tâche réclamée.
+
+    Returns:
+        Statistiques du job.
+
+    Raises:
+        ValueError: Si le type de tâche est inconnu.
+    """
+    payload = task.payload or {}
+    force = bool(payload.get("force", False))
+
+    if task.task_type == TASK_DISCOVER_BATCH:
+        job = DiscoverJob(db, market_code=task.market_code)
+        return job.run_batch(payload.get("asins", []), force=force)
+
+    product_ids = [UUID(product_id) for product_id in payload.get("product_ids", [])]
+    if task.task_type == TASK_SOURCING_CHUNK:
+        return SourcingJob(db).run(force=force, product_ids=product_ids)
+    if task.task_type == TASK_SCORING_CHUNK:
+        return ScoringJob(db).run(force=force, product_ids=product_ids)
+
+    raise ValueError(f"Type de tâche inconnu: {task.task_type}")
+
+
+class QueueWorker:
+    """Boucle de réclamation et d'exécution des tâches de la file."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        worker_id: Optional[str] = None,
+        task_types: Optional[Iterable[str]] = None,
+        poll_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        """
+        Initialise le worker.
+
+        Args:
+            session_factory: Fabrique de sessions SQLAlchemy (une session par tâche).
+            worker_id: Identifiant du worker (défaut: hôte:pid).
+            task_types: Types de tâches traités (défaut: tous).
+            poll_interval: Attente quand la file est vide (défaut: WORK_QUEUE_POLL_INTERVAL_SECONDS).
+            heartbeat_interval: Intervalle de prolongation du délai de visibilité
+                d'une tâche en cours (défaut: WORK_QUEUE_HEARTBEAT_INTERVAL_SECONDS).
+        """
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.task_types = list(task_types) if task_types else list(TASK_TYPES)
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else settings.WORK_QUEUE_POLL_INTERVAL_SECONDS
+        )
+        self.heartbeat_interval = (
+            heartbeat_interval if heartbeat_interval is not None
+            else settings.WORK_QUEUE_HEARTBEAT_INTERVAL_SECONDS
+        )
+
+    def _send_heartbeats(self, task_id: UUID, done: threading.Event) -> None:
+        """
+        Prolonge le délai de visibilité de la tâche jusqu'à la fin de son exécution.
+
+        Utilise sa propre session : celle de la tâche est occupée par le job.
+        """
+        while not done.wait(self.heartbeat_interval):
+            db = self.session_factory()
+            try:
+                if not WorkQueue(db).heartbeat(task_id, self.worker_id):
+                    logger.warning(
+                        f"Worker {self.worker_id}: tâche {task_id} reprise par un autre worker, "
+                        "arrêt du heartbeat"
+                    )
+                    return
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id}: heartbeat de la tâche {task_id} en échec: {str(e)}")
+            finally:
+                db.close()
+
+    @contextmanager
+    def _heartbeat(self, task_id: UUID) -> Iterator[None]:
+        """Envoie des heartbeats en arrière-plan pendant l'exécution d'une tâche."""
+        done = threading.Event()
+        thread = threading.Thread(
+            target=self._send_heartbeats,
+            args=(task_id, done),
+            name=f"heartbeat-{task_id}",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def run_once(self) -> bool:
+        """
+        Réclame et exécute une tâche.
+
+        Returns:
+            True si une tâche a été traitée (succès ou échec), False si la file est vide.
+        """
+        db = self.session_factory()
+        try:
+            queue = WorkQueue(db)
+            task = queue.claim(self.worker_id, self.task_types)
+            if task is None:
+                return False
+
+            logger.info(
+                f"Worker {self.worker_id}: tâche {task.id} ({task.task_type}), "
+                f"tentative {task.attempts}/{task.max_attempts}"
+            )
+            task_id = task.id
+            try:
+                with self._heartbeat(task_id):
+                    result = execute_task(db, task)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'exécution de la tâche {task_id}: {str(e)}", exc_info=True)
+                queue.fail(task, self.worker_id, e)
+            else:
+                queue.complete(task, self.worker_id, result)
+            return True
+        finally:
+            db.close()
+
+    def run_forever(
+        self, stop: Optional[threading.Event] = None, max_tasks: Optional[int] = None
+    ) -> int:
+        """
+        Traite les tâches jusqu'à l'arrêt demandé.
+
+        Args:
+            stop: Événement d'arrêt (None = jusqu'à interruption du processus).
+            max_tasks: Nombre maximum de tâches à traiter (None = illimité).
+
+        Returns:
+            Nombre de tâches traitées.
+        """
+        processed = 0
+        logger.info(f"Worker {self.worker_id} démarré (types: {', '.join(self.task_types)})")
+        while not (stop and stop.is_set()):
+            if max_tasks is not None and processed >= max_tasks:
+                break
+            try:
+                worked = self.run_once()
+            except Exception as e:
+                # Base indisponible, etc. : on réessaie après une pause
+                logger.error(f"Worker {self.worker_id}: erreur de la file: {str(e)}", exc_info=True)
+                worked = False
+            if worked:
+                processed += 1
+            elif stop:
+                stop.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+        logger.info(f"Worker {self.worker_id} arrêté après {processed} tâche(s)")
+        return processed
+
+
+def main() -> None:
+    """Point d'entrée en ligne de commande."""
+    parser = argparse.ArgumentParser(description="Worker de la file de travail Winner Machine")
+    parser.add_argument(
+        "--types",
+        nargs="+",
+        choices=TASK_TYPES,
+        help="Types de tâches à traiter (défaut: tous)",
+    )
+    parser.add_argument("--once", action="store_true", help="Traiter au plus une tâche puis quitter")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=get_settings().LOG_LEVEL,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    worker = QueueWorker(task_types=args.types)
+    if args.once:
+        worker.run_once()
+    else:
+        worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,20 @@ Calcule les scores de rentabilité pour toutes les combinaisons
 ProductCandidate + SourcingOption qui n'ont pas encore de score.
 """
 import logging
-from typing import Dict, List
+import time
+from typing import Dict, Iterable, List, Optional
 from collections import defaultdict
 
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, not_
 
+from app.core.metrics import SCORING_PAIR_DURATION, SCORING_PAIRS
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
 from app.models.product_score import ProductScore
+from app.services.pipeline_events import CHANNEL_SCORES_WRITTEN, publish
 from app.services.scoring_service import get_scoring_service
+from app.services.winners_projection import WinnersProjectionService
 
 logger = logging.getLogger(__name__)
 
@@ -31,14 +35,17 @@ class ScoringJob:
         """
         self.db = db
         self.scoring_service = get_scoring_service()
+        self.winners_projection = WinnersProjectionService(db)
 
-    def run(self, force: bool = False) -> Dict[str, int]:
+    def run(self, force: bool = False, product_ids: Optional[Iterable] = None) -> Dict[str, int]:
         """
         Lance le job de scoring.
 
         Args:
             force: Si True, recalcule les scores pour TOUS les couples (remplace les anciens).
                    Si False, ne traite que les couples sans score (comportement par défaut).
+            product_ids: Restreindre aux couples des produits donnés (lot d'une tâche de
+                         la file de travail). None = tous les couples éligibles.
 
         Returns:
             Dictionnaire avec les statistiques :
@@ -46,16 +53,20 @@ class ScoringJob:
             - products_marked_selected: nombre de produits marqués "selected"
             - products_marked_scored: nombre de produits marqués "scored"
             - products_marked_rejected: nombre de produits marqués "rejected"
+            - winners_refreshed: nombre de lignes de la projection winners réécrites
+            - page_cache_hits / page_cache_revalidated / page_cache_misses: pages
+              produit scrapées servies par le cache, revalidées (304) ou téléchargées
         """
         logger.info(f"=== Démarrage du job de scoring (force={force}) ===")
 
         # Récupérer les couples éligibles
+        product_ids = list(product_ids) if product_ids is not None else None
         if force:
-            pairs_to_score = self._get_all_pairs()
+            pairs_to_score = self._get_all_pairs(product_ids)
             # Supprimer les scores existants pour ces couples
             self._delete_existing_scores_for_pairs(pairs_to_score)
         else:
-            pairs_to_score = self._get_eligible_pairs()
+            pairs_to_score = self._get_eligible_pairs(product_ids)
 
         if not pairs_to_score:
             logger.warning("Aucun couple (produit, option) éligible pour le scoring. Le job ne fera rien.")
@@ -64,22 +75,52 @@ class ScoringJob:
                 "products_marked_selected": 0,
                 "products_marked_scored": 0,
                 "products_marked_rejected": 0,
+                "winners_refreshed": 0,
+                "page_cache_hits": 0,
+                "page_cache_revalidated": 0,
+                "page_cache_misses": 0,
             }
 
         logger.info(f"Nombre de couples à scorer: {len(pairs_to_score)}")
 
+        # Produits dont la projection winners devra être rafraîchie (IDs lus avant les commits)
+        affected_product_ids = {candidate.id for candidate, _ in pairs_to_score}
+
         stats = {
             "pairs_scored": 0,
             "products_marked_selected": 0,
             "products_marked_scored": 0,
             "products_marked_rejected": 0,
+            "winners_refreshed": 0,
+            "page_cache_hits": 0,
+            "page_cache_revalidated": 0,
+            "page_cache_misses": 0,
         }
 
         # Dictionnaire pour stocker les décisions par produit
         product_decisions: Dict[str, List[str]] = defaultdict(list)
 
-        # Calculer les scores pour chaque couple
+        # Compteurs du cache de pages avant le run (cumulés sur le processus)
+        scraper_client = self.scoring_service.scraper_client
+        page_cache_before = scraper_client.page_cache_stats()
+
+        # Précharger les prix de vente (SP-API puis scraping parallèle des manquants)
+        # (propres à ce run : le service de scoring est partagé par le processus)
+        try:
+            prefetched_prices = self.scoring_service.prefetch_selling_prices(
+                candidate.asin for candidate, _ in pairs_to_score
+            )
+        except Exception as e:
+            logger.warning(
+                f"Préchargement des prix impossible, récupération unitaire: {str(e)}",
+                exc_info=True,
+            )
+            prefetched_prices = {}
+
+        # Calculer les scores pour chaque couple (durée par couple mesurée pour /metrics)
+        pair_duration = SCORING_PAIR_DURATION.labels()
         for candidate, option in pairs_to_score:
+            started = time.perf_counter()
             try:
                 logger.debug(
                     f"Calcul du score pour {candidate.asin} + {option.supplier_name} "
@@ -87,7 +128,9 @@ class ScoringJob:
                 )
 
                 # Calculer le score
-                product_score = self.scoring_service.score_product_option(candidate, option)
+                product_score = self.scoring_service.score_product_option(
+                    candidate, option, prefetched_prices
+                )
 
                 # Ajouter à la session
                 self.db.add(product_score)
@@ -95,6 +138,8 @@ class ScoringJob:
 
                 # Stocker la décision pour ce produit
                 product_decisions[str(candidate.id)].append(product_score.decision)
+                pair_duration.observe(time.perf_counter() - started)
+                SCORING_PAIRS.labels(product_score.decision).inc()
 
                 logger.debug(
                     f"Score calculé: decision={product_score.decision}, "
@@ -107,9 +152,15 @@ class ScoringJob:
                     f"Erreur lors du scoring de {candidate.asin} + {option.supplier_name}: {str(e)}",
                     exc_info=True,
                 )
+                SCORING_PAIRS.labels("error").inc()
                 # Continue avec le couple suivant
                 continue
 
+        page_cache_after = scraper_client.page_cache_stats()
+        for name in ("hits", "revalidated", "misses"):
+            delta = page_cache_after.get(name, 0) - page_cache_before.get(name, 0)
+            stats[f"page_cache_{name}"] = delta
+
         # Commit les scores
         try:
             self.db.commit()
@@ -164,6 +215,18 @@ class ScoringJob:
             self.db.rollback()
             raise
 
+        # Rafraîchir la projection winners pour les produits dont les scores ont changé
+        try:
+            stats["winners_refreshed"] = self.winners_projection.refresh_for_products(affected_product_ids)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Erreur lors du rafraîchissement des winners: {str(e)}", exc_info=True)
+            self.db.rollback()
+            raise
+
+        # Produits scorés : le listener enchaîne la génération de listings
+        publish(self.db, CHANNEL_SCORES_WRITTEN, products_to_update.keys())
+
         logger.info("=== Job de scoring terminé avec succès ===")
         logger.info(
             f"Statistiques: {stats['pairs_scored']} couples scorés, "
@@ -171,13 +234,35 @@ class ScoringJob:
             f"{stats['products_marked_scored']} produits scorés, "
             f"{stats['products_marked_rejected']} produits rejetés"
         )
+        logger.info(
+            f"Cache de pages: {stats['page_cache_hits']} hits, "
+            f"{stats['page_cache_revalidated']} revalidées, "
+            f"{stats['page_cache_misses']} téléchargées"
+        )
 
         return stats
 
-    def _get_eligible_pairs(self) -> List[tuple]:
+    def eligible_product_ids(self, force: bool = False) -> list:
+        """
+        IDs des produits ayant des couples à scorer (découpage en tâches de la file de travail).
+
+        Args:
+            force: Si True, tous les produits ayant des options ; sinon ceux ayant
+                   au moins un couple sans score.
+
+        Returns:
+            Liste des IDs de ProductCandidate (ordre stable).
+        """
+        pairs = self._get_all_pairs() if force else self._get_eligible_pairs()
+        return list(dict.fromkeys(candidate.id for candidate, _ in pairs))
+
+    def _get_eligible_pairs(self, product_ids: Optional[list] = None) -> List[tuple]:
         """
         Récupère les couples (ProductCandidate, SourcingOption) qui n'ont pas encore de score.
 
+        Args:
+            product_ids: Restreindre aux produits donnés (None = tous).
+
         Returns:
             Liste de tuples (ProductCandidate, SourcingOption).
         """
@@ -193,7 +278,7 @@ class ScoringJob:
         scored_pairs_set = {(row[0], row[1]) for row in scored_pairs}
 
         # Récupérer tous les couples (candidate, option)
-        all_options = self.db.query(SourcingOption).all()
+        all_options = self._get_options(product_ids)
 
         # Construire la liste des couples éligibles
         eligible_pairs = []
@@ -224,14 +309,17 @@ class ScoringJob:
         else:
             return "rejected"
 
-    def _get_all_pairs(self) -> List[tuple]:
+    def _get_all_pairs(self, product_ids: Optional[list] = None) -> List[tuple]:
         """
         Récupère TOUS les couples (ProductCandidate, SourcingOption).
 
+        Args:
+            product_ids: Restreindre aux produits donnés (None = tous).
+
         Returns:
             Liste de tuples (ProductCandidate, SourcingOption).
         """
-        all_options = self.db.query(SourcingOption).all()
+        all_options = self._get_options(product_ids)
         
         pairs = []
         for option in all_options:
@@ -244,6 +332,21 @@ class ScoringJob:
         
         return pairs
 
+    def _get_options(self, product_ids: Optional[list] = None) -> List[SourcingOption]:
+        """
+        Récupère les options de sourcing, éventuellement limitées à certains produits.
+
+        Args:
+            product_ids: Restreindre aux produits donnés (None = toutes les options).
+
+        Returns:
+            Liste des SourcingOption.
+        """
+        query = self.db.query(SourcingOption)
+        if product_ids is not None:
+            query = query.filter(SourcingOption.product_candidate_id.in_(product_ids))
+        return query.all()
+
     def _delete_existing_scores_for_pairs(self, pairs: List[tuple]):
         """
         Supprime les scores existants pour les couples donnés.
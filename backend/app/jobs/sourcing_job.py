@@ -4,13 +4,14 @@ Job de sourcing - Module B.
 Trouve et crée des options de sourcing pour les produits candidats.
 """
 import logging
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
+from app.services.pipeline_events import CHANNEL_OPTIONS_CREATED, publish
 from app.services.sourcing_matcher import SourcingMatcher
 
 logger = logging.getLogger(__name__)
@@ -29,13 +30,15 @@ class SourcingJob:
         self.db = db
         self.sourcing_matcher = SourcingMatcher()
 
-    def run(self, force: bool = False) -> Dict[str, int]:
+    def run(self, force: bool = False, product_ids: Optional[Iterable] = None) -> Dict[str, int]:
         """
         Lance le job de sourcing.
 
         Args:
             force: Si True, traite TOUS les produits (supprime et régénère les options).
                    Si False, ne traite que les produits sans options (comportement par défaut).
+            product_ids: Restreindre aux produits donnés (lot d'une tâche de la file
+                         de travail). None = tous les produits éligibles.
 
         Returns:
             Dictionnaire avec les statistiques :
@@ -46,12 +49,13 @@ class SourcingJob:
         logger.info(f"=== Démarrage du job de sourcing (force={force}) ===")
 
         # Récupérer les produits candidats éligibles
+        product_ids = list(product_ids) if product_ids is not None else None
         if force:
-            candidates = self._get_all_candidates()
+            candidates = self._get_all_candidates(product_ids)
             # Supprimer les options existantes pour les produits éligibles
             self._delete_existing_options_for_candidates(candidates)
         else:
-            candidates = self._get_eligible_candidates()
+            candidates = self._get_eligible_candidates(product_ids)
 
         if not candidates:
             logger.warning("Aucun produit candidat éligible pour le sourcing. Le job ne fera rien.")
@@ -68,6 +72,8 @@ class SourcingJob:
             "options_created": 0,
             "products_without_options": 0,
         }
+        # Produits ayant reçu des options, publiés sur options_created après le commit
+        sourced_ids = []
 
         for candidate in candidates:
             try:
@@ -84,6 +90,7 @@ class SourcingJob:
                     for option in options:
                         self.db.add(option)
                         stats["options_created"] += 1
+                    sourced_ids.append(candidate.id)
 
                     logger.debug(
                         f"Création de {len(options)} option(s) pour {candidate.asin}"
@@ -112,14 +119,31 @@ class SourcingJob:
             self.db.rollback()
             raise
 
+        publish(self.db, CHANNEL_OPTIONS_CREATED, sourced_ids)
         return stats
 
-    def _get_eligible_candidates(self):
+    def eligible_product_ids(self, force: bool = False) -> list:
+        """
+        IDs des produits à sourcer (découpage en tâches de la file de travail).
+
+        Args:
+            force: Si True, tous les produits ; sinon ceux sans options.
+
+        Returns:
+            Liste des IDs de ProductCandidate.
+        """
+        candidates = self._get_all_candidates() if force else self._get_eligible_candidates()
+        return [candidate.id for candidate in candidates]
+
+    def _get_eligible_candidates(self, product_ids: Optional[list] = None):
         """
         Récupère les produits candidats éligibles pour le sourcing.
 
         Stratégie V1 : produits qui n'ont encore AUCUNE option de sourcing.
 
+        Args:
+            product_ids: Restreindre aux produits donnés (None = tous).
+
         Returns:
             Liste des ProductCandidate éligibles.
         """
@@ -132,7 +156,7 @@ class SourcingJob:
         product_ids_with_options = {row[0] for row in products_with_options}
 
         # Récupérer tous les produits candidats
-        all_candidates = self.db.query(ProductCandidate).all()
+        all_candidates = self._get_all_candidates(product_ids)
 
         # Filtrer ceux qui n'ont pas d'options
         eligible_candidates = [
@@ -143,14 +167,20 @@ class SourcingJob:
 
         return eligible_candidates
 
-    def _get_all_candidates(self):
+    def _get_all_candidates(self, product_ids: Optional[list] = None):
         """
         Récupère TOUS les produits candidats.
 
+        Args:
+            product_ids: Restreindre aux produits donnés (None = tous).
+
         Returns:
             Liste de tous les ProductCandidate.
         """
-        return self.db.query(ProductCandidate).all()
+        query = self.db.query(ProductCandidate)
+        if product_ids is not None:
+            query = query.filter(ProductCandidate.id.in_(product_ids))
+        return query.all()
 
     def _delete_existing_options_for_candidates(self, candidates):
         """
@@ -6,10 +6,11 @@ Point d'entrée de l'API backend.
 import logging
 import sys
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.metrics import CONTENT_TYPE_LATEST, REGISTRY, MetricsMiddleware
 from app.api.routes_discover import router as discover_router
 from app.api.routes_sourcing import router as sourcing_router
 from app.api.routes_scoring import router as scoring_router
@@ -18,6 +19,8 @@ from app.api.routes_export import router as export_router
 from app.api.routes_ui import router as ui_router
 from app.api.routes_dashboard import router as dashboard_router
 from app.api.routes_asin_harvest import router as asin_harvest_router
+from app.api.routes_queue import router as queue_router
+from app.api.routes_jobs import router as jobs_router
 
 # Récupérer la configuration
 settings = get_settings()
@@ -52,8 +55,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Curseur de pagination de /products/scores/top, lisible par le front
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Durée des requêtes par route (métriques Prometheus)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Inclure les routers
 app.include_router(discover_router)
 app.include_router(sourcing_router)
@@ -63,6 +72,8 @@ app.include_router(export_router)
 app.include_router(ui_router)
 app.include_router(dashboard_router)
 app.include_router(asin_harvest_router)
+app.include_router(queue_router)
+app.include_router(jobs_router)
 
 
 @app.get("/health")
@@ -75,6 +86,19 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Métriques Prometheus du processus (format texte).
+
+    Latence des requêtes par route, jobs en cours, durées des étapes, appels
+    aux services externes, pool de connexions et caches.
+    """
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """Endpoint racine."""
@@ -83,5 +107,6 @@ async def root():
         "environment": settings.APP_ENV,
         "docs": "/docs" if settings.is_debug else "disabled",
         "health": "/health",
+        "metrics": "/metrics",
     }
 
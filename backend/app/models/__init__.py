@@ -19,5 +19,13 @@ from app.models.product_score import ProductScore  # noqa: E402
 from app.models.listing_template import ListingTemplate  # noqa: E402
 from app.models.bundle import Bundle  # noqa: E402
 from app.models.harvested_asin import HarvestedAsin  # noqa: E402
+from app.models.winner import Winner  # noqa: E402
+from app.models.listing_content_cache import ListingContentCache  # noqa: E402
+from app.models.keepa_history import KeepaHistorySeries  # noqa: E402
+from app.models.asin_refresh_schedule import AsinRefreshSchedule  # noqa: E402
+from app.models.discover_run import DiscoverRun  # noqa: E402
+from app.models.work_task import WorkTask  # noqa: E402
+from app.models.job_run import JobRun  # noqa: E402
+from app.models.job_run_stage import JobRunStage  # noqa: E402
 
-__all__ = ["Base", "ProductCandidate", "SourcingOption", "ProductScore", "ListingTemplate", "Bundle", "HarvestedAsin"]
+__all__ = ["Base", "ProductCandidate", "SourcingOption", "ProductScore", "ListingTemplate", "Bundle", "HarvestedAsin", "Winner", "ListingContentCache", "KeepaHistorySeries", "AsinRefreshSchedule", "DiscoverRun", "WorkTask", "JobRun", "JobRunStage"]
@@ -0,0 +1,75 @@
+"""
+Modèle AsinRefreshSchedule - Planification des rafraîchissements Keepa par ASIN.
+
+Une ligne par (ASIN, marché) avec la prochaine échéance de rafraîchissement,
+calculée d'après le statut, la décision de scoring, la volatilité du prix et
+le profit/jour (voir app.services.refresh_scheduler).
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import String, Numeric, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class AsinRefreshSchedule(Base):
+    """Échéance de rafraîchissement Keepa d'un ASIN sur un marché."""
+
+    __tablename__ = "asin_refresh_schedule"
+
+    asin: Mapped[str] = mapped_column(
+        String(10),
+        primary_key=True,
+        comment="Amazon Standard Identification Number",
+    )
+
+    marketplace: Mapped[str] = mapped_column(
+        String(50),
+        primary_key=True,
+        comment="Code du marché (amazon_fr, amazon_de, etc.)",
+    )
+
+    next_due_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        comment="Date à partir de laquelle l'ASIN doit être rafraîchi",
+    )
+
+    last_refreshed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+        comment="Dernier rafraîchissement Keepa",
+    )
+
+    refresh_interval_hours: Mapped[Decimal] = mapped_column(
+        Numeric(8, 2),
+        nullable=False,
+        comment="Intervalle appliqué au dernier rafraîchissement (heures)",
+    )
+
+    last_price: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Prix observé au dernier rafraîchissement (EUR)",
+    )
+
+    price_volatility: Mapped[Decimal] = mapped_column(
+        Numeric(6, 4),
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Moyenne mobile exponentielle de la variation relative du prix",
+    )
+
+    __table_args__ = (
+        Index("idx_asin_refresh_schedule_due", "marketplace", "next_due_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<AsinRefreshSchedule(asin={self.asin}, marketplace={self.marketplace}, "
+            f"next_due_at={self.next_due_at})>"
+        )
@@ -0,0 +1,112 @@
+"""
+Modèle DiscoverRun - Points de reprise des runs de découverte.
+
+Un run fige la liste ordonnée des ASINs à rafraîchir, puis avance par lots :
+après chaque lot commité, le curseur, la liste des lots terminés et les
+statistiques cumulées sont enregistrés. Un run interrompu (crash, déploiement)
+reprend au lot suivant le dernier lot commité (voir DiscoverJob.run(resume=True)).
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import String, Integer, DateTime, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class DiscoverRun(Base):
+    """Run de découverte avec son point de reprise."""
+
+    __tablename__ = "discover_runs"
+
+    id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+    )
+
+    market_code: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Code du marché (amazon_fr, amazon_de, etc.)",
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="running",
+        comment="Statut: running, completed, failed, abandoned",
+    )
+
+    asins: Mapped[list] = mapped_column(
+        JSON,
+        nullable=False,
+        comment="Liste ordonnée des ASINs du run (figée au démarrage)",
+    )
+
+    batch_size: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Nombre d'ASINs par lot",
+    )
+
+    cursor: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Position du prochain ASIN à traiter dans asins",
+    )
+
+    completed_batches: Mapped[list] = mapped_column(
+        JSON,
+        nullable=False,
+        default=list,
+        comment="Numéros des lots commités",
+    )
+
+    stats: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False,
+        default=dict,
+        comment="Statistiques cumulées au dernier point de reprise",
+    )
+
+    error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True,
+        comment="Dernière erreur (run en échec)",
+    )
+
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+    )
+
+    __table_args__ = (
+        Index("idx_discover_runs_market_status", "market_code", "status", "started_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<DiscoverRun(id={self.id}, market={self.market_code}, status={self.status}, "
+            f"cursor={self.cursor}/{len(self.asins or [])})>"
+        )
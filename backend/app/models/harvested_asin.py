@@ -58,6 +58,14 @@ class HarvestedAsin(Base):
         server_default="CURRENT_TIMESTAMP",
     )
 
+    last_seen_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+        comment="Dernière récolte ayant remonté cet ASIN",
+    )
+
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         nullable=False,
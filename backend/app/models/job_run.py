@@ -0,0 +1,95 @@
+"""
+Modèle JobRun - Exécutions des jobs du pipeline.
+
+Une ligne par exécution d'un job (discover, sourcing, scoring, listing,
+pipeline_abcde) pour un marché. L'exécution est protégée par un verrou
+consultatif Postgres (voir app.services.job_lock) : un second déclenchement
+pendant qu'elle tourne se rattache à cette ligne au lieu d'en lancer une autre.
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import String, DateTime, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class JobRun(Base):
+    """Exécution d'un job."""
+
+    __tablename__ = "job_runs"
+
+    id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+    )
+
+    job_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Type de job: discover, sourcing, scoring, listing, pipeline_abcde",
+    )
+
+    market_code: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Code du marché ('all' pour les jobs sans marché)",
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="running",
+        comment="Statut: running, completed, failed, abandoned",
+    )
+
+    owner: Mapped[Optional[str]] = mapped_column(
+        String(100),
+        nullable=True,
+        comment="Processus qui exécute le job (hôte:pid)",
+    )
+
+    params: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="Paramètres du déclenchement (ex. force) ; un déclenchement différent ne s'y rattache pas",
+    )
+
+    stats: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="Statistiques retournées par le job",
+    )
+
+    error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True,
+        comment="Erreur (job en échec)",
+    )
+
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+    )
+
+    __table_args__ = (
+        Index("idx_job_runs_type_market_status", "job_type", "market_code", "status"),
+        Index("idx_job_runs_started_at", "started_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<JobRun(id={self.id}, job_type={self.job_type}, market={self.market_code}, "
+            f"status={self.status})>"
+        )
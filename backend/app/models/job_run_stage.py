@@ -0,0 +1,112 @@
+"""
+Modèle JobRunStage - Mesures par étape d'une exécution de job.
+
+Une ligne par étape d'une exécution (job_runs) : durée, temps passé en base,
+lignes lues/écrites, appels HTTP par service externe, tokens Keepa dépensés
+et hits/misses des caches. Alimenté par app.services.run_ledger à la fin de
+chaque exécution ; sert à suivre les régressions et la capacité dans le temps.
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import String, DateTime, Integer, Float, JSON, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class JobRunStage(Base):
+    """Mesures d'une étape d'une exécution de job."""
+
+    __tablename__ = "job_run_stages"
+
+    id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+    )
+
+    job_run_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("job_runs.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    stage: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Étape: type du job, ou job enchaîné (pipeline_abcde)",
+    )
+
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    wall_ms: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        default=0.0,
+        comment="Durée de l'étape (ms)",
+    )
+
+    db_ms: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        default=0.0,
+        comment="Temps cumulé des requêtes SQL (ms)",
+    )
+
+    db_queries: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Nombre de requêtes SQL",
+    )
+
+    rows_read: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Lignes retournées par les SELECT",
+    )
+
+    rows_written: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Lignes insérées, modifiées ou supprimées",
+    )
+
+    http_calls: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="Appels HTTP par service: {keepa: {calls, errors, ms}, ...}",
+    )
+
+    keepa_tokens: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Tokens Keepa consommés",
+    )
+
+    cache: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="Hits/misses par cache: {page_cache: {hits, misses}, ...}",
+    )
+
+    __table_args__ = (
+        Index("idx_job_run_stages_job_run_id", "job_run_id"),
+        Index("idx_job_run_stages_stage_started_at", "stage", "started_at"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<JobRunStage(job_run_id={self.job_run_id}, stage={self.stage}, "
+            f"wall_ms={self.wall_ms:.0f})>"
+        )
@@ -0,0 +1,81 @@
+"""
+Modèle KeepaHistorySeries - Historiques Keepa (prix, BSR) compressés.
+
+Une ligne par (ASIN, domaine, série Keepa). Les paires (temps, valeur) des
+tableaux csv de Keepa sont stockées delta-encodées et compressées (voir
+app.services.keepa_history), hors de product_candidates.raw_keepa_data.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, SmallInteger, DateTime, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class KeepaHistorySeries(Base):
+    """Historique compressé d'une série Keepa (prix Amazon, prix neuf, BSR...) pour un ASIN."""
+
+    __tablename__ = "keepa_history_series"
+
+    asin: Mapped[str] = mapped_column(
+        String(10),
+        primary_key=True,
+        comment="Amazon Standard Identification Number",
+    )
+
+    domain: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True,
+        comment="Domaine Keepa (1=FR dans cette application)",
+    )
+
+    series: Mapped[int] = mapped_column(
+        SmallInteger,
+        primary_key=True,
+        comment="Index de la série dans le tableau csv Keepa (0=Amazon, 1=neuf, 3=BSR)",
+    )
+
+    points_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Nombre de points (temps, valeur) de la série",
+    )
+
+    first_time: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Premier point (minutes Keepa)",
+    )
+
+    last_time: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Dernier point (minutes Keepa)",
+    )
+
+    last_value: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Dernière valeur (centimes ou rang, -1 = indisponible)",
+    )
+
+    data: Mapped[bytes] = mapped_column(
+        LargeBinary,
+        nullable=False,
+        comment="Points delta-encodés (varint zigzag) compressés zlib",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<KeepaHistorySeries(asin={self.asin}, domain={self.domain}, "
+            f"series={self.series}, points={self.points_count})>"
+        )
@@ -0,0 +1,61 @@
+"""
+Modèle ListingContentCache - Cache du contenu généré des listings.
+
+Une ligne par empreinte (hash des entrées du générateur + version du
+générateur) avec le contenu produit. ListingService réutilise ce contenu
+pour les produits inchangés au lieu de relancer la génération.
+"""
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class ListingContentCache(Base):
+    """Contenu de listing généré, indexé par l'empreinte de ses entrées."""
+
+    __tablename__ = "listing_content_cache"
+
+    # Primary key = sha256 des entrées du générateur et de sa version
+    content_hash: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+        comment="sha256 des entrées de génération et de la version du générateur",
+    )
+
+    generator_version: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+        index=True,
+        comment="Version du générateur ayant produit le contenu",
+    )
+
+    # Champs de ListingTemplate générés (voir LISTING_CONTENT_FIELDS)
+    content: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False,
+        comment="Contenu généré (titre, bullets, description, FAQ, search terms, ...)",
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+        comment="Dernière réutilisation du contenu (purge des entrées obsolètes)",
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ListingContentCache(hash={self.content_hash[:12]}, "
+            f"version={self.generator_version})>"
+        )
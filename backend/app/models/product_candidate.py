@@ -6,7 +6,7 @@ from decimal import Decimal
 from typing import Optional
 from uuid import uuid4
 
-from sqlalchemy import JSON, String, Numeric, Integer, DateTime, Column
+from sqlalchemy import JSON, String, Numeric, Integer, DateTime, Boolean, Column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -89,11 +89,47 @@ class ProductCandidate(Base):
         comment="Note moyenne (0-5)",
     )
 
+    # Champs Keepa typés (extraits de raw_keepa_data, voir KEEPA_LEAN_RAW_DATA)
+    keepa_domain: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Domaine Keepa du produit (clé de keepa_history_series)",
+    )
+
+    brand: Mapped[Optional[str]] = mapped_column(
+        String(255),
+        nullable=True,
+        comment="Marque du produit (Keepa)",
+    )
+
+    sales_rank_drops_90: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Nombre de baisses du BSR sur 90 jours (≈ ventes)",
+    )
+
+    # Empreinte des champs normalisés (évite de réécrire un produit inchangé)
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        comment="SHA-256 des champs Keepa normalisés au dernier upsert",
+    )
+
     # Données brutes
     raw_keepa_data: Mapped[Optional[dict]] = mapped_column(
         JSON,
         nullable=True,
-        comment="Données brutes de l'API Keepa (JSON)",
+        comment="Données Keepa (JSON, allégées : sans historiques csv)",
+    )
+
+    # Produit réel ou mocké (dérivé de raw_keepa_data["source"] à l'upsert)
+    is_real_asin: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=True,
+        server_default="true",
+        index=True,
+        comment="False si le produit provient des données mockées (source == 'mock')",
     )
 
     # Statut du produit
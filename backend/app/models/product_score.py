@@ -9,10 +9,11 @@ from decimal import Decimal
 from typing import Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import String, Numeric, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import String, Numeric, DateTime, ForeignKey, CheckConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.orm import Mapped, mapped_column
 
+from app.core.pagination import keyset_index_expression
 from app.models import Base
 
 
@@ -149,11 +150,33 @@ class ProductScore(Base):
     )
 
     # Contrainte pour les valeurs valides de decision
+    # + index pour le "meilleur score par produit" (DISTINCT ON côté dashboard)
     __table_args__ = (
         CheckConstraint(
             "decision IN ('A_launch', 'B_review', 'C_drop')",
             name="check_valid_decision",
         ),
+        Index(
+            "idx_product_scores_best_per_product",
+            "product_candidate_id",
+            text("global_score DESC NULLS LAST"),
+            text("margin_percent DESC NULLS LAST"),
+        ),
+        # Index keyset pour /products/scores/top (voir app.core.pagination)
+        Index(
+            "idx_product_scores_decision_score",
+            "decision",
+            text(keyset_index_expression("global_score")),
+            text(keyset_index_expression("margin_percent")),
+            "id",
+        ),
+        Index(
+            "idx_product_scores_decision_margin",
+            "decision",
+            text(keyset_index_expression("margin_percent")),
+            text(keyset_index_expression("global_score")),
+            "id",
+        ),
     )
 
     def __repr__(self) -> str:
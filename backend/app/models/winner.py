@@ -0,0 +1,200 @@
+"""
+Modèle Winner - Projection matérialisée "meilleur score par produit".
+
+Une ligne par ProductCandidate avec son meilleur ProductScore, le fournisseur
+associé, le profit/jour et le flag réel/mock. Rafraîchie de manière incrémentale
+par ScoringJob (voir WinnersProjectionService) et lue par le dashboard.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import String, Numeric, Boolean, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.pagination import keyset_index_expression
+from app.models import Base
+
+
+class Winner(Base):
+    """
+    Projection du meilleur score par produit pour le dashboard.
+
+    Les index correspondent aux filtres et au tri du dashboard
+    (decision, global_score, margin_percent, estimated_sales_per_day).
+    """
+
+    __tablename__ = "winners"
+
+    # Primary key = produit candidat (une ligne par produit)
+    product_candidate_id: Mapped[UUID] = mapped_column(
+        PostgresUUID(as_uuid=True),
+        ForeignKey("product_candidates.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Référence au produit candidat",
+    )
+
+    product_score_id: Mapped[UUID] = mapped_column(
+        PostgresUUID(as_uuid=True),
+        ForeignKey("product_scores.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Meilleur score du produit",
+    )
+
+    sourcing_option_id: Mapped[UUID] = mapped_column(
+        PostgresUUID(as_uuid=True),
+        ForeignKey("sourcing_options.id", ondelete="CASCADE"),
+        nullable=False,
+        comment="Option de sourcing du meilleur score",
+    )
+
+    # Fournisseur
+    supplier_name: Mapped[Optional[str]] = mapped_column(
+        String(255),
+        nullable=True,
+        comment="Nom du fournisseur",
+    )
+
+    purchase_price: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Prix d'achat (unit_cost de l'option)",
+    )
+
+    # Copie des champs du meilleur score
+    selling_price_target: Mapped[Decimal] = mapped_column(
+        Numeric(10, 2),
+        nullable=False,
+        comment="Prix de vente cible (EUR)",
+    )
+
+    amazon_fees_estimate: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Estimation des frais Amazon (EUR)",
+    )
+
+    margin_absolute: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Marge absolue (EUR)",
+    )
+
+    margin_percent: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(5, 2),
+        nullable=True,
+        index=True,
+        comment="Marge en pourcentage",
+    )
+
+    gross_profit: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Marge brute (EUR)",
+    )
+
+    gross_margin_percent: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(5, 2),
+        nullable=True,
+        comment="Marge brute en pourcentage",
+    )
+
+    net_profit_estimated: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Profit net estimé après IS/CFE (EUR)",
+    )
+
+    estimated_sales_per_day: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        index=True,
+        comment="Estimation des ventes par jour",
+    )
+
+    approx_profit_per_day: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(12, 2),
+        nullable=True,
+        comment="Profit/jour approximatif = net_profit_estimated * estimated_sales_per_day",
+    )
+
+    global_score: Mapped[Optional[Decimal]] = mapped_column(
+        Numeric(10, 2),
+        nullable=True,
+        comment="Score global",
+    )
+
+    decision: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        comment="Décision: A_launch, B_review, C_drop",
+    )
+
+    # Flag réel/mock (copie de product_candidates.is_real_asin)
+    is_real_asin: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=True,
+        server_default="true",
+        comment="False si le produit provient des données mockées",
+    )
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+        comment="Date du dernier rafraîchissement de la ligne",
+    )
+
+    # Index keyset alignés sur les tris du dashboard (voir app.core.pagination),
+    # avec et sans filtre sur la décision
+    __table_args__ = (
+        Index(
+            "idx_winners_score",
+            text(keyset_index_expression("global_score")),
+            text(keyset_index_expression("margin_percent")),
+            "product_candidate_id",
+        ),
+        Index(
+            "idx_winners_decision_score",
+            "decision",
+            text(keyset_index_expression("global_score")),
+            text(keyset_index_expression("margin_percent")),
+            "product_candidate_id",
+        ),
+        Index(
+            "idx_winners_margin",
+            text(keyset_index_expression("margin_percent")),
+            text(keyset_index_expression("global_score")),
+            "product_candidate_id",
+        ),
+        Index(
+            "idx_winners_decision_margin",
+            "decision",
+            text(keyset_index_expression("margin_percent")),
+            text(keyset_index_expression("global_score")),
+            "product_candidate_id",
+        ),
+        Index(
+            "idx_winners_profit_per_day",
+            text(keyset_index_expression("approx_profit_per_day")),
+            text(keyset_index_expression("global_score")),
+            "product_candidate_id",
+        ),
+        Index(
+            "idx_winners_decision_profit_per_day",
+            "decision",
+            text(keyset_index_expression("approx_profit_per_day")),
+            text(keyset_index_expression("global_score")),
+            "product_candidate_id",
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Winner(product={self.product_candidate_id}, "
+            f"score={self.global_score}, decision={self.decision})>"
+        )
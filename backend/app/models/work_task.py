@@ -0,0 +1,132 @@
+"""
+Modèle WorkTask - File de travail distribuée des étapes du pipeline.
+
+Chaque tâche porte un morceau d'étape (lot d'ASINs à découvrir, lot de
+produits à sourcer ou à scorer). Les workers, sur n'importe quel nœud, les
+réclament avec SELECT ... FOR UPDATE SKIP LOCKED (voir app.services.work_queue).
+Une tâche réclamée reste invisible jusqu'à locked_until : un worker tombé
+libère ainsi sa tâche, qui est reprise après expiration du délai.
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import String, Integer, DateTime, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class WorkTask(Base):
+    """Tâche de la file de travail."""
+
+    __tablename__ = "work_tasks"
+
+    id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+    )
+
+    task_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False,
+        comment="Type de tâche: discover_batch, sourcing_chunk, scoring_chunk",
+    )
+
+    market_code: Mapped[Optional[str]] = mapped_column(
+        String(50),
+        nullable=True,
+        comment="Code du marché (tâches discover)",
+    )
+
+    payload: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False,
+        comment="Paramètres de la tâche (ASINs, IDs de produits, force...)",
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="pending",
+        comment="Statut: pending, running, done, failed",
+    )
+
+    attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Nombre de tentatives (réclamations)",
+    )
+
+    max_attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Nombre maximum de tentatives avant échec définitif",
+    )
+
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+        comment="Date à partir de laquelle la tâche peut être réclamée",
+    )
+
+    locked_by: Mapped[Optional[str]] = mapped_column(
+        String(100),
+        nullable=True,
+        comment="Identifiant du worker qui traite la tâche",
+    )
+
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+        comment="Fin du délai de visibilité (tâche reprise par un autre worker ensuite)",
+    )
+
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True,
+        comment="Dernière erreur rencontrée",
+    )
+
+    result: Mapped[Optional[dict]] = mapped_column(
+        JSON,
+        nullable=True,
+        comment="Statistiques retournées par le job",
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default="CURRENT_TIMESTAMP",
+    )
+
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+    )
+
+    __table_args__ = (
+        Index("idx_work_tasks_claim", "status", "available_at"),
+        Index("idx_work_tasks_type_status", "task_type", "status"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<WorkTask(id={self.id}, type={self.task_type}, status={self.status}, "
+            f"attempts={self.attempts}/{self.max_attempts})>"
+        )
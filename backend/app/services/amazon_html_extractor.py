@@ -0,0 +1,194 @@
+"""
+Extraction des ASINs et des prix depuis le HTML des pages Amazon.
+
+Les motifs sont compilés une seule fois au chargement du module :
+- ASINs : une seule passe sur la page (recherche du jeton B0XXXXXXXX), le
+  contexte de chaque jeton (bornes de mot, préfixe /dp/, asin=...) étant
+  vérifié localement ;
+- prix : sélecteurs essayés par priorité, chacun ignoré sans parcours de la
+  page si son marqueur littéral en est absent, et arrêt au premier prix valide.
+
+Une alternance unique de tous les motifs a été écartée : elle empêche le
+moteur re de sauter directement au préfixe littéral de chaque motif et s'est
+révélée plus lente. Voir scripts/benchmark_html_extraction.py.
+"""
+import logging
+import re
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bornes du filtre de cohérence des prix scrapés (EUR)
+MIN_SCRAPED_PRICE = 1
+MAX_SCRAPED_PRICE = 2000
+
+# Jeton ASIN (casse ignorée) ; les bornes sont vérifiées autour de chaque occurrence
+ASIN_TOKEN_PATTERN = re.compile(r"[Bb]0[A-Za-z0-9]{8}")
+
+# Préfixes acceptant un ASIN collé à la suite du texte (/dp/B0..., asin: "B0...")
+ASIN_PREFIX_PATTERN = re.compile(
+    r"""(?:/dp/|data-asin=["']|(?:asin|productId|product-id)["']?\s*[:=]\s*["']?)\Z""",
+    re.IGNORECASE,
+)
+
+# Longueur maximale d'un préfixe d'ASIN (fenêtre examinée avant le jeton)
+ASIN_PREFIX_WINDOW = 32
+
+# Sélecteurs de prix, par ordre de priorité décroissante :
+# (nom, marqueur littéral en minuscules ou None, motif avec un groupe)
+PRICE_SELECTORS: List[Tuple[str, Optional[str], str]] = [
+    # #priceblock_ourprice (format: <span id="priceblock_ourprice">29,99 €</span>)
+    (
+        "priceblock_ourprice",
+        "priceblock_ourprice",
+        r"""<span[^>]*id=["']priceblock_ourprice["'][^>]*>([^<]+)""",
+    ),
+    # #priceblock_dealprice (format: <span id="priceblock_dealprice">29,99 €</span>)
+    (
+        "priceblock_dealprice",
+        "priceblock_dealprice",
+        r"""<span[^>]*id=["']priceblock_dealprice["'][^>]*>([^<]+)""",
+    ),
+    # .a-offscreen (format: <span class="a-offscreen">29,99 €</span>)
+    (
+        "a-offscreen",
+        "a-offscreen",
+        r"""<span[^>]*class=["'][^"']*a-offscreen[^"']*["'][^>]*>([^<]+)""",
+    ),
+    # Prix dans data-a-color="price" (format: <span data-a-color="price">29,99</span>)
+    (
+        "data-a-color=price",
+        "data-a-color",
+        r"""data-a-color=["']price["'][^>]*>([^<]+)""",
+    ),
+    # Prix dans span class "a-price-whole" (format: <span class="a-price-whole">29</span>)
+    (
+        "a-price-whole",
+        "a-price-whole",
+        r"""<span[^>]*class=["'][^"']*a-price-whole[^"']*["'][^>]*>([^<]+)""",
+    ),
+    # Prix dans span class avec "a-price" (format: <span class="a-price">29,99</span>)
+    (
+        "a-price",
+        "a-price",
+        r"""<span[^>]*class=["'][^"']*a-price[^"']*["'][^>]*>([^<]+)""",
+    ),
+    # Prix dans format JSON-LD (structured data)
+    (
+        "json-ld",
+        '"price"',
+        r""""price":\s*["']?([\d,]+\.?\d*)[^"']*["']?""",
+    ),
+    # Prix générique dans format "XX,XX EUR" ou "XX.XX EUR"
+    (
+        "generic-price",
+        None,
+        r"(\d+[,\.]\d{2})\s*(?:€|EUR|euros?)",
+    ),
+]
+
+# Motifs compilés une fois, dans l'ordre de PRICE_SELECTORS
+PRICE_PATTERNS = [
+    (name, marker, re.compile(pattern, re.IGNORECASE)) for name, marker, pattern in PRICE_SELECTORS
+]
+
+_NON_PRICE_CHARS = re.compile(r"[^\d,.]")
+_NON_DIGITS = re.compile(r"[^\d]")
+_DECIMAL_PRICE = re.compile(r"^\d+[.,]\d+$")
+
+
+def _is_word_char(char: str) -> bool:
+    """Caractère de mot au sens de \\b (lettre, chiffre ou _)."""
+    return char.isalnum() or char == "_"
+
+
+def extract_asins(html: str) -> List[str]:
+    """
+    Extrait les ASINs d'une page Amazon en une seule passe.
+
+    Un jeton B0XXXXXXXX est retenu s'il n'est pas précédé d'un caractère de
+    mot et s'il est isolé (non suivi d'un caractère de mot) ou précédé d'un
+    préfixe connu (/dp/, data-asin=, asin/productId: ...).
+
+    Args:
+        html: Contenu HTML de la page.
+
+    Returns:
+        Liste triée d'ASINs uniques (format B0XXXXXXXX, 10 caractères).
+    """
+    asins = set()
+    length = len(html)
+    for match in ASIN_TOKEN_PATTERN.finditer(html):
+        start, end = match.span()
+        if start and _is_word_char(html[start - 1]):
+            continue
+        if end < length and _is_word_char(html[end]):
+            window = html[max(0, start - ASIN_PREFIX_WINDOW):start]
+            if not ASIN_PREFIX_PATTERN.search(window):
+                continue
+        asins.add(match.group().upper())
+    return sorted(asins)
+
+
+def parse_price_text(text: str) -> Optional[float]:
+    """
+    Convertit le texte d'un prix ("29,99 €", "29.99", "29") en nombre.
+
+    Args:
+        text: Texte capturé par un sélecteur de prix.
+
+    Returns:
+        Valeur numérique, ou None si le texte n'est pas un prix.
+    """
+    price_str = text.strip()
+    # Nettoyer le prix : extraire les chiffres, points et virgules, virgule -> point
+    price_clean = _NON_PRICE_CHARS.sub("", price_str).replace(",", ".")
+
+    # Vérifier qu'on a au moins un chiffre et un point/virgule
+    if not _DECIMAL_PRICE.match(price_clean):
+        # Essayer de trouver un format avec seulement des chiffres (prix entier)
+        price_clean_digits = _NON_DIGITS.sub("", price_str)
+        if price_clean_digits and len(price_clean_digits) >= 2:
+            price_clean = price_clean_digits
+
+    try:
+        return float(price_clean)
+    except ValueError:
+        return None
+
+
+def extract_price(html: str, asin: str = "") -> Optional[Tuple[Decimal, str]]:
+    """
+    Extrait le prix d'une page produit Amazon.
+
+    Les sélecteurs sont essayés par priorité ; un sélecteur dont le marqueur
+    littéral est absent de la page est ignoré sans parcours, et la recherche
+    s'arrête au premier prix valide (les occurrences suivantes ne sont pas lues).
+
+    Args:
+        html: Contenu HTML de la page produit.
+        asin: ASIN du produit (logs).
+
+    Returns:
+        Tuple (prix en Decimal, nom du sélecteur), ou None si aucun prix valide.
+    """
+    lowered = html.lower()
+
+    for name, marker, pattern in PRICE_PATTERNS:
+        if marker is not None and marker not in lowered:
+            continue
+
+        for match in pattern.finditer(html):
+            value = parse_price_text(match.group(1))
+            if value is None:
+                continue
+            # Sanity Filter : rejeter les prix aberrants (< 1 EUR ou > 2000 EUR)
+            if value > MAX_SCRAPED_PRICE or value < MIN_SCRAPED_PRICE:
+                logger.warning(
+                    f"SCRAPER PRICE REJECTED for {asin}: {value} EUR (hors limite 1-2000)"
+                )
+                continue
+            return Decimal(str(value)), name
+
+    return None
@@ -6,10 +6,41 @@ from typing import List, Optional, Dict, Any
 import httpx
 
 from app.core.config import get_settings
+from app.services.run_ledger import UPSTREAM_APIFY, InstrumentedClient
 
 logger = logging.getLogger(__name__)
 
 
+def extract_asins(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Extrait les ASINs (normalisés, dédupliqués) d'items de dataset Apify.
+
+    Args:
+        items: Items bruts retournés par un actor Apify.
+
+    Returns:
+        Liste d'ASINs uniques de 10 caractères, dans l'ordre des items.
+    """
+    asins = []
+    for item in items:
+        # Chercher l'ASIN dans différents champs possibles
+        asin = (
+            item.get("asin")
+            or item.get("ASIN")
+            or item.get("productAsin")
+            or item.get("asinCode")
+        )
+
+        if asin:
+            # Normaliser l'ASIN (enlever les espaces, mettre en majuscule)
+            asin = str(asin).strip().upper()
+            # Vérifier que l'ASIN a 10 caractères (format Amazon standard)
+            if len(asin) == 10:
+                asins.append(asin)
+
+    return list(dict.fromkeys(asins))
+
+
 class ApifyClient:
     """Client pour interagir avec l'API Apify."""
 
@@ -55,7 +86,7 @@ class ApifyClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
+            with InstrumentedClient(UPSTREAM_APIFY, timeout=self.timeout) as client:
                 response = client.request(
                     method=method,
                     url=url,
@@ -233,27 +264,8 @@ class ApifyClient:
                 title_example = first_item.get("title") or first_item.get("name") or "N/A"
                 logger.info(f"Premier item - ASIN: {asin_example}, Titre: {title_example}")
 
-            # Extraire les ASINs depuis les items
-            asins = []
-            for item in items:
-                # Chercher l'ASIN dans différents champs possibles
-                asin = (
-                    item.get("asin") 
-                    or item.get("ASIN") 
-                    or item.get("productAsin")
-                    or item.get("asinCode")
-                    or item.get("asinCode")
-                )
-                
-                if asin:
-                    # Normaliser l'ASIN (enlever les espaces, mettre en majuscule)
-                    asin = str(asin).strip().upper()
-                    # Vérifier que l'ASIN a 10 caractères (format Amazon standard)
-                    if len(asin) == 10:
-                        asins.append(asin)
-
-            # Dédupliquer et limiter
-            unique_asins = list(dict.fromkeys(asins))[:limit]
+            # Extraire les ASINs depuis les items, dédupliquer et limiter
+            unique_asins = extract_asins(items)[:limit]
 
             logger.info(
                 f"Récupération réussie: {len(unique_asins)} ASINs uniques récupérés sur {len(items)} items"
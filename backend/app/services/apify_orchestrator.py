@@ -0,0 +1,349 @@
+"""
+Orchestration asynchrone des runs Apify.
+
+Lance plusieurs runs d'actors en parallèle (catégories × listes Best Sellers /
+Movers & Shakers), suit leur état par long-polling et lit leurs datasets page
+par page. Les pages d'items sont remises au consommateur (AsinHarvestJob) au
+fil de l'eau, sans attendre la fin de tous les runs.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Actor Best Sellers (accepte les pages de classement : best sellers, movers & shakers)
+LIST_ACTOR_ID = "happitap/amazon-best-sellers-scraper"
+
+# Chemins Amazon des listes de classement, par source de récolte
+LIST_PATHS = {
+    "apify_bestsellers": "gp/bestsellers",
+    "apify_movers": "gp/movers-and-shakers",
+}
+
+# Domaine Apify -> hôte Amazon
+AMAZON_HOSTS = {
+    "FR": "www.amazon.fr",
+    "DE": "www.amazon.de",
+    "ES": "www.amazon.es",
+    "IT": "www.amazon.it",
+    "UK": "www.amazon.co.uk",
+    "US": "www.amazon.com",
+}
+
+# États terminaux d'un run Apify
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
+
+# Durée de long-polling par requête (maximum accepté par l'API Apify : 60 s)
+POLL_WAIT_SECONDS = 60
+
+# Marqueur de fin d'un worker dans la file des pages
+_RUN_DONE = object()
+
+
+def build_list_run_specs(
+    domain: str,
+    categories: Sequence[str],
+    sources: Sequence[str],
+    max_products: int,
+) -> List[Dict[str, Any]]:
+    """
+    Construit les runs à lancer : une liste de classement par (source, catégorie).
+
+    Args:
+        domain: Domaine Amazon (FR, DE, ...).
+        categories: Slugs de catégories Amazon ("" = classement général).
+        sources: Sources de récolte (apify_bestsellers, apify_movers).
+        max_products: Nombre maximum de produits par run.
+
+    Returns:
+        Liste de specs {"label", "source", "actor_id", "input"}.
+    """
+    host = AMAZON_HOSTS.get(domain, AMAZON_HOSTS["FR"])
+    specs = []
+    for source in sources:
+        path = LIST_PATHS.get(source)
+        if not path:
+            logger.warning(f"Source de liste inconnue ignorée: {source}")
+            continue
+        for category in categories or [""]:
+            url = f"https://{host}/{path}/{category}".rstrip("/")
+            specs.append(
+                {
+                    "label": f"{source}:{category or 'all'}",
+                    "source": source,
+                    "actor_id": LIST_ACTOR_ID,
+                    "input": {"startUrls": [{"url": url}], "maxProducts": max_products},
+                }
+            )
+    return specs
+
+
+class AsyncApifyOrchestrator:
+    """Lance, suit et lit plusieurs runs Apify en parallèle."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrent_runs: Optional[int] = None,
+        run_timeout_seconds: Optional[float] = None,
+        page_size: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Initialise l'orchestrateur.
+
+        Args:
+            api_key: Clé API Apify. Si None, lit depuis les settings.
+            max_concurrent_runs: Nombre maximum de runs simultanés.
+            run_timeout_seconds: Durée maximale d'un run (au-delà, il est arrêté via l'API).
+            page_size: Nombre d'items lus par page de dataset.
+            transport: Transport HTTP (par défaut, réseau ; injectable pour les tests).
+        """
+        settings = get_settings()
+        self.api_key = api_key or settings.APIFY_API_KEY
+        self.base_url = "https://api.apify.com/v2"
+        self.max_concurrent_runs = max_concurrent_runs or settings.APIFY_MAX_CONCURRENT_RUNS
+        self.run_timeout_seconds = run_timeout_seconds or settings.APIFY_RUN_TIMEOUT_SECONDS
+        self.page_size = page_size or settings.APIFY_DATASET_PAGE_SIZE
+        self.transport = transport
+        # Résultat de chaque run du dernier stream_items() : label, run_id, status, items
+        self.run_results: List[Dict[str, Any]] = []
+
+        if not self.api_key:
+            logger.warning(
+                "APIFY_API_KEY non définie, l'orchestrateur Apify ne pourra pas fonctionner"
+            )
+
+    async def _request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Effectue une requête vers l'API Apify (lève une exception en cas d'erreur HTTP).
+
+        Args:
+            client: Client HTTP asynchrone partagé.
+            method: Méthode HTTP.
+            path: Chemin relatif à base_url.
+            params: Paramètres de requête.
+            json_data: Corps JSON.
+
+        Returns:
+            Réponse JSON décodée.
+        """
+        response = await client.request(
+            method, f"{self.base_url}{path}", params=params, json=json_data
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def start_run(
+        self, client: httpx.AsyncClient, actor_id: str, input_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Lance un run d'actor sans attendre sa fin.
+
+        Args:
+            client: Client HTTP asynchrone partagé.
+            actor_id: ID de l'actor (ex: "happitap/amazon-best-sellers-scraper").
+            input_data: Input de l'actor.
+
+        Returns:
+            Objet run Apify (id, status, defaultDatasetId, ...).
+        """
+        result = await self._request(
+            client, "POST", f"/acts/{actor_id.replace('/', '~')}/runs", json_data=input_data
+        )
+        return result.get("data", {})
+
+    async def wait_for_run(self, client: httpx.AsyncClient, run: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Attend la fin d'un run par long-polling (waitForFinish côté API).
+
+        Un run encore en cours après run_timeout_seconds est arrêté
+        (POST /actor-runs/{id}/abort) pour ne pas continuer à être facturé.
+
+        Args:
+            client: Client HTTP asynchrone partagé.
+            run: Objet run retourné par start_run().
+
+        Returns:
+            Objet run final (status terminal), ou état retourné par l'arrêt après timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.run_timeout_seconds
+        while run.get("status") not in TERMINAL_STATUSES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(
+                    f"Run Apify {run.get('id')} toujours {run.get('status')} après timeout, arrêt"
+                )
+                return await self.abort_run(client, run)
+            result = await self._request(
+                client,
+                "GET",
+                f"/actor-runs/{run['id']}",
+                params={"waitForFinish": int(min(POLL_WAIT_SECONDS, max(1, remaining)))},
+            )
+            run = result.get("data", run)
+        return run
+
+    async def abort_run(self, client: httpx.AsyncClient, run: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Arrête un run en cours (une erreur d'arrêt est journalisée, sans exception).
+
+        Args:
+            client: Client HTTP asynchrone partagé.
+            run: Objet run à arrêter.
+
+        Returns:
+            Objet run retourné par l'API (status ABORTING/ABORTED), ou run inchangé
+            si l'arrêt a échoué.
+        """
+        try:
+            result = await self._request(client, "POST", f"/actor-runs/{run['id']}/abort")
+        except Exception as e:
+            logger.error(f"Impossible d'arrêter le run Apify {run.get('id')}: {str(e)}")
+            return run
+        return result.get("data", run)
+
+    async def iter_dataset_pages(
+        self, client: httpx.AsyncClient, dataset_id: str
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Lit un dataset page par page (offset/limit).
+
+        Args:
+            client: Client HTTP asynchrone partagé.
+            dataset_id: ID du dataset du run.
+
+        Yields:
+            Pages d'items (au plus page_size items chacune).
+        """
+        offset = 0
+        while True:
+            items = await self._request(
+                client,
+                "GET",
+                f"/datasets/{dataset_id}/items",
+                params={
+                    "offset": offset,
+                    "limit": self.page_size,
+                    "clean": "true",
+                    "format": "json",
+                },
+            )
+            if isinstance(items, dict):
+                items = items.get("items", [])
+            if not items:
+                return
+            yield items
+            if len(items) < self.page_size:
+                return
+            offset += len(items)
+
+    async def stream_items(
+        self, specs: List[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Lance les runs en parallèle et remet leurs pages d'items au fil de l'eau.
+
+        Au plus max_concurrent_runs runs tournent simultanément. Un run en échec
+        est journalisé dans run_results sans interrompre les autres. Si le
+        consommateur s'arrête (erreur, sortie anticipée), les runs encore en
+        cours sont arrêtés côté Apify.
+
+        Args:
+            specs: Runs à lancer (voir build_list_run_specs()).
+
+        Yields:
+            Tuples (spec du run, page d'items).
+        """
+        self.run_results = []
+        if not self.api_key:
+            logger.warning("APIFY_API_KEY non définie, impossible de lancer les runs")
+            return
+        if not specs:
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_runs)
+        # File bornée : les runs rapides attendent le consommateur (mémoire bornée)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrent_runs * 2)
+        # Consommateur arrêté : plus personne ne lit la file
+        stopped = asyncio.Event()
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+
+        async with httpx.AsyncClient(
+            headers=headers, timeout=POLL_WAIT_SECONDS + 30, transport=self.transport
+        ) as client:
+
+            async def worker(spec: Dict[str, Any]) -> None:
+                result = {
+                    "label": spec["label"],
+                    "run_id": None,
+                    "status": "NOT_STARTED",
+                    "items": 0,
+                }
+                self.run_results.append(result)
+                try:
+                    async with semaphore:
+                        run = await self.start_run(client, spec["actor_id"], spec["input"])
+                        result["run_id"] = run.get("id")
+                        result["status"] = "RUNNING"
+                        logger.info(f"Run Apify lancé: {spec['label']} (run {run.get('id')})")
+
+                        run = await self.wait_for_run(client, run)
+                        result["status"] = run.get("status", "UNKNOWN")
+                        if result["status"] != "SUCCEEDED":
+                            logger.error(
+                                f"Run Apify {spec['label']} terminé en {result['status']}"
+                            )
+                            return
+
+                    # Lecture du dataset hors sémaphore : un autre run peut démarrer
+                    async for page in self.iter_dataset_pages(client, run["defaultDatasetId"]):
+                        result["items"] += len(page)
+                        await queue.put((spec, page))
+                except asyncio.CancelledError:
+                    if result["status"] == "RUNNING":
+                        # Récolte annulée : ne plus payer un run qui ne sera pas lu
+                        run = await self.abort_run(client, {"id": result["run_id"]})
+                        result["status"] = run.get("status", "ABORTED")
+                        logger.warning(f"Run Apify {spec['label']} arrêté (récolte annulée)")
+                    raise
+                except Exception as e:
+                    result["status"] = "ERROR"
+                    logger.error(
+                        f"Erreur sur le run Apify {spec['label']}: {str(e)}", exc_info=True
+                    )
+                finally:
+                    # File bornée : ne pas attendre une place que personne ne libérera
+                    if not stopped.is_set():
+                        await queue.put(_RUN_DONE)
+
+            tasks = [asyncio.create_task(worker(spec)) for spec in specs]
+            try:
+                finished = 0
+                while finished < len(tasks):
+                    entry = await queue.get()
+                    if entry is _RUN_DONE:
+                        finished += 1
+                        continue
+                    yield entry
+            finally:
+                stopped.set()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        succeeded = sum(1 for r in self.run_results if r["status"] == "SUCCEEDED")
+        logger.info(f"Runs Apify terminés: {succeeded}/{len(specs)} réussis")
@@ -16,9 +16,12 @@ class CategoryConfig(BaseModel):
     id: int
     name: str
     marketplace: str
+    domain: int = 1  # Domaine Keepa (1 = Amazon FR)
     bsr_max: int
     price_min: float
     price_max: float
+    min_reviews: Optional[int] = None  # Nombre d'avis minimum (Product Finder)
+    min_rating: Optional[float] = None  # Note minimum sur 5 (Product Finder)
     active: bool = True
 
 
@@ -0,0 +1,137 @@
+"""
+Découverte parallèle des catégories Keepa (Product Finder).
+
+Les catégories actives sont parcourues simultanément par un pool de threads,
+sous un budget de tokens Keepa commun. Les ASINs déjà réclamés par une autre
+catégorie ne sont pas enrichis une seconde fois (les best-sellers se
+recoupent beaucoup entre catégories). Les pages de produits sont remises au
+consommateur (DiscoverJob, seul à toucher la session DB) au fil de l'eau : un
+balayage complet dure le temps de la catégorie la plus lente.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.category_config import CategoryConfig
+from app.services.keepa_client import KeepaClient, KeepaProduct, KeepaTokenBudget, SharedAsinSet
+from app.services.run_ledger import bind_context
+
+logger = logging.getLogger(__name__)
+
+# Marqueur de fin d'une catégorie dans la file des pages
+_CATEGORY_DONE = object()
+
+# Attente maximale d'un worker sur la file pleine avant de revérifier l'arrêt
+PUT_TIMEOUT_SECONDS = 1.0
+
+
+class CategoryFanout:
+    """Exécute la découverte Product Finder de plusieurs catégories en parallèle."""
+
+    def __init__(
+        self,
+        keepa_client: Optional[KeepaClient] = None,
+        max_workers: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ):
+        """
+        Initialise l'exécuteur.
+
+        Args:
+            keepa_client: Client Keepa (partagé entre les threads, sans état mutable).
+            max_workers: Catégories traitées simultanément (défaut: KEEPA_CATEGORY_CONCURRENCY).
+            token_budget: Budget de tokens du balayage (défaut: KEEPA_DISCOVERY_TOKEN_BUDGET).
+        """
+        settings = get_settings()
+        self.keepa_client = keepa_client or KeepaClient()
+        self.max_workers = max(max_workers or settings.KEEPA_CATEGORY_CONCURRENCY, 1)
+        self.budget = KeepaTokenBudget(
+            token_budget if token_budget is not None else settings.KEEPA_DISCOVERY_TOKEN_BUDGET
+        )
+        self.seen_asins = SharedAsinSet()
+        # Résultat par catégorie : {"category", "pages", "products", "status"}
+        self.category_results: List[Dict[str, Any]] = []
+
+    def iter_products(
+        self, categories: List[CategoryConfig], limit_per_category: int
+    ) -> Iterator[Tuple[CategoryConfig, List[KeepaProduct]]]:
+        """
+        Lance les catégories en parallèle et remet leurs pages de produits au fil de l'eau.
+
+        Une catégorie en erreur est journalisée dans category_results sans
+        interrompre les autres.
+
+        Args:
+            categories: Catégories à découvrir.
+            limit_per_category: Nombre maximum d'ASINs par catégorie.
+
+        Yields:
+            Tuples (catégorie, page de produits dédupliqués entre catégories).
+        """
+        self.category_results = []
+        if not categories:
+            return
+
+        # File bornée : les catégories rapides attendent le consommateur (mémoire bornée)
+        pages: queue.Queue = queue.Queue(maxsize=self.max_workers * 2)
+        stop = threading.Event()
+
+        def put(entry) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=PUT_TIMEOUT_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(category: CategoryConfig) -> None:
+            result = {"category": category.name, "pages": 0, "products": 0, "status": "ok"}
+            self.category_results.append(result)
+            try:
+                for products in self.keepa_client.iter_category_products(
+                    category,
+                    limit=limit_per_category,
+                    token_budget=self.budget,
+                    seen_asins=self.seen_asins,
+                ):
+                    result["pages"] += 1
+                    result["products"] += len(products)
+                    if not put((category, products)):
+                        return
+            except Exception as e:
+                result["status"] = "error"
+                logger.error(
+                    f"Erreur lors de la découverte de la catégorie {category.name}: {str(e)}",
+                    exc_info=True,
+                )
+            finally:
+                put(_CATEGORY_DONE)
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(categories)),
+            thread_name_prefix="keepa-category",
+        )
+        try:
+            for category in categories:
+                executor.submit(bind_context(worker), category)
+
+            finished = 0
+            while finished < len(categories):
+                entry = pages.get()
+                if entry is _CATEGORY_DONE:
+                    finished += 1
+                    continue
+                yield entry
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        logger.info(
+            f"Balayage des catégories terminé: {len(categories)} catégorie(s), "
+            f"{self.budget.spent}/{self.budget.total} tokens, "
+            f"{self.seen_asins.duplicates} doublon(s) évités"
+        )
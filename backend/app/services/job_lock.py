@@ -0,0 +1,489 @@
+"""
+Exécution unique des jobs par type et par marché (single-flight).
+
+Le cron n8n et l'UI peuvent déclencher le même job en même temps ; deux
+ScoringJob concurrents insèrent alors les scores en double et consomment deux
+fois les quotas d'API. Chaque exécution prend un verrou consultatif Postgres
+(pg_try_advisory_lock) dérivé du type de job et du marché, sur une connexion
+dédiée gardée ouverte pendant tout le job : le verrou vaut pour tout le
+cluster et se libère tout seul si le processus meurt. Un second déclenchement
+ne relance rien : il se rattache à l'exécution en cours (job_runs) et attend
+son résultat, à condition qu'elle ait été lancée avec les mêmes paramètres
+(ex. force) ; sinon il est refusé (JobParamsConflictError). Les lots
+incrémentaux du listener (étape "scoring:incremental", etc.) ont leur propre
+verrou : un run complet ne s'y rattache jamais, il attend la fin du lot en
+cours avant de démarrer et le lot suivant s'efface devant lui. Les mesures de
+l'exécution (app.services.run_ledger) sont écrites dans job_run_stages à sa
+clôture.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, engine
+from app.core.metrics import JOB_RUNS, JOBS_IN_FLIGHT
+from app.models.job_run import JobRun
+from app.services.run_ledger import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+# Marché des jobs qui ne dépendent pas d'un marché (sourcing, scoring, listing)
+ALL_MARKETS = "all"
+
+# Suffixe des lots incrémentaux d'une étape (app.jobs.pipeline_listener)
+INCREMENTAL_SUFFIX = ":incremental"
+
+# Attente maximale de l'apparition de la ligne job_runs du détenteur du verrou
+OWNER_ROW_WAIT_SECONDS = 5.0
+OWNER_ROW_POLL_SECONDS = 0.2
+
+# Longueur maximale de l'erreur conservée
+MAX_ERROR_LENGTH = 2000
+
+
+class JobStillRunningError(Exception):
+    """Le job en cours ne s'est pas terminé pendant l'attente du déclenchement rattaché."""
+
+    def __init__(self, job_type: str, market_code: str, job_run_id: Optional[str]):
+        self.job_type = job_type
+        self.market_code = market_code
+        self.job_run_id = job_run_id
+        super().__init__(
+            f"Job {job_type} ({market_code}) déjà en cours (exécution {job_run_id})"
+        )
+
+
+class JobParamsConflictError(JobStillRunningError):
+    """Le job est déjà en cours avec d'autres paramètres : pas de rattachement."""
+
+    def __init__(
+        self,
+        job_type: str,
+        market_code: str,
+        job_run_id: Optional[str],
+        running_params: Dict[str, Any],
+        params: Dict[str, Any],
+    ):
+        super().__init__(job_type, market_code, job_run_id)
+        self.running_params = running_params
+        self.params = params
+        self.args = (
+            f"Job {job_type} ({market_code}) déjà en cours avec d'autres paramètres "
+            f"(exécution {job_run_id}: {running_params}, demandé: {params})",
+        )
+
+
+def advisory_lock_key(job_type: str, market_code: Optional[str] = None) -> int:
+    """
+    Clé du verrou consultatif d'un job (entier signé 64 bits stable entre processus).
+
+    Args:
+        job_type: Type de job.
+        market_code: Code du marché (None = tous les marchés).
+
+    Returns:
+        Clé pour pg_try_advisory_lock.
+    """
+    name = f"job:{job_type}:{market_code or ALL_MARKETS}"
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def incremental_job_type(job_type: str) -> str:
+    """Type de job des lots incrémentaux d'une étape (ex. "scoring:incremental")."""
+    return f"{job_type}{INCREMENTAL_SUFFIX}"
+
+
+def _job_run_result(job_run: JobRun, attached: bool) -> Dict[str, Any]:
+    """Résultat d'une exécution sous forme de dictionnaire."""
+    return {
+        "job_run_id": str(job_run.id),
+        "attached": attached,
+        "status": job_run.status,
+        "stats": job_run.stats or {},
+        "error": job_run.error,
+    }
+
+
+@contextmanager
+def _in_flight(job_type: str) -> Iterator[None]:
+    """Compte le job parmi les jobs en cours (métrique Prometheus)."""
+    gauge = JOBS_IN_FLIGHT.labels(job_type)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+class SingleFlight:
+    """Exécute un job au plus une fois à la fois par (type de job, marché)."""
+
+    def __init__(
+        self,
+        job_type: str,
+        market_code: Optional[str] = None,
+        bind: Engine = engine,
+        session_factory: sessionmaker = SessionLocal,
+        params: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialise l'exécution.
+
+        Args:
+            job_type: Type de job (discover, sourcing, scoring, listing, pipeline_abcde).
+            market_code: Code du marché (None = tous les marchés).
+            bind: Engine pour la connexion qui porte le verrou.
+            session_factory: Fabrique des sessions qui écrivent job_runs.
+            params: Paramètres du déclenchement (ex. {"force": True}), comparés à
+                ceux de l'exécution en cours avant de s'y rattacher.
+        """
+        self.job_type = job_type
+        self.market_code = market_code or ALL_MARKETS
+        self.params = params or {}
+        self.lock_key = advisory_lock_key(job_type, market_code)
+        # Un run complet détient aussi le verrou des lots incrémentaux de l'étape
+        self.batch_lock_key = (
+            None if job_type.endswith(INCREMENTAL_SUFFIX)
+            else advisory_lock_key(incremental_job_type(job_type), market_code)
+        )
+        self.bind = bind
+        self.session_factory = session_factory
+
+    def run(
+        self, fn: Callable[[], Dict[str, Any]], attach: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Exécute fn sous le verrou, ou se rattache à l'exécution en cours.
+
+        Args:
+            fn: Job à exécuter (retourne ses statistiques).
+            attach: Si False, retourne None au lieu de se rattacher quand le
+                verrou est déjà pris (lots incrémentaux).
+
+        Returns:
+            Dictionnaire {job_run_id, attached, status, stats, error}. Si attached
+            est True, status vaut "running" : attendre le résultat avec wait().
+
+        Raises:
+            JobParamsConflictError: Si l'exécution en cours a d'autres paramètres.
+            Exception: L'erreur du job (l'exécution est marquée failed).
+        """
+        connection = self._try_lock()
+        if connection is None:
+            return self._attach() if attach else None
+        db = self.session_factory()
+        try:
+            job_run = self._start(db)
+            metrics = RunMetrics(self.job_type)
+            try:
+                self._wait_for_batch(connection)
+                with metrics.activate(), _in_flight(self.job_type):
+                    stats = fn()
+            except Exception as e:
+                self._finish(db, job_run, metrics, error=e)
+                raise
+            self._finish(db, job_run, metrics, stats=stats)
+            return _job_run_result(job_run, attached=False)
+        finally:
+            db.close()
+            self._unlock(connection)
+
+    async def run_async(self, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Variante de run() pour un job asynchrone (ex. pipeline qui enchaîne les jobs).
+
+        Args:
+            fn: Coroutine à exécuter (retourne ses statistiques).
+
+        Returns:
+            Dictionnaire {job_run_id, attached, status, stats, error}.
+
+        Raises:
+            JobParamsConflictError: Si l'exécution en cours a d'autres paramètres.
+        """
+        connection = self._try_lock()
+        if connection is None:
+            return await self._attach_async()
+        db = self.session_factory()
+        try:
+            job_run = self._start(db)
+            metrics = RunMetrics(self.job_type)
+            try:
+                await self._wait_for_batch_async(connection)
+                with metrics.activate(), _in_flight(self.job_type):
+                    stats = await fn()
+            except Exception as e:
+                self._finish(db, job_run, metrics, error=e)
+                raise
+            self._finish(db, job_run, metrics, stats=stats)
+            return _job_run_result(job_run, attached=False)
+        finally:
+            db.close()
+            self._unlock(connection)
+
+    def _try_lock(self) -> Optional[Connection]:
+        """
+        Tente de prendre le verrou sur une connexion dédiée.
+
+        Returns:
+            Connexion qui détient le verrou (à libérer avec _unlock), None si déjà pris.
+        """
+        connection = self.bind.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return None
+        return connection
+
+    def _try_lock_batch(self, connection: Connection) -> bool:
+        """Tente de prendre, sur la connexion du verrou, celui des lots incrémentaux."""
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.batch_lock_key}
+        ).scalar()
+        connection.commit()
+        return bool(acquired)
+
+    def _wait_for_batch(self, connection: Connection) -> None:
+        """Attend la fin du lot incrémental en cours de l'étape (run complet uniquement)."""
+        if self.batch_lock_key is None or self._try_lock_batch(connection):
+            return
+        logger.info(f"Job {self.job_type}: attente de la fin du lot incrémental en cours")
+        while not self._try_lock_batch(connection):
+            time.sleep(OWNER_ROW_POLL_SECONDS)
+
+    async def _wait_for_batch_async(self, connection: Connection) -> None:
+        """Variante de _wait_for_batch() qui ne bloque pas la boucle d'événements."""
+        if self.batch_lock_key is None or self._try_lock_batch(connection):
+            return
+        logger.info(f"Job {self.job_type}: attente de la fin du lot incrémental en cours")
+        while not self._try_lock_batch(connection):
+            await asyncio.sleep(OWNER_ROW_POLL_SECONDS)
+
+    def _unlock(self, connection: Connection) -> None:
+        """Libère les verrous de la connexion (job et lots incrémentaux) et la ferme."""
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock_all()"))
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _start(self, db: Session) -> JobRun:
+        """Enregistre l'exécution (verrou détenu) et abandonne les lignes orphelines."""
+        # Verrou libre : une ligne encore "running" vient d'un processus mort
+        db.query(JobRun).filter(
+            JobRun.job_type == self.job_type,
+            JobRun.market_code == self.market_code,
+            JobRun.status == "running",
+        ).update(
+            {"status": "abandoned", "finished_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        job_run = JobRun(
+            job_type=self.job_type,
+            market_code=self.market_code,
+            status="running",
+            params=self.params,
+            owner=f"{socket.gethostname()}:{os.getpid()}",
+            started_at=datetime.utcnow(),
+        )
+        db.add(job_run)
+        db.commit()
+        return job_run
+
+    def _finish(
+        self,
+        db: Session,
+        job_run: JobRun,
+        metrics: RunMetrics,
+        stats: Optional[Dict[str, Any]] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Clôture l'exécution avec ses statistiques ou son erreur, et ses mesures par étape."""
+        if error is not None:
+            job_run.status = "failed"
+            job_run.error = str(error)[:MAX_ERROR_LENGTH]
+        else:
+            job_run.status = "completed"
+            job_run.stats = stats
+        job_run.finished_at = datetime.utcnow()
+        JOB_RUNS.labels(self.job_type, job_run.status).inc()
+        db.add_all(metrics.to_rows(job_run.id))
+        db.commit()
+
+    def _find_running(self) -> Optional[JobRun]:
+        """Exécution en cours du job (nouvelle session : voir les commits du détenteur)."""
+        db: Session = self.session_factory()
+        try:
+            return (
+                db.query(JobRun)
+                .filter(
+                    JobRun.job_type == self.job_type,
+                    JobRun.market_code == self.market_code,
+                    JobRun.status == "running",
+                )
+                .order_by(JobRun.started_at.desc())
+                .first()
+            )
+        finally:
+            db.close()
+
+    def _attach(self) -> Dict[str, Any]:
+        """Se rattache à l'exécution en cours (verrou détenu par un autre processus)."""
+        deadline = time.monotonic() + OWNER_ROW_WAIT_SECONDS
+        job_run = self._find_running()
+        # Le détenteur du verrou n'a peut-être pas encore commité sa ligne
+        while job_run is None and time.monotonic() < deadline:
+            time.sleep(OWNER_ROW_POLL_SECONDS)
+            job_run = self._find_running()
+        return self._attached(job_run)
+
+    async def _attach_async(self) -> Dict[str, Any]:
+        """Variante de _attach() qui ne bloque pas la boucle d'événements pendant l'attente."""
+        deadline = time.monotonic() + OWNER_ROW_WAIT_SECONDS
+        job_run = self._find_running()
+        while job_run is None and time.monotonic() < deadline:
+            await asyncio.sleep(OWNER_ROW_POLL_SECONDS)
+            job_run = self._find_running()
+        return self._attached(job_run)
+
+    def _attached(self, job_run: Optional[JobRun]) -> Dict[str, Any]:
+        """
+        Résultat du rattachement à l'exécution en cours.
+
+        Raises:
+            JobParamsConflictError: Si l'exécution en cours a d'autres paramètres.
+        """
+        if job_run is None:
+            logger.warning(
+                f"Job {self.job_type} ({self.market_code}) verrouillé sans exécution visible"
+            )
+            return {
+                "job_run_id": None,
+                "attached": True,
+                "status": "running",
+                "stats": {},
+                "error": None,
+            }
+
+        running_params = job_run.params or {}
+        if running_params != self.params:
+            raise JobParamsConflictError(
+                self.job_type, self.market_code, str(job_run.id), running_params, self.params
+            )
+
+        logger.info(
+            f"Job {self.job_type} ({self.market_code}) déjà en cours: "
+            f"rattachement à l'exécution {job_run.id}"
+        )
+        return _job_run_result(job_run, attached=True)
+
+    async def wait(
+        self, job_run_id: Optional[str], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Attend la fin d'une exécution à laquelle on s'est rattaché.
+
+        Args:
+            job_run_id: Identifiant de l'exécution (None = introuvable).
+            timeout: Attente maximale en secondes (défaut: JOB_ATTACH_WAIT_SECONDS).
+
+        Returns:
+            Dictionnaire {job_run_id, attached, status, stats, error} ; status vaut
+            encore "running" si l'attente a expiré.
+        """
+        settings = get_settings()
+        timeout = settings.JOB_ATTACH_WAIT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while job_run_id is not None:
+            job_run = self._load(job_run_id)
+            if job_run is None:
+                break
+            if job_run["status"] != "running" or time.monotonic() >= deadline:
+                return job_run
+            await asyncio.sleep(settings.JOB_ATTACH_POLL_SECONDS)
+        return {
+            "job_run_id": job_run_id,
+            "attached": True,
+            "status": "running",
+            "stats": {},
+            "error": None,
+        }
+
+    def _load(self, job_run_id: str) -> Optional[Dict[str, Any]]:
+        """Relit une exécution (nouvelle session : voir les commits du détenteur)."""
+        db: Session = self.session_factory()
+        try:
+            job_run = db.query(JobRun).filter(JobRun.id == job_run_id).first()
+            return _job_run_result(job_run, attached=True) if job_run else None
+        finally:
+            db.close()
+
+
+async def run_or_attach(
+    job_type: str,
+    market_code: Optional[str],
+    fn: Callable[[], Any],
+    wait_timeout: Optional[float] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Exécute un job sous verrou, ou attend le résultat de l'exécution déjà en cours.
+
+    Args:
+        job_type: Type de job.
+        market_code: Code du marché (None = tous les marchés).
+        fn: Job à exécuter (coroutine, ou fonction exécutée dans un thread ;
+            retourne ses statistiques).
+        wait_timeout: Attente maximale d'un déclenchement rattaché
+                      (défaut: JOB_ATTACH_WAIT_SECONDS).
+        params: Paramètres du déclenchement (ex. {"force": True}) ; seul un
+            déclenchement aux mêmes paramètres se rattache à l'exécution en cours.
+
+    Returns:
+        Dictionnaire {job_run_id, attached, status="completed", stats, error}.
+
+    Raises:
+        JobParamsConflictError: Si l'exécution en cours a d'autres paramètres.
+        JobStillRunningError: Si l'exécution en cours n'est pas terminée après l'attente.
+        RuntimeError: Si l'exécution à laquelle on s'est rattaché a échoué.
+        Exception: L'erreur du job exécuté par ce déclenchement.
+    """
+    flight = SingleFlight(job_type, market_code, params=params)
+    if asyncio.iscoroutinefunction(fn):
+        run = fn
+    else:
+        async def run() -> Dict[str, Any]:
+            # Job synchrone dans un thread (contexte copié : mesures du run_ledger) :
+            # la boucle reste libre pour un second déclenchement, qui se rattache
+            return await asyncio.to_thread(fn)
+
+    result = await flight.run_async(run)
+    if result["attached"]:
+        result = await flight.wait(result["job_run_id"], timeout=wait_timeout)
+        if result["status"] == "running":
+            raise JobStillRunningError(job_type, flight.market_code, result["job_run_id"])
+        if result["status"] != "completed":
+            raise RuntimeError(
+                f"L'exécution {result['job_run_id']} du job {job_type} "
+                f"a échoué: {result['error']}"
+            )
+    return result
@@ -2,16 +2,178 @@
 Client pour l'API Keepa - Récupération de données produits Amazon.
 """
 import logging
-from typing import List, Optional
+import math
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
 from decimal import Decimal
 import httpx
 from datetime import datetime
 
 from app.core.config import get_settings
 from app.services.category_config import CategoryConfig
+from app.services.keepa_history import extract_history
+from app.services.run_ledger import UPSTREAM_KEEPA, InstrumentedClient, record_keepa_tokens
 
 logger = logging.getLogger(__name__)
 
+# Taille de page minimale acceptée par le Product Finder Keepa (/query)
+FINDER_MIN_PAGE_SIZE = 50
+
+# Nombre maximum d'ASINs par appel /product
+PRODUCT_BATCH_SIZE = 100
+
+# Champs du produit Keepa conservés tels quels dans raw_data en mode allégé
+LEAN_PRODUCT_FIELDS = ("title", "brand", "features", "lastUpdate")
+
+# Stats Keepa compactes conservées en mode allégé (tableaux courts ou entiers)
+LEAN_STATS_FIELDS = (
+    "current",
+    "avg30",
+    "avg90",
+    "avg180",
+    "salesRankDrops30",
+    "salesRankDrops90",
+    "salesRankDrops180",
+    "buyBoxPrice",
+)
+
+
+def lean_raw_data(product: dict) -> dict:
+    """
+    Réduit un produit Keepa brut aux champs utilisés par le pipeline.
+
+    Les historiques csv (plusieurs centaines de Ko) et les autres tableaux
+    volumineux sont écartés : les séries utiles sont stockées compressées
+    à part (voir app.services.keepa_history).
+
+    Args:
+        product: Produit brut de l'API Keepa.
+
+    Returns:
+        Dictionnaire allégé (champs produit + stats compactes).
+    """
+    lean = {key: product[key] for key in LEAN_PRODUCT_FIELDS if product.get(key) is not None}
+    stats = product.get("stats")
+    if isinstance(stats, dict):
+        lean["stats"] = {
+            key: stats[key] for key in LEAN_STATS_FIELDS if stats.get(key) is not None
+        }
+    return lean
+
+
+def _tokens_consumed(data) -> Optional[int]:
+    """Tokens consommés indiqués par une réponse Keepa (champ tokensConsumed)."""
+    return data.get("tokensConsumed") if isinstance(data, dict) else None
+
+
+def build_finder_selection(category_config: CategoryConfig, page: int, per_page: int) -> dict:
+    """
+    Construit la sélection du Product Finder Keepa pour une catégorie.
+
+    Les seuils de category_config.yml (BSR, prix, avis, note) sont appliqués
+    côté serveur : seuls les produits qui les respectent sont renvoyés.
+
+    Args:
+        category_config: Configuration de la catégorie.
+        page: Numéro de page (à partir de 0).
+        per_page: Nombre d'ASINs par page (minimum FINDER_MIN_PAGE_SIZE).
+
+    Returns:
+        Sélection JSON de l'endpoint /query.
+    """
+    selection = {
+        "rootCategory": [category_config.id],
+        "current_SALES_gte": 1,
+        "current_SALES_lte": category_config.bsr_max,
+        "sort": [["current_SALES", "asc"]],
+        "productType": [0],  # Produits standards uniquement
+        "page": page,
+        "perPage": max(per_page, FINDER_MIN_PAGE_SIZE),
+    }
+    # Prix en centimes, sur le prix neuf le plus bas
+    if category_config.price_min:
+        selection["current_NEW_gte"] = int(category_config.price_min * 100)
+    if category_config.price_max:
+        selection["current_NEW_lte"] = int(category_config.price_max * 100)
+    if category_config.min_reviews:
+        selection["current_COUNT_REVIEWS_gte"] = category_config.min_reviews
+    if category_config.min_rating:
+        # Keepa exprime la note sur 50 (4.5 étoiles = 45)
+        selection["current_RATING_gte"] = int(category_config.min_rating * 10)
+    return selection
+
+
+class KeepaTokenBudget:
+    """Budget de tokens Keepa partagé entre plusieurs threads (un run de découverte)."""
+
+    def __init__(self, total: int):
+        """
+        Initialise le budget.
+
+        Args:
+            total: Nombre de tokens disponibles pour le run.
+        """
+        self.total = total
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Tokens restants."""
+        with self._lock:
+            return self.total - self.spent
+
+    def try_acquire(self, tokens: int) -> bool:
+        """
+        Réserve exactement `tokens` tokens.
+
+        Returns:
+            True si le budget le permettait, False sinon (rien n'est réservé).
+        """
+        with self._lock:
+            if self.spent + tokens > self.total:
+                return False
+            self.spent += tokens
+            return True
+
+    def acquire_up_to(self, tokens: int) -> int:
+        """
+        Réserve au plus `tokens` tokens.
+
+        Returns:
+            Nombre de tokens effectivement réservés (0 si le budget est épuisé).
+        """
+        with self._lock:
+            granted = max(min(tokens, self.total - self.spent), 0)
+            self.spent += granted
+            return granted
+
+
+class SharedAsinSet:
+    """Ensemble d'ASINs partagé entre threads : un ASIN n'est réclamé qu'une fois."""
+
+    def __init__(self):
+        self._asins = set()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def claim(self, asins: Iterable[str]) -> List[str]:
+        """
+        Réclame des ASINs (ordre conservé).
+
+        Returns:
+            ASINs qui n'avaient encore été réclamés par personne.
+        """
+        claimed = []
+        with self._lock:
+            for asin in asins:
+                if asin in self._asins:
+                    self.duplicates += 1
+                    continue
+                self._asins.add(asin)
+                claimed.append(asin)
+        return claimed
+
 
 class KeepaProduct:
     """Produit normalisé depuis Keepa."""
@@ -27,6 +189,9 @@ class KeepaProduct:
         reviews_count: Optional[int],
         rating: Optional[Decimal],
         raw_data: dict,
+        brand: Optional[str] = None,
+        sales_rank_drops_90: Optional[int] = None,
+        history: Optional[Dict[int, List[int]]] = None,
     ):
         self.asin = asin
         self.title = title
@@ -37,6 +202,10 @@ class KeepaProduct:
         self.reviews_count = reviews_count
         self.rating = rating
         self.raw_data = raw_data
+        self.brand = brand
+        self.sales_rank_drops_90 = sales_rank_drops_90
+        # Séries csv Keepa {index: [t1, v1, ...]} à stocker dans keepa_history_series
+        self.history = history or {}
 
 
 class KeepaClient:
@@ -53,6 +222,8 @@ class KeepaClient:
         self.api_key = api_key or settings.KEEPA_API_KEY
         self.base_url = "https://api.keepa.com"
         self.timeout = 30.0  # Timeout en secondes pour les requêtes HTTP
+        # Mode allégé : raw_data sans les historiques csv (stockés à part)
+        self.lean_raw_data = settings.KEEPA_LEAN_RAW_DATA
 
     def get_products_by_asins(
         self, domain: int, asin_list: List[str]
@@ -106,13 +277,14 @@ class KeepaClient:
                 }
 
                 try:
-                    with httpx.Client(timeout=self.timeout) as client:
+                    with InstrumentedClient(UPSTREAM_KEEPA, timeout=self.timeout) as client:
                         response = client.get(
                             f"{self.base_url}/product",
                             params=params,
                         )
                         response.raise_for_status()
                         data = response.json()
+                        record_keepa_tokens(_tokens_consumed(data))
 
                     logger.debug(
                         "Réponse Keepa API pour batch %s-%s: %s",
@@ -344,22 +516,23 @@ class KeepaClient:
             )
 
             # Essayer l'endpoint /product avec le paramètre category
-            # Format: https://api.keepa.com/product?key=API_KEY&domain=1&category=CATEGORY_ID&stats=180
+            # Format: https://api.keepa.com/product?key=API_KEY&domain=DOMAIN&category=CATEGORY_ID&stats=180
             params = {
                 "key": self.api_key,
-                "domain": 1,  # 1 = Amazon FR
+                "domain": category_config.domain,
                 "category": str(category_config.id),
                 "stats": 180,  # Stats sur 180 jours
             }
 
             try:
-                with httpx.Client(timeout=self.timeout) as client:
+                with InstrumentedClient(UPSTREAM_KEEPA, timeout=self.timeout) as client:
                     response = client.get(
                         f"{self.base_url}/product",
                         params=params,
                     )
                     response.raise_for_status()
                     data = response.json()
+                    record_keepa_tokens(_tokens_consumed(data))
 
                 logger.debug(f"Réponse Keepa API pour catégorie {category_config.name}: {data}")
 
@@ -377,7 +550,7 @@ class KeepaClient:
                         len(asin_list),
                         category_config.name,
                     )
-                    products = self._enrich_asins(asin_list[:limit])
+                    products = self._enrich_asins(asin_list[:limit], domain=category_config.domain)
                 else:
                     logger.warning(
                         "Structure de réponse Keepa inattendue pour la catégorie %s: %s",
@@ -600,12 +773,16 @@ class KeepaClient:
         
         return mock_products
 
-    def _enrich_asins(self, asin_list: List[str]) -> List[dict]:
+    def _enrich_asins(
+        self, asin_list: List[str], domain: int = 1, client: Optional[httpx.Client] = None
+    ) -> List[dict]:
         """
         Enrichit une liste d'ASINs avec les détails des produits via l'endpoint /product.
 
         Args:
             asin_list: Liste d'ASINs à enrichir.
+            domain: Domaine Keepa (1 = Amazon FR).
+            client: Client HTTP à réutiliser (sinon un client par lot).
 
         Returns:
             Liste de produits bruts depuis Keepa.
@@ -614,7 +791,7 @@ class KeepaClient:
             return []
 
         products = []
-        batch_size = 100  # Keepa permet jusqu'à 100 ASINs par requête
+        batch_size = PRODUCT_BATCH_SIZE  # Keepa permet jusqu'à 100 ASINs par requête
 
         for i in range(0, len(asin_list), batch_size):
             batch_asins = asin_list[i:i + batch_size]
@@ -622,19 +799,26 @@ class KeepaClient:
 
             product_params = {
                 "key": self.api_key,
-                "domain": 1,  # Amazon FR
+                "domain": domain,
                 "asin": asin_string,
                 "stats": 180,  # Stats sur 180 jours
             }
 
             try:
-                with httpx.Client(timeout=self.timeout) as client:
-                    response = client.get(
-                        f"{self.base_url}/product",
-                        params=product_params,
-                    )
+                if client is not None:
+                    response = client.get(f"{self.base_url}/product", params=product_params)
                     response.raise_for_status()
                     data = response.json()
+                    record_keepa_tokens(_tokens_consumed(data))
+                else:
+                    with InstrumentedClient(UPSTREAM_KEEPA, timeout=self.timeout) as batch_client:
+                        response = batch_client.get(
+                            f"{self.base_url}/product",
+                            params=product_params,
+                        )
+                        response.raise_for_status()
+                        data = response.json()
+                        record_keepa_tokens(_tokens_consumed(data))
 
                 if "products" in data:
                     products.extend(data["products"])
@@ -652,6 +836,144 @@ class KeepaClient:
 
         return products
 
+    def iter_finder_asins(
+        self,
+        category_config: CategoryConfig,
+        max_results: int,
+        page_size: Optional[int] = None,
+        client: Optional[httpx.Client] = None,
+        token_budget: Optional[KeepaTokenBudget] = None,
+    ) -> Iterator[List[str]]:
+        """
+        Parcourt les pages du Product Finder Keepa (/query) pour une catégorie.
+
+        Les filtres BSR, prix, avis et note sont appliqués côté serveur (voir
+        build_finder_selection), les ASINs sont triés par BSR croissant.
+
+        Args:
+            category_config: Configuration de la catégorie.
+            max_results: Nombre maximum d'ASINs à renvoyer au total.
+            page_size: ASINs par page (défaut: KEEPA_FINDER_PAGE_SIZE).
+            client: Client HTTP à réutiliser (sinon un client dédié).
+            token_budget: Budget partagé ; la pagination s'arrête quand il est épuisé.
+
+        Yields:
+            Une liste d'ASINs par page, jusqu'à épuisement, max_results ou budget.
+        """
+        if not self.api_key:
+            logger.warning(
+                "KEEPA_API_KEY non définie, Product Finder indisponible pour la catégorie %s",
+                category_config.name,
+            )
+            return
+
+        page_size = page_size or get_settings().KEEPA_FINDER_PAGE_SIZE
+        owns_client = client is None
+        if owns_client:
+            client = InstrumentedClient(UPSTREAM_KEEPA, timeout=self.timeout)
+
+        try:
+            page = 0
+            yielded = 0
+            while yielded < max_results:
+                selection = build_finder_selection(category_config, page, page_size)
+                if token_budget is not None and not token_budget.try_acquire(
+                    self.finder_query_cost(selection["perPage"])
+                ):
+                    logger.info(
+                        "Budget de tokens épuisé, arrêt du Product Finder pour la catégorie %s",
+                        category_config.name,
+                    )
+                    return
+                try:
+                    response = client.post(
+                        f"{self.base_url}/query",
+                        params={"key": self.api_key, "domain": category_config.domain},
+                        json=selection,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                    record_keepa_tokens(_tokens_consumed(data))
+                except Exception as e:
+                    logger.error(
+                        "Erreur Product Finder Keepa pour la catégorie %s (page %s): %s",
+                        category_config.name,
+                        page,
+                        str(e),
+                    )
+                    return
+
+                asin_list = (data.get("asinList") if isinstance(data, dict) else None) or []
+                if not asin_list:
+                    return
+
+                batch = asin_list[: max_results - yielded]
+                yielded += len(batch)
+                logger.info(
+                    "Product Finder %s page %s: %s ASINs (%s/%s au total)",
+                    category_config.name,
+                    page,
+                    len(batch),
+                    yielded,
+                    data.get("totalResults", "?"),
+                )
+                yield batch
+
+                if len(asin_list) < selection["perPage"]:
+                    return
+                page += 1
+        finally:
+            if owns_client:
+                client.close()
+
+    @staticmethod
+    def finder_query_cost(per_page: int) -> int:
+        """Coût en tokens d'une page du Product Finder (forfait + 1 par tranche de 100 ASINs)."""
+        return get_settings().KEEPA_FINDER_TOKENS_PER_QUERY + math.ceil(per_page / 100)
+
+    def iter_category_products(
+        self,
+        category_config: CategoryConfig,
+        limit: int = 200,
+        token_budget: Optional[KeepaTokenBudget] = None,
+        seen_asins: Optional[SharedAsinSet] = None,
+    ) -> Iterator[List[KeepaProduct]]:
+        """
+        Découverte d'une catégorie via le Product Finder, page par page.
+
+        Chaque page d'ASINs est enrichie (/product par lots de 100) puis normalisée
+        et renvoyée aussitôt : le stockage commence dès la première page, sans
+        attendre la fin de la pagination.
+
+        Args:
+            category_config: Configuration de la catégorie.
+            limit: Nombre maximum d'ASINs à découvrir.
+            token_budget: Budget de tokens partagé (pages du Finder et enrichissement).
+            seen_asins: ASINs déjà réclamés par d'autres catégories : ils ne sont
+                        pas enrichis une seconde fois.
+
+        Yields:
+            Une liste de produits normalisés par page de résultats.
+        """
+        tokens_per_product = max(get_settings().KEEPA_TOKENS_PER_PRODUCT, 1)
+        with InstrumentedClient(UPSTREAM_KEEPA, timeout=self.timeout) as client:
+            for asin_page in self.iter_finder_asins(
+                category_config, limit, client=client, token_budget=token_budget
+            ):
+                if seen_asins is not None:
+                    asin_page = seen_asins.claim(asin_page)
+                if token_budget is not None and asin_page:
+                    granted = token_budget.acquire_up_to(len(asin_page) * tokens_per_product)
+                    asin_page = asin_page[: granted // tokens_per_product]
+                if not asin_page:
+                    continue
+                raw_products = self._enrich_asins(
+                    asin_page, domain=category_config.domain, client=client
+                )
+                normalized = self._normalize_products(raw_products, category_config)
+                if normalized:
+                    yield normalized
+
     def _normalize_products(
         self, products: List[dict], category_config: CategoryConfig
     ) -> List[KeepaProduct]:
@@ -895,12 +1217,21 @@ class KeepaClient:
                         rating = None
 
                 # Ajouter la source "keepa_api" dans raw_data pour identifier les vrais produits
-                raw_data_with_source = dict(product) if isinstance(product, dict) else product
+                if self.lean_raw_data:
+                    raw_data_with_source = lean_raw_data(product)
+                else:
+                    raw_data_with_source = dict(product) if isinstance(product, dict) else product
                 if isinstance(raw_data_with_source, dict):
                     raw_data_with_source["source"] = "keepa_api"
                     # Le domaine sera ajouté lors de l'appel, on le met à None pour l'instant
                     # Il sera défini dans DiscoverJob lors de l'upsert
 
+                # Champs typés (colonnes product_candidates)
+                brand = str(product.get("brand") or "").strip()[:255] or None
+                sales_rank_drops_90 = None
+                if isinstance(stats, dict) and isinstance(stats.get("salesRankDrops90"), int):
+                    sales_rank_drops_90 = stats["salesRankDrops90"]
+
                 # Créer le produit normalisé
                 normalized_product = KeepaProduct(
                     asin=asin,
@@ -912,6 +1243,9 @@ class KeepaClient:
                     reviews_count=reviews_count,
                     rating=rating,
                     raw_data=raw_data_with_source,
+                    brand=brand,
+                    sales_rank_drops_90=sales_rank_drops_90,
+                    history=extract_history(product),
                 )
 
                 normalized.append(normalized_product)
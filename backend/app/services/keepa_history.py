@@ -0,0 +1,409 @@
+"""
+Stockage compressé des historiques Keepa (tableaux csv : prix, BSR).
+
+Keepa renvoie chaque historique sous la forme [t1, v1, t2, v2, ...] où t est
+en "minutes Keepa" et v en centimes (prix) ou en rang (BSR), -1 signifiant
+"indisponible". Chaque série est encodée en deltas (temps croissants, valeurs
+proches) sous forme de varints zigzag puis compressée zlib : quelques Ko au
+lieu de centaines de Ko de JSON, stockés dans keepa_history_series plutôt que
+dans product_candidates.raw_keepa_data.
+
+Les requêtes ("prix à l'instant t", "moyenne sur une fenêtre", "baisses de
+BSR sur 90 jours") travaillent directement sur les points décodés, sans
+rappeler Keepa ni parser de JSON.
+"""
+import logging
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.keepa_history import KeepaHistorySeries
+
+logger = logging.getLogger(__name__)
+
+# Séries csv Keepa conservées (index -> nom)
+KEEPA_SERIES = {
+    0: "amazon",  # Prix Amazon retail (centimes)
+    1: "new",  # Prix neuf le plus bas, tous vendeurs (centimes)
+    3: "sales_rank",  # Best Seller Rank
+}
+SERIES_AMAZON = 0
+SERIES_NEW = 1
+SERIES_SALES_RANK = 3
+
+# Origine des "minutes Keepa" (temps des tableaux csv)
+KEEPA_EPOCH = datetime(2011, 1, 1)
+
+# Niveau de compression zlib des séries
+ZLIB_LEVEL = 6
+
+
+def _zigzag(value: int) -> int:
+    """Entier signé -> non signé (0, -1, 1, -2 -> 0, 1, 2, 3)."""
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value: int) -> int:
+    """Inverse de _zigzag."""
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Ajoute un entier non signé encodé en varint (7 bits par octet)."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_series(points: Sequence[int]) -> bytes:
+    """
+    Encode une série Keepa [t1, v1, t2, v2, ...] (deltas + varints zigzag + zlib).
+
+    Args:
+        points: Tableau csv Keepa à plat (longueur paire).
+
+    Returns:
+        Données binaires compressées.
+    """
+    out = bytearray()
+    prev_time = 0
+    prev_value = 0
+    for i in range(0, len(points) - 1, 2):
+        time_value, value = int(points[i]), int(points[i + 1])
+        _write_varint(out, _zigzag(time_value - prev_time))
+        _write_varint(out, _zigzag(value - prev_value))
+        prev_time, prev_value = time_value, value
+    return zlib.compress(bytes(out), ZLIB_LEVEL)
+
+
+def decode_series(data: bytes) -> List[Tuple[int, int]]:
+    """
+    Décode une série produite par encode_series().
+
+    Args:
+        data: Données binaires compressées.
+
+    Returns:
+        Liste de points (minutes Keepa, valeur) dans l'ordre chronologique.
+    """
+    raw = zlib.decompress(data)
+    numbers = []
+    shift = 0
+    current = 0
+    for byte in raw:
+        current |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(_unzigzag(current))
+            current = 0
+            shift = 0
+
+    points = []
+    time_value = 0
+    value = 0
+    for i in range(0, len(numbers) - 1, 2):
+        time_value += numbers[i]
+        value += numbers[i + 1]
+        points.append((time_value, value))
+    return points
+
+
+def to_keepa_minutes(moment: datetime) -> int:
+    """Convertit une date (UTC naïve) en minutes Keepa."""
+    return int((moment - KEEPA_EPOCH).total_seconds() // 60)
+
+
+def from_keepa_minutes(minutes: int) -> datetime:
+    """Convertit des minutes Keepa en date (UTC naïve)."""
+    return KEEPA_EPOCH + timedelta(minutes=minutes)
+
+
+def value_at(points: Sequence[Tuple[int, int]], at: int) -> Optional[int]:
+    """
+    Valeur d'une série à un instant (dernier point antérieur ou égal).
+
+    Args:
+        points: Points (minutes Keepa, valeur) triés par temps.
+        at: Instant en minutes Keepa.
+
+    Returns:
+        Valeur à cet instant, ou None si avant le premier point ou indisponible (-1).
+    """
+    low, high = 0, len(points)
+    while low < high:
+        middle = (low + high) // 2
+        if points[middle][0] <= at:
+            low = middle + 1
+        else:
+            high = middle
+    if low == 0:
+        return None
+    value = points[low - 1][1]
+    return value if value >= 0 else None
+
+
+def window_average(points: Sequence[Tuple[int, int]], start: int, end: int) -> Optional[float]:
+    """
+    Moyenne pondérée par la durée d'une série sur [start, end[.
+
+    Chaque valeur compte pour le temps pendant lequel elle est restée en vigueur ;
+    les périodes indisponibles (-1) sont exclues.
+
+    Args:
+        points: Points (minutes Keepa, valeur) triés par temps.
+        start: Début de la fenêtre (minutes Keepa).
+        end: Fin de la fenêtre (minutes Keepa).
+
+    Returns:
+        Moyenne, ou None si aucune valeur disponible sur la fenêtre.
+    """
+    weighted_sum = 0
+    total_minutes = 0
+    for i, (time_value, value) in enumerate(points):
+        next_time = points[i + 1][0] if i + 1 < len(points) else end
+        segment_start = max(time_value, start)
+        segment_end = min(next_time, end)
+        if segment_end <= segment_start or value < 0:
+            continue
+        weighted_sum += value * (segment_end - segment_start)
+        total_minutes += segment_end - segment_start
+    if total_minutes == 0:
+        return None
+    return weighted_sum / total_minutes
+
+
+def count_rank_drops(points: Sequence[Tuple[int, int]], start: int, end: int) -> int:
+    """
+    Nombre de baisses du BSR (rang amélioré, ≈ une vente) entre start et end.
+
+    Args:
+        points: Points (minutes Keepa, rang) de la série BSR, triés par temps.
+        start: Début de la fenêtre (minutes Keepa).
+        end: Fin de la fenêtre (minutes Keepa).
+
+    Returns:
+        Nombre de points de la fenêtre dont le rang est inférieur au rang valide précédent.
+    """
+    drops = 0
+    previous = None
+    for time_value, value in points:
+        if time_value > end:
+            break
+        if value < 0:
+            continue
+        if previous is not None and value < previous and time_value >= start:
+            drops += 1
+        previous = value
+    return drops
+
+
+def extract_history(product: dict) -> Dict[int, List[int]]:
+    """
+    Extrait les séries KEEPA_SERIES du tableau csv d'un produit Keepa brut.
+
+    Args:
+        product: Produit brut de l'API Keepa.
+
+    Returns:
+        Dictionnaire {index de série: tableau [t1, v1, ...]} (séries vides ignorées).
+    """
+    csv_arrays = product.get("csv") if isinstance(product, dict) else None
+    if not isinstance(csv_arrays, list):
+        return {}
+
+    history = {}
+    for index in KEEPA_SERIES:
+        if index < len(csv_arrays) and isinstance(csv_arrays[index], list):
+            series = csv_arrays[index]
+            if len(series) >= 2:
+                history[index] = series
+    return history
+
+
+class KeepaHistoryStore:
+    """Écriture et requêtes des historiques Keepa compressés (table keepa_history_series)."""
+
+    def __init__(self, db: Session):
+        """
+        Initialise le store.
+
+        Args:
+            db: Session SQLAlchemy pour la base de données.
+        """
+        self.db = db
+
+    def save(self, asin: str, domain: int, history: Dict[int, List[int]]) -> int:
+        """
+        Enregistre les séries d'un produit (INSERT ... ON CONFLICT).
+
+        Une série dont les données compressées sont identiques n'est pas réécrite.
+        Pas de commit ici.
+
+        Args:
+            asin: ASIN du produit.
+            domain: Domaine Keepa.
+            history: Séries extraites par extract_history().
+
+        Returns:
+            Nombre de séries insérées ou modifiées.
+        """
+        if not history:
+            return 0
+
+        now = datetime.utcnow()
+        rows = []
+        for series, points in history.items():
+            count = len(points) // 2
+            rows.append(
+                {
+                    "asin": asin,
+                    "domain": domain,
+                    "series": series,
+                    "points_count": count,
+                    "first_time": int(points[0]) if count else None,
+                    "last_time": int(points[2 * count - 2]) if count else None,
+                    "last_value": int(points[2 * count - 1]) if count else None,
+                    "data": encode_series(points),
+                    "updated_at": now,
+                }
+            )
+
+        table = KeepaHistorySeries.__table__
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.asin, table.c.domain, table.c.series],
+            set_={
+                "points_count": stmt.excluded.points_count,
+                "first_time": stmt.excluded.first_time,
+                "last_time": stmt.excluded.last_time,
+                "last_value": stmt.excluded.last_value,
+                "data": stmt.excluded.data,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=table.c.data.is_distinct_from(stmt.excluded.data),
+        )
+        result = self.db.execute(stmt)
+        return result.rowcount or 0
+
+    def load(self, asin: str, domain: int, series: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Charge et décode une série.
+
+        Args:
+            asin: ASIN du produit.
+            domain: Domaine Keepa.
+            series: Index de la série (voir KEEPA_SERIES).
+
+        Returns:
+            Points (minutes Keepa, valeur), ou None si la série n'est pas stockée.
+        """
+        row = self.db.get(KeepaHistorySeries, (asin, domain, series))
+        if row is None:
+            return None
+        return decode_series(row.data)
+
+    def load_many(
+        self, asins: Iterable[str], domain: int, series: int
+    ) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Charge et décode une série pour plusieurs ASINs en une requête.
+
+        Args:
+            asins: ASINs à charger.
+            domain: Domaine Keepa.
+            series: Index de la série (voir KEEPA_SERIES).
+
+        Returns:
+            Dictionnaire {asin: points} (ASINs sans série absents).
+        """
+        asin_list = list(asins)
+        if not asin_list:
+            return {}
+        rows = (
+            self.db.query(KeepaHistorySeries.asin, KeepaHistorySeries.data)
+            .filter(
+                KeepaHistorySeries.asin.in_(asin_list),
+                KeepaHistorySeries.domain == domain,
+                KeepaHistorySeries.series == series,
+            )
+            .all()
+        )
+        return {asin: decode_series(data) for asin, data in rows}
+
+    def price_at(
+        self, asin: str, domain: int, at: datetime, series: int = SERIES_AMAZON
+    ) -> Optional[Decimal]:
+        """
+        Prix d'un produit à un instant donné.
+
+        Args:
+            asin: ASIN du produit.
+            domain: Domaine Keepa.
+            at: Instant (UTC).
+            series: Série de prix (SERIES_AMAZON ou SERIES_NEW).
+
+        Returns:
+            Prix en EUR, ou None si inconnu ou indisponible à cet instant.
+        """
+        points = self.load(asin, domain, series)
+        cents = value_at(points, to_keepa_minutes(at)) if points else None
+        return Decimal(cents) / Decimal("100") if cents is not None else None
+
+    def average_price(
+        self,
+        asin: str,
+        domain: int,
+        start: datetime,
+        end: Optional[datetime] = None,
+        series: int = SERIES_AMAZON,
+    ) -> Optional[Decimal]:
+        """
+        Prix moyen (pondéré par la durée) sur une fenêtre.
+
+        Args:
+            asin: ASIN du produit.
+            domain: Domaine Keepa.
+            start: Début de la fenêtre (UTC).
+            end: Fin de la fenêtre (UTC, maintenant par défaut).
+            series: Série de prix (SERIES_AMAZON ou SERIES_NEW).
+
+        Returns:
+            Prix moyen en EUR (2 décimales), ou None si aucun prix sur la fenêtre.
+        """
+        points = self.load(asin, domain, series)
+        if not points:
+            return None
+        end = end or datetime.utcnow()
+        cents = window_average(points, to_keepa_minutes(start), to_keepa_minutes(end))
+        if cents is None:
+            return None
+        return (Decimal(str(cents)) / Decimal("100")).quantize(Decimal("0.01"))
+
+    def rank_drops(
+        self, asin: str, domain: int, days: int = 90, now: Optional[datetime] = None
+    ) -> Optional[int]:
+        """
+        Nombre de baisses du BSR sur les derniers jours (équivalent de salesRankDrops90).
+
+        Args:
+            asin: ASIN du produit.
+            domain: Domaine Keepa.
+            days: Taille de la fenêtre en jours.
+            now: Fin de la fenêtre (UTC, maintenant par défaut).
+
+        Returns:
+            Nombre de baisses, ou None si la série BSR n'est pas stockée.
+        """
+        points = self.load(asin, domain, SERIES_SALES_RANK)
+        if points is None:
+            return None
+        end = now or datetime.utcnow()
+        return count_rank_drops(
+            points, to_keepa_minutes(end - timedelta(days=days)), to_keepa_minutes(end)
+        )
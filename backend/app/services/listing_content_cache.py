@@ -0,0 +1,120 @@
+"""
+Cache du contenu généré des listings (Modules D/E).
+
+Le contenu d'un listing ne dépend que des entrées du générateur (titre,
+catégorie, note, marque, flag brandable, ...) et de la version du générateur.
+Il est stocké dans listing_content_cache sous le sha256 de ces entrées, pour
+être réutilisé tel quel quand un produit inchangé repasse en génération.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.listing_content_cache import ListingContentCache
+from app.services.run_ledger import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+def compute_content_hash(payload: dict, generator_version: str) -> str:
+    """
+    Calcule l'empreinte des entrées de génération d'un listing.
+
+    Les IDs (produit, option) sont exclus : seules les données lues par le
+    générateur comptent, plus la marque par défaut et la version du générateur.
+
+    Args:
+        payload: Entrée build_generation_input().
+        generator_version: Version du générateur (backend.version).
+
+    Returns:
+        sha256 hexadécimal (64 caractères).
+    """
+    key = {
+        "candidate": {k: v for k, v in payload["candidate"].items() if k != "id"},
+        "option": {k: v for k, v in payload["option"].items() if k != "id"},
+        "brand_name": get_settings().DEFAULT_BRAND_NAME,
+        "version": generator_version,
+    }
+    serialized = json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ListingContentCacheService:
+    """Service de lecture/écriture du cache de contenu des listings."""
+
+    def __init__(self, db: Session):
+        """
+        Initialise le service.
+
+        Args:
+            db: Session SQLAlchemy pour la base de données.
+        """
+        self.db = db
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, dict]:
+        """
+        Récupère les contenus en cache et marque leur réutilisation.
+
+        Args:
+            content_hashes: Empreintes recherchées.
+
+        Returns:
+            Dictionnaire empreinte -> contenu (empreintes absentes du cache omises).
+        """
+        hashes = list(set(content_hashes))
+        if not hashes:
+            return {}
+
+        rows = (
+            self.db.query(ListingContentCache.content_hash, ListingContentCache.content)
+            .filter(ListingContentCache.content_hash.in_(hashes))
+            .all()
+        )
+        found = {content_hash: content for content_hash, content in rows}
+        record_cache("listing_content_cache", hits=len(found), misses=len(hashes) - len(found))
+
+        if found:
+            self.db.query(ListingContentCache).filter(
+                ListingContentCache.content_hash.in_(list(found))
+            ).update(
+                {ListingContentCache.last_used_at: datetime.utcnow()},
+                synchronize_session=False,
+            )
+
+        return found
+
+    def put_many(self, generator_version: str, contents: Dict[str, dict]) -> None:
+        """
+        Enregistre des contenus générés (les empreintes déjà présentes sont ignorées).
+
+        Pas de commit ici : l'appelant commit avec le reste de sa transaction.
+
+        Args:
+            generator_version: Version du générateur ayant produit les contenus.
+            contents: Dictionnaire empreinte -> contenu.
+        """
+        if not contents:
+            return
+
+        now = datetime.utcnow()
+        stmt = pg_insert(ListingContentCache).values(
+            [
+                {
+                    "content_hash": content_hash,
+                    "generator_version": generator_version,
+                    "content": content,
+                    "created_at": now,
+                    "last_used_at": now,
+                }
+                for content_hash, content in contents.items()
+            ]
+        )
+        self.db.execute(stmt.on_conflict_do_nothing(index_elements=["content_hash"]))
+        logger.debug(f"{len(contents)} contenu(s) de listing mis en cache")
@@ -0,0 +1,399 @@
+"""
+Backends d'exécution de la génération de listings (Modules D/E).
+
+La génération travaille sur des entrées/sorties sérialisables (dict JSON) afin
+de pouvoir tourner :
+- en ligne, dans le thread appelant (inline, comportement historique) ;
+- dans un pool de threads ou de processus (thread, process) ;
+- sur un serveur local de génération (http), ex: LLM ou moteur de templates.
+
+Les backends à pool bornent la concurrence (max_workers) et appliquent un
+timeout par produit : un produit trop lent est ignoré sans bloquer le lot.
+"""
+import logging
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+
+from app.core.config import get_settings
+from app.models.product_candidate import ProductCandidate
+from app.models.sourcing_option import SourcingOption
+from app.services.listing_generator_brandable import ListingGeneratorBrandable
+from app.services.listing_generator_non_brandable import ListingGeneratorNonBrandable
+
+logger = logging.getLogger(__name__)
+
+# Champs de ListingTemplate produits par la génération (hors clés étrangères)
+LISTING_CONTENT_FIELDS = [
+    "brandable",
+    "reference_asin",
+    "strategy",
+    "brand_name",
+    "title",
+    "bullets",
+    "description",
+    "search_terms",
+    "faq",
+    "status",
+    "marketplace",
+]
+
+# Version des générateurs à templates (à incrémenter à chaque modification du
+# contenu produit : invalide le cache de contenu des listings)
+TEMPLATE_GENERATOR_VERSION = "templates-1"
+
+# Générateurs réutilisés par processus (sans état)
+_generators: Dict[bool, object] = {}
+
+
+def build_generation_input(candidate: ProductCandidate, option: SourcingOption) -> dict:
+    """
+    Construit l'entrée sérialisable (JSON) de la génération d'un listing.
+
+    Seuls les attributs lus par les générateurs sont copiés (raw_keepa_data
+    réduit à ses "features").
+
+    Args:
+        candidate: Produit candidat.
+        option: Option de sourcing retenue.
+
+    Returns:
+        Dictionnaire {"candidate": {...}, "option": {...}}.
+    """
+    raw = candidate.raw_keepa_data if isinstance(candidate.raw_keepa_data, dict) else {}
+    return {
+        "candidate": {
+            "id": str(candidate.id),
+            "asin": candidate.asin,
+            "title": candidate.title,
+            "category": candidate.category,
+            "rating": float(candidate.rating) if candidate.rating is not None else None,
+            "reviews_count": candidate.reviews_count,
+            "features": raw.get("features"),
+        },
+        "option": {
+            "id": str(option.id),
+            "brandable": bool(option.brandable),
+        },
+    }
+
+
+def generate_listing_content(payload: dict) -> dict:
+    """
+    Génère le contenu d'un listing à partir d'une entrée build_generation_input().
+
+    Fonction de module (picklable) exécutée par les workers thread/process.
+
+    Args:
+        payload: Entrée sérialisable.
+
+    Returns:
+        Dictionnaire des champs LISTING_CONTENT_FIELDS.
+    """
+    data = payload["candidate"]
+    candidate = ProductCandidate(
+        id=UUID(data["id"]),
+        asin=data["asin"],
+        title=data["title"],
+        category=data["category"],
+        rating=Decimal(str(data["rating"])) if data["rating"] is not None else None,
+        reviews_count=data["reviews_count"],
+        raw_keepa_data={"features": data["features"]} if data["features"] else None,
+    )
+    option = SourcingOption(
+        id=UUID(payload["option"]["id"]),
+        brandable=payload["option"]["brandable"],
+    )
+
+    brandable = bool(option.brandable)
+    if brandable not in _generators:
+        _generators[brandable] = (
+            ListingGeneratorBrandable() if brandable else ListingGeneratorNonBrandable()
+        )
+
+    listing = _generators[brandable].generate(candidate, option)
+    return {field: getattr(listing, field) for field in LISTING_CONTENT_FIELDS}
+
+
+class ListingGeneratorBackend(ABC):
+    """Interface des backends de génération de listings."""
+
+    name = "base"
+    # Version du contenu produit (clé du cache de contenu des listings)
+    version = TEMPLATE_GENERATOR_VERSION
+
+    @abstractmethod
+    def generate_many(self, payloads: List[dict]) -> List[Optional[dict]]:
+        """
+        Génère le contenu de plusieurs listings.
+
+        Args:
+            payloads: Entrées build_generation_input().
+
+        Returns:
+            Contenus générés, dans l'ordre des entrées (None si erreur ou timeout).
+        """
+
+    def close(self) -> None:
+        """Libère les ressources du backend (pools de workers)."""
+
+
+class InlineListingBackend(ListingGeneratorBackend):
+    """Génération séquentielle dans le thread appelant (sans timeout)."""
+
+    name = "inline"
+
+    def generate_many(self, payloads: List[dict]) -> List[Optional[dict]]:
+        """Génère les listings un par un (voir ListingGeneratorBackend.generate_many)."""
+        results = []
+        for payload in payloads:
+            try:
+                results.append(generate_listing_content(payload))
+            except Exception as e:
+                logger.error(
+                    f"Erreur de génération pour {payload['candidate']['asin']}: {str(e)}",
+                    exc_info=True,
+                )
+                results.append(None)
+        return results
+
+
+class PoolListingBackend(ListingGeneratorBackend):
+    """
+    Génération dans un pool de workers, à concurrence bornée et timeout par produit.
+
+    Chaque appel de generate_many() a son propre pool (le backend est partagé
+    par le processus : aucun état entre deux jobs). Au plus max_workers produits
+    sont en cours à un instant donné. Un produit qui dépasse son timeout est
+    abandonné (résultat None) : le pool ne pouvant pas interrompre son worker,
+    la suite du lot passe sur un pool neuf et l'ancien est arrêté en fin d'appel,
+    processus bloqués compris (backend process).
+    """
+
+    def __init__(
+        self,
+        executor_factory: Callable[[int], Executor],
+        func: Callable[[dict], dict],
+        max_workers: int,
+        timeout_seconds: float,
+        name: str,
+        version: str = TEMPLATE_GENERATOR_VERSION,
+    ):
+        """
+        Initialise le backend.
+
+        Args:
+            executor_factory: Crée l'executor (ThreadPoolExecutor, ProcessPoolExecutor).
+            func: Fonction de génération exécutée par les workers.
+            max_workers: Nombre maximum de produits générés en parallèle.
+            timeout_seconds: Timeout par produit.
+            name: Nom du backend (logs).
+            version: Version du contenu produit (clé du cache).
+        """
+        self.executor_factory = executor_factory
+        self.func = func
+        self.max_workers = max(1, max_workers)
+        self.timeout_seconds = timeout_seconds
+        self.name = name
+        self.version = version
+
+    def generate_many(self, payloads: List[dict]) -> List[Optional[dict]]:
+        """Génère les listings en parallèle (voir ListingGeneratorBackend.generate_many)."""
+        results: List[Optional[dict]] = [None] * len(payloads)
+        if not payloads:
+            return results
+        queue = iter(enumerate(payloads))
+        in_flight = {}  # future -> (index, deadline)
+        executors = [self.executor_factory(self.max_workers)]  # dernier = pool courant
+        try:
+            self._generate(payloads, results, queue, in_flight, executors)
+        finally:
+            for executor in executors:
+                _stop_executor(executor)
+        return results
+
+    def _generate(self, payloads, results, queue, in_flight, executors) -> None:
+        """Boucle de soumission et d'attente des produits de generate_many()."""
+
+        def submit_next() -> None:
+            item = next(queue, None)
+            if item is not None:
+                index, payload = item
+                future = executors[-1].submit(self.func, payload)
+                in_flight[future] = (index, time.monotonic() + self.timeout_seconds)
+
+        for _ in range(self.max_workers):
+            submit_next()
+
+        while in_flight:
+            next_deadline = min(deadline for _, deadline in in_flight.values())
+            done, _ = wait(
+                in_flight,
+                timeout=max(0.0, next_deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+
+            for future in list(in_flight):
+                index, deadline = in_flight[future]
+                asin = payloads[index]["candidate"]["asin"]
+                if future in done:
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        logger.error(f"Erreur de génération pour {asin}: {str(e)}")
+                elif now >= deadline:
+                    logger.warning(
+                        f"Timeout de génération pour {asin} "
+                        f"({self.timeout_seconds}s, backend {self.name})"
+                    )
+                    # Worker bloqué : la suite du lot part sur un pool neuf
+                    executors.append(self.executor_factory(self.max_workers))
+                else:
+                    continue
+
+                del in_flight[future]
+                submit_next()
+
+
+def _stop_executor(executor: Executor) -> None:
+    """
+    Arrête un pool sans attendre ses tâches abandonnées.
+
+    Les processus d'un ProcessPoolExecutor sont terminés (worker bloqué) ; un
+    thread bloqué ne peut pas être interrompu et se termine avec sa tâche.
+    """
+    processes = []
+    if isinstance(executor, ProcessPoolExecutor):
+        # API privée avant Python 3.14 (terminate_workers), remise à None par shutdown()
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class HttpListingGenerator:
+    """Appel d'un serveur local de génération (POST {base_url}/generate)."""
+
+    def __init__(self, base_url: str, timeout_seconds: float):
+        """
+        Initialise le client.
+
+        Args:
+            base_url: URL du serveur de génération.
+            timeout_seconds: Timeout HTTP par produit.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+        self.client = httpx.Client(timeout=timeout_seconds)
+
+    def __call__(self, payload: dict) -> dict:
+        """
+        Génère un listing via le serveur.
+
+        Le serveur reçoit l'entrée build_generation_input() et renvoie un objet
+        JSON avec les champs LISTING_CONTENT_FIELDS.
+        """
+        response = self.client.post(f"{self.base_url}/generate", json=payload)
+        response.raise_for_status()
+        content = response.json()
+        return {field: content.get(field) for field in LISTING_CONTENT_FIELDS}
+
+
+def create_listing_generator_backend(
+    backend: str,
+    max_workers: int = 4,
+    timeout_seconds: float = 10.0,
+    url: Optional[str] = None,
+    version: Optional[str] = None,
+) -> ListingGeneratorBackend:
+    """
+    Crée un backend de génération de listings.
+
+    Args:
+        backend: "inline", "thread", "process" ou "http".
+        max_workers: Concurrence maximale (backends à pool).
+        timeout_seconds: Timeout par produit (backends à pool).
+        url: URL du serveur de génération (backend "http").
+        version: Version du contenu produit, si différente de la version par défaut
+            (ex: modèle servi par le serveur http).
+
+    Returns:
+        Instance de ListingGeneratorBackend.
+
+    Raises:
+        ValueError: Si le backend est inconnu ou si l'URL manque pour "http".
+    """
+    backend = backend.lower()
+    if backend == "inline":
+        instance = InlineListingBackend()
+    elif backend == "thread":
+        instance = PoolListingBackend(
+            lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="listing-gen"),
+            generate_listing_content,
+            max_workers,
+            timeout_seconds,
+            "thread",
+        )
+    elif backend == "process":
+        instance = PoolListingBackend(
+            lambda n: ProcessPoolExecutor(max_workers=n),
+            generate_listing_content,
+            max_workers,
+            timeout_seconds,
+            "process",
+        )
+    elif backend == "http":
+        if not url:
+            raise ValueError("LISTING_GENERATOR_URL est requis pour le backend 'http'")
+        instance = PoolListingBackend(
+            lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="listing-http"),
+            HttpListingGenerator(url, timeout_seconds),
+            max_workers,
+            timeout_seconds,
+            "http",
+            version=f"http:{url}",
+        )
+    else:
+        raise ValueError(f"Backend de génération de listings inconnu: {backend}")
+
+    if version:
+        instance.version = version
+    return instance
+
+
+# Instance singleton
+_listing_generator_backend: Optional[ListingGeneratorBackend] = None
+
+
+def get_listing_generator_backend() -> ListingGeneratorBackend:
+    """
+    Retourne le backend de génération configuré (LISTING_GENERATOR_*), en singleton.
+
+    Returns:
+        Instance de ListingGeneratorBackend.
+    """
+    global _listing_generator_backend
+    if _listing_generator_backend is None:
+        settings = get_settings()
+        _listing_generator_backend = create_listing_generator_backend(
+            settings.LISTING_GENERATOR_BACKEND,
+            max_workers=settings.LISTING_GENERATOR_MAX_WORKERS,
+            timeout_seconds=settings.LISTING_GENERATOR_TIMEOUT_SECONDS,
+            url=settings.LISTING_GENERATOR_URL,
+            version=settings.LISTING_GENERATOR_VERSION,
+        )
+        logger.info(f"Backend de génération de listings: {_listing_generator_backend.name}")
+    return _listing_generator_backend
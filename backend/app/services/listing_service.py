@@ -5,8 +5,10 @@ Orchestre la génération de listings brandables ou non-brandables
 pour les produits candidats.
 """
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
 
+from sqlalchemy import and_, insert
 from sqlalchemy.orm import Session
 
 from app.models.product_candidate import ProductCandidate
@@ -15,6 +17,13 @@ from app.models.product_score import ProductScore
 from app.models.listing_template import ListingTemplate
 from app.services.listing_generator_brandable import ListingGeneratorBrandable
 from app.services.listing_generator_non_brandable import ListingGeneratorNonBrandable
+from app.core.config import get_settings
+from app.services.listing_content_cache import ListingContentCacheService, compute_content_hash
+from app.services.listing_generation_backend import (
+    ListingGeneratorBackend,
+    build_generation_input,
+    get_listing_generator_backend,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,28 +31,35 @@ logger = logging.getLogger(__name__)
 class ListingService:
     """Service pour générer des listings de produits."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, generator_backend: Optional[ListingGeneratorBackend] = None):
         """
         Initialise le service.
 
         Args:
             db: Session SQLAlchemy pour la base de données.
+            generator_backend: Backend de génération par lots (None = backend configuré).
         """
         self.db = db
         self.generator_brandable = ListingGeneratorBrandable()
         self.generator_non_brandable = ListingGeneratorNonBrandable()
+        self.generator_backend = generator_backend or get_listing_generator_backend()
+        self.content_cache = (
+            ListingContentCacheService(db) if get_settings().LISTING_CONTENT_CACHE_ENABLED else None
+        )
 
     def generate_listing_for_candidate(
-        self, candidate: ProductCandidate
+        self, candidate: ProductCandidate, option: Optional[SourcingOption] = None
     ) -> Optional[ListingTemplate]:
         """
         Génère un listing pour un produit candidat.
 
-        Trouve la meilleure option de sourcing associée et génère
-        un listing brandable ou non-brandable selon l'option.
+        Trouve la meilleure option de sourcing associée (sauf si elle est fournie,
+        ex: préchargée par ListingJob) et génère un listing brandable ou
+        non-brandable selon l'option.
 
         Args:
             candidate: Produit candidat.
+            option: Option de sourcing déjà choisie (None = la rechercher).
 
         Returns:
             ListingTemplate créé (non persisté) ou None si aucune option trouvée.
@@ -51,7 +67,8 @@ class ListingService:
         logger.debug(f"Génération de listing pour {candidate.asin}")
 
         # Trouver la meilleure option de sourcing
-        option = self._find_best_sourcing_option(candidate)
+        if option is None:
+            option = self._find_best_sourcing_option(candidate)
 
         if not option:
             logger.warning(f"Aucune option de sourcing trouvée pour {candidate.asin}")
@@ -71,53 +88,143 @@ class ListingService:
         logger.debug(f"Listing généré pour {candidate.asin} (brandable={listing_template.brandable})")
         return listing_template
 
-    def _find_best_sourcing_option(
-        self, candidate: ProductCandidate
-    ) -> Optional[SourcingOption]:
+    def generate_listings(
+        self, pairs: List[Tuple[ProductCandidate, SourcingOption]]
+    ) -> Tuple[List[Optional[ListingTemplate]], int]:
         """
-        Trouve la meilleure option de sourcing pour un produit candidat.
+        Génère les listings d'un lot de couples (produit, option) via le backend configuré.
 
-        Priorité :
-        1. Option avec un score A_launch (si disponible)
-        2. Première option disponible
+        Le contenu des produits inchangés (même empreinte d'entrées et même version
+        de générateur) est repris du cache ; seuls les autres passent par le backend,
+        et leur contenu est mis en cache (sans commit).
 
         Args:
-            candidate: Produit candidat.
+            pairs: Couples (produit candidat, option de sourcing retenue).
 
         Returns:
-            Meilleure SourcingOption ou None si aucune trouvée.
+            Tuple (ListingTemplate créés (non persistés) dans l'ordre des couples,
+            None si la génération a échoué ou dépassé son timeout ; nombre de
+            listings repris du cache).
+        """
+        payloads = [build_generation_input(candidate, option) for candidate, option in pairs]
+        version = self.generator_backend.version
+        hashes = [compute_content_hash(payload, version) for payload in payloads]
+
+        cached = self.content_cache.get_many(hashes) if self.content_cache else {}
+        contents: List[Optional[dict]] = [cached.get(content_hash) for content_hash in hashes]
+        cache_hits = sum(1 for content in contents if content is not None)
+
+        # Générer uniquement les contenus absents du cache
+        missing = [i for i, content in enumerate(contents) if content is None]
+        if missing:
+            generated = self.generator_backend.generate_many([payloads[i] for i in missing])
+            new_entries = {}
+            for i, content in zip(missing, generated):
+                contents[i] = content
+                if content is not None:
+                    new_entries[hashes[i]] = content
+            if self.content_cache:
+                self.content_cache.put_many(version, new_entries)
+
+        if cache_hits:
+            logger.info(f"{cache_hits}/{len(pairs)} listing(s) repris du cache de contenu")
+
+        listings = [
+            ListingTemplate(
+                product_candidate_id=candidate.id,
+                sourcing_option_id=option.id,
+                **content,
+            )
+            if content is not None
+            else None
+            for (candidate, option), content in zip(pairs, contents)
+        ]
+        return listings, cache_hits
+
+    def find_best_sourcing_options(
+        self, candidate_ids: Iterable[UUID]
+    ) -> Dict[UUID, SourcingOption]:
+        """
+        Trouve en une requête la meilleure option de sourcing de chaque produit.
+
+        Priorité (par produit) :
+        1. Option avec le meilleur score A_launch (global_score décroissant)
+        2. Sinon, la première option créée
+
+        DISTINCT ON (product_candidate_id) sur les options, jointes à leurs scores
+        A_launch (LEFT JOIN) : 1 requête au lieu de 1 + N par produit.
+
+        Args:
+            candidate_ids: IDs des produits candidats.
+
+        Returns:
+            Dictionnaire product_candidate_id -> SourcingOption (produits sans option absents).
         """
-        # Récupérer toutes les options de sourcing pour ce produit
+        ids = list(candidate_ids)
+        if not ids:
+            return {}
+
         options = (
             self.db.query(SourcingOption)
-            .filter(SourcingOption.product_candidate_id == candidate.id)
+            .outerjoin(
+                ProductScore,
+                and_(
+                    ProductScore.sourcing_option_id == SourcingOption.id,
+                    ProductScore.product_candidate_id == SourcingOption.product_candidate_id,
+                    ProductScore.decision == "A_launch",
+                ),
+            )
+            .filter(SourcingOption.product_candidate_id.in_(ids))
+            .distinct(SourcingOption.product_candidate_id)
+            .order_by(
+                SourcingOption.product_candidate_id,
+                ProductScore.id.is_(None),
+                ProductScore.global_score.desc().nulls_last(),
+                SourcingOption.created_at,
+                SourcingOption.id,
+            )
             .all()
         )
 
-        if not options:
-            return None
+        return {option.product_candidate_id: option for option in options}
 
-        # Essayer de trouver une option avec un score A_launch
-        for option in options:
-            score = (
-                self.db.query(ProductScore)
-                .filter(
-                    ProductScore.product_candidate_id == candidate.id,
-                    ProductScore.sourcing_option_id == option.id,
-                    ProductScore.decision == "A_launch",
-                )
-                .order_by(ProductScore.global_score.desc().nulls_last())
-                .first()
-            )
+    def bulk_insert_listings(self, listings: List[ListingTemplate]) -> int:
+        """
+        Insère des listings générés en une seule instruction INSERT multi-lignes.
 
-            if score:
-                logger.debug(
-                    f"Option trouvée avec score A_launch: {option.supplier_name} "
-                    f"(score={score.global_score})"
-                )
-                return option
+        Les templates ne passent pas par l'identity map de la session ; les
+        colonnes laissées à None reçoivent leurs valeurs par défaut.
+        Pas de commit ici : l'appelant commit avec le reste de sa transaction.
 
-        # Sinon, retourner la première option disponible
-        logger.debug(f"Utilisation de la première option disponible: {options[0].supplier_name}")
-        return options[0]
+        Args:
+            listings: ListingTemplate générés (non persistés).
 
+        Returns:
+            Nombre de listings insérés.
+        """
+        if not listings:
+            return 0
+
+        columns = [column.key for column in ListingTemplate.__mapper__.column_attrs]
+        rows = [
+            {key: getattr(listing, key) for key in columns if getattr(listing, key) is not None}
+            for listing in listings
+        ]
+        self.db.execute(insert(ListingTemplate), rows)
+        return len(rows)
+
+    def _find_best_sourcing_option(
+        self, candidate: ProductCandidate
+    ) -> Optional[SourcingOption]:
+        """
+        Trouve la meilleure option de sourcing pour un produit candidat.
+
+        Voir find_best_sourcing_options() pour la priorité.
+
+        Args:
+            candidate: Produit candidat.
+
+        Returns:
+            Meilleure SourcingOption ou None si aucune trouvée.
+        """
+        return self.find_best_sourcing_options([candidate.id]).get(candidate.id)
@@ -0,0 +1,294 @@
+"""
+Cache disque des pages scrapées.
+
+Chaque page est stockée compressée (gzip) sous la clé sha256 de son URL, avec
+ses métadonnées (ETag, Last-Modified, date de récupération) dans un fichier
+JSON voisin. Une page plus jeune que le TTL est servie sans requête ; une page
+périmée portant un validateur est revalidée par requête conditionnelle
+(If-None-Match / If-Modified-Since). La taille totale est bornée : les pages
+les moins récemment utilisées sont évincées en premier.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Après éviction, la taille totale redescend sous cette fraction du maximum
+EVICTION_TARGET_RATIO = 0.9
+
+
+class PageCache:
+    """Cache disque de pages HTML, compressé, à TTL et taille bornée."""
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+        """
+        Initialise le cache.
+
+        Args:
+            directory: Répertoire de stockage (créé si absent).
+            ttl_seconds: Durée pendant laquelle une page est servie sans revalidation.
+            max_bytes: Taille maximale (compressée) de l'ensemble des pages.
+        """
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # clé -> [taille sur disque, dernière utilisation], chargé au premier accès
+        self._index: Optional[Dict[str, list]] = None
+        self._total_bytes = 0
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        """Compteurs d'utilisation du cache."""
+        return {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stored": 0,
+            "evicted": 0,
+            "bytes_saved": 0,
+        }
+
+    def reset_stats(self) -> Dict[str, int]:
+        """
+        Remet les compteurs à zéro (début d'un run).
+
+        Returns:
+            Compteurs avant remise à zéro.
+        """
+        with self._lock:
+            stats, self.stats = self.stats, self._empty_stats()
+        return stats
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retourne une copie des compteurs courants."""
+        with self._lock:
+            return dict(self.stats)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        """Clé de cache d'une URL."""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        """Chemins (page compressée, métadonnées) d'une clé."""
+        return self.directory / f"{key}.html.gz", self.directory / f"{key}.json"
+
+    def _load_index(self) -> Dict[str, list]:
+        """Construit l'index en mémoire depuis le répertoire (appelé sous verrou)."""
+        if self._index is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._index = {}
+            self._total_bytes = 0
+            for page_path in self.directory.glob("*.html.gz"):
+                try:
+                    stat = page_path.stat()
+                except OSError:
+                    continue
+                key = page_path.name[: -len(".html.gz")]
+                self._index[key] = [stat.st_size, stat.st_mtime]
+                self._total_bytes += stat.st_size
+        return self._index
+
+    def record(self, name: str, value: int = 1) -> None:
+        """Incrémente un compteur."""
+        with self._lock:
+            self.stats[name] += value
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Lit une page du cache.
+
+        Args:
+            url: URL de la page.
+
+        Returns:
+            {"html", "etag", "last_modified", "fetched_at", "fresh"} ou None si absente.
+            fresh indique que la page a moins de ttl_seconds et peut être servie telle quelle.
+        """
+        key = self._key(url)
+        page_path, meta_path = self._paths(key)
+        with self._lock:
+            if key not in self._load_index():
+                return None
+
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            with gzip.open(page_path, "rt", encoding="utf-8") as f:
+                html = f.read()
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"Entrée de cache illisible pour {url}, ignorée: {str(e)}")
+            self._remove(key)
+            return None
+
+        if meta.get("url") != url:
+            return None
+
+        now = time.time()
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = now
+        try:
+            os.utime(page_path, (now, now))
+        except OSError:
+            pass
+
+        return {
+            "html": html,
+            "etag": meta.get("etag"),
+            "last_modified": meta.get("last_modified"),
+            "fetched_at": meta.get("fetched_at", 0),
+            "fresh": now - meta.get("fetched_at", 0) < self.ttl_seconds,
+        }
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Enregistre une page (écriture atomique), puis évince si la taille maximale est dépassée.
+
+        Args:
+            url: URL de la page.
+            html: Contenu HTML.
+            etag: En-tête ETag de la réponse.
+            last_modified: En-tête Last-Modified de la réponse.
+        """
+        key = self._key(url)
+        page_path, meta_path = self._paths(key)
+        with self._lock:
+            self._load_index()
+
+        try:
+            tmp_page = page_path.with_name(f"{page_path.name}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_page, "wt", encoding="utf-8", compresslevel=6) as f:
+                f.write(html)
+            self._write_meta(meta_path, url, etag, last_modified)
+            os.replace(tmp_page, page_path)
+            size = page_path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire la page {url} dans le cache: {str(e)}")
+            return
+
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._index[key] = [size, time.time()]
+            self._total_bytes += size
+            self.stats["stored"] += 1
+            over_limit = self._total_bytes > self.max_bytes
+
+        if over_limit:
+            self._evict()
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Marque une page comme revalidée (réponse 304) : elle redevient fraîche pour un TTL.
+
+        Args:
+            url: URL de la page.
+            etag: Nouvel ETag éventuel.
+            last_modified: Nouveau Last-Modified éventuel.
+        """
+        _, meta_path = self._paths(self._key(url))
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self._write_meta(
+                meta_path,
+                url,
+                etag or meta.get("etag"),
+                last_modified or meta.get("last_modified"),
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Impossible de revalider la page {url} dans le cache: {str(e)}")
+
+    def _write_meta(
+        self, meta_path: Path, url: str, etag: Optional[str], last_modified: Optional[str]
+    ) -> None:
+        """Écrit les métadonnées d'une page (écriture atomique)."""
+        tmp_meta = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.tmp")
+        tmp_meta.write_text(
+            json.dumps(
+                {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "fetched_at": time.time(),
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_meta, meta_path)
+
+    def _remove(self, key: str) -> None:
+        """Supprime une entrée (fichiers et index)."""
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer {path}: {str(e)}")
+        with self._lock:
+            entry = self._index.pop(key, None) if self._index is not None else None
+            if entry:
+                self._total_bytes -= entry[0]
+
+    def _evict(self) -> None:
+        """Évince les pages les moins récemment utilisées jusqu'à EVICTION_TARGET_RATIO."""
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        with self._lock:
+            by_age = sorted(self._index.items(), key=lambda item: item[1][1])
+            victims = []
+            remaining = self._total_bytes
+            for key, (size, _) in by_age:
+                if remaining <= target:
+                    break
+                victims.append(key)
+                remaining -= size
+
+        for key in victims:
+            self._remove(key)
+
+        self.record("evicted", len(victims))
+        logger.info(f"Cache de pages: {len(victims)} page(s) évincée(s)")
+
+
+# Instance singleton
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Retourne le cache de pages configuré (SCRAPER_CACHE_*), en singleton.
+
+    Returns:
+        Instance de PageCache, ou None si le cache est désactivé.
+    """
+    global _page_cache
+    settings = get_settings()
+    if not settings.SCRAPER_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(
+                settings.SCRAPER_CACHE_DIR,
+                ttl_seconds=settings.SCRAPER_CACHE_TTL_SECONDS,
+                max_bytes=settings.SCRAPER_CACHE_MAX_MB * 1024 * 1024,
+            )
+    return _page_cache
@@ -0,0 +1,162 @@
+"""
+Événements du pipeline via Postgres LISTEN/NOTIFY.
+
+Les jobs publient les IDs des produits qu'ils viennent d'écrire :
+- products_upserted : produits créés ou modifiés par discover
+- options_created : produits ayant reçu des options de sourcing
+- scores_written : produits ayant reçu des scores
+
+Le listener (app.jobs.pipeline_listener) enchaîne alors les étapes suivantes
+sur ces seuls produits, sans attendre le cron n8n. Les notifications sont
+« au mieux » : perdues si aucun listener n'écoute, elles ne remplacent pas les
+runs complets, qui restent la source de vérité.
+"""
+import json
+import logging
+import select
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Canaux NOTIFY
+CHANNEL_PRODUCTS_UPSERTED = "products_upserted"
+CHANNEL_OPTIONS_CREATED = "options_created"
+CHANNEL_SCORES_WRITTEN = "scores_written"
+CHANNELS = (CHANNEL_PRODUCTS_UPSERTED, CHANNEL_OPTIONS_CREATED, CHANNEL_SCORES_WRITTEN)
+
+# IDs par notification (UUID ~40 octets en JSON, charge utile NOTIFY limitée à 8000 octets)
+MAX_IDS_PER_NOTIFICATION = 150
+
+
+def encode_payloads(ids: Iterable) -> List[str]:
+    """
+    Découpe des IDs en charges utiles NOTIFY (JSON {"ids": [...]}).
+
+    Args:
+        ids: IDs (UUID ou chaînes), dédoublonnés dans l'ordre.
+
+    Returns:
+        Charges utiles, chacune sous la limite de taille de NOTIFY.
+    """
+    unique_ids = list(dict.fromkeys(str(item) for item in ids))
+    return [
+        json.dumps({"ids": unique_ids[i:i + MAX_IDS_PER_NOTIFICATION]})
+        for i in range(0, len(unique_ids), MAX_IDS_PER_NOTIFICATION)
+    ]
+
+
+def decode_payload(payload: str) -> List[str]:
+    """
+    Relit les IDs d'une charge utile NOTIFY (charge invalide = aucun ID).
+
+    Args:
+        payload: Charge utile reçue.
+
+    Returns:
+        Liste des IDs.
+    """
+    try:
+        ids = json.loads(payload).get("ids", [])
+    except (ValueError, AttributeError):
+        logger.warning(f"Notification illisible ignorée: {payload[:200]}")
+        return []
+    return [str(item) for item in ids]
+
+
+def publish(db: Session, channel: str, ids: Iterable) -> int:
+    """
+    Publie des IDs sur un canal (pg_notify puis commit : livrés au commit).
+
+    Une erreur de publication est journalisée sans interrompre le job.
+
+    Args:
+        db: Session SQLAlchemy (dont les écritures sont déjà commitées).
+        channel: Canal (CHANNELS).
+        ids: IDs des produits concernés.
+
+    Returns:
+        Nombre de notifications envoyées.
+    """
+    if not get_settings().PIPELINE_EVENTS_ENABLED:
+        return 0
+    payloads = encode_payloads(ids)
+    if not payloads:
+        return 0
+    try:
+        for payload in payloads:
+            db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": channel, "payload": payload},
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erreur lors de la publication sur {channel}: {str(e)}", exc_info=True)
+        return 0
+    return len(payloads)
+
+
+class PipelineEventListener:
+    """Écoute les canaux du pipeline sur une connexion dédiée (LISTEN)."""
+
+    def __init__(self, bind: Engine = engine, channels: Iterable[str] = CHANNELS):
+        """
+        Initialise l'écoute.
+
+        Args:
+            bind: Engine pour la connexion d'écoute.
+            channels: Canaux écoutés (CHANNELS).
+        """
+        self.bind = bind
+        self.channels = [channel for channel in channels if channel in CHANNELS]
+        self._connection = None
+
+    def start(self) -> None:
+        """Ouvre la connexion d'écoute (autocommit) et s'abonne aux canaux."""
+        self.close()
+        self._connection = self.bind.raw_connection()
+        driver_connection = self._connection.driver_connection
+        driver_connection.autocommit = True
+        with driver_connection.cursor() as cursor:
+            for channel in self.channels:
+                # Noms de canaux issus de CHANNELS : pas d'injection possible
+                cursor.execute(f"LISTEN {channel}")
+        logger.info(f"Écoute des canaux: {', '.join(self.channels)}")
+
+    def poll(self, timeout: float) -> List[Tuple[str, List[str]]]:
+        """
+        Attend des notifications pendant au plus timeout secondes.
+
+        Args:
+            timeout: Attente maximale en secondes.
+
+        Returns:
+            Liste de (canal, IDs) reçus (vide si rien n'est arrivé).
+        """
+        if self._connection is None:
+            self.start()
+        driver_connection = self._connection.driver_connection
+        if select.select([driver_connection], [], [], timeout) == ([], [], []):
+            return []
+        driver_connection.poll()
+        events = []
+        while driver_connection.notifies:
+            notification = driver_connection.notifies.pop(0)
+            events.append((notification.channel, decode_payload(notification.payload)))
+        return events
+
+    def close(self) -> None:
+        """Ferme la connexion d'écoute."""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
@@ -0,0 +1,296 @@
+"""
+Planificateur des rafraîchissements Keepa par ASIN.
+
+Chaque ASIN a une échéance (asin_refresh_schedule.next_due_at). L'intervalle
+dépend de la décision de scoring (ou du statut du produit), raccourci pour
+les prix volatils et les profits/jour élevés. À chaque run, seuls les ASINs
+échus sont candidats, triés par valeur (profit/jour, décision, retard) et
+limités au budget de tokens Keepa.
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.asin_refresh_schedule import AsinRefreshSchedule
+from app.models.product_candidate import ProductCandidate
+from app.models.winner import Winner
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de base (heures) par décision de scoring
+DECISION_INTERVAL_HOURS = {
+    "A_launch": 12,
+    "B_review": 48,
+    "C_drop": 14 * 24,
+}
+
+# Intervalle de base (heures) par statut, pour les produits sans décision
+STATUS_INTERVAL_HOURS = {
+    "launched": 12,
+    "selected": 12,
+    "scored": 72,
+    "rejected": 14 * 24,
+    "new": 24,
+}
+DEFAULT_INTERVAL_HOURS = 24
+
+# Poids d'un rafraîchissement par décision (ordre de priorité à valeur égale)
+DECISION_WEIGHT = {
+    "A_launch": 4.0,
+    "B_review": 2.0,
+    "C_drop": 0.25,
+}
+DEFAULT_WEIGHT = 1.0
+
+# Bornes de l'intervalle (heures)
+MIN_INTERVAL_HOURS = 6
+MAX_INTERVAL_HOURS = 30 * 24
+
+# Lissage de la volatilité et influence sur l'intervalle
+VOLATILITY_SMOOTHING = 0.3
+VOLATILITY_FACTOR = 5.0
+# Profit/jour (EUR) divisant l'intervalle par deux
+PROFIT_HALF_INTERVAL = 20.0
+
+# Taille des lots d'ASINs pour les requêtes IN
+QUERY_CHUNK_SIZE = 1000
+
+
+def compute_interval_hours(
+    status: Optional[str],
+    decision: Optional[str],
+    volatility: float,
+    profit_per_day: Optional[float],
+) -> float:
+    """
+    Intervalle de rafraîchissement d'un ASIN.
+
+    Args:
+        status: Statut du produit candidat (None si pas encore en base).
+        decision: Décision du meilleur score (None si non scoré).
+        volatility: Volatilité lissée du prix (variation relative, 0 = stable).
+        profit_per_day: Profit/jour approximatif (EUR).
+
+    Returns:
+        Intervalle en heures, borné à [MIN_INTERVAL_HOURS, MAX_INTERVAL_HOURS].
+    """
+    if decision in DECISION_INTERVAL_HOURS:
+        hours = DECISION_INTERVAL_HOURS[decision]
+    else:
+        hours = STATUS_INTERVAL_HOURS.get(status, DEFAULT_INTERVAL_HOURS)
+
+    hours /= 1 + VOLATILITY_FACTOR * max(volatility, 0.0)
+    if profit_per_day and profit_per_day > 0:
+        hours /= 1 + profit_per_day / PROFIT_HALF_INTERVAL
+    return min(max(hours, MIN_INTERVAL_HOURS), MAX_INTERVAL_HOURS)
+
+
+def refresh_value(
+    decision: Optional[str],
+    profit_per_day: Optional[float],
+    overdue_hours: float,
+    interval_hours: float,
+) -> float:
+    """
+    Valeur d'un rafraîchissement (plus haut = plus prioritaire).
+
+    Args:
+        decision: Décision du meilleur score (None si non scoré).
+        profit_per_day: Profit/jour approximatif (EUR).
+        overdue_hours: Retard sur l'échéance (heures, 0 si jamais planifié).
+        interval_hours: Intervalle de rafraîchissement de l'ASIN.
+
+    Returns:
+        Valeur relative du rafraîchissement.
+    """
+    weight = DECISION_WEIGHT.get(decision, DEFAULT_WEIGHT)
+    profit = max(profit_per_day or 0.0, 0.0)
+    staleness = 1 + max(overdue_hours, 0.0) / max(interval_hours, 1.0)
+    return weight * (1 + profit) * staleness
+
+
+class RefreshScheduler:
+    """Sélection et replanification des ASINs à rafraîchir depuis Keepa."""
+
+    def __init__(self, db: Session):
+        """
+        Initialise le planificateur.
+
+        Args:
+            db: Session SQLAlchemy pour la base de données.
+        """
+        self.db = db
+
+    def _load_context(self, marketplace: str, asins: List[str]) -> Dict[str, dict]:
+        """
+        Charge échéance, statut, décision et profit/jour pour une liste d'ASINs.
+
+        Args:
+            marketplace: Code du marché.
+            asins: ASINs concernés.
+
+        Returns:
+            Dictionnaire {asin: {"schedule", "status", "decision", "profit_per_day"}}.
+        """
+        context = {asin: {"schedule": None, "status": None, "decision": None,
+                          "profit_per_day": None} for asin in asins}
+
+        for i in range(0, len(asins), QUERY_CHUNK_SIZE):
+            chunk = asins[i:i + QUERY_CHUNK_SIZE]
+            schedules = (
+                self.db.query(AsinRefreshSchedule)
+                .filter(
+                    AsinRefreshSchedule.marketplace == marketplace,
+                    AsinRefreshSchedule.asin.in_(chunk),
+                )
+                .all()
+            )
+            for schedule in schedules:
+                context[schedule.asin]["schedule"] = schedule
+
+            products = (
+                self.db.query(
+                    ProductCandidate.asin,
+                    ProductCandidate.status,
+                    Winner.decision,
+                    Winner.approx_profit_per_day,
+                )
+                .outerjoin(Winner, Winner.product_candidate_id == ProductCandidate.id)
+                .filter(ProductCandidate.asin.in_(chunk))
+                .all()
+            )
+            for asin, status, decision, profit in products:
+                context[asin].update(
+                    status=status,
+                    decision=decision,
+                    profit_per_day=float(profit) if profit is not None else None,
+                )
+
+        return context
+
+    def select_due(
+        self,
+        marketplace: str,
+        asins: Iterable[str],
+        token_budget: int,
+        tokens_per_asin: int = 1,
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """
+        Sélectionne les ASINs échus les plus intéressants dans la limite du budget.
+
+        Les ASINs jamais planifiés sont toujours échus.
+
+        Args:
+            marketplace: Code du marché.
+            asins: ASINs connus pour ce marché.
+            token_budget: Budget de tokens Keepa du run.
+            tokens_per_asin: Coût Keepa d'un ASIN.
+            now: Instant de référence (UTC, maintenant par défaut).
+
+        Returns:
+            ASINs à rafraîchir, du plus au moins prioritaire.
+        """
+        now = now or datetime.utcnow()
+        asin_list = sorted(set(asins))
+        context = self._load_context(marketplace, asin_list)
+
+        candidates = []
+        for asin, info in context.items():
+            schedule = info["schedule"]
+            if schedule is None:
+                overdue_hours = 0.0
+                interval = compute_interval_hours(
+                    info["status"], info["decision"], 0.0, info["profit_per_day"]
+                )
+            elif schedule.next_due_at <= now:
+                overdue_hours = (now - schedule.next_due_at).total_seconds() / 3600
+                interval = float(schedule.refresh_interval_hours)
+            else:
+                continue
+            value = refresh_value(info["decision"], info["profit_per_day"], overdue_hours, interval)
+            candidates.append((value, asin))
+
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        capacity = max(token_budget // max(tokens_per_asin, 1), 0)
+        selected = [asin for _, asin in candidates[:capacity]]
+
+        logger.info(
+            f"Planificateur {marketplace}: {len(asin_list)} ASINs connus, "
+            f"{len(candidates)} échus, {len(selected)} sélectionnés "
+            f"(budget {token_budget} tokens)"
+        )
+        return selected
+
+    def record_refreshes(
+        self,
+        marketplace: str,
+        prices: Dict[str, Optional[Decimal]],
+        now: Optional[datetime] = None,
+    ) -> int:
+        """
+        Replanifie des ASINs qui viennent d'être rafraîchis (INSERT ... ON CONFLICT).
+
+        La volatilité est mise à jour avec la variation relative du prix, puis la
+        prochaine échéance est recalculée. Pas de commit ici.
+
+        Args:
+            marketplace: Code du marché.
+            prices: {asin: prix observé (None si Keepa n'a rien renvoyé)}.
+            now: Instant du rafraîchissement (UTC, maintenant par défaut).
+
+        Returns:
+            Nombre d'ASINs replanifiés.
+        """
+        if not prices:
+            return 0
+
+        now = now or datetime.utcnow()
+        context = self._load_context(marketplace, sorted(prices))
+
+        rows = []
+        for asin, price in prices.items():
+            info = context[asin]
+            schedule = info["schedule"]
+            volatility = float(schedule.price_volatility) if schedule else 0.0
+            last_price = schedule.last_price if schedule else None
+            if price is not None and last_price:
+                change = abs(float(price) - float(last_price)) / float(last_price)
+                volatility = (1 - VOLATILITY_SMOOTHING) * volatility + VOLATILITY_SMOOTHING * change
+            volatility = min(volatility, 99.0)
+
+            interval = compute_interval_hours(
+                info["status"], info["decision"], volatility, info["profit_per_day"]
+            )
+            rows.append(
+                {
+                    "asin": asin,
+                    "marketplace": marketplace,
+                    "next_due_at": now + timedelta(hours=interval),
+                    "last_refreshed_at": now,
+                    "refresh_interval_hours": round(interval, 2),
+                    "last_price": price if price is not None else last_price,
+                    "price_volatility": round(volatility, 4),
+                }
+            )
+
+        table = AsinRefreshSchedule.__table__
+        for i in range(0, len(rows), QUERY_CHUNK_SIZE):
+            stmt = pg_insert(table).values(rows[i:i + QUERY_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.asin, table.c.marketplace],
+                set_={
+                    "next_due_at": stmt.excluded.next_due_at,
+                    "last_refreshed_at": stmt.excluded.last_refreshed_at,
+                    "refresh_interval_hours": stmt.excluded.refresh_interval_hours,
+                    "last_price": stmt.excluded.last_price,
+                    "price_volatility": stmt.excluded.price_volatility,
+                },
+            )
+            self.db.execute(stmt)
+
+        return len(rows)
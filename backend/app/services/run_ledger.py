@@ -0,0 +1,384 @@
+"""
+Registre des exécutions de jobs : mesures par exécution et par étape.
+
+Chaque exécution lancée via SingleFlight (app.services.job_lock) active un
+RunMetrics ; tout ce qui se passe dans son contexte y est compté, par étape :
+
+- durée de l'étape (stage()) ;
+- temps SQL, nombre de requêtes, lignes lues et écrites (événements de l'engine) ;
+- appels HTTP par service externe (InstrumentedClient : keepa, spapi, apify, scraper) ;
+- tokens Keepa consommés (record_keepa_tokens) ;
+- hits/misses des caches (record_cache).
+
+À la fin de l'exécution, les mesures sont écrites dans job_run_stages. Hors
+d'une exécution (CLI, tests), seules les métriques Prometheus du processus
+(app.core.metrics) sont alimentées.
+
+L'étape active est portée par une ContextVar : elle suit les await, mais pas
+les threads d'un executor ; envelopper les tâches avec bind_context().
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.database import engine
+from app.core.metrics import (
+    CACHE_REQUESTS,
+    JOB_STAGE_DURATION,
+    KEEPA_TOKENS,
+    UPSTREAM_HTTP_DURATION,
+    UPSTREAM_HTTP_ERRORS,
+)
+from app.models.job_run_stage import JobRunStage
+
+logger = logging.getLogger(__name__)
+
+# Services externes suivis (nom passé à InstrumentedClient)
+UPSTREAM_KEEPA = "keepa"
+UPSTREAM_SPAPI = "spapi"
+UPSTREAM_APIFY = "apify"
+UPSTREAM_SCRAPER = "scraper"
+
+# Étape active du contexte courant (None hors d'une exécution mesurée)
+_active_stage: contextvars.ContextVar[Optional["StageMetrics"]] = contextvars.ContextVar(
+    "run_ledger_stage", default=None
+)
+
+
+class StageMetrics:
+    """Compteurs d'une étape (mis à jour sous le verrou de l'exécution)."""
+
+    def __init__(self, run: "RunMetrics", name: str):
+        self.run = run
+        self.name = name
+        self.started_at = datetime.utcnow()
+        self.wall_ms = 0.0
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.http_calls: Dict[str, Dict[str, float]] = {}
+        self.keepa_tokens = 0
+        self.cache: Dict[str, Dict[str, int]] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Mesures de l'étape sous forme de dictionnaire."""
+        return {
+            "stage": self.name,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_ms, 1),
+            "db_ms": round(self.db_ms, 1),
+            "db_queries": self.db_queries,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "http_calls": {
+                upstream: {**calls, "ms": round(calls["ms"], 1)}
+                for upstream, calls in self.http_calls.items()
+            },
+            "keepa_tokens": self.keepa_tokens,
+            "cache": {name: dict(counts) for name, counts in self.cache.items()},
+        }
+
+
+class RunMetrics:
+    """Mesures d'une exécution de job, regroupées par étape."""
+
+    def __init__(self, job_type: str):
+        """
+        Initialise les mesures.
+
+        Args:
+            job_type: Type du job (nom de l'étape racine).
+        """
+        self.job_type = job_type
+        self.stages: Dict[str, StageMetrics] = {}
+        self.lock = threading.Lock()
+
+    def stage_for(self, name: str) -> StageMetrics:
+        """Étape de ce nom (créée au premier usage, cumulée ensuite)."""
+        with self.lock:
+            metrics = self.stages.get(name)
+            if metrics is None:
+                metrics = StageMetrics(self, name)
+                self.stages[name] = metrics
+            return metrics
+
+    @contextmanager
+    def activate(self) -> Iterator["RunMetrics"]:
+        """Active les mesures dans le contexte courant (étape racine = type du job)."""
+        token = _active_stage.set(self.stage_for(self.job_type))
+        try:
+            with stage(self.job_type):
+                yield self
+        finally:
+            _active_stage.reset(token)
+
+    def to_rows(self, job_run_id: UUID) -> List[JobRunStage]:
+        """
+        Lignes job_run_stages de l'exécution.
+
+        Args:
+            job_run_id: Identifiant de l'exécution.
+
+        Returns:
+            Une ligne par étape.
+        """
+        with self.lock:
+            stages = [metrics.as_dict() for metrics in self.stages.values()]
+        return [
+            JobRunStage(
+                job_run_id=job_run_id,
+                **{
+                    **values,
+                    "http_calls": values["http_calls"] or None,
+                    "cache": values["cache"] or None,
+                },
+            )
+            for values in stages
+        ]
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Compte ce qui s'exécute dans le bloc dans l'étape `name` de l'exécution courante.
+
+    Les compteurs vont à l'étape la plus interne ; la durée d'une étape inclut
+    celle de ses sous-étapes. Sans exécution active, ne fait rien.
+
+    Args:
+        name: Nom de l'étape (ex. "discover", "sourcing").
+    """
+    current = _active_stage.get()
+    if current is None:
+        yield
+        return
+    metrics = current.run.stage_for(name)
+    token = _active_stage.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with metrics.run.lock:
+            metrics.wall_ms += elapsed * 1000
+        JOB_STAGE_DURATION.labels(name).observe(elapsed)
+        _active_stage.reset(token)
+
+
+def bind_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Enveloppe fn pour l'exécuter, dans un thread d'executor, avec le contexte
+    (étape active) de l'appelant.
+
+    Args:
+        fn: Fonction soumise à l'executor.
+
+    Returns:
+        Fonction à soumettre à la place de fn.
+    """
+    context = contextvars.copy_context()
+
+    def run_in_context(*args, **kwargs):
+        # Une copie par appel : un même contexte ne peut être entré que par un thread à la fois
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run_in_context
+
+
+def record_http(upstream: str, elapsed_seconds: float, error: bool = False) -> None:
+    """
+    Compte un appel HTTP vers un service externe.
+
+    Args:
+        upstream: Service (UPSTREAM_*).
+        elapsed_seconds: Durée de l'appel.
+        error: True si l'appel a échoué (erreur réseau ou statut >= 400).
+    """
+    UPSTREAM_HTTP_DURATION.labels(upstream).observe(elapsed_seconds)
+    if error:
+        UPSTREAM_HTTP_ERRORS.labels(upstream).inc()
+    metrics = _active_stage.get()
+    if metrics is None:
+        return
+    with metrics.run.lock:
+        calls = metrics.http_calls.setdefault(upstream, {"calls": 0, "errors": 0, "ms": 0.0})
+        calls["calls"] += 1
+        calls["errors"] += int(error)
+        calls["ms"] += elapsed_seconds * 1000
+
+
+def record_keepa_tokens(tokens: Optional[int]) -> None:
+    """
+    Compte des tokens Keepa consommés (champ tokensConsumed des réponses).
+
+    Args:
+        tokens: Tokens consommés (None ignoré).
+    """
+    if not tokens:
+        return
+    KEEPA_TOKENS.inc(tokens)
+    metrics = _active_stage.get()
+    if metrics is None:
+        return
+    with metrics.run.lock:
+        metrics.keepa_tokens += int(tokens)
+
+
+def record_cache(name: str, hits: int = 0, misses: int = 0) -> None:
+    """
+    Compte des hits/misses d'un cache.
+
+    Args:
+        name: Nom du cache (ex. "page_cache", "listing_content_cache").
+        hits: Lectures servies par le cache.
+        misses: Lectures absentes du cache.
+    """
+    if hits:
+        CACHE_REQUESTS.labels(name, "hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(name, "miss").inc(misses)
+    metrics = _active_stage.get()
+    if metrics is None or not (hits or misses):
+        return
+    with metrics.run.lock:
+        counts = metrics.cache.setdefault(name, {"hits": 0, "misses": 0})
+        counts["hits"] += hits
+        counts["misses"] += misses
+
+
+def _record_query(elapsed_seconds: float, statement: str, rowcount: int) -> None:
+    """Compte une requête SQL (SELECT : lignes lues, INSERT/UPDATE/DELETE : lignes écrites)."""
+    metrics = _active_stage.get()
+    if metrics is None:
+        return
+    verb = statement.lstrip()[:6].upper()
+    with metrics.run.lock:
+        metrics.db_ms += elapsed_seconds * 1000
+        metrics.db_queries += 1
+        if rowcount > 0:
+            if verb.startswith(("SELECT", "WITH")):
+                metrics.rows_read += rowcount
+            elif verb in ("INSERT", "UPDATE", "DELETE"):
+                metrics.rows_written += rowcount
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _active_stage.get() is not None:
+        context._run_ledger_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_run_ledger_started", None)
+    if started is None:
+        return
+    _record_query(time.perf_counter() - started, statement, cursor.rowcount)
+
+
+def instrument_engine(bind: Engine) -> None:
+    """Mesure le temps SQL et les lignes lues/écrites des requêtes d'un engine."""
+    if not event.contains(bind, "before_cursor_execute", _before_cursor_execute):
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+
+
+instrument_engine(engine)
+
+
+class InstrumentedClient(httpx.Client):
+    """
+    Client httpx qui compte ses appels (durée, erreurs) pour un service externe.
+
+    S'utilise comme httpx.Client : InstrumentedClient(UPSTREAM_KEEPA, timeout=30.0).
+    """
+
+    def __init__(self, upstream: str, **kwargs):
+        """
+        Initialise le client.
+
+        Args:
+            upstream: Service appelé (UPSTREAM_*).
+            **kwargs: Arguments de httpx.Client.
+        """
+        super().__init__(**kwargs)
+        self.upstream = upstream
+
+    def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Envoie la requête et compte l'appel (erreur réseau ou statut >= 400 = erreur)."""
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except httpx.HTTPError:
+            record_http(self.upstream, time.perf_counter() - started, error=True)
+            raise
+        record_http(
+            self.upstream, time.perf_counter() - started, error=response.status_code >= 400
+        )
+        return response
+
+
+def summarize_stages(
+    totals: List[Dict[str, Any]],
+    http_calls: List[Dict[str, Any]],
+    caches: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Met en forme les mesures d'étapes agrégées en SQL par jour, type de job et étape.
+
+    Args:
+        totals: Une ligne par (day, job_type, stage) : runs, wall_ms_total,
+            wall_ms_max, db_ms_total, rows_read, rows_written, keepa_tokens.
+        http_calls: Une ligne par (day, job_type, stage, upstream) : calls, errors, ms.
+        caches: Une ligne par (day, job_type, stage, name) : hits, misses.
+
+    Returns:
+        Une entrée par (jour, job_type, étape), triée par jour : nombre de runs,
+        durées moyenne et max, temps SQL moyen, lignes, tokens Keepa, appels
+        HTTP par service (durée moyenne) et taux de hit par cache.
+    """
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for row in totals:
+        runs = row["runs"]
+        groups[(row["day"], row["job_type"], row["stage"])] = {
+            "day": row["day"],
+            "job_type": row["job_type"],
+            "stage": row["stage"],
+            "runs": runs,
+            "wall_ms_avg": round((row["wall_ms_total"] or 0.0) / runs, 1),
+            "wall_ms_max": round(row["wall_ms_max"] or 0.0, 1),
+            "db_ms_avg": round((row["db_ms_total"] or 0.0) / runs, 1),
+            "rows_read": int(row["rows_read"] or 0),
+            "rows_written": int(row["rows_written"] or 0),
+            "keepa_tokens": int(row["keepa_tokens"] or 0),
+            "http_calls": {},
+            "cache_hit_rate": {},
+        }
+
+    for row in http_calls:
+        group = groups.get((row["day"], row["job_type"], row["stage"]))
+        if group is None:
+            continue
+        calls = int(row["calls"] or 0)
+        group["http_calls"][row["upstream"]] = {
+            "calls": calls,
+            "errors": int(row["errors"] or 0),
+            "avg_ms": round((row["ms"] or 0.0) / calls, 1) if calls else 0.0,
+        }
+
+    for row in caches:
+        group = groups.get((row["day"], row["job_type"], row["stage"]))
+        lookups = (row["hits"] or 0) + (row["misses"] or 0)
+        if group is None or not lookups:
+            continue
+        group["cache_hit_rate"][row["name"]] = round((row["hits"] or 0) / lookups, 4)
+
+    return [groups[key] for key in sorted(groups)]
@@ -14,7 +14,7 @@ import logging
 import yaml
 from decimal import Decimal
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
@@ -56,6 +56,48 @@ class ScoringService:
         self.profit_model_service = get_profit_model_service()
         self.settings = get_settings()
 
+    def prefetch_selling_prices(self, asins: Iterable[str]) -> Dict[str, dict]:
+        """
+        Précharge les prix de vente d'un lot de produits avant leur scoring.
+
+        SP-API est interrogée pour chaque ASIN (si configurée), puis les ASINs
+        sans prix SP-API sont scrapés en parallèle (ScraperClient.scrape_prices)
+        au lieu d'une page à la fois pendant le scoring.
+
+        Le service est partagé par le processus (get_scoring_service()) : les prix
+        sont retournés à l'appelant, qui les passe à score_product_option(), et
+        non gardés sur le service (jobs de scoring concurrents).
+
+        Args:
+            asins: ASINs des produits à scorer (doublons ignorés).
+
+        Returns:
+            Dictionnaire asin -> {"spapi_pricing": résultat SP-API ou None,
+            "scraper_price": prix scrapé ou None (seulement si scrapé)}.
+        """
+        prefetched: Dict[str, dict] = {}
+
+        missing = []
+        for asin in dict.fromkeys(asins):
+            pricing = None
+            if self.spapi_client.is_configured:
+                pricing = self.spapi_client.get_pricing_for_asin(
+                    asin, marketplace_id=self.settings.SPAPI_MARKETPLACE_ID_FR
+                )
+            prefetched[asin] = {"spapi_pricing": pricing}
+            if pricing and (
+                pricing.get("buybox_price")
+                or pricing.get("lowest_fba_price")
+                or pricing.get("lowest_fbm_price")
+            ):
+                continue
+            missing.append(asin)
+
+        if missing:
+            for asin, price in self.scraper_client.scrape_prices(missing).items():
+                prefetched[asin]["scraper_price"] = price
+        return prefetched
+
     def _load_fees_config(self) -> dict:
         """Charge la configuration des frais depuis fees.yml."""
         if self._fees_config is not None:
@@ -110,6 +152,7 @@ class ScoringService:
         self,
         candidate: ProductCandidate,
         option: SourcingOption,
+        prefetched_prices: Optional[Dict[str, dict]] = None,
     ) -> ProductScore:
         """
         Calcule le score de rentabilité pour une combinaison produit + option de sourcing.
@@ -117,6 +160,8 @@ class ScoringService:
         Args:
             candidate: Produit candidat.
             option: Option de sourcing.
+            prefetched_prices: Prix préchargés par prefetch_selling_prices() (sinon,
+                récupération unitaire).
 
         Returns:
             ProductScore avec tous les calculs effectués.
@@ -142,11 +187,15 @@ class ScoringService:
         selling_price_target = None
         price_source = None
         
-        # 1) Première source : SP-API (competitive pricing)
-        spapi_pricing = self.spapi_client.get_pricing_for_asin(
-            candidate.asin,
-            marketplace_id=self.settings.SPAPI_MARKETPLACE_ID_FR
-        )
+        # 1) Première source : SP-API (competitive pricing), préchargée si possible
+        prefetched = (prefetched_prices or {}).get(candidate.asin, {})
+        if "spapi_pricing" in prefetched:
+            spapi_pricing = prefetched["spapi_pricing"]
+        else:
+            spapi_pricing = self.spapi_client.get_pricing_for_asin(
+                candidate.asin,
+                marketplace_id=self.settings.SPAPI_MARKETPLACE_ID_FR
+            )
         
         if spapi_pricing:
             # Priorité : buybox_price > lowest_fba_price > lowest_fbm_price
@@ -162,7 +211,10 @@ class ScoringService:
         
         # 2) Fallback : Scraper HTML Amazon FR
         if selling_price_target is None:
-            scraper_price = self.scraper_client.scrape_price_for_product(candidate.asin)
+            if "scraper_price" in prefetched:
+                scraper_price = prefetched["scraper_price"]
+            else:
+                scraper_price = self.scraper_client.scrape_price_for_product(candidate.asin)
             if scraper_price and scraper_price > 0:
                 selling_price_target = scraper_price
                 price_source = "SCRAPER"
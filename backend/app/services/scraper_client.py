@@ -2,28 +2,157 @@
 Client scraper Amazon FR maison - Scraping direct sans dépendance externe.
 
 Scrape les pages Amazon pour extraire des ASINs et des prix.
+
+Les requêtes passent par un client HTTP partagé (pool de connexions keep-alive,
+HTTP/2 si le paquet h2 est installé), limité par hôte (token bucket) et relancé
+avec backoff exponentiel + jitter sur 503/429 et pages captcha.
 """
+import importlib.util
 import logging
-import re
-from typing import List, Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
 from decimal import Decimal
 import httpx
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
+
+from app.core.config import get_settings
+from app.services.amazon_html_extractor import extract_asins, extract_price
+from app.services.page_cache import PageCache, get_page_cache
+from app.services.run_ledger import UPSTREAM_SCRAPER, InstrumentedClient, bind_context, record_cache
 
 logger = logging.getLogger(__name__)
 
+# Codes HTTP relancés (surcharge / limitation côté Amazon)
+RETRY_STATUS_CODES = {429, 503}
+
+# Marqueurs d'une page captcha / robot check Amazon (réponse 200)
+CAPTCHA_MARKERS = (
+    "/errors/validateCaptcha",
+    "Type the characters you see in this image",
+    "Saisissez les caractères que vous voyez",
+    "api-services-support@amazon.com",
+)
+
+# HTTP/2 disponible si le paquet h2 est installé (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class ScraperBlockedError(Exception):
+    """Page captcha ou refus persistant après toutes les tentatives."""
+
+
+class HostRateLimiter:
+    """
+    Limiteur de débit par hôte (token bucket), partagé entre threads.
+
+    Chaque hôte dispose d'un seau de `burst` jetons rechargé à `rate` jetons par
+    seconde ; acquire() attend qu'un jeton soit disponible.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Initialise le limiteur.
+
+        Args:
+            rate: Requêtes par seconde autorisées par hôte (<= 0 : pas de limite).
+            burst: Nombre maximum de requêtes consécutives sans attente.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._buckets: Dict[str, List[float]] = {}  # hôte -> [jetons, dernier remplissage]
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str) -> float:
+        """
+        Réserve un jeton pour l'hôte, en attendant si nécessaire.
+
+        Args:
+            host: Nom d'hôte de la requête.
+
+        Returns:
+            Temps d'attente en secondes.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, [float(self.burst), now])
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            # Le jeton est réservé immédiatement (solde éventuellement négatif) :
+            # les threads suivants attendent d'autant plus longtemps
+            tokens -= 1.0
+            self._buckets[host] = [tokens, now]
+            delay = -tokens / self.rate if tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+# Limiteur partagé par toutes les instances (un même hôte, un même budget)
+_host_rate_limiter: Optional[HostRateLimiter] = None
+_host_rate_limiter_lock = threading.Lock()
+
+
+def get_host_rate_limiter() -> HostRateLimiter:
+    """
+    Retourne le limiteur par hôte (SCRAPER_RATE_PER_HOST / SCRAPER_BURST), en singleton.
+
+    Returns:
+        Instance de HostRateLimiter.
+    """
+    global _host_rate_limiter
+    with _host_rate_limiter_lock:
+        if _host_rate_limiter is None:
+            settings = get_settings()
+            _host_rate_limiter = HostRateLimiter(
+                settings.SCRAPER_RATE_PER_HOST, settings.SCRAPER_BURST
+            )
+    return _host_rate_limiter
+
 
 class ScraperClient:
     """Client pour scraper Amazon et extraire des ASINs."""
 
-    def __init__(self, timeout: float = 10.0):
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base_seconds: Optional[float] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        page_cache: Optional[PageCache] = None,
+        cache_pages: bool = True,
+    ):
         """
         Initialise le client scraper.
 
         Args:
             timeout: Timeout pour les requêtes HTTP en secondes.
+            max_concurrency: Nombre maximum de pages récupérées en parallèle
+                (taille du pool de connexions). Si None, lit SCRAPER_MAX_CONCURRENCY.
+            max_retries: Nombre de nouvelles tentatives sur 503/429/captcha.
+            backoff_base_seconds: Délai de base du backoff exponentiel.
+            rate_limiter: Limiteur par hôte (par défaut, le limiteur partagé).
+            page_cache: Cache disque des pages (par défaut, le cache SCRAPER_CACHE_*).
+            cache_pages: Si False, aucune page n'est lue ni écrite dans le cache.
         """
+        settings = get_settings()
         self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency or settings.SCRAPER_MAX_CONCURRENCY)
+        self.max_retries = settings.SCRAPER_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base_seconds = (
+            settings.SCRAPER_BACKOFF_BASE_SECONDS
+            if backoff_base_seconds is None
+            else backoff_base_seconds
+        )
+        self.http2 = settings.SCRAPER_HTTP2 and HTTP2_AVAILABLE
+        self.rate_limiter = rate_limiter or get_host_rate_limiter()
+        self.page_cache = (page_cache or get_page_cache()) if cache_pages else None
         self.default_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -32,45 +161,160 @@ class ScraperClient:
             "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",
         }
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        """Client HTTP partagé (pool de connexions), créé à la première utilisation."""
+        with self._client_lock:
+            if self._client is None:
+                self._client = InstrumentedClient(
+                    UPSTREAM_SCRAPER,
+                    timeout=self.timeout,
+                    headers=self.default_headers,
+                    follow_redirects=True,
+                    http2=self.http2,
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                )
+            return self._client
+
+    def close(self) -> None:
+        """Ferme le pool de connexions."""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    @staticmethod
+    def is_captcha_page(html: str) -> bool:
+        """Indique si le HTML est une page captcha / robot check Amazon."""
+        head = html[:20000]
+        return any(marker in head for marker in CAPTCHA_MARKERS)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Délai avant la tentative suivante : backoff exponentiel avec full jitter."""
+        return random.uniform(0, self.backoff_base_seconds * (2 ** attempt))
+
+    def page_cache_stats(self) -> Dict[str, int]:
+        """
+        Compteurs du cache de pages (hits, revalidated, misses, stored, evicted, bytes_saved).
+
+        Returns:
+            Copie des compteurs cumulés (à soustraire entre deux instants pour un run),
+            dictionnaire vide si le cache est désactivé.
+        """
+        return self.page_cache.get_stats() if self.page_cache else {}
 
-    def fetch_html(self, url: str) -> str:
+    def fetch_html(self, url: str, use_cache: bool = True) -> str:
         """
         Récupère le HTML d'une URL.
 
+        Une page du cache encore fraîche est servie sans requête ; une page périmée
+        portant un ETag/Last-Modified est revalidée par requête conditionnelle (304).
+        La requête attend son jeton de débit pour l'hôte, puis est relancée avec
+        backoff (jitter) sur 503/429, page captcha, timeout ou erreur réseau.
+
         Args:
             url: URL à scraper.
+            use_cache: Si False, ignore le cache de pages pour cette URL.
 
         Returns:
             Contenu HTML en string.
 
         Raises:
-            Exception si la requête échoue.
+            Exception si la requête échoue (ScraperBlockedError si captcha persistant).
         """
+        cache = self.page_cache if use_cache else None
+        cached = cache.get(url) if cache else None
+        if cached and cached["fresh"]:
+            cache.record("hits")
+            record_cache("page_cache", hits=1)
+            cache.record("bytes_saved", len(cached["html"]))
+            logger.info(f"Page servie depuis le cache: {url}")
+            return cached["html"]
+
+        # Revalidation conditionnelle d'une page périmée
+        conditional_headers = {}
+        if cached and cached["etag"]:
+            conditional_headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            conditional_headers["If-Modified-Since"] = cached["last_modified"]
+
         logger.info(f"Scraping de l'URL: {url}")
-        try:
-            with httpx.Client(timeout=self.timeout, headers=self.default_headers, follow_redirects=True) as client:
-                response = client.get(url)
-                response.raise_for_status()
-                
-                logger.info(f"Réponse HTTP {response.status_code} pour {url}, taille: {len(response.text)} caractères")
-                return response.text
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Erreur HTTP {e.response.status_code} lors du scraping de {url}: {e.response.text[:200]}")
-            raise
-        except httpx.TimeoutException:
-            logger.error(f"Timeout lors du scraping de {url}")
-            raise
-        except Exception as e:
-            logger.error(f"Erreur lors du scraping de {url}: {str(e)}", exc_info=True)
-            raise
+        host = urlsplit(url).hostname or ""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(host)
+            try:
+                response = self.client.get(url, headers=conditional_headers or None)
+                if response.status_code == 304 and cached:
+                    cache.touch(
+                        url,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                    cache.record("revalidated")
+                    record_cache("page_cache", hits=1)
+                    cache.record("bytes_saved", len(cached["html"]))
+                    logger.info(f"Page du cache revalidée (304): {url}")
+                    return cached["html"]
+                if response.status_code in RETRY_STATUS_CODES:
+                    reason = f"HTTP {response.status_code}"
+                    if attempt >= self.max_retries:
+                        response.raise_for_status()
+                elif self.is_captcha_page(response.text):
+                    reason = "captcha"
+                    if attempt >= self.max_retries:
+                        raise ScraperBlockedError(f"Page captcha persistante pour {url}")
+                else:
+                    response.raise_for_status()
+                    logger.info(f"Réponse HTTP {response.status_code} pour {url}, taille: {len(response.text)} caractères")
+                    if cache:
+                        cache.record("misses")
+                        record_cache("page_cache", misses=1)
+                        cache.put(
+                            url,
+                            response.text,
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"),
+                        )
+                    return response.text
+            except httpx.HTTPStatusError as e:
+                logger.error(f"Erreur HTTP {e.response.status_code} lors du scraping de {url}: {e.response.text[:200]}")
+                raise
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Timeout ou erreur réseau lors du scraping de {url}: {str(e)}")
+                    raise
+                reason = type(e).__name__
+            except ScraperBlockedError:
+                logger.error(f"Page captcha persistante lors du scraping de {url}")
+                raise
+            except Exception as e:
+                logger.error(f"Erreur lors du scraping de {url}: {str(e)}", exc_info=True)
+                raise
+
+            delay = self._backoff_delay(attempt)
+            attempt += 1
+            logger.warning(
+                f"{reason} pour {url}, nouvelle tentative {attempt}/{self.max_retries} "
+                f"dans {delay:.1f}s"
+            )
+            time.sleep(delay)
 
     def extract_asins_from_html(self, html: str) -> List[str]:
         """
         Extrait les ASINs depuis le HTML d'une page Amazon.
 
-        Utilise plusieurs patterns regex pour trouver les ASINs :
+        Une seule passe sur la page (jeton ASIN précompilé, voir
+        amazon_html_extractor.extract_asins) pour trouver les ASINs :
         - /dp/B0XXXXXXXX
         - data-asin="B0XXXXXXXX"
+        - asin/productId dans les attributs ou le JSON embarqué
         - ASINs en format B0XXXXXXXX dans le texte
 
         Args:
@@ -79,48 +323,10 @@ class ScraperClient:
         Returns:
             Liste d'ASINs uniques (format B0XXXXXXXX, 10 caractères).
         """
-        asins_set = set()
-
-        # Pattern 1: /dp/B0XXXXXXXX ou /gp/product/B0XXXXXXXX
-        pattern_dp = re.compile(r'/dp/(B0[A-Z0-9]{8})', re.IGNORECASE)
-        matches = pattern_dp.findall(html)
-        for match in matches:
-            asin = match.upper()
-            if len(asin) == 10 and asin.startswith('B0'):
-                asins_set.add(asin)
-
-        # Pattern 2: data-asin="B0XXXXXXXX"
-        pattern_data_asin = re.compile(r'data-asin=["\'](B0[A-Z0-9]{8})["\']', re.IGNORECASE)
-        matches = pattern_data_asin.findall(html)
-        for match in matches:
-            asin = match.upper()
-            if len(asin) == 10 and asin.startswith('B0'):
-                asins_set.add(asin)
-
-        # Pattern 3: ASINs dans les attributs data-* ou autres attributs
-        pattern_asin_generic = re.compile(r'(?:asin|productId|product-id)["\']?\s*[:=]\s*["\']?(B0[A-Z0-9]{8})["\']?', re.IGNORECASE)
-        matches = pattern_asin_generic.findall(html)
-        for match in matches:
-            asin = match.upper()
-            if len(asin) == 10 and asin.startswith('B0'):
-                asins_set.add(asin)
-
-        # Pattern 4: ASINs isolés (plus risqué, mais peut trouver des ASINs dans le texte)
-        # On cherche des séquences B0 suivies de 8 caractères alphanumériques
-        pattern_isolated = re.compile(r'\b(B0[A-Z0-9]{8})\b', re.IGNORECASE)
-        matches = pattern_isolated.findall(html)
-        for match in matches:
-            asin = match.upper()
-            # Validation : doit commencer par B0 et avoir 10 caractères
-            if len(asin) == 10 and asin.startswith('B0'):
-                # Vérifier que ce n'est pas dans une URL ou autre contexte indésirable
-                asins_set.add(asin)
-
-        # Convertir en liste triée pour la déduplication
-        asins_list = sorted(list(asins_set))
+        asins_list = extract_asins(html)
 
         logger.info(f"Extraction de {len(asins_list)} ASINs uniques depuis le HTML")
-        
+
         if asins_list:
             logger.debug(f"Premiers ASINs extraits: {asins_list[:10]}")
 
@@ -140,7 +346,8 @@ class ScraperClient:
         logger.info(f"Scraping des Best Sellers Amazon FR: {url} (limit: {limit})")
 
         try:
-            html = self.fetch_html(url)
+            # Le classement change souvent : pas de cache de pages
+            html = self.fetch_html(url, use_cache=False)
             asins = self.extract_asins_from_html(html)
 
             # Limiter le nombre d'ASINs
@@ -170,7 +377,8 @@ class ScraperClient:
         logger.info(f"Scraping de la recherche Amazon FR: {url} (keyword: {keyword}, limit: {limit})")
 
         try:
-            html = self.fetch_html(url)
+            # Les résultats de recherche changent souvent : pas de cache de pages
+            html = self.fetch_html(url, use_cache=False)
             asins = self.extract_asins_from_html(html)
 
             # Limiter le nombre d'ASINs
@@ -198,59 +406,10 @@ class ScraperClient:
 
         try:
             html = self.fetch_html(url)
-
-            # Essayer plusieurs sélecteurs pour le prix (par ordre de priorité)
-            price_patterns = [
-                # #priceblock_ourprice (format: <span id="priceblock_ourprice">29,99 €</span>)
-                (r'<span[^>]*id=["\']priceblock_ourprice["\'][^>]*>([^<]+)', "priceblock_ourprice"),
-                # #priceblock_dealprice (format: <span id="priceblock_dealprice">29,99 €</span>)
-                (r'<span[^>]*id=["\']priceblock_dealprice["\'][^>]*>([^<]+)', "priceblock_dealprice"),
-                # .a-offscreen (format: <span class="a-offscreen">29,99 €</span>)
-                (r'<span[^>]*class=["\'][^"\']*a-offscreen[^"\']*["\'][^>]*>([^<]+)', "a-offscreen"),
-                # Prix dans data-a-color="price" (format: <span data-a-color="price">29,99</span>)
-                (r'data-a-color=["\']price["\'][^>]*>([^<]+)', "data-a-color=price"),
-                # Prix dans span class "a-price-whole" (format: <span class="a-price-whole">29</span>)
-                (r'<span[^>]*class=["\'][^"\']*a-price-whole[^"\']*["\'][^>]*>([^<]+)', "a-price-whole"),
-                # Prix dans span class avec "a-price" (format: <span class="a-price">29,99</span>)
-                (r'<span[^>]*class=["\'][^"\']*a-price[^"\']*["\'][^>]*>([^<]+)', "a-price"),
-                # Prix dans format JSON-LD (structured data)
-                (r'"price":\s*["\']?([\d,]+\.?\d*)[^"\']*["\']?', "json-ld"),
-                # Prix générique dans format "XX,XX EUR" ou "XX.XX EUR"
-                (r'(\d+[,\.]\d{2})\s*(?:€|EUR|euros?)', "generic-price"),
-            ]
-
-            for pattern, selector_name in price_patterns:
-                matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
-                for match in matches:
-                    price_str = match.strip()
-                    # Nettoyer le prix : extraire les chiffres, points et virgules
-                    # Format attendu : "29,99 €" ou "29.99" ou "29,99EUR"
-                    price_clean = re.sub(r'[^\d,.]', '', price_str)
-                    # Remplacer la virgule par un point pour conversion
-                    price_clean = price_clean.replace(',', '.')
-                    
-                    # Vérifier qu'on a au moins un chiffre et un point/virgule
-                    if not re.match(r'^\d+[.,]\d+$', price_clean):
-                        # Essayer de trouver un format avec seulement des chiffres (prix entier)
-                        price_clean_digits = re.sub(r'[^\d]', '', price_str)
-                        if price_clean_digits and len(price_clean_digits) >= 2:
-                            price_clean = price_clean_digits
-                    
-                    try:
-                        price_value = float(price_clean)
-                        # Sanity Filter : rejeter les prix aberrants (< 1 EUR ou > 2000 EUR)
-                        if price_value > 2000 or price_value < 1:
-                            logger.warning(f"SCRAPER PRICE REJECTED for {asin}: {price_value} EUR (hors limite 1-2000)")
-                            continue
-                        
-                        # Prix valide
-                        logger.info(f"Prix trouvé via {selector_name} pour {asin}: {price_value} EUR")
-                        return Decimal(str(price_value))
-                    except (ValueError, AttributeError):
-                        continue
-
-            logger.warning(f"Aucun prix trouvé pour {asin} sur {url}")
-            return None
+            price = self.extract_price_from_html(html, asin)
+            if price is None:
+                logger.warning(f"Aucun prix trouvé pour {asin} sur {url}")
+            return price
 
         except httpx.HTTPStatusError as e:
             logger.warning(f"Erreur HTTP {e.response.status_code} lors du scraping du prix pour {asin}: {str(e)}")
@@ -262,3 +421,54 @@ class ScraperClient:
             logger.warning(f"Erreur lors du scraping du prix pour {asin}: {str(e)}", exc_info=True)
             return None
 
+    def scrape_prices(self, asins: Sequence[str]) -> Dict[str, Optional[Decimal]]:
+        """
+        Scrape les prix de plusieurs produits en parallèle.
+
+        Au plus max_concurrency pages sont récupérées simultanément, dans la limite
+        du débit par hôte. Un échec sur un ASIN n'interrompt pas les autres.
+
+        Args:
+            asins: ASINs des produits (doublons ignorés).
+
+        Returns:
+            Dictionnaire {asin: prix en Decimal (EUR) ou None si non trouvé/erreur}.
+        """
+        unique_asins = list(dict.fromkeys(asins))
+        if not unique_asins:
+            return {}
+
+        logger.info(
+            f"Scraping des prix pour {len(unique_asins)} ASINs "
+            f"(concurrence: {self.max_concurrency})"
+        )
+        workers = min(self.max_concurrency, len(unique_asins))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as executor:
+            results = executor.map(bind_context(self.scrape_price_for_product), unique_asins)
+            prices = dict(zip(unique_asins, results))
+
+        found = sum(1 for price in prices.values() if price is not None)
+        logger.info(f"Prix scrapés: {found}/{len(unique_asins)} trouvés")
+        return prices
+
+    def extract_price_from_html(self, html: str, asin: str) -> Optional[Decimal]:
+        """
+        Extrait le prix d'une page produit Amazon FR.
+
+        Les sélecteurs de prix sont essayés par ordre de priorité, en une seule
+        passe sur la page (voir amazon_html_extractor.extract_price).
+
+        Args:
+            html: Contenu HTML de la page produit.
+            asin: ASIN du produit (logs).
+
+        Returns:
+            Prix en Decimal (EUR) ou None si non trouvé.
+        """
+        result = extract_price(html, asin)
+        if result is None:
+            return None
+
+        price, selector_name = result
+        logger.info(f"Prix trouvé via {selector_name} pour {asin}: {price} EUR")
+        return price
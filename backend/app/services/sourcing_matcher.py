@@ -11,8 +11,10 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from decimal import Decimal
 
+from app.core.metrics import SOURCING_CATALOG_ROWS, SOURCING_MATCH_DURATION
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
+from app.services.run_ledger import record_cache
 from app.services.supplier_config import get_supplier_config_service, SupplierConfig
 
 logger = logging.getLogger(__name__)
@@ -73,7 +75,9 @@ class SourcingMatcher:
         """
         # Vérifier le cache
         if csv_path in self._csv_cache:
+            record_cache("sourcing_csv_catalog", hits=1)
             return self._csv_cache[csv_path]
+        record_cache("sourcing_csv_catalog", misses=1)
 
         # Résoudre le chemin
         if Path(csv_path).is_absolute():
@@ -229,6 +233,11 @@ class SourcingMatcher:
         Returns:
             Liste d'instances SourcingOption (non persistées en base).
         """
+        with SOURCING_MATCH_DURATION.time():
+            return self._find_sourcing_options(candidate)
+
+    def _find_sourcing_options(self, candidate: ProductCandidate) -> List[SourcingOption]:
+        """Recherche des options de sourcing (voir find_sourcing_options_for_candidate)."""
         options = []
 
         if not candidate.title:
@@ -263,6 +272,7 @@ class SourcingMatcher:
             try:
                 # Charger le catalogue CSV
                 catalog = self._load_csv_catalog(supplier.path)
+                SOURCING_CATALOG_ROWS.inc(len(catalog))
 
                 # Parcourir chaque ligne du catalogue
                 for csv_row in catalog:
@@ -11,6 +11,7 @@ from decimal import Decimal
 import httpx
 
 from app.core.config import get_settings
+from app.services.run_ledger import UPSTREAM_SPAPI, InstrumentedClient
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,7 @@ class SPAPIClient:
                 "client_secret": self.settings.SPAPI_LWA_CLIENT_SECRET,
             }
 
-            with httpx.Client(timeout=10.0) as client:
+            with InstrumentedClient(UPSTREAM_SPAPI, timeout=10.0) as client:
                 response = client.post(token_url, data=data)
                 response.raise_for_status()
                 token_data = response.json()
@@ -115,7 +116,7 @@ class SPAPIClient:
                 "Content-Type": "application/json",
             }
 
-            with httpx.Client(timeout=10.0) as client:
+            with InstrumentedClient(UPSTREAM_SPAPI, timeout=10.0) as client:
                 response = client.get(url, params=params, headers=headers)
                 response.raise_for_status()
                 data = response.json()
@@ -240,7 +241,7 @@ class SPAPIClient:
                 "Content-Type": "application/json",
             }
 
-            with httpx.Client(timeout=10.0) as client:
+            with InstrumentedClient(UPSTREAM_SPAPI, timeout=10.0) as client:
                 response = client.post(url, json=params, headers=headers)
                 response.raise_for_status()
                 data = response.json()
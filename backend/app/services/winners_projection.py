@@ -0,0 +1,175 @@
+"""
+Service de projection des winners (table winners).
+
+Maintient une ligne par produit avec son meilleur score, calculée en SQL
+(DISTINCT ON) et rafraîchie de manière incrémentale pour les produits
+dont les scores viennent d'être écrits.
+"""
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, insert, literal, select, delete
+from sqlalchemy.orm import Session
+
+from app.models.product_candidate import ProductCandidate
+from app.models.product_score import ProductScore
+from app.models.sourcing_option import SourcingOption
+from app.models.winner import Winner
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots de product_ids pour les DELETE/INSERT incrémentaux
+REFRESH_CHUNK_SIZE = 1000
+
+# Colonnes de la table winners alimentées par la requête "meilleur score"
+_WINNER_COLUMNS = [
+    "product_candidate_id",
+    "product_score_id",
+    "sourcing_option_id",
+    "supplier_name",
+    "purchase_price",
+    "selling_price_target",
+    "amazon_fees_estimate",
+    "margin_absolute",
+    "margin_percent",
+    "gross_profit",
+    "gross_margin_percent",
+    "net_profit_estimated",
+    "estimated_sales_per_day",
+    "approx_profit_per_day",
+    "global_score",
+    "decision",
+    "is_real_asin",
+    "refreshed_at",
+]
+
+
+def build_best_scores_select(product_ids: Optional[List[UUID]] = None):
+    """
+    Construit le SELECT "meilleur score par produit" (une ligne par produit).
+
+    Utilise DISTINCT ON (product_candidate_id) trié par global_score puis
+    margin_percent décroissants (index idx_product_scores_best_per_product).
+
+    Args:
+        product_ids: Restreindre aux produits donnés (None = tous).
+
+    Returns:
+        Select SQLAlchemy dont les colonnes suivent _WINNER_COLUMNS.
+    """
+    stmt = (
+        select(
+            ProductScore.product_candidate_id,
+            ProductScore.id,
+            ProductScore.sourcing_option_id,
+            SourcingOption.supplier_name,
+            SourcingOption.unit_cost,
+            ProductScore.selling_price_target,
+            ProductScore.amazon_fees_estimate,
+            ProductScore.margin_absolute,
+            ProductScore.margin_percent,
+            ProductScore.gross_profit,
+            ProductScore.gross_margin_percent,
+            ProductScore.net_profit_estimated,
+            ProductScore.estimated_sales_per_day,
+            func.coalesce(
+                ProductScore.net_profit_estimated * ProductScore.estimated_sales_per_day,
+                Decimal("0"),
+            ),
+            ProductScore.global_score,
+            ProductScore.decision,
+            ProductCandidate.is_real_asin,
+            literal(datetime.utcnow()),
+        )
+        .join(ProductCandidate, ProductCandidate.id == ProductScore.product_candidate_id)
+        .join(SourcingOption, SourcingOption.id == ProductScore.sourcing_option_id)
+    )
+
+    if product_ids is not None:
+        stmt = stmt.where(ProductScore.product_candidate_id.in_(product_ids))
+
+    return stmt.distinct(ProductScore.product_candidate_id).order_by(
+        ProductScore.product_candidate_id,
+        ProductScore.global_score.desc().nulls_last(),
+        ProductScore.margin_percent.desc().nulls_last(),
+    )
+
+
+class WinnersProjectionService:
+    """Service pour maintenir la projection winners."""
+
+    def __init__(self, db: Session):
+        """
+        Initialise le service.
+
+        Args:
+            db: Session SQLAlchemy pour la base de données.
+        """
+        self.db = db
+
+    def refresh_for_products(self, product_ids: Iterable[UUID]) -> int:
+        """
+        Rafraîchit les lignes winners des produits donnés (DELETE + INSERT ... SELECT).
+
+        Les produits qui n'ont plus aucun score disparaissent de la projection.
+        Pas de commit ici : l'appelant commit avec le reste de sa transaction.
+
+        Args:
+            product_ids: IDs des produits dont les scores ont changé.
+
+        Returns:
+            Nombre de lignes winners réécrites.
+        """
+        ids = list(dict.fromkeys(product_ids))
+        if not ids:
+            return 0
+
+        refreshed = 0
+        for i in range(0, len(ids), REFRESH_CHUNK_SIZE):
+            chunk = ids[i:i + REFRESH_CHUNK_SIZE]
+            self.db.execute(delete(Winner).where(Winner.product_candidate_id.in_(chunk)))
+            result = self.db.execute(
+                insert(Winner).from_select(_WINNER_COLUMNS, build_best_scores_select(chunk))
+            )
+            refreshed += result.rowcount or 0
+
+        logger.info(f"Projection winners rafraîchie pour {len(ids)} produit(s) ({refreshed} ligne(s))")
+        return refreshed
+
+    def rebuild(self) -> int:
+        """
+        Reconstruit entièrement la projection winners puis commit.
+
+        Returns:
+            Nombre de lignes winners écrites.
+        """
+        logger.info("Reconstruction complète de la projection winners")
+        try:
+            self.db.execute(delete(Winner))
+            result = self.db.execute(
+                insert(Winner).from_select(_WINNER_COLUMNS, build_best_scores_select())
+            )
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconstruction des winners: {str(e)}", exc_info=True)
+            self.db.rollback()
+            raise
+
+        rebuilt = result.rowcount or 0
+        logger.info(f"Projection winners reconstruite: {rebuilt} ligne(s)")
+        return rebuilt
+
+    def sync_real_asin_flag(self, product_id: UUID, is_real_asin: bool) -> None:
+        """
+        Répercute un changement de is_real_asin d'un produit sur sa ligne winners.
+
+        Args:
+            product_id: ID du produit candidat.
+            is_real_asin: Nouvelle valeur du flag.
+        """
+        self.db.query(Winner).filter(Winner.product_candidate_id == product_id).update(
+            {Winner.is_real_asin: is_real_asin}, synchronize_session=False
+        )
@@ -0,0 +1,321 @@
+"""
+File de travail distribuée adossée à Postgres.
+
+Les étapes du pipeline (lots discover, lots de sourcing, lots de scoring) sont
+découpées en tâches dans la table work_tasks. N'importe quel nombre de workers,
+sur n'importe quel nœud, réclament les tâches avec SELECT ... FOR UPDATE SKIP
+LOCKED : deux workers ne prennent jamais la même tâche et ne s'attendent pas.
+Une tâche réclamée est invisible jusqu'à locked_until (délai de visibilité) ;
+si le worker disparaît, elle redevient réclamable à l'expiration. Le worker
+prolonge ce délai (heartbeat) tant que la tâche s'exécute, et seul le worker
+qui détient la tâche peut l'acquitter. Les échecs sont retentés avec un délai
+exponentiel jusqu'à max_attempts.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.work_task import WorkTask
+
+logger = logging.getLogger(__name__)
+
+# Types de tâches
+TASK_DISCOVER_BATCH = "discover_batch"
+TASK_SOURCING_CHUNK = "sourcing_chunk"
+TASK_SCORING_CHUNK = "scoring_chunk"
+TASK_TYPES = (TASK_DISCOVER_BATCH, TASK_SOURCING_CHUNK, TASK_SCORING_CHUNK)
+
+# Longueur maximale de l'erreur conservée sur la tâche
+MAX_ERROR_LENGTH = 2000
+
+
+def retry_delay_seconds(attempts: int, base_seconds: int) -> int:
+    """
+    Délai avant une nouvelle tentative (exponentiel, plafonné à une heure).
+
+    Args:
+        attempts: Nombre de tentatives déjà effectuées (>= 1).
+        base_seconds: Délai de la première relance.
+
+    Returns:
+        Délai en secondes.
+    """
+    return min(base_seconds * 2 ** max(attempts - 1, 0), 3600)
+
+
+class WorkQueue:
+    """Opérations sur la file work_tasks (mise en file, réclamation, acquittement)."""
+
+    def __init__(self, db: Session):
+        """
+        Initialise la file.
+
+        Args:
+            db: Session SQLAlchemy pour la base de données.
+        """
+        self.db = db
+        settings = get_settings()
+        self.visibility_timeout = settings.WORK_QUEUE_VISIBILITY_TIMEOUT_SECONDS
+        self.max_attempts = settings.WORK_QUEUE_MAX_ATTEMPTS
+        self.retry_backoff = settings.WORK_QUEUE_RETRY_BACKOFF_SECONDS
+
+    def enqueue(
+        self,
+        task_type: str,
+        payloads: Iterable[Dict[str, Any]],
+        market_code: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> List[WorkTask]:
+        """
+        Met des tâches en file (commit inclus, visibles immédiatement des workers).
+
+        Args:
+            task_type: Type de tâche (TASK_TYPES).
+            payloads: Paramètres de chaque tâche.
+            market_code: Code du marché (tâches discover).
+            max_attempts: Tentatives maximum (défaut: WORK_QUEUE_MAX_ATTEMPTS).
+
+        Returns:
+            Tâches créées.
+        """
+        if task_type not in TASK_TYPES:
+            raise ValueError(f"Type de tâche inconnu: {task_type}")
+
+        tasks = [
+            WorkTask(
+                task_type=task_type,
+                market_code=market_code,
+                payload=payload,
+                status="pending",
+                attempts=0,
+                max_attempts=max_attempts or self.max_attempts,
+                available_at=datetime.utcnow(),
+            )
+            for payload in payloads
+        ]
+        if tasks:
+            self.db.add_all(tasks)
+            self.db.commit()
+            logger.info(f"{len(tasks)} tâche(s) {task_type} mise(s) en file")
+        return tasks
+
+    def queued_asins(self, market_code: str) -> Set[str]:
+        """
+        ASINs des lots discover déjà en file (en attente ou en cours) pour un marché.
+
+        Args:
+            market_code: Code du marché.
+
+        Returns:
+            Ensemble des ASINs (à ne pas remettre en file avant la fin de ces lots).
+        """
+        payloads = self.db.query(WorkTask.payload).filter(
+            WorkTask.task_type == TASK_DISCOVER_BATCH,
+            WorkTask.market_code == market_code,
+            WorkTask.status.in_(("pending", "running")),
+        )
+        return {asin for (payload,) in payloads for asin in (payload or {}).get("asins", [])}
+
+    def claim(
+        self,
+        worker_id: str,
+        task_types: Optional[Iterable[str]] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[WorkTask]:
+        """
+        Réclame la plus ancienne tâche disponible (FOR UPDATE SKIP LOCKED, commit inclus).
+
+        Sont disponibles les tâches en attente arrivées à échéance et les tâches
+        en cours dont le délai de visibilité a expiré (worker tombé). Une tâche
+        expirée ayant épuisé ses tentatives est marquée en échec au lieu d'être
+        reprise.
+
+        Args:
+            worker_id: Identifiant du worker.
+            task_types: Types acceptés (None = tous).
+            now: Instant de référence (UTC, maintenant par défaut).
+
+        Returns:
+            Tâche réclamée, ou None si la file est vide.
+        """
+        now = now or datetime.utcnow()
+        query = self.db.query(WorkTask).filter(
+            or_(
+                and_(WorkTask.status == "pending", WorkTask.available_at <= now),
+                and_(WorkTask.status == "running", WorkTask.locked_until < now),
+            )
+        )
+        if task_types:
+            query = query.filter(WorkTask.task_type.in_(list(task_types)))
+
+        while True:
+            task = (
+                query.order_by(WorkTask.available_at)
+                .with_for_update(skip_locked=True)
+                .limit(1)
+                .first()
+            )
+            if task is None:
+                self.db.rollback()
+                return None
+            if task.status != "running" or task.attempts < task.max_attempts:
+                break
+
+            # Worker tombé pendant la dernière tentative : pas de reprise
+            task.status = "failed"
+            task.last_error = (
+                f"Délai de visibilité expiré (worker {task.locked_by}) après "
+                f"{task.attempts} tentative(s)"
+            )
+            task.locked_until = None
+            task.finished_at = now
+            self.db.commit()
+            logger.error(f"Tâche {task.id} ({task.task_type}) définitivement en échec: {task.last_error}")
+
+        if task.status == "running":
+            logger.warning(
+                f"Tâche {task.id} ({task.task_type}) abandonnée par {task.locked_by}, reprise par {worker_id}"
+            )
+        task.status = "running"
+        task.attempts += 1
+        task.locked_by = worker_id
+        task.locked_until = now + timedelta(seconds=self.visibility_timeout)
+        self.db.commit()
+        return task
+
+    def heartbeat(self, task_id: UUID, worker_id: str) -> bool:
+        """
+        Prolonge le délai de visibilité d'une tâche en cours (commit inclus).
+
+        Args:
+            task_id: ID de la tâche réclamée.
+            worker_id: Identifiant du worker qui l'exécute.
+
+        Returns:
+            False si la tâche n'est plus détenue par ce worker (reprise par un autre).
+        """
+        updated = (
+            self.db.query(WorkTask)
+            .filter(
+                WorkTask.id == task_id,
+                WorkTask.status == "running",
+                WorkTask.locked_by == worker_id,
+            )
+            .update(
+                {"locked_until": datetime.utcnow() + timedelta(seconds=self.visibility_timeout)},
+                synchronize_session=False,
+            )
+        )
+        self.db.commit()
+        return updated > 0
+
+    def _lock_owned(self, task: WorkTask, worker_id: str) -> bool:
+        """
+        Verrouille la tâche si elle est toujours en cours et détenue par ce worker.
+
+        Sinon (délai expiré, tâche reprise par un autre worker) la transaction
+        est annulée et l'acquittement ignoré.
+        """
+        owned = (
+            self.db.query(WorkTask)
+            .filter(
+                WorkTask.id == task.id,
+                WorkTask.status == "running",
+                WorkTask.locked_by == worker_id,
+            )
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if owned is None:
+            self.db.rollback()
+            logger.warning(
+                f"Tâche {task.id} ({task.task_type}) n'est plus détenue par {worker_id}, "
+                "acquittement ignoré"
+            )
+            return False
+        return True
+
+    def complete(
+        self, task: WorkTask, worker_id: str, result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Marque une tâche comme terminée (commit inclus).
+
+        Args:
+            task: Tâche réclamée.
+            worker_id: Identifiant du worker qui l'a réclamée.
+            result: Statistiques du job.
+
+        Returns:
+            False si la tâche n'est plus détenue par ce worker (rien n'est écrit).
+        """
+        if not self._lock_owned(task, worker_id):
+            return False
+        task.status = "done"
+        task.result = result
+        task.locked_until = None
+        task.last_error = None
+        task.finished_at = datetime.utcnow()
+        self.db.commit()
+        return True
+
+    def fail(self, task: WorkTask, worker_id: str, error: Exception) -> bool:
+        """
+        Enregistre l'échec d'une tâche : nouvelle tentative différée ou échec définitif.
+
+        La session peut être dans un état d'erreur : elle est annulée avant
+        d'écrire l'échec.
+
+        Args:
+            task: Tâche réclamée.
+            worker_id: Identifiant du worker qui l'a réclamée.
+            error: Erreur rencontrée.
+
+        Returns:
+            False si la tâche n'est plus détenue par ce worker (rien n'est écrit).
+        """
+        self.db.rollback()
+        if not self._lock_owned(task, worker_id):
+            return False
+        task.last_error = str(error)[:MAX_ERROR_LENGTH]
+        task.locked_until = None
+        if task.attempts < task.max_attempts:
+            delay = retry_delay_seconds(task.attempts, self.retry_backoff)
+            task.status = "pending"
+            task.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(
+                f"Tâche {task.id} ({task.task_type}) en échec, tentative "
+                f"{task.attempts}/{task.max_attempts}, relance dans {delay}s: {task.last_error}"
+            )
+        else:
+            task.status = "failed"
+            task.finished_at = datetime.utcnow()
+            logger.error(
+                f"Tâche {task.id} ({task.task_type}) définitivement en échec après "
+                f"{task.attempts} tentative(s): {task.last_error}"
+            )
+        self.db.commit()
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Nombre de tâches par type et par statut.
+
+        Returns:
+            Dictionnaire {task_type: {status: nombre}}.
+        """
+        rows = (
+            self.db.query(WorkTask.task_type, WorkTask.status, func.count(WorkTask.id))
+            .group_by(WorkTask.task_type, WorkTask.status)
+            .all()
+        )
+        counts: Dict[str, Dict[str, int]] = {}
+        for task_type, status, count in rows:
+            counts.setdefault(task_type, {})[status] = count
+        return counts
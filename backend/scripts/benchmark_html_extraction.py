@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de l'extraction HTML du scraper (ASINs et prix).
+
+Compare, page par page, l'ancienne extraction (4 motifs ASIN + 8 motifs prix
+recompilés et appliqués chacun sur toute la page) au moteur précompilé de
+app.services.amazon_html_extractor, et vérifie que les résultats sont identiques.
+
+Usage :
+    python scripts/benchmark_html_extraction.py page1.html page2.html ...
+    python scripts/benchmark_html_extraction.py   # pages synthétiques (~1,5 Mo)
+
+Les pages Amazon sauvegardées s'obtiennent par exemple avec :
+    curl -sL -A "Mozilla/5.0" https://www.amazon.fr/dp/<ASIN> -o dp_<ASIN>.html
+"""
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from app.services.amazon_html_extractor import extract_asins, extract_price
+
+# Nombre de répétitions par page (le meilleur temps est retenu)
+REPEAT = 5
+
+
+def legacy_extract_asins(html):
+    """Ancienne extraction des ASINs (4 motifs compilés à chaque appel, 4 passes)."""
+    asins_set = set()
+    patterns = [
+        r'/dp/(B0[A-Z0-9]{8})',
+        r'data-asin=["\'](B0[A-Z0-9]{8})["\']',
+        r'(?:asin|productId|product-id)["\']?\s*[:=]\s*["\']?(B0[A-Z0-9]{8})["\']?',
+        r'\b(B0[A-Z0-9]{8})\b',
+    ]
+    for pattern in patterns:
+        for match in re.compile(pattern, re.IGNORECASE).findall(html):
+            asin = match.upper()
+            if len(asin) == 10 and asin.startswith('B0'):
+                asins_set.add(asin)
+    return sorted(asins_set)
+
+
+def legacy_extract_price(html):
+    """Ancienne extraction du prix (jusqu'à 8 findall avec re.DOTALL sur toute la page)."""
+    price_patterns = [
+        r'<span[^>]*id=["\']priceblock_ourprice["\'][^>]*>([^<]+)',
+        r'<span[^>]*id=["\']priceblock_dealprice["\'][^>]*>([^<]+)',
+        r'<span[^>]*class=["\'][^"\']*a-offscreen[^"\']*["\'][^>]*>([^<]+)',
+        r'data-a-color=["\']price["\'][^>]*>([^<]+)',
+        r'<span[^>]*class=["\'][^"\']*a-price-whole[^"\']*["\'][^>]*>([^<]+)',
+        r'<span[^>]*class=["\'][^"\']*a-price[^"\']*["\'][^>]*>([^<]+)',
+        r'"price":\s*["\']?([\d,]+\.?\d*)[^"\']*["\']?',
+        r'(\d+[,\.]\d{2})\s*(?:€|EUR|euros?)',
+    ]
+    for pattern in price_patterns:
+        for match in re.findall(pattern, html, re.IGNORECASE | re.DOTALL):
+            price_str = match.strip()
+            price_clean = re.sub(r'[^\d,.]', '', price_str).replace(',', '.')
+            if not re.match(r'^\d+[.,]\d+$', price_clean):
+                price_clean_digits = re.sub(r'[^\d]', '', price_str)
+                if price_clean_digits and len(price_clean_digits) >= 2:
+                    price_clean = price_clean_digits
+            try:
+                price_value = float(price_clean)
+                if price_value > 2000 or price_value < 1:
+                    continue
+                return price_value
+            except (ValueError, AttributeError):
+                continue
+    return None
+
+
+def synthetic_page(seed, size_bytes=1_500_000, with_core_price=True):
+    """
+    Génère une page de type fiche produit Amazon (scripts, carrousels d'ASINs, prix).
+
+    Sans bloc prix principal (with_core_price=False), seuls les sélecteurs de
+    priorité basse trouvent un prix : cas le plus coûteux pour l'extraction.
+    """
+    rng = random.Random(seed)
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+    def asin():
+        return "B0" + "".join(rng.choice(alphabet) for _ in range(8))
+
+    blocks = ['<html><head><title>Produit</title></head><body>']
+    # Le bloc prix arrive après l'en-tête, comme sur une vraie fiche produit
+    if with_core_price:
+        price = f"{rng.randint(5, 300)},{rng.randint(10, 99)} €"
+        blocks.append('<div id="corePrice_feature_div">'
+                      '<span class="a-price" data-a-color="price">'
+                      f'<span class="a-offscreen">{price}</span></span></div>')
+    size = sum(len(b) for b in blocks)
+    while size < size_bytes:
+        kind = rng.random()
+        if kind < 0.4:
+            block = (f'<div data-asin="{asin()}" class="a-carousel-card">'
+                     f'<a href="/dp/{asin()}/ref=sr_1_{rng.randint(1, 99)}">'
+                     f'<span class="a-size-base">Article {rng.randint(1, 9999)}</span></a>'
+                     f'<span class="a-price-whole">{rng.randint(1, 500)}</span></div>')
+        elif kind < 0.7:
+            block = ('<script type="text/javascript">var data = {'
+                     + ",".join(f'"k{i}": "{rng.random():.6f}"' for i in range(40))
+                     + f', "asin": "{asin()}"}};</script>')
+        else:
+            block = ('<p class="a-spacing-small">'
+                     + " ".join("".join(rng.choice("abcdefghij ") for _ in range(8))
+                                for _ in range(60))
+                     + '</p>')
+        blocks.append(block)
+        size += len(block)
+    blocks.append('</body></html>')
+    return "".join(blocks)
+
+
+def best_time(func, html):
+    """Meilleur temps (secondes) sur REPEAT exécutions."""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Mesure l'ancienne et la nouvelle extraction sur chaque page."""
+    logging.disable(logging.WARNING)
+
+    if len(sys.argv) > 1:
+        pages = [(Path(p).name, Path(p).read_text(encoding="utf-8", errors="replace"))
+                 for p in sys.argv[1:]]
+    else:
+        print("Aucune page fournie : pages synthétiques générées")
+        pages = [(f"synthetic_{i}.html", synthetic_page(i)) for i in range(3)]
+        pages.append(("synthetic_no_core_price.html", synthetic_page(3, with_core_price=False)))
+
+    print(f"{'page':<30} {'taille':>9} {'ancien (ms)':>12} {'nouveau (ms)':>13} {'gain':>6}")
+    print("=" * 75)
+
+    total_old = total_new = 0.0
+    mismatches = 0
+    for name, html in pages:
+        old_asins, new_asins = legacy_extract_asins(html), extract_asins(html)
+        old_price = legacy_extract_price(html)
+        new_result = extract_price(html)
+        new_price = float(new_result[0]) if new_result else None
+        if old_asins != new_asins or old_price != new_price:
+            mismatches += 1
+            print(f"⚠️  {name}: résultats différents "
+                  f"(ASINs {len(old_asins)}/{len(new_asins)}, prix {old_price}/{new_price})")
+
+        old_time = best_time(legacy_extract_asins, html) + best_time(legacy_extract_price, html)
+        new_time = best_time(extract_asins, html) + best_time(extract_price, html)
+        total_old += old_time
+        total_new += new_time
+        print(f"{name[:30]:<30} {len(html) // 1024:>7}Ko {old_time * 1000:>12.1f} "
+              f"{new_time * 1000:>13.1f} {old_time / new_time:>5.1f}x")
+
+    print("=" * 75)
+    print(f"{'total':<30} {'':>9} {total_old * 1000:>12.1f} {total_new * 1000:>13.1f} "
+          f"{total_old / total_new:>5.1f}x")
+    if mismatches:
+        print(f"❌ {mismatches} page(s) avec des résultats différents")
+        sys.exit(1)
+    print("✅ Résultats identiques sur toutes les pages")
+
+
+if __name__ == "__main__":
+    main()
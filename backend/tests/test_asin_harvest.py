@@ -0,0 +1,249 @@
+"""
+Tests pour la récolte d'ASINs (ASIN Harvester).
+"""
+import asyncio
+from contextlib import aclosing
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.jobs.asin_harvest_job import AsinHarvestJob
+from app.main import app
+from app.models import Base
+from app.models.harvested_asin import HarvestedAsin
+from app.services.apify_orchestrator import AsyncApifyOrchestrator, build_list_run_specs
+
+
+@pytest.fixture(scope="function")
+def db():
+    """Créer une session de base de données pour les tests."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestUpsertAsins:
+    """Tests de l'upsert par lots des ASINs récoltés."""
+
+    def test_counts_new_and_duplicate_asins(self, db: Session):
+        """Test que les ASINs déjà connus sont comptés comme doublons."""
+        job = AsinHarvestJob(db)
+
+        assert job._upsert_asins(["B000000001", "B000000002"], "amazon_fr", "scraper_search") == (2, 0)
+        db.commit()
+        assert job._upsert_asins(["B000000002", "B000000003"], "amazon_fr", "scraper_search") == (1, 1)
+        db.commit()
+
+        assert db.query(HarvestedAsin).count() == 3
+
+    def test_repeated_and_invalid_asins_in_one_call(self, db: Session):
+        """Test qu'un ASIN répété ou invalide dans une même récolte compte comme doublon."""
+        job = AsinHarvestJob(db)
+
+        inserted, duplicates = job._upsert_asins(
+            ["B000000001", "B000000001", "", "B0000000011", "B000000002"],
+            "amazon_fr",
+            "apify_bestsellers",
+        )
+        db.commit()
+
+        assert (inserted, duplicates) == (2, 3)
+        assert db.query(HarvestedAsin).count() == 2
+
+    def test_existing_asin_refreshes_last_seen_at(self, db: Session):
+        """Test que last_seen_at est rafraîchi, et updated_at seulement si la source change."""
+        job = AsinHarvestJob(db)
+        job._upsert_asins(["B000000001"], "amazon_fr", "scraper_search")
+        db.commit()
+        old = datetime.utcnow() - timedelta(days=3)
+        db.query(HarvestedAsin).update({"last_seen_at": old, "updated_at": old})
+        db.commit()
+
+        job._upsert_asins(["B000000001"], "amazon_fr", "scraper_search")
+        db.commit()
+        asin = db.query(HarvestedAsin).one()
+        db.refresh(asin)
+        assert asin.last_seen_at > old
+        assert asin.updated_at == old
+
+        job._upsert_asins(["B000000001"], "amazon_fr", "apify_bestsellers")
+        db.commit()
+        db.refresh(asin)
+        assert asin.source == "apify_bestsellers"
+        assert asin.updated_at > old
+
+    def test_chunk_boundaries(self, db: Session, monkeypatch):
+        """Test les comptes sur plusieurs lots, dont un lot partiel et un doublon à cheval."""
+        monkeypatch.setattr("app.jobs.asin_harvest_job.HARVEST_UPSERT_CHUNK_SIZE", 2)
+        job = AsinHarvestJob(db)
+        job._upsert_asins(["B000000003"], "amazon_fr", "scraper_search")
+        db.commit()
+
+        asins = [f"B00000000{i}" for i in range(1, 6)]
+        inserted, duplicates = job._upsert_asins(asins, "amazon_fr", "scraper_search")
+        db.commit()
+
+        assert (inserted, duplicates) == (4, 1)
+        assert db.query(HarvestedAsin).count() == 5
+
+
+class FakeApifyApi:
+    """Faux serveur Apify (httpx.MockTransport) : runs, long-polling, datasets et arrêt."""
+
+    def __init__(self, datasets=None, finish_runs=True, pending_runs=()):
+        self.datasets = datasets or {}
+        self.finish_runs = finish_runs
+        self.pending_runs = set(pending_runs)
+        self.runs = {}
+        self.running = 0
+        self.max_running = 0
+        self.dataset_offsets = []
+        self.aborted = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/abort"):
+            run_id = path.split("/")[-2]
+            self.aborted.append(run_id)
+            self.running -= 1
+            return httpx.Response(200, json={"data": {"id": run_id, "status": "ABORTED"}})
+        if request.method == "POST" and path.endswith("/runs"):
+            run_id = f"run{len(self.runs)}"
+            self.runs[run_id] = {
+                "id": run_id,
+                "status": "RUNNING",
+                "defaultDatasetId": f"ds{len(self.runs)}",
+            }
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            return httpx.Response(201, json={"data": dict(self.runs[run_id])})
+        if request.method == "GET" and path.startswith("/v2/actor-runs/"):
+            run = self.runs[path.split("/")[-1]]
+            await asyncio.sleep(0.01)
+            if self.finish_runs and run["status"] == "RUNNING" and run["id"] not in self.pending_runs:
+                run["status"] = "SUCCEEDED"
+                self.running -= 1
+            return httpx.Response(200, json={"data": dict(run)})
+        if request.method == "GET" and path.startswith("/v2/datasets/"):
+            dataset_id = path.split("/")[-2]
+            offset = int(request.url.params["offset"])
+            limit = int(request.url.params["limit"])
+            self.dataset_offsets.append((dataset_id, offset))
+            return httpx.Response(200, json=self.datasets.get(dataset_id, [])[offset:offset + limit])
+        return httpx.Response(404)
+
+    def orchestrator(self, **kwargs) -> AsyncApifyOrchestrator:
+        return AsyncApifyOrchestrator(
+            api_key="test", transport=httpx.MockTransport(self.handler), **kwargs
+        )
+
+
+def _collect(orchestrator, specs):
+    """Consomme stream_items() et retourne les pages reçues."""
+
+    async def collect():
+        return [entry async for entry in orchestrator.stream_items(specs)]
+
+    return asyncio.run(collect())
+
+
+class TestApifyOrchestrator:
+    """Tests de l'orchestration asynchrone des runs Apify."""
+
+    def test_concurrent_runs_are_capped(self):
+        """Test qu'au plus max_concurrent_runs runs tournent simultanément."""
+        api = FakeApifyApi()
+        orchestrator = api.orchestrator(max_concurrent_runs=2)
+        categories = ["kitchen", "sports", "toys", "garden", "beauty"]
+        specs = build_list_run_specs("FR", categories, ["apify_bestsellers"], 10)
+
+        _collect(orchestrator, specs)
+
+        assert len(api.runs) == 5
+        assert api.max_running == 2
+        assert all(result["status"] == "SUCCEEDED" for result in orchestrator.run_results)
+
+    def test_dataset_is_read_page_by_page(self):
+        """Test la lecture du dataset par pages offset/limit jusqu'à une page partielle."""
+        items = [{"asin": f"B00000000{i}"} for i in range(5)]
+        api = FakeApifyApi(datasets={"ds0": items})
+        orchestrator = api.orchestrator(page_size=2)
+        specs = build_list_run_specs("FR", [], ["apify_bestsellers"], 10)
+
+        pages = _collect(orchestrator, specs)
+
+        assert [len(page) for _, page in pages] == [2, 2, 1]
+        assert api.dataset_offsets == [("ds0", 0), ("ds0", 2), ("ds0", 4)]
+        assert orchestrator.run_results[0]["items"] == 5
+
+    def test_run_is_aborted_after_timeout(self):
+        """Test qu'un run encore en cours après le timeout est arrêté et ne remet aucun item."""
+        api = FakeApifyApi(datasets={"ds0": [{"asin": "B000000001"}]}, finish_runs=False)
+        orchestrator = api.orchestrator(run_timeout_seconds=0.05)
+        specs = build_list_run_specs("FR", [], ["apify_bestsellers"], 10)
+
+        pages = _collect(orchestrator, specs)
+
+        assert pages == []
+        assert api.aborted == ["run0"]
+        assert orchestrator.run_results[0]["status"] == "ABORTED"
+        assert api.dataset_offsets == []
+
+    def test_consumer_error_stops_stream_and_aborts_running_runs(self):
+        """Test qu'une erreur du consommateur remonte sans blocage et arrête les runs en cours."""
+        items = [{"asin": f"B00000000{i}"} for i in range(9)]
+        api = FakeApifyApi(datasets={"ds0": items}, pending_runs={"run1"})
+        orchestrator = api.orchestrator(max_concurrent_runs=2, page_size=1)
+        specs = build_list_run_specs("FR", ["kitchen", "sports"], ["apify_bestsellers"], 10)
+
+        async def consume():
+            async with aclosing(orchestrator.stream_items(specs)) as stream:
+                async for _ in stream:
+                    # Laisser le run terminé remplir la file bornée avant l'erreur
+                    await asyncio.sleep(0.2)
+                    raise RuntimeError("upsert en échec")
+
+        async def consume_with_timeout():
+            await asyncio.wait_for(consume(), timeout=5)
+
+        with pytest.raises(RuntimeError, match="upsert en échec"):
+            asyncio.run(consume_with_timeout())
+
+        assert api.aborted == ["run1"]
+        statuses = {result["run_id"]: result["status"] for result in orchestrator.run_results}
+        assert statuses == {"run0": "SUCCEEDED", "run1": "ABORTED"}
+
+
+def test_parallel_harvest_aggregates_upsert_counts(db: Session, monkeypatch):
+    """Test les compteurs agrégés de la récolte parallèle (endpoint run_parallel)."""
+    api = FakeApifyApi(
+        datasets={
+            "ds0": [{"asin": "B000000001"}, {"asin": "B000000002"}],
+            "ds1": [{"asin": "B000000002"}, {"asin": "B000000003"}, {"asin": "bad"}],
+        }
+    )
+    monkeypatch.setattr(
+        "app.jobs.asin_harvest_job.AsyncApifyOrchestrator", lambda: api.orchestrator()
+    )
+
+    response = TestClient(app).post(
+        "/api/v1/jobs/asin_harvest/run_parallel",
+        params={"sources": ["apify_bestsellers", "apify_movers"]},
+    )
+
+    assert response.status_code == 200
+    stats = response.json()["stats"]
+    assert stats["runs_started"] == 2
+    assert stats["runs_succeeded"] == 2
+    assert stats["harvested_total"] == 4
+    assert stats["inserted_new"] == 3
+    assert stats["duplicates"] == 1
+    assert db.query(HarvestedAsin).count() == 3
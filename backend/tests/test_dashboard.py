@@ -13,6 +13,7 @@ from app.models import Base
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
 from app.models.product_score import ProductScore
+from app.services.winners_projection import WinnersProjectionService
 
 # Créer les tables pour les tests
 @pytest.fixture(scope="function")
@@ -75,6 +76,10 @@ def sample_winner_data(db: Session):
     )
     db.add(score)
     db.commit()
+
+    # Alimenter la projection winners (normalement faite par ScoringJob)
+    WinnersProjectionService(db).refresh_for_products([product.id])
+    db.commit()
     
     return {
         "product": product,
@@ -129,3 +134,108 @@ def test_get_winners_empty_result(client: TestClient, db: Session):
     assert data["success"] is True
     assert len(data["items"]) == 0
 
+
+
+def test_get_winners_best_score_per_product(client: TestClient, db: Session, sample_winner_data):
+    """Test qu'un seul score (le meilleur) est retourné par produit, et is_real_asin depuis la projection."""
+    product = sample_winner_data["product"]
+    product.is_real_asin = False
+
+    # Deuxième option avec un score plus faible pour le même produit
+    other_sourcing = SourcingOption(
+        id=uuid4(),
+        product_candidate_id=product.id,
+        supplier_name="Other Supplier",
+        sourcing_type="import_CN",
+        unit_cost=Decimal("15.00"),
+    )
+    db.add(other_sourcing)
+    db.flush()
+    db.add(
+        ProductScore(
+            id=uuid4(),
+            product_candidate_id=product.id,
+            sourcing_option_id=other_sourcing.id,
+            selling_price_target=Decimal("25.99"),
+            margin_percent=Decimal("20.00"),
+            estimated_sales_per_day=Decimal("10.5"),
+            global_score=Decimal("30.0"),
+            decision="B_review",
+            risk_factor=Decimal("0.1"),
+        )
+    )
+    db.commit()
+    WinnersProjectionService(db).refresh_for_products([product.id])
+    db.commit()
+
+    response = client.get("/api/v1/dashboard/winners")
+    assert response.status_code == 200
+    items = [item for item in response.json()["items"] if item["asin"] == "TEST001"]
+    assert len(items) == 1
+    assert items[0]["supplier_name"] == "Test Supplier"
+    assert items[0]["is_real_asin"] is False
+
+    # Les filtres portent sur le meilleur score du produit (A_launch ici)
+    response = client.get("/api/v1/dashboard/winners?decision=B_review")
+    items = [item for item in response.json()["items"] if item["asin"] == "TEST001"]
+    assert len(items) == 0
+
+
+def test_get_winners_keyset_pagination(client: TestClient, db: Session):
+    """Test la pagination par curseur : pages disjointes, ordre stable, NULL en dernier."""
+    product_ids = []
+    for i, global_score in enumerate([Decimal("90.0"), Decimal("50.0"), None]):
+        product = ProductCandidate(
+            id=uuid4(),
+            asin=f"PAGE00{i}",
+            title=f"Produit paginé {i}",
+            source_marketplace="amazon_fr",
+            status="scored",
+        )
+        db.add(product)
+        db.flush()
+        sourcing = SourcingOption(
+            id=uuid4(),
+            product_candidate_id=product.id,
+            supplier_name="Test Supplier",
+            sourcing_type="EU_wholesale",
+            unit_cost=Decimal("10.00"),
+        )
+        db.add(sourcing)
+        db.flush()
+        db.add(
+            ProductScore(
+                id=uuid4(),
+                product_candidate_id=product.id,
+                sourcing_option_id=sourcing.id,
+                selling_price_target=Decimal("25.99"),
+                margin_percent=Decimal("30.00"),
+                global_score=global_score,
+                decision="B_review",
+                risk_factor=Decimal("0.1"),
+            )
+        )
+        product_ids.append(product.id)
+    db.commit()
+    WinnersProjectionService(db).refresh_for_products(product_ids)
+    db.commit()
+
+    response = client.get("/api/v1/dashboard/winners?limit=2")
+    data = response.json()
+    assert [item["asin"] for item in data["items"]] == ["PAGE000", "PAGE001"]
+    assert data["next_cursor"] is not None
+
+    response = client.get(f"/api/v1/dashboard/winners?limit=2&cursor={data['next_cursor']}")
+    data = response.json()
+    assert [item["asin"] for item in data["items"]] == ["PAGE002"]
+    assert data["next_cursor"] is None
+
+    # Un curseur émis pour un autre tri est refusé
+    first_page = client.get("/api/v1/dashboard/winners?limit=1").json()
+    response = client.get(
+        f"/api/v1/dashboard/winners?limit=1&sort=margin_percent&cursor={first_page['next_cursor']}"
+    )
+    assert response.status_code == 400
+
+    response = client.get("/api/v1/dashboard/winners?cursor=not-a-cursor")
+    assert response.status_code == 400
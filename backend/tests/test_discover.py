@@ -1,14 +1,32 @@
 """
 Tests pour le Module A : Discoverer.
 """
+import json
+from decimal import Decimal
+
+import httpx
 import pytest
 from sqlalchemy.orm import Session
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.core.config import get_settings
 from app.core.database import SessionLocal, engine
 from app.models import Base
+from app.models.discover_run import DiscoverRun
+from app.models.keepa_history import KeepaHistorySeries
 from app.models.product_candidate import ProductCandidate
+from app.jobs.discover_job import DiscoverJob
+from app.services.category_config import CategoryConfig
+from app.services import keepa_client as keepa_client_module
+from app.services.category_fanout import CategoryFanout
+from app.services.keepa_client import KeepaClient, KeepaProduct
+from app.services.refresh_scheduler import (
+    MIN_INTERVAL_HOURS,
+    compute_interval_hours,
+    refresh_value,
+)
+from app.services.run_ledger import InstrumentedClient
 
 # Créer les tables pour les tests
 @pytest.fixture(scope="function")
@@ -119,7 +137,7 @@ def test_discover_job_idempotent(client: TestClient, db: Session):
     """
     Test que le job Discover est idempotent : 
     - Premier run : crée des produits (created > 0)
-    - Deuxième run : met à jour les produits (updated > 0, created = 0)
+    - Deuxième run : met à jour ou laisse inchangés les produits (updated + unchanged > 0, created = 0)
     - Aucune UniqueViolation ne doit être levée
     """
     # Premier run
@@ -135,6 +153,204 @@ def test_discover_job_idempotent(client: TestClient, db: Session):
     data2 = response2.json()
     assert data2["success"] is True
     assert data2["stats"]["created"] == 0, "Le deuxième run ne devrait pas créer de nouveaux produits"
-    assert data2["stats"]["updated"] > 0, "Le deuxième run devrait mettre à jour les produits existants"
+    assert data2["stats"]["updated"] + data2["stats"]["unchanged"] > 0, (
+        "Le deuxième run devrait mettre à jour (ou laisser inchangés) les produits existants"
+    )
     assert data2["stats"]["errors"] == 0, "Aucune erreur ne devrait être levée, notamment pas de UniqueViolation"
 
+
+def test_discover_resume_skips_committed_batches(client: TestClient, db: Session):
+    """Test qu'un run interrompu reprend au lot suivant le dernier lot commité."""
+    interrupted = DiscoverRun(
+        market_code="amazon_fr",
+        status="failed",
+        asins=["B0RESUME01", "B0RESUME02", "B0RESUME03"],
+        batch_size=1,
+        cursor=1,
+        completed_batches=[0],
+        stats={"created": 1, "total_processed": 1},
+    )
+    db.add(interrupted)
+    db.commit()
+
+    response = client.post("/api/v1/jobs/discover/run", params={"resume": True})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["run_id"] == str(interrupted.id)
+    assert data["run_status"] == "completed"
+
+    db.refresh(interrupted)
+    assert interrupted.cursor == 3
+    assert interrupted.completed_batches == [0, 1, 2]
+    # Le lot 0 n'est pas retraité : seuls B0RESUME02 et B0RESUME03 sont en base
+    assert db.query(ProductCandidate).filter(ProductCandidate.asin == "B0RESUME01").count() == 0
+    assert data["stats"]["total_processed"] <= 3
+
+
+def test_content_hash_ignores_volatile_fields():
+    """Test que l'empreinte ignore lastUpdate mais change avec les champs normalisés."""
+    product = KeepaProduct(
+        asin="B0HASH0001",
+        title="Gourde isotherme",
+        category="Test",
+        avg_price=Decimal("19.99"),
+        bsr=1200,
+        estimated_sales_per_day=Decimal("0.50"),
+        reviews_count=42,
+        rating=Decimal("4.50"),
+        raw_data={},
+    )
+
+    def content_hash(raw):
+        return DiscoverJob._content_hash(product, "Test", "amazon_fr", 1, raw, {3: [10, 1200]})
+
+    base = content_hash({"source": "keepa_api", "lastUpdate": 1})
+    assert content_hash({"source": "keepa_api", "lastUpdate": 2}) == base
+    assert content_hash({"source": "keepa_api", "features": ["500 ml"]}) != base
+
+    product.avg_price = Decimal("17.99")
+    assert content_hash({"source": "keepa_api", "lastUpdate": 1}) != base
+
+
+def test_upsert_unchanged_product_skips_all_writes(db: Session):
+    """Test qu'un produit réupserté à l'identique ne réécrit ni le produit ni ses historiques."""
+    product = KeepaProduct(
+        asin="B0SAME0001",
+        title="Gourde isotherme",
+        category="Test",
+        avg_price=Decimal("19.99"),
+        bsr=1200,
+        estimated_sales_per_day=Decimal("0.50"),
+        reviews_count=42,
+        rating=Decimal("4.50"),
+        raw_data={"source": "keepa_api"},
+        history={3: [10, 1200, 20, 1100]},
+    )
+    job = DiscoverJob(db)
+    saves = []
+    save = job.history_store.save
+
+    def recording_save(*args, **kwargs):
+        saves.append(args)
+        return save(*args, **kwargs)
+
+    job.history_store.save = recording_save
+
+    assert job._upsert_product(product, "Test", "amazon_fr", domain=1) == "created"
+    stored = db.query(ProductCandidate).filter(ProductCandidate.asin == "B0SAME0001").one()
+    updated_at, content_hash = stored.updated_at, stored.content_hash
+    series_updated_at = db.query(KeepaHistorySeries.updated_at).scalar()
+    assert len(saves) == 1
+
+    assert job._upsert_product(product, "Test", "amazon_fr", domain=1) == "unchanged"
+
+    db.expire_all()
+    stored = db.query(ProductCandidate).filter(ProductCandidate.asin == "B0SAME0001").one()
+    assert (stored.updated_at, stored.content_hash) == (updated_at, content_hash)
+    assert len(saves) == 1
+    assert db.query(KeepaHistorySeries.updated_at).scalar() == series_updated_at
+
+
+def test_refresh_interval_and_value_prioritize_winners():
+    """Test que les winners volatils sont rafraîchis plus souvent et passent avant les C_drop."""
+    winner = compute_interval_hours("scored", "A_launch", volatility=0.2, profit_per_day=20.0)
+    dropped = compute_interval_hours("scored", "C_drop", volatility=0.0, profit_per_day=None)
+    unknown = compute_interval_hours(None, None, volatility=0.0, profit_per_day=None)
+
+    assert winner == MIN_INTERVAL_HOURS
+    assert dropped == 14 * 24
+    assert unknown == 24
+
+    assert refresh_value("A_launch", 20.0, 0.0, winner) > refresh_value("C_drop", None, 0.0, dropped)
+    # À décision égale, un ASIN très en retard passe devant
+    assert refresh_value("B_review", 5.0, 96.0, 48) > refresh_value("B_review", 5.0, 0.0, 48)
+
+
+def test_finder_pages_until_limit_with_server_side_filters():
+    """Test que le Product Finder pagine, s'arrête à la limite et envoie les seuils de la catégorie."""
+    selections = []
+
+    def handler(request):
+        selection = json.loads(request.content)
+        selections.append(selection)
+        start = selection["page"] * selection["perPage"]
+        asins = [f"B0FIND{i:04d}" for i in range(start, start + selection["perPage"])]
+        return httpx.Response(200, json={"asinList": asins, "totalResults": 1000})
+
+    category = CategoryConfig(
+        id=541966, name="Electronics & Photo", marketplace="amazon_fr", domain=1,
+        bsr_max=50000, price_min=10.0, price_max=150.0, min_reviews=20, min_rating=4.0,
+    )
+    client = KeepaClient(api_key="test")
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    pages = list(client.iter_finder_asins(category, max_results=120, page_size=50, client=http_client))
+
+    assert [len(page) for page in pages] == [50, 50, 20]
+    assert pages[2][-1] == "B0FIND0119"
+    assert selections[0]["rootCategory"] == [541966]
+    assert selections[0]["current_SALES_lte"] == 50000
+    assert (selections[0]["current_NEW_gte"], selections[0]["current_NEW_lte"]) == (1000, 15000)
+    assert selections[0]["current_COUNT_REVIEWS_gte"] == 20
+    assert selections[0]["current_RATING_gte"] == 40
+
+
+def test_category_fanout_dedupes_across_categories_under_shared_budget(monkeypatch):
+    """
+    Test que les catégories parallèles partagent le budget et ne traitent un ASIN qu'une fois.
+
+    Le vrai KeepaClient tourne contre un transport HTTP simulé : les ASINs sont
+    réclamés avant la réservation du budget, la page est tronquée au budget
+    accordé (granted // tokens_per_product) et les pages suivantes ne sont plus
+    demandées une fois le budget épuisé.
+    """
+    monkeypatch.setattr(get_settings(), "KEEPA_TOKENS_PER_PRODUCT", 2)
+    monkeypatch.setattr(get_settings(), "KEEPA_FINDER_PAGE_SIZE", 100)
+    monkeypatch.setattr(get_settings(), "KEEPA_FINDER_TOKENS_PER_QUERY", 10)
+    shared = [f"B0SHARED{i:02d}" for i in range(50)]
+    queries, enriched = [], []
+
+    def handler(request):
+        if request.url.path == "/query":
+            selection = json.loads(request.content)
+            category_id, page = selection["rootCategory"][0], selection["page"]
+            queries.append((category_id, page))
+            if page == 0:
+                # Page pleine : 50 ASINs communs aux deux catégories + 50 propres
+                asins = shared + [f"B0CAT{category_id}{i:04d}" for i in range(50)]
+            else:
+                asins = [f"B0CAT{category_id}{i:04d}" for i in range(50, 70)]
+            return httpx.Response(200, json={"asinList": asins, "totalResults": 170})
+        asins = request.url.params["asin"].split(",")
+        enriched.append(asins)
+        return httpx.Response(200, json={"products": [{"asin": a, "title": a} for a in asins]})
+
+    def instrumented_client(upstream, **kwargs):
+        return InstrumentedClient(upstream, transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(keepa_client_module, "InstrumentedClient", instrumented_client)
+    categories = [
+        CategoryConfig(id=i, name=f"Cat {i}", marketplace="amazon_fr",
+                       bsr_max=50000, price_min=10.0, price_max=150.0)
+        for i in (1, 2)
+    ]
+    # Cat 1 : 2 pages (11 + 100 * 2, puis 11 + 20 * 2) ; Cat 2 : page 0 (11) + 61 tokens
+    budget = 211 + 51 + 11 + 61
+    # Un seul worker : les catégories passent l'une après l'autre (ordre déterministe)
+    fanout = CategoryFanout(keepa_client=KeepaClient(api_key="test"), max_workers=1,
+                            token_budget=budget)
+
+    asins = [p.asin for _, products in fanout.iter_products(categories, 1000) for p in products]
+
+    # Les 50 ASINs communs ne sont ni enrichis ni facturés une seconde fois :
+    # les 61 tokens restants donnent 30 ASINs propres à Cat 2 (61 // 2)
+    assert enriched[-1] == [f"B0CAT2{i:04d}" for i in range(30)]
+    assert len(asins) == len(set(asins)) == 100 + 20 + 30
+    assert fanout.seen_asins.duplicates == 50
+    # Budget épuisé : la page 1 de Cat 2 n'est jamais demandée
+    assert queries == [(1, 0), (1, 1), (2, 0)]
+    assert fanout.budget.spent == budget
+    assert [(r["category"], r["pages"], r["status"]) for r in fanout.category_results] == [
+        ("Cat 1", 2, "ok"),
+        ("Cat 2", 1, "ok"),
+    ]
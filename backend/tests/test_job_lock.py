@@ -0,0 +1,220 @@
+"""
+Tests pour l'exécution unique des jobs (verrous consultatifs).
+
+Tests unitaires des clés de verrou (sans base de données), et tests du
+rattachement entre deux déclenchements concurrents (base de données).
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, engine
+from app.main import app
+from app.models import Base
+from app.models.job_run import JobRun
+from app.services.job_lock import (
+    ALL_MARKETS,
+    SingleFlight,
+    advisory_lock_key,
+    incremental_job_type,
+    run_or_attach,
+)
+
+
+@pytest.fixture(scope="function")
+def db():
+    """Créer une session de base de données pour les tests."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestAdvisoryLockKey:
+    """Tests des clés de verrou par (type de job, marché)."""
+
+    def test_key_is_stable_signed_bigint(self):
+        """Test que la clé est identique entre appels et tient dans un bigint Postgres."""
+        key = advisory_lock_key("scoring", "amazon_fr")
+
+        assert key == advisory_lock_key("scoring", "amazon_fr")
+        assert -(2 ** 63) <= key < 2 ** 63
+
+    def test_keys_differ_by_job_and_market(self):
+        """Test qu'un même job sur deux marchés, ou deux jobs, ne partagent pas de verrou."""
+        keys = {
+            advisory_lock_key("discover", "amazon_fr"),
+            advisory_lock_key("discover", "amazon_de"),
+            advisory_lock_key("scoring", "amazon_fr"),
+            advisory_lock_key("pipeline_abcde", "amazon_fr"),
+        }
+
+        assert len(keys) == 4
+
+    def test_jobs_without_market_share_one_lock(self):
+        """Test que les jobs sans marché (sourcing, scoring) utilisent un verrou global."""
+        flight = SingleFlight("sourcing")
+
+        assert flight.market_code == ALL_MARKETS
+        assert flight.lock_key == advisory_lock_key("sourcing", ALL_MARKETS)
+
+    def test_incremental_batches_have_their_own_lock(self):
+        """Test que les lots incrémentaux n'ont pas le verrou du run complet, qui détient le leur."""
+        full = SingleFlight("scoring")
+        batch = SingleFlight(incremental_job_type("scoring"))
+
+        assert batch.job_type == "scoring:incremental"
+        assert batch.lock_key != full.lock_key
+        assert full.batch_lock_key == batch.lock_key
+        assert batch.batch_lock_key is None
+
+
+
+class RunningJob:
+    """Job en cours dans un autre thread (sa propre connexion porte le verrou)."""
+
+    def __init__(self, params=None, stats=None, job_type="scoring"):
+        self.job_type = job_type
+        self.params = params
+        self.stats = stats or {}
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = None
+        self.thread = threading.Thread(target=self._run)
+
+    def _run(self):
+        def job():
+            self.started.set()
+            self.release.wait(10)
+            return self.stats
+
+        self.result = SingleFlight(self.job_type, params=self.params).run(job)
+
+    def __enter__(self):
+        self.thread.start()
+        assert self.started.wait(10)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release.set()
+        self.thread.join(10)
+
+
+def _never_called():
+    raise AssertionError("Le job ne doit pas être relancé par un déclenchement rattaché")
+
+
+class TestSingleFlightDatabase:
+    """Tests des verrous consultatifs et de job_runs sur Postgres."""
+
+    def test_second_trigger_attaches_and_gets_result(self, db: Session, monkeypatch):
+        """Test qu'un second déclenchement se rattache et reçoit le résultat du premier."""
+        monkeypatch.setattr(get_settings(), "JOB_ATTACH_POLL_SECONDS", 0.05)
+
+        with RunningJob(params={"force": False}, stats={"pairs_scored": 3}) as running:
+            threading.Timer(0.2, running.release.set).start()
+            result = asyncio.run(
+                run_or_attach("scoring", None, _never_called, wait_timeout=10, params={"force": False})
+            )
+
+        assert result["attached"] is True
+        assert result["status"] == "completed"
+        assert result["stats"] == {"pairs_scored": 3}
+        assert result["job_run_id"] == running.result["job_run_id"]
+        assert db.query(JobRun).count() == 1
+
+    def test_stale_running_row_is_abandoned(self, db: Session):
+        """Test qu'une ligne running sans verrou (processus mort) est marquée abandoned."""
+        stale = JobRun(
+            job_type="scoring",
+            market_code=ALL_MARKETS,
+            status="running",
+            owner="mort:1",
+            started_at=datetime.utcnow() - timedelta(hours=1),
+        )
+        db.add(stale)
+        db.commit()
+
+        result = SingleFlight("scoring").run(lambda: {"pairs_scored": 1})
+
+        assert result["attached"] is False
+        assert result["status"] == "completed"
+        db.expire_all()
+        assert db.query(JobRun).filter(JobRun.id == stale.id).one().status == "abandoned"
+        assert db.query(JobRun).filter(JobRun.status == "running").count() == 0
+
+    def test_trigger_with_other_params_is_refused(self, db: Session):
+        """Test le 409 quand le job est déjà en cours avec d'autres paramètres (force)."""
+        with RunningJob(params={"force": False}):
+            response = TestClient(app).post("/api/v1/jobs/scoring/run", params={"force": True})
+
+        assert response.status_code == 409
+        assert "autres paramètres" in response.json()["detail"]
+
+    def test_attached_trigger_times_out_with_409(self, db: Session, monkeypatch):
+        """Test le 409 quand l'exécution rejointe n'est pas terminée après l'attente."""
+        monkeypatch.setattr(get_settings(), "JOB_ATTACH_WAIT_SECONDS", 0.1)
+        monkeypatch.setattr(get_settings(), "JOB_ATTACH_POLL_SECONDS", 0.05)
+
+        with RunningJob(params={"force": False}):
+            response = TestClient(app).post("/api/v1/jobs/scoring/run")
+
+        assert response.status_code == 409
+        assert "toujours pas terminé" in response.json()["detail"]
+
+    def test_full_run_waits_for_incremental_batch(self, db: Session):
+        """Test qu'un run complet ne se rattache pas à un lot incrémental : il attend sa fin puis s'exécute."""
+        batch_type = incremental_job_type("scoring")
+        with RunningJob(stats={"pairs_scored": 1}, job_type=batch_type) as batch:
+            threading.Timer(0.3, batch.release.set).start()
+            result = asyncio.run(run_or_attach("scoring", None, lambda: {"pairs_scored": 5}))
+
+        assert result["attached"] is False
+        assert result["stats"] == {"pairs_scored": 5}
+        assert batch.result["attached"] is False
+        assert db.query(JobRun).filter(JobRun.status == "completed").count() == 2
+
+    def test_incremental_batch_yields_to_full_run(self, db: Session):
+        """Test qu'un lot incrémental ne démarre pas pendant un run complet (IDs gardés)."""
+        with RunningJob():
+            result = SingleFlight(incremental_job_type("scoring")).run(_never_called, attach=False)
+
+        assert result is None
+        assert db.query(JobRun).filter(JobRun.job_type == "scoring:incremental").count() == 0
+
+    def test_concurrent_requests_run_the_job_once(self, db: Session, monkeypatch):
+        """Test que deux requêtes simultanées sur la même application n'exécutent le job qu'une fois."""
+        monkeypatch.setattr(get_settings(), "JOB_ATTACH_POLL_SECONDS", 0.05)
+        calls = []
+
+        def slow_run(self, force=False, product_ids=None):
+            calls.append(threading.current_thread().name)
+            time.sleep(0.5)
+            return {"pairs_scored": 2}
+
+        monkeypatch.setattr("app.jobs.scoring_job.ScoringJob.run", slow_run)
+
+        async def trigger_twice():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(
+                    client.post("/api/v1/jobs/scoring/run"),
+                    client.post("/api/v1/jobs/scoring/run"),
+                )
+
+        responses = asyncio.run(trigger_twice())
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert len(calls) == 1
+        assert sorted(response.json()["attached"] for response in responses) == [False, True]
+        assert {response.json()["stats"]["pairs_scored"] for response in responses} == {2}
@@ -0,0 +1,107 @@
+"""
+Tests pour le stockage allégé des données Keepa.
+
+Tests unitaires de l'encodage des historiques csv, des requêtes sur les
+séries décodées et de la normalisation allégée de raw_data (sans base de données).
+"""
+from datetime import datetime
+
+from app.services.category_config import CategoryConfig
+from app.services.keepa_client import KeepaClient
+from app.services.keepa_history import (
+    count_rank_drops,
+    decode_series,
+    encode_series,
+    extract_history,
+    from_keepa_minutes,
+    to_keepa_minutes,
+    value_at,
+    window_average,
+)
+
+
+class TestSeriesEncoding:
+    """Tests de l'encodage compressé des séries Keepa."""
+
+    def test_roundtrip_with_gaps_and_negative_deltas(self):
+        """Test que l'encodage est sans perte (valeurs -1, baisses de prix, grands écarts)."""
+        points = [3_500_000, 1999, 3_500_060, -1, 3_501_000, 1899, 4_200_000, 250_000]
+
+        decoded = decode_series(encode_series(points))
+
+        assert decoded == [(3_500_000, 1999), (3_500_060, -1), (3_501_000, 1899), (4_200_000, 250_000)]
+
+    def test_encoded_series_smaller_than_json(self):
+        """Test qu'un historique régulier est bien plus compact que sa forme JSON."""
+        points = []
+        for i in range(2000):
+            points += [3_500_000 + i * 60, 1999 + (i % 7)]
+
+        assert len(encode_series(points)) * 20 < len(str(points))
+
+
+class TestLeanNormalization:
+    """Tests de la normalisation allégée des produits Keepa."""
+
+    def test_lean_raw_data_drops_csv_and_keeps_history(self):
+        """Test que raw_data ne contient plus les csv, conservés à part dans history."""
+        product = {
+            "asin": "B0LEAN0001",
+            "title": "Gourde isotherme",
+            "brand": "Acme",
+            "features": ["500 ml"],
+            "csv": [[3_500_000, 1999, 3_500_060, 1899], None, None, [3_500_000, 1200]],
+            "offers": [{"offerId": 1}],
+            "stats": {"current": [1899], "salesRankDrops90": 45, "min": [[3_500_000, 1899]]},
+        }
+        config = CategoryConfig(
+            id=0, name="Test", marketplace="amazon", bsr_max=999999, price_min=0, price_max=999999
+        )
+        client = KeepaClient(api_key="test")
+        client.lean_raw_data = True
+
+        keepa_product = client._normalize_products([product], config)[0]
+
+        assert "csv" not in keepa_product.raw_data
+        assert "offers" not in keepa_product.raw_data
+        assert keepa_product.raw_data["features"] == ["500 ml"]
+        assert keepa_product.raw_data["source"] == "keepa_api"
+        assert keepa_product.raw_data["stats"] == {"current": [1899], "salesRankDrops90": 45}
+        assert keepa_product.brand == "Acme"
+        assert keepa_product.sales_rank_drops_90 == 45
+        assert keepa_product.history == extract_history(product)
+        assert set(keepa_product.history) == {0, 3}
+
+
+class TestHistoryQueries:
+    """Tests des requêtes sur les points décodés."""
+
+    POINTS = [(1000, 2000), (1100, -1), (1200, 1800), (1500, 2200)]
+
+    def test_value_at(self):
+        """Test la valeur en vigueur à un instant (avant, pendant une indisponibilité, après)."""
+        assert value_at(self.POINTS, 999) is None
+        assert value_at(self.POINTS, 1000) == 2000
+        assert value_at(self.POINTS, 1150) is None
+        assert value_at(self.POINTS, 1499) == 1800
+        assert value_at(self.POINTS, 10_000) == 2200
+
+    def test_window_average_weights_by_duration(self):
+        """Test que la moyenne est pondérée par la durée et ignore les périodes indisponibles."""
+        # 2000 pendant 100 min, indisponible 100 min, 1800 pendant 300 min, 2200 pendant 100 min
+        assert window_average(self.POINTS, 1000, 1600) == (2000 * 100 + 1800 * 300 + 2200 * 100) / 500
+        assert window_average(self.POINTS, 1100, 1200) is None
+
+    def test_count_rank_drops(self):
+        """Test le comptage des baisses de BSR dans la fenêtre uniquement."""
+        ranks = [(10, 5000), (20, 4000), (30, -1), (40, 3000), (50, 3500), (60, 1000)]
+
+        assert count_rank_drops(ranks, 0, 100) == 3
+        assert count_rank_drops(ranks, 35, 55) == 1
+
+    def test_keepa_minutes_roundtrip(self):
+        """Test la conversion date <-> minutes Keepa."""
+        moment = datetime(2025, 12, 1, 12, 30)
+
+        assert from_keepa_minutes(to_keepa_minutes(moment)) == moment
+        assert to_keepa_minutes(datetime(2011, 1, 1, 1, 0)) == 60
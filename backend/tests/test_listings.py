@@ -3,6 +3,13 @@ Tests pour les Modules D/E : Listings.
 
 Tests unitaires et d'intégration pour la génération de listings.
 """
+import gzip
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pytest
 from uuid import uuid4
 from decimal import Decimal
@@ -16,8 +23,15 @@ from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
 from app.models.listing_template import ListingTemplate
 from app.models.product_score import ProductScore
+from app.models.listing_content_cache import ListingContentCache
 from app.jobs.listing_job import ListingJob
 from app.services.listing_service import ListingService
+from app.services.listing_content_cache import compute_content_hash
+from app.services.listing_generation_backend import (
+    PoolListingBackend,
+    build_generation_input,
+    create_listing_generator_backend,
+)
 
 
 # Créer les tables pour les tests
@@ -210,6 +224,29 @@ class TestListingJob:
         assert listing.faq is not None
         assert isinstance(listing.faq, list)
 
+    def test_listing_job_prefers_a_launch_option(
+        self,
+        db,
+        sample_candidate,
+        sample_sourcing_option_non_brandable,
+        sample_sourcing_option_brandable,
+        sample_product_score,
+    ):
+        """Test: l'option préchargée est celle du score A_launch, pas la première créée."""
+        best_options = ListingService(db).find_best_sourcing_options([sample_candidate.id])
+        assert best_options[sample_candidate.id].id == sample_sourcing_option_brandable.id
+
+        stats = ListingJob(db).run()
+
+        assert stats["listings_created"] == 1
+        listing = (
+            db.query(ListingTemplate)
+            .filter(ListingTemplate.product_candidate_id == sample_candidate.id)
+            .one()
+        )
+        assert listing.sourcing_option_id == sample_sourcing_option_brandable.id
+        assert listing.brandable is True
+
     def test_listing_job_no_sourcing_option(self, db, sample_candidate):
         """Test: ListingJob gère les produits sans option de sourcing."""
         # Lancer le job
@@ -397,6 +434,101 @@ class TestExportCSV:
         assert "Draft 1" in csv_content
         assert "Draft 2" not in csv_content  # Status ready, pas draft
 
+    def test_export_csv_streams_rows_with_candidate(
+        self, client, db, sample_candidate, sample_sourcing_option_non_brandable
+    ):
+        """Test: l'export streamé contient le BOM, les en-têtes et les champs du candidat joint."""
+        db.add(
+            ListingTemplate(
+                product_candidate_id=sample_candidate.id,
+                sourcing_option_id=sample_sourcing_option_non_brandable.id,
+                brandable=False,
+                title="Streamed Listing",
+                bullets=["A", "B"],
+                status="draft",
+            )
+        )
+        db.commit()
+
+        response = client.post(
+            "/api/v1/listings/export_csv",
+            json={"export_all_drafts": True},
+        )
+
+        assert response.status_code == 200
+        assert response.content.startswith("\ufeff".encode("utf-8"))
+        lines = response.content.decode("utf-8-sig").splitlines()
+        assert lines[0].startswith("asin,reference_asin,title")
+        assert "B01234567,B01234567,Streamed Listing,A | B,,29.99,Non" in lines[1]
+
+    def test_export_csv_gzip(
+        self, client, db, sample_candidate, sample_sourcing_option_non_brandable
+    ):
+        """Test: POST /api/v1/listings/export_csv?compression=gzip."""
+        db.add(
+            ListingTemplate(
+                product_candidate_id=sample_candidate.id,
+                sourcing_option_id=sample_sourcing_option_non_brandable.id,
+                brandable=False,
+                title="Gzip Listing",
+                status="draft",
+            )
+        )
+        db.commit()
+
+        response = client.post(
+            "/api/v1/listings/export_csv?compression=gzip",
+            json={"export_all_drafts": True},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert "listings_export.csv.gz" in response.headers["content-disposition"]
+        assert "Gzip Listing" in gzip.decompress(response.content).decode("utf-8-sig")
+
+    def test_export_flatfile(
+        self, client, db, sample_candidate, sample_sourcing_option_non_brandable
+    ):
+        """Test: POST /api/v1/listings/export_flatfile (texte tabulé Amazon)."""
+        db.add(
+            ListingTemplate(
+                product_candidate_id=sample_candidate.id,
+                sourcing_option_id=sample_sourcing_option_non_brandable.id,
+                brandable=False,
+                title="Flat\tFile Listing",
+                bullets=["B1", "B2"],
+                status="draft",
+            )
+        )
+        db.commit()
+
+        response = client.post(
+            "/api/v1/listings/export_flatfile",
+            json={"export_all_drafts": True},
+        )
+
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0].split("\t")[:3] == ["item_sku", "external_product_id", "external_product_id_type"]
+        values = dict(zip(lines[0].split("\t"), lines[1].split("\t")))
+        assert values["external_product_id"] == "B01234567"
+        assert values["item_name"] == "Flat File Listing"
+        assert values["bullet_point2"] == "B2"
+        assert values["standard_price"] == "29.99"
+
+    def test_export_analytics_parquet(
+        self, client, db, sample_candidate, sample_sourcing_option_non_brandable
+    ):
+        """Test: GET /api/v1/export/analytics.parquet (nécessite pyarrow)."""
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        response = client.get("/api/v1/export/analytics.parquet")
+
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert "B01234567" in table.column("asin").to_pylist()
+        assert "global_score" in table.column_names
+
     def test_export_csv_empty_request(self, client):
         """Test: POST /api/v1/listings/export_csv sans paramètres."""
         response = client.post(
@@ -415,3 +547,143 @@ class TestExportCSV:
 
         assert response.status_code == 404
 
+
+
+class TestListingGenerationBackend:
+    """Tests pour les backends de génération de listings."""
+
+    def _payloads(self):
+        candidate = ProductCandidate(
+            id=uuid4(),
+            asin="B0BACKEND1",
+            title="Gourde isotherme en acier inoxydable",
+            category="Sports",
+            rating=Decimal("4.4"),
+            reviews_count=42,
+        )
+        return [
+            build_generation_input(candidate, SourcingOption(id=uuid4(), brandable=brandable))
+            for brandable in (True, False)
+        ]
+
+    def test_thread_backend_matches_inline(self):
+        """Test: le backend thread produit le même contenu que le backend inline."""
+        payloads = self._payloads()
+        inline = create_listing_generator_backend("inline").generate_many(payloads)
+        backend = create_listing_generator_backend("thread", max_workers=2, timeout_seconds=5)
+        try:
+            assert backend.generate_many(payloads) == inline
+        finally:
+            backend.close()
+
+        assert inline[0]["brandable"] is True
+        assert inline[1]["strategy"] == "clone_best"
+
+    def test_pool_backend_timeout(self):
+        """Test: un produit trop lent est abandonné sans bloquer les autres."""
+
+        def generate(payload):
+            if payload["option"]["brandable"]:
+                time.sleep(1)
+            return {"title": payload["candidate"]["asin"]}
+
+        backend = PoolListingBackend(ThreadPoolExecutor, generate, 2, 0.1, "test")
+        try:
+            assert backend.generate_many(self._payloads()) == [None, {"title": "B0BACKEND1"}]
+        finally:
+            backend.close()
+
+    def test_shared_pool_backend_survives_concurrent_timeouts(self):
+        """Test: un timeout dans un job ne casse pas le pool d'un autre job sur le même backend."""
+
+        def generate(payload):
+            if payload["option"]["brandable"]:
+                time.sleep(0.5)
+            return {"title": payload["candidate"]["asin"]}
+
+        backend = PoolListingBackend(ThreadPoolExecutor, generate, 1, 0.1, "test")
+        results, errors = [], []
+
+        def job():
+            try:
+                results.append(backend.generate_many(self._payloads() * 2))
+            except Exception as e:  # "cannot schedule new futures after shutdown"
+                errors.append(e)
+
+        threads = [threading.Thread(target=job) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert results == [[None, {"title": "B0BACKEND1"}] * 2] * 3
+
+    def test_process_backend_terminates_hung_workers(self):
+        """Test: le processus bloqué par un timeout est terminé en fin de lot."""
+        backend = PoolListingBackend(
+            lambda n: ProcessPoolExecutor(max_workers=n), _slow_brandable_generate, 2, 0.5, "test"
+        )
+        started = time.monotonic()
+        assert backend.generate_many(self._payloads()) == [None, {"title": "B0BACKEND1"}]
+        assert time.monotonic() - started < 10
+
+        deadline = time.monotonic() + 5
+        while multiprocessing.active_children() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert multiprocessing.active_children() == []
+
+    def test_unknown_backend(self):
+        """Test: un backend inconnu est refusé."""
+        with pytest.raises(ValueError):
+            create_listing_generator_backend("gpu")
+
+
+def _slow_brandable_generate(payload):
+    """Génération bloquée pour les produits brandables (worker de ProcessPoolExecutor)."""
+    if payload["option"]["brandable"]:
+        time.sleep(60)
+    return {"title": payload["candidate"]["asin"]}
+
+
+class TestListingContentCache:
+    """Tests pour le cache de contenu des listings."""
+
+    def test_unchanged_product_reuses_cached_content(
+        self, db, sample_candidate, sample_sourcing_option_non_brandable
+    ):
+        """Test: un produit inchangé reprend le contenu du cache au lieu de le regénérer."""
+        stats = ListingJob(db).run()
+        assert stats["listings_created"] == 1
+        assert stats["listings_from_cache"] == 0
+        assert db.query(ListingContentCache).count() == 1
+
+        # Reset : suppression du draft puis nouvelle génération
+        first = db.query(ListingTemplate).one()
+        first_title, first_bullets = first.title, first.bullets
+        db.delete(first)
+        db.commit()
+
+        stats = ListingJob(db).run()
+        assert stats["listings_created"] == 1
+        assert stats["listings_from_cache"] == 1
+        second = db.query(ListingTemplate).one()
+        assert second.title == first_title
+        assert second.bullets == first_bullets
+
+    def test_content_hash_depends_on_inputs_and_version(self):
+        """Test: l'empreinte change avec les entrées ou la version, pas avec les IDs."""
+        candidate = ProductCandidate(id=uuid4(), asin="B0HASH0001", title="Lampe LED")
+        option = SourcingOption(id=uuid4(), brandable=False)
+        payload = build_generation_input(candidate, option)
+        base = compute_content_hash(payload, "v1")
+
+        other_ids = build_generation_input(
+            ProductCandidate(id=uuid4(), asin="B0HASH0001", title="Lampe LED"),
+            SourcingOption(id=uuid4(), brandable=False),
+        )
+        assert compute_content_hash(other_ids, "v1") == base
+        assert compute_content_hash(payload, "v2") != base
+
+        candidate.title = "Lampe LED rechargeable"
+        assert compute_content_hash(build_generation_input(candidate, option), "v1") != base
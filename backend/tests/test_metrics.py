@@ -0,0 +1,72 @@
+"""
+Tests pour les métriques Prometheus (/metrics).
+
+Tests unitaires du format texte et de l'endpoint (sans base de données).
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Counter, Histogram, Registry
+from app.main import app
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registre isolé pour les métriques créées par le test."""
+    registry = Registry()
+    monkeypatch.setattr("app.core.metrics.REGISTRY", registry)
+    return registry
+
+
+class TestRendering:
+    """Tests du format texte Prometheus."""
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test les seaux cumulés, la somme et le nombre d'observations."""
+        histogram = Histogram("test_duration_seconds", "Durée", ["stage"], buckets=(0.1, 1.0))
+
+        child = histogram.labels("scoring")
+        child.observe(0.05)
+        child.observe(0.1)
+        child.observe(5.0)
+
+        text = registry.render()
+        assert 'test_duration_seconds_bucket{stage="scoring",le="0.1"} 2' in text
+        assert 'test_duration_seconds_bucket{stage="scoring",le="1"} 2' in text
+        assert 'test_duration_seconds_bucket{stage="scoring",le="+Inf"} 3' in text
+        assert 'test_duration_seconds_count{stage="scoring"} 3' in text
+        assert 'test_duration_seconds_sum{stage="scoring"} 5.15' in text
+
+    def test_counter_labels_are_escaped_and_reused(self, registry):
+        """Test l'échappement des labels et la réutilisation de l'enfant."""
+        counter = Counter("test_requests_total", "Requêtes", ["route"])
+
+        counter.labels('/a"b').inc()
+        counter.labels('/a"b').inc(2)
+
+        assert counter.labels('/a"b') is counter.labels('/a"b')
+        assert 'test_requests_total{route="/a\\"b"} 3' in registry.render()
+
+    def test_unlabelled_metric_is_exposed_at_zero(self, registry):
+        """Test qu'une métrique sans label est exposée avant tout usage."""
+        Counter("test_tokens_total", "Tokens")
+
+        assert "test_tokens_total 0" in registry.render()
+
+
+class TestMetricsEndpoint:
+    """Tests de l'endpoint /metrics."""
+
+    def test_request_latency_is_labelled_by_route_template(self):
+        """Test que la durée des requêtes est exposée par gabarit de route."""
+        client = TestClient(app)
+
+        client.get("/health")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert (
+            'winner_http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+            in response.text
+        )
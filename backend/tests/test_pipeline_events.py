@@ -0,0 +1,136 @@
+"""
+Tests pour les événements du pipeline (LISTEN/NOTIFY).
+
+Tests unitaires des charges utiles NOTIFY et du regroupement des IDs par le
+listener (sans base de données).
+"""
+import json
+from uuid import uuid4
+
+from app.jobs.pipeline_listener import PipelineListener
+from app.services.pipeline_events import (
+    CHANNEL_OPTIONS_CREATED,
+    CHANNEL_PRODUCTS_UPSERTED,
+    MAX_IDS_PER_NOTIFICATION,
+    decode_payload,
+    encode_payloads,
+)
+
+
+class TestPayloads:
+    """Tests des charges utiles NOTIFY."""
+
+    def test_payloads_are_chunked_under_notify_limit(self):
+        """Test le découpage des IDs sous la limite de 8000 octets de NOTIFY."""
+        ids = [uuid4() for _ in range(MAX_IDS_PER_NOTIFICATION * 2 + 1)]
+
+        payloads = encode_payloads(ids + ids[:10])
+
+        assert len(payloads) == 3
+        assert all(len(payload.encode("utf-8")) < 8000 for payload in payloads)
+        decoded = [item for payload in payloads for item in decode_payload(payload)]
+        assert decoded == [str(item) for item in ids]
+
+    def test_invalid_payload_is_ignored(self):
+        """Test qu'une charge utile illisible ne donne aucun ID."""
+        assert decode_payload("not json") == []
+        assert decode_payload(json.dumps([1, 2])) == []
+
+
+class TestListenerBatching:
+    """Tests du regroupement des IDs par étape."""
+
+    def test_channels_feed_next_stage_and_batch_is_due(self):
+        """Test que chaque canal alimente l'étape suivante et le déclenchement du lot."""
+        listener = PipelineListener(batch_seconds=10.0, max_batch=100)
+        product_id = str(uuid4())
+
+        listener.add(CHANNEL_PRODUCTS_UPSERTED, [product_id, "not-a-uuid"])
+        listener.add(CHANNEL_OPTIONS_CREATED, [product_id])
+
+        assert listener.pending["sourcing"] == {product_id}
+        assert listener.pending["scoring"] == {product_id}
+        assert not listener.is_due(now=listener._pending_since + 1)
+        assert listener.is_due(now=listener._pending_since + 10)
+
+    def test_full_batch_is_due_immediately(self):
+        """Test qu'un lot plein est traité sans attendre le délai."""
+        listener = PipelineListener(batch_seconds=60.0, max_batch=3)
+
+        listener.add(CHANNEL_PRODUCTS_UPSERTED, [str(uuid4()) for _ in range(3)])
+
+        assert listener.is_due(now=listener._pending_since)
+
+
+class FakeSession:
+    """Session factice (le job est simulé)."""
+
+    def close(self):
+        pass
+
+
+def _listener_with_flight(monkeypatch, run, max_attempts=2):
+    """Listener dont le verrou single-flight exécute run à la place du job."""
+
+    class FakeSingleFlight:
+        def __init__(self, job_type):
+            self.job_type = job_type
+
+        def run(self, fn, attach=True):
+            return run(self.job_type)
+
+    monkeypatch.setattr("app.jobs.pipeline_listener.SingleFlight", FakeSingleFlight)
+    return PipelineListener(
+        session_factory=FakeSession, batch_seconds=0.0, max_attempts=max_attempts
+    )
+
+
+class TestListenerRetries:
+    """Tests des relances des étapes incrémentales."""
+
+    def test_failing_ids_are_dropped_after_max_attempts(self, monkeypatch):
+        """Test qu'un lot empoisonné est abandonné après max_attempts échecs."""
+
+        def run(job_type):
+            raise RuntimeError("produit invalide")
+
+        listener = _listener_with_flight(monkeypatch, run)
+        product_id = str(uuid4())
+        listener.add(CHANNEL_PRODUCTS_UPSERTED, [product_id])
+
+        listener.flush()
+        assert listener.pending["sourcing"] == {product_id}
+
+        listener.flush()
+        assert listener.pending["sourcing"] == set()
+        assert listener.failures["sourcing"] == {}
+        assert listener.pending_count() == 0
+
+    def test_busy_lock_keeps_ids_without_counting_failures(self, monkeypatch):
+        """Test qu'un verrou pris (run complet en cours) garde les IDs sans limite de tentatives."""
+        listener = _listener_with_flight(monkeypatch, lambda job_type: None)
+        product_id = str(uuid4())
+        listener.add(CHANNEL_PRODUCTS_UPSERTED, [product_id])
+
+        for _ in range(5):
+            assert listener.flush() == {}
+
+        assert listener.pending["sourcing"] == {product_id}
+        assert listener.failures["sourcing"] == {}
+
+    def test_success_resets_failure_count(self, monkeypatch):
+        """Test qu'un lot réussi remet à zéro le compteur d'échecs de ses IDs."""
+        outcomes = [RuntimeError("timeout"), {"stats": {"options_created": 1}}]
+
+        def run(job_type):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        listener = _listener_with_flight(monkeypatch, run)
+        listener.add(CHANNEL_PRODUCTS_UPSERTED, [str(uuid4())])
+
+        listener.flush()
+        assert listener.flush() == {"sourcing": {"options_created": 1}}
+        assert listener.failures["sourcing"] == {}
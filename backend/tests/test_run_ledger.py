@@ -0,0 +1,181 @@
+"""
+Tests pour le registre des exécutions de jobs (mesures par étape).
+
+Tests unitaires des compteurs, des étapes et des agrégats (sans base de données),
+et test de l'endpoint de tendances (base de données).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.main import app
+from app.models import Base
+from app.models.job_run import JobRun
+from app.models.job_run_stage import JobRunStage
+
+from app.services.run_ledger import (
+    UPSTREAM_KEEPA,
+    InstrumentedClient,
+    RunMetrics,
+    bind_context,
+    record_cache,
+    record_http,
+    record_keepa_tokens,
+    stage,
+    summarize_stages,
+)
+
+
+@pytest.fixture(scope="function")
+def db():
+    """Créer une session de base de données pour les tests."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestRunMetrics:
+    """Tests des compteurs par étape."""
+
+    def test_counters_go_to_innermost_stage(self):
+        """Test que les compteurs vont à l'étape active et la durée à chaque étape."""
+        metrics = RunMetrics("pipeline_abcde")
+
+        with metrics.activate():
+            record_keepa_tokens(3)
+            with stage("discover"):
+                record_keepa_tokens(10)
+                record_cache("page_cache", hits=3, misses=1)
+
+        root = metrics.stages["pipeline_abcde"].as_dict()
+        discover = metrics.stages["discover"].as_dict()
+        assert root["keepa_tokens"] == 3
+        assert discover["keepa_tokens"] == 10
+        assert discover["cache"] == {"page_cache": {"hits": 3, "misses": 1}}
+        assert root["wall_ms"] >= discover["wall_ms"]
+
+    def test_recording_outside_a_run_is_a_no_op(self):
+        """Test que les enregistrements hors exécution ne lèvent rien et ne comptent rien."""
+        metrics = RunMetrics("scoring")
+
+        record_http(UPSTREAM_KEEPA, 0.1)
+        with stage("scoring"):
+            record_keepa_tokens(5)
+
+        assert metrics.stages == {}
+
+    def test_bound_tasks_record_from_executor_threads(self):
+        """Test que les tâches soumises via bind_context comptent dans l'étape de l'appelant."""
+        metrics = RunMetrics("sourcing")
+
+        with metrics.activate():
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(bind_context(lambda _: record_http("scraper", 0.01)), range(20)))
+            # Sans bind_context, les threads ne voient pas l'exécution
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda _: record_http("scraper", 0.01), range(5)))
+
+        assert metrics.stages["sourcing"].http_calls["scraper"]["calls"] == 20
+
+    def test_instrumented_client_counts_calls_and_errors(self):
+        """Test le comptage des appels HTTP et des erreurs par service."""
+        metrics = RunMetrics("discover")
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200 if request.url.path == "/ok" else 429)
+        )
+
+        with metrics.activate():
+            with InstrumentedClient(UPSTREAM_KEEPA, transport=transport) as client:
+                client.get("https://api.keepa.com/ok")
+                client.get("https://api.keepa.com/limited")
+
+        calls = metrics.stages["discover"].http_calls[UPSTREAM_KEEPA]
+        assert calls["calls"] == 2
+        assert calls["errors"] == 1
+
+
+class TestSummarizeStages:
+    """Tests de l'agrégation des étapes par jour."""
+
+    def test_summary_per_day_job_and_stage(self):
+        """Test les moyennes, totaux et taux de hit à partir des agrégats SQL."""
+        key = {"job_type": "scoring", "stage": "scoring"}
+        day1 = {**key, "day": date(2025, 12, 1)}
+        day2 = {**key, "day": date(2025, 12, 2)}
+        totals = [
+            {
+                **day2, "runs": 1, "wall_ms_total": 500.0, "wall_ms_max": 500.0,
+                "db_ms_total": 10.0, "rows_read": 100, "rows_written": 10, "keepa_tokens": 0,
+            },
+            {
+                **day1, "runs": 2, "wall_ms_total": 4000.0, "wall_ms_max": 3000.0,
+                "db_ms_total": 20.0, "rows_read": 200, "rows_written": 20, "keepa_tokens": 0,
+            },
+        ]
+        http_calls = [
+            {**day1, "upstream": "spapi", "calls": 4.0, "errors": 2.0, "ms": 400.0},
+            {**day2, "upstream": "spapi", "calls": 0.0, "errors": 0.0, "ms": 0.0},
+        ]
+        caches = [
+            {**day1, "name": "page_cache", "hits": 6.0, "misses": 2.0},
+            {**day2, "name": "page_cache", "hits": 0.0, "misses": 0.0},
+        ]
+
+        summary = summarize_stages(totals, http_calls, caches)
+
+        assert [entry["runs"] for entry in summary] == [2, 1]
+        first = summary[0]
+        assert first["wall_ms_avg"] == 2000.0
+        assert first["wall_ms_max"] == 3000.0
+        assert first["rows_read"] == 200
+        assert first["http_calls"]["spapi"] == {"calls": 4, "errors": 2, "avg_ms": 100.0}
+        assert first["cache_hit_rate"] == {"page_cache": 0.75}
+        assert summary[1]["http_calls"]["spapi"]["avg_ms"] == 0.0
+        assert summary[1]["cache_hit_rate"] == {}
+
+
+def test_stage_summary_endpoint_aggregates_in_sql(db: Session):
+    """Test l'endpoint /jobs/stages/summary (agrégats SQL et json_each, null JSON compris)."""
+    now = datetime.utcnow().replace(hour=12)
+    job_run = JobRun(job_type="scoring", market_code="all", status="completed", started_at=now)
+    db.add(job_run)
+    db.flush()
+    base = {
+        "job_run_id": job_run.id,
+        "stage": "scoring",
+        "db_ms": 10.0,
+        "db_queries": 5,
+        "rows_read": 100,
+        "rows_written": 10,
+        "keepa_tokens": 3,
+    }
+    db.add_all([
+        JobRunStage(
+            **base,
+            started_at=now - timedelta(hours=1),
+            wall_ms=1000.0,
+            http_calls={"spapi": {"calls": 2, "errors": 1, "ms": 200.0}},
+            cache={"page_cache": {"hits": 3, "misses": 1}},
+        ),
+        JobRunStage(**base, started_at=now, wall_ms=3000.0, http_calls=None, cache=None),
+    ])
+    db.commit()
+
+    response = TestClient(app).get("/api/v1/jobs/stages/summary", params={"days": 2})
+
+    assert response.status_code == 200
+    [entry] = response.json()
+    assert entry["day"] == now.date().isoformat()
+    assert (entry["runs"], entry["wall_ms_avg"], entry["wall_ms_max"]) == (2, 2000.0, 3000.0)
+    assert (entry["rows_read"], entry["keepa_tokens"]) == (200, 6)
+    assert entry["http_calls"] == {"spapi": {"calls": 2, "errors": 1, "avg_ms": 100.0}}
+    assert entry["cache_hit_rate"] == {"page_cache": 0.75}
@@ -13,7 +13,9 @@ from app.models import Base
 from app.models.product_candidate import ProductCandidate
 from app.models.sourcing_option import SourcingOption
 from app.models.product_score import ProductScore
+from app.models.winner import Winner
 from app.jobs.scoring_job import ScoringJob
+from app.services.scoring_service import ScoringService
 
 
 # Créer les tables pour les tests
@@ -86,6 +88,26 @@ def test_scoring_job_run(db: Session, sample_product_candidate, sample_sourcing_
     assert score.selling_price_target is not None
 
 
+def test_scoring_job_refreshes_winners(db: Session, sample_product_candidate, sample_sourcing_option):
+    """Test que ScoringJob rafraîchit la projection winners pour les produits scorés."""
+    job = ScoringJob(db)
+    stats = job.run()
+
+    assert stats["winners_refreshed"] == 1
+
+    winner = db.query(Winner).filter(
+        Winner.product_candidate_id == sample_product_candidate.id
+    ).first()
+    score = db.query(ProductScore).filter(
+        ProductScore.product_candidate_id == sample_product_candidate.id
+    ).first()
+
+    assert winner is not None
+    assert winner.product_score_id == score.id
+    assert winner.supplier_name == "Test Supplier"
+    assert winner.decision == score.decision
+
+
 def test_scoring_endpoint_run(client: TestClient):
     """Test l'endpoint POST /api/v1/jobs/scoring/run retourne 200 avec stats."""
     response = client.post("/api/v1/jobs/scoring/run")
@@ -131,3 +153,105 @@ def test_get_top_scores_with_filter(client: TestClient, db: Session):
     for score in scores:
         assert score["decision"] == "B_review"
 
+
+
+def test_get_top_scores_keyset_pagination(client: TestClient, db: Session, sample_product_candidate, sample_sourcing_option):
+    """Test la pagination par curseur de /products/scores/top (en-tête X-Next-Cursor)."""
+    for global_score in [Decimal("80.0"), Decimal("60.0"), Decimal("40.0")]:
+        db.add(
+            ProductScore(
+                product_candidate_id=sample_product_candidate.id,
+                sourcing_option_id=sample_sourcing_option.id,
+                selling_price_target=Decimal("29.99"),
+                margin_percent=Decimal("35.00"),
+                global_score=global_score,
+                decision="A_launch",
+                risk_factor=Decimal("0.1"),
+            )
+        )
+    db.commit()
+
+    response = client.get(
+        "/api/v1/products/scores/top?decision=A_launch&limit=2",
+        headers={"Origin": "http://localhost:3000"},
+    )
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [float(s["global_score"]) for s in first_page] == [80.0, 60.0]
+    cursor = response.headers["X-Next-Cursor"]
+    # En-tête lisible par le front (CORS)
+    assert "X-Next-Cursor" in response.headers["Access-Control-Expose-Headers"]
+
+    response = client.get(f"/api/v1/products/scores/top?decision=A_launch&limit=2&cursor={cursor}")
+    assert response.status_code == 200
+    assert [float(s["global_score"]) for s in response.json()] == [40.0]
+    assert "X-Next-Cursor" not in response.headers
+
+
+class FakeSPAPIClient:
+    """Faux client SP-API : prix connus par ASIN, appels comptés."""
+
+    is_configured = True
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def get_pricing_for_asin(self, asin, marketplace_id=None):
+        self.calls.append(asin)
+        price = self.prices.get(asin)
+        return {"buybox_price": price} if price else None
+
+    def get_fees_estimate(self, *args, **kwargs):
+        return None
+
+
+class FakeScraperClient:
+    """Faux scraper : prix par lot (scrape_prices), appels unitaires interdits."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.batches = []
+
+    def scrape_prices(self, asins):
+        self.batches.append(list(asins))
+        return {asin: self.prices.get(asin) for asin in asins}
+
+    def scrape_price_for_product(self, asin):
+        raise AssertionError(f"Prix de {asin} non préchargé")
+
+
+def test_prefetched_prices_are_returned_and_used_per_job():
+    """Test le préchargement des prix : SP-API d'abord, scraping groupé des manquants."""
+    service = ScoringService()
+    service.spapi_client = FakeSPAPIClient({"B00SPAPI01": Decimal("39.90")})
+    service.scraper_client = FakeScraperClient({"B00SCRAP01": Decimal("24.50")})
+
+    prefetched = service.prefetch_selling_prices(["B00SPAPI01", "B00SCRAP01", "B00SPAPI01"])
+
+    assert service.scraper_client.batches == [["B00SCRAP01"]]
+    assert prefetched["B00SPAPI01"] == {"spapi_pricing": {"buybox_price": Decimal("39.90")}}
+    assert prefetched["B00SCRAP01"] == {"spapi_pricing": None, "scraper_price": Decimal("24.50")}
+    # Rien n'est gardé sur le service partagé
+    assert not hasattr(service, "_prefetched_spapi_pricing")
+
+    service.spapi_client.calls.clear()
+    for asin, expected_price in (("B00SPAPI01", Decimal("39.90")), ("B00SCRAP01", Decimal("24.50"))):
+        candidate = ProductCandidate(
+            asin=asin,
+            title="Test Product",
+            source_marketplace="amazon_fr",
+            avg_price=Decimal("29.99"),
+            estimated_sales_per_day=Decimal("10"),
+        )
+        option = SourcingOption(
+            supplier_name="Test Supplier",
+            sourcing_type="EU_wholesale",
+            unit_cost=Decimal("10.00"),
+            shipping_cost_unit=Decimal("2.00"),
+        )
+
+        score = service.score_product_option(candidate, option, prefetched)
+
+        assert score.selling_price_target == expected_price
+    assert service.spapi_client.calls == []
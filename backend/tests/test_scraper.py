@@ -0,0 +1,148 @@
+"""
+Tests pour le scraper Amazon maison.
+
+Tests unitaires de l'extraction HTML (ASINs, prix), du client HTTP
+(relances sur 503/captcha, scraping des prix par lot) et du cache de pages.
+"""
+import time
+from decimal import Decimal
+
+import httpx
+
+from app.services.amazon_html_extractor import extract_asins, extract_price
+from app.services.page_cache import PageCache
+from app.services.scraper_client import HostRateLimiter, ScraperClient
+
+
+class TestHtmlExtraction:
+    """Tests de l'extraction en une passe des ASINs et des prix."""
+
+    def test_extract_asins_isolated_and_prefixed(self):
+        """Test que les ASINs isolés et préfixés sont extraits, sans faux positifs."""
+        html = (
+            '<div data-asin="B0AAAAAAA1"></div>'
+            '<a href="/dp/b0bbbbbbb2xyz">lien</a>'
+            '<script>{"asin": "B0CCCCCCC3"}</script>'
+            "texte B0DDDDDDD4, fin"
+            " XB0EEEEEEE5 B0FFFFFFF6GG"
+        )
+
+        assert extract_asins(html) == ["B0AAAAAAA1", "B0BBBBBBB2", "B0CCCCCCC3", "B0DDDDDDD4"]
+
+    def test_extract_price_respects_selector_priority(self):
+        """Test que le sélecteur le plus prioritaire l'emporte, même plus loin dans la page."""
+        html = (
+            '<span class="a-price-whole">12</span>'
+            '<span class="a-offscreen">0,50 €</span>'
+            '<span class="a-offscreen">29,99 €</span>'
+        )
+
+        assert extract_price(html) == (Decimal("29.99"), "a-offscreen")
+
+    def test_extract_price_generic_fallback(self):
+        """Test le repli sur le format générique "XX,XX €"."""
+        assert extract_price("<p>Seulement 15,90 € aujourd'hui</p>") == (
+            Decimal("15.9"),
+            "generic-price",
+        )
+        assert extract_price("<p>Aucun prix</p>") is None
+
+
+class TestScraperClient:
+    """Tests du client HTTP du scraper."""
+
+    def test_scrape_prices_retries_503_and_captcha(self):
+        """Test que les 503 et pages captcha sont relancés et qu'un 404 donne None."""
+        calls = {}
+
+        def handler(request):
+            asin = request.url.path.rsplit("/", 1)[1]
+            calls[asin] = calls.get(asin, 0) + 1
+            if asin == "B0RETRY503" and calls[asin] == 1:
+                return httpx.Response(503, text="Service Unavailable")
+            if asin == "B0CAPTCHA1" and calls[asin] == 1:
+                return httpx.Response(200, text='<form action="/errors/validateCaptcha">')
+            if asin == "B0MISSING1":
+                return httpx.Response(404, text="Not Found")
+            return httpx.Response(200, text='<span class="a-offscreen">19,99 €</span>')
+
+        client = ScraperClient(
+            max_concurrency=2,
+            backoff_base_seconds=0.01,
+            rate_limiter=HostRateLimiter(rate=0, burst=1),
+            cache_pages=False,
+        )
+        client._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+        prices = client.scrape_prices(["B0RETRY503", "B0CAPTCHA1", "B0MISSING1", "B0RETRY503"])
+
+        assert prices == {
+            "B0RETRY503": Decimal("19.99"),
+            "B0CAPTCHA1": Decimal("19.99"),
+            "B0MISSING1": None,
+        }
+        assert calls == {"B0RETRY503": 2, "B0CAPTCHA1": 2, "B0MISSING1": 1}
+
+
+class TestPageCache:
+    """Tests du cache disque des pages scrapées."""
+
+    def _client(self, cache, handler):
+        """Client scraper sans limite de débit, branché sur un transport simulé."""
+        client = ScraperClient(rate_limiter=HostRateLimiter(rate=0, burst=1), page_cache=cache)
+        client._client = httpx.Client(transport=httpx.MockTransport(handler))
+        return client
+
+    def test_fresh_page_served_then_revalidated(self, tmp_path):
+        """Test qu'une page fraîche est servie sans requête et qu'une page périmée est revalidée."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text="<html>page</html>", headers={"ETag": '"v1"'})
+
+        cache = PageCache(str(tmp_path), ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+        client = self._client(cache, handler)
+        url = "https://www.amazon.fr/dp/B0CACHE001"
+
+        assert client.fetch_html(url) == "<html>page</html>"
+        assert client.fetch_html(url) == "<html>page</html>"
+        assert len(requests) == 1
+
+        cache.ttl_seconds = 0
+        assert client.fetch_html(url) == "<html>page</html>"
+        assert len(requests) == 2
+        assert requests[1].headers["If-None-Match"] == '"v1"'
+
+        stats = client.page_cache_stats()
+        assert (stats["misses"], stats["hits"], stats["revalidated"]) == (1, 1, 1)
+
+    def test_eviction_keeps_size_bounded(self, tmp_path):
+        """Test que les pages les moins récemment utilisées sont évincées au-delà de la taille max."""
+        cache = PageCache(str(tmp_path), ttl_seconds=3600, max_bytes=1)
+        cache.put("https://www.amazon.fr/dp/B0OLD00001", "<html>ancienne</html>")
+        time.sleep(0.01)
+        cache.put("https://www.amazon.fr/dp/B0NEW00001", "<html>récente</html>")
+
+        assert cache.get("https://www.amazon.fr/dp/B0OLD00001") is None
+        assert cache.get_stats()["evicted"] >= 1
+
+    def test_listing_and_search_pages_bypass_cache(self, tmp_path):
+        """Test que les Best Sellers et la recherche sont toujours rechargés (classement changeant)."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, text='<div data-asin="B0LIST0001"></div>')
+
+        cache = PageCache(str(tmp_path), ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+        client = self._client(cache, handler)
+
+        for _ in range(2):
+            assert client.scrape_best_sellers_fr() == ["B0LIST0001"]
+            assert client.scrape_search("cafetière") == ["B0LIST0001"]
+
+        assert len(requests) == 4
+        assert client.page_cache_stats()["hits"] == 0
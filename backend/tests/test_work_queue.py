@@ -0,0 +1,203 @@
+"""
+Tests pour la file de travail distribuée.
+
+Tests unitaires des relances et du découpage en tâches (sans base de données),
+et tests de la réclamation, de l'expiration et des relances (base de données).
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.jobs.queue_worker import QueueWorker, _chunks, enqueue_stage, execute_task
+from app.models import Base
+from app.models.work_task import WorkTask
+from app.services.job_lock import JobStillRunningError, SingleFlight
+from app.services.work_queue import TASK_SCORING_CHUNK, WorkQueue, retry_delay_seconds
+
+
+@pytest.fixture(scope="function")
+def db():
+    """Créer une session de base de données pour les tests."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestWorkQueue:
+    """Tests de la file work_tasks."""
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        """Test que le délai double à chaque tentative, plafonné à une heure."""
+        assert retry_delay_seconds(1, 60) == 60
+        assert retry_delay_seconds(2, 60) == 120
+        assert retry_delay_seconds(3, 60) == 240
+        assert retry_delay_seconds(20, 60) == 3600
+
+    def test_chunks_split_in_order(self):
+        """Test le découpage des ASINs / produits en lots."""
+        assert _chunks(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+        assert _chunks([], 10) == []
+        assert _chunks([1, 2], 0) == [[1], [2]]
+
+    def test_execute_unknown_task_type(self):
+        """Test qu'un type de tâche inconnu lève une erreur (tâche mise en échec)."""
+        task = WorkTask(task_type="unknown", payload={})
+
+        with pytest.raises(ValueError):
+            execute_task(None, task)
+
+
+
+class TestWorkQueueDatabase:
+    """Tests de la file work_tasks sur Postgres."""
+
+    def test_claim_skips_rows_locked_by_another_worker(self, db: Session):
+        """Test qu'une tâche verrouillée par une autre transaction est sautée (SKIP LOCKED)."""
+        queue = WorkQueue(db)
+        first, second = queue.enqueue(TASK_SCORING_CHUNK, [{"product_ids": []}, {"product_ids": []}])
+        first_id, second_id = first.id, second.id
+
+        other = SessionLocal()
+        try:
+            locked = (
+                other.query(WorkTask)
+                .filter(WorkTask.id == first_id)
+                .with_for_update()
+                .one()
+            )
+            assert locked.status == "pending"
+
+            claimed = queue.claim("worker-a")
+            assert claimed.id == second_id
+            assert queue.claim("worker-b") is None
+        finally:
+            other.rollback()
+            other.close()
+
+        claimed = queue.claim("worker-b")
+        assert claimed.id == first_id
+        assert (claimed.status, claimed.locked_by, claimed.attempts) == ("running", "worker-b", 1)
+
+    def test_expired_lease_is_reclaimed_and_old_worker_cannot_ack(self, db: Session):
+        """Test la reprise après expiration du délai de visibilité et la garde locked_by."""
+        queue = WorkQueue(db)
+        queue.enqueue(TASK_SCORING_CHUNK, [{"product_ids": []}])
+        task = queue.claim("worker-a")
+
+        assert queue.claim("worker-b") is None
+        later = datetime.utcnow() + timedelta(seconds=queue.visibility_timeout + 1)
+        reclaimed = queue.claim("worker-b", now=later)
+
+        assert reclaimed.id == task.id
+        assert (reclaimed.locked_by, reclaimed.attempts) == ("worker-b", 2)
+        assert queue.heartbeat(task.id, "worker-a") is False
+        assert queue.complete(task, "worker-a", {"scored": 1}) is False
+        assert queue.fail(task, "worker-a", RuntimeError("trop tard")) is False
+        assert queue.heartbeat(task.id, "worker-b") is True
+        assert queue.complete(reclaimed, "worker-b", {"scored": 2}) is True
+
+        db.expire_all()
+        task = db.query(WorkTask).one()
+        assert (task.status, task.result) == ("done", {"scored": 2})
+
+    def test_expired_lease_on_last_attempt_fails_task(self, db: Session):
+        """Test qu'une tâche expirée sans tentative restante passe en échec au lieu d'être reprise."""
+        queue = WorkQueue(db)
+        queue.enqueue(TASK_SCORING_CHUNK, [{"product_ids": []}], max_attempts=1)
+        queue.claim("worker-a")
+
+        later = datetime.utcnow() + timedelta(seconds=queue.visibility_timeout + 1)
+        assert queue.claim("worker-b", now=later) is None
+
+        task = db.query(WorkTask).one()
+        assert task.status == "failed"
+        assert task.attempts == 1
+        assert "worker-a" in task.last_error
+
+    def test_failed_task_is_retried_then_fails(self, db: Session):
+        """Test la relance différée après un échec, puis l'échec définitif à max_attempts."""
+        queue = WorkQueue(db)
+        queue.enqueue(TASK_SCORING_CHUNK, [{"product_ids": []}], max_attempts=2)
+
+        task = queue.claim("worker-a")
+        assert queue.fail(task, "worker-a", RuntimeError("boom")) is True
+        assert task.status == "pending"
+        assert task.available_at > datetime.utcnow()
+        assert queue.claim("worker-a") is None
+
+        later = datetime.utcnow() + timedelta(seconds=queue.retry_backoff + 1)
+        task = queue.claim("worker-a", now=later)
+        assert task.attempts == 2
+        assert queue.fail(task, "worker-a", RuntimeError("boom")) is True
+        assert (task.status, task.last_error) == ("failed", "boom")
+        assert task.finished_at is not None
+
+    def test_worker_sends_heartbeats_while_task_runs(self, db: Session, monkeypatch):
+        """Test que le worker prolonge le délai de visibilité pendant l'exécution."""
+        WorkQueue(db).enqueue(TASK_SCORING_CHUNK, [{"product_ids": []}])
+        heartbeats = []
+        original = WorkQueue.heartbeat
+
+        def heartbeat(self, task_id, worker_id):
+            heartbeats.append(threading.current_thread().name)
+            return original(self, task_id, worker_id)
+
+        def slow_task(db, task):
+            time.sleep(0.3)
+            return {"scored": 0}
+
+        monkeypatch.setattr(WorkQueue, "heartbeat", heartbeat)
+        monkeypatch.setattr("app.jobs.queue_worker.execute_task", slow_task)
+
+        worker = QueueWorker(worker_id="worker-a", heartbeat_interval=0.05)
+        assert worker.run_once() is True
+
+        assert len(heartbeats) >= 2
+        db.expire_all()
+        assert db.query(WorkTask).one().status == "done"
+
+    def test_discover_enqueue_skips_asins_already_queued(self, db: Session, monkeypatch):
+        """Test qu'une seconde mise en file discover ne remet pas les ASINs déjà en file."""
+        selected = ["B000000001", "B000000002", "B000000003"]
+        monkeypatch.setattr(
+            "app.jobs.queue_worker.DiscoverJob.select_asins", lambda self, force=False: list(selected)
+        )
+
+        first = enqueue_stage(db, "discover", market_code="amazon_fr", chunk_size=2)
+        selected.append("B000000004")
+        second = enqueue_stage(db, "discover", market_code="amazon_fr", chunk_size=2)
+
+        assert [task.payload["asins"] for task in first] == [
+            ["B000000001", "B000000002"],
+            ["B000000003"],
+        ]
+        assert [task.payload["asins"] for task in second] == [["B000000004"]]
+
+        queue = WorkQueue(db)
+        task = queue.claim("worker-a")
+        queue.complete(task, "worker-a", {})
+        third = enqueue_stage(db, "discover", market_code="amazon_fr", chunk_size=2)
+        assert [t.payload["asins"] for t in third] == [task.payload["asins"]]
+
+    def test_concurrent_discover_enqueue_is_refused(self, db: Session, monkeypatch):
+        """Test qu'une mise en file discover pendant une autre (même marché) est refusée."""
+        monkeypatch.setattr(
+            "app.jobs.queue_worker.DiscoverJob.select_asins", lambda self, force=False: ["B000000001"]
+        )
+        flight = SingleFlight("discover_enqueue", "amazon_fr")
+        connection = flight._try_lock()
+        try:
+            with pytest.raises(JobStillRunningError):
+                enqueue_stage(db, "discover", market_code="amazon_fr")
+        finally:
+            flight._unlock(connection)
+
+        assert len(enqueue_stage(db, "discover", market_code="amazon_fr")) == 1